@@ -0,0 +1,406 @@
+"""Concurrent forwarder for the form submission queue.
+
+``process_form_queue`` used to pick at most 20 due ``FormSubmissionTask``
+rows per cron run and forward them one at a time, each with a fresh
+``requests.post`` connection.  ``Forwarder`` instead:
+
+* claims batches with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several
+  forwarders share the queue without waiting on each other's rows; a claimed
+  task is ``processing`` with ``next_try_at`` moved to the end of its lease,
+  and tasks whose lease ran out (a crashed forwarder) are claimed again;
+* sends a batch concurrently on a thread pool, every worker thread keeping
+  its own keep-alive ``requests.Session``, with at most ``PER_HOST_LIMIT``
+  requests in flight per Leads API host;
+* stops calling the Leads API while it is failing: after
+  ``BREAKER_THRESHOLD`` consecutive outages (connection errors, timeouts,
+  429 and 5xx answers) the circuit opens for ``BREAKER_COOLDOWN`` seconds,
+  claimed tasks are handed back untouched, and then a single probe decides
+  whether it closes again.  Rejections (other 4xx) are the submission's
+  problem and do not count;
+* keeps throughput and lag counters (``Forwarder.metrics``), published after
+  every batch to its ``FormForwarderStatus`` row (one per forwarder name, the
+  host by default), where ``queue_stats()`` and the admin endpoint read them
+  from any process.
+
+Worker threads only do HTTP; claiming and recording the outcome stay on the
+calling thread, so each batch uses a single database connection.
+
+``run_once`` handles one batch (the cron mode of the command),
+``run_forever`` is the daemon loop, polling every ``POLL_INTERVAL`` seconds
+while the queue is empty.
+"""
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import FormForwarderStatus, FormSubmissionTask
+from . import tasks as submission_tasks
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "WORKERS": 8,
+    "BATCH_SIZE": 50,
+    "PER_HOST_LIMIT": 4,
+    "POOL_SIZE": 10,
+    "POLL_INTERVAL": 2.0,
+    "LEASE_SECONDS": 300,
+    "BREAKER_THRESHOLD": 5,
+    "BREAKER_COOLDOWN": 30.0,
+}
+
+# a circuit-open skip: the task goes back to the queue as it was
+DEFERRED = object()
+
+
+def _config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "FORM_FORWARDER", {}) or {})
+    return config
+
+
+def backoff(attempts):
+    """Delay before retrying a task that failed ``attempts`` times (minutes, capped at a day)."""
+    return timedelta(minutes=min(60 * 24, 2 ** attempts))
+
+
+def is_outage(error):
+    """Whether a failed send says the Leads API is unavailable (rather than rejecting the submission)."""
+    if not error:
+        return False
+    if "exception" in error:
+        return True
+    status = error.get("http_status")
+    return status is not None and (status == 429 or status >= 500)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open -> half-open -> closed."""
+
+    def __init__(self, threshold, cooldown, clock=time.monotonic):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def retry_in(self):
+        """Seconds until calls are let through again (0 when closed)."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown - (self._clock() - self._opened_at))
+
+    def allow(self):
+        """Whether a call may go out now; in half-open state only one probe at a time."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "open" or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, ok):
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.threshold:
+                # a failed probe re-opens the circuit for another cooldown
+                if self._opened_at is None:
+                    self.opened += 1
+                    logger.warning("Leads API circuit opened after %s consecutive failures", self._failures)
+                self._opened_at = self._clock()
+
+
+class HostLimiter:
+    """At most ``limit`` concurrent requests per host."""
+
+    def __init__(self, limit):
+        self.limit = max(1, int(limit))
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    @contextmanager
+    def slot(self, host):
+        with self._lock:
+            semaphore = self._slots.setdefault(host, threading.BoundedSemaphore(self.limit))
+        with semaphore:
+            yield
+
+
+class Metrics:
+    """Thread-safe counters of one forwarder."""
+
+    COUNTERS = ("batches", "claimed", "forwarded", "failed", "dead", "deferred", "reclaimed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self._values = dict.fromkeys(self.COUNTERS, 0)
+        self._send_ms = 0.0
+        self._sends = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._lag_count = 0
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._values[name] += n
+
+    def sent(self, elapsed_ms):
+        with self._lock:
+            self._sends += 1
+            self._send_ms += elapsed_ms
+
+    def lag(self, seconds):
+        """Time a task waited between becoming due and being claimed."""
+        seconds = max(0.0, seconds)
+        with self._lock:
+            self._lag_count += 1
+            self._lag_total += seconds
+            self._lag_max = max(self._lag_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            values = dict(self._values)
+            values.update({
+                "uptime_s": round(elapsed, 3),
+                "throughput_per_s": round(values["forwarded"] / elapsed, 3),
+                "avg_send_ms": round(self._send_ms / self._sends, 3) if self._sends else 0.0,
+                "avg_lag_s": round(self._lag_total / self._lag_count, 3) if self._lag_count else 0.0,
+                "max_lag_s": round(self._lag_max, 3),
+            })
+            return values
+
+
+class Forwarder:
+    """One queue consumer; ``overrides`` replace ``settings.FORM_FORWARDER`` keys (``workers=4``)."""
+
+    def __init__(self, **overrides):
+        config = _config()
+        config.update({key.upper(): value for key, value in overrides.items() if value is not None})
+        self.config = config
+        self.breaker = CircuitBreaker(config["BREAKER_THRESHOLD"], config["BREAKER_COOLDOWN"])
+        self.limiter = HostLimiter(config["PER_HOST_LIMIT"])
+        self.metrics = Metrics()
+        self.name = config.get("NAME") or socket.gethostname()
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = None
+
+    # --- HTTP (worker threads) ------------------------------------------------
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.config["POOL_SIZE"])
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _send(self, task, host):
+        if not self.breaker.allow():
+            return DEFERRED
+        started = time.perf_counter()
+        with self.limiter.slot(host):
+            success, data, error = submission_tasks.send_to_leads(task.submission, session=self._session())
+        self.metrics.sent((time.perf_counter() - started) * 1000)
+        if error and "error" in error:
+            # not configured; nothing to learn about the API
+            self.breaker.record(True)
+        else:
+            self.breaker.record(not is_outage(error))
+        return success, data, error
+
+    # --- queue (calling thread) -------------------------------------------------
+
+    def reclaim_expired(self):
+        """Return tasks whose lease ran out (their forwarder died) to the queue."""
+        reclaimed = FormSubmissionTask.objects.filter(status="processing", next_try_at__lte=timezone.now()).update(
+            status="pending", locked=False
+        )
+        if reclaimed:
+            self.metrics.incr("reclaimed", reclaimed)
+            logger.warning("Reclaimed %s form submission tasks with expired leases", reclaimed)
+        return reclaimed
+
+    def claim(self, limit):
+        """Lock and lease up to ``limit`` due tasks, skipping rows other forwarders hold."""
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = list(
+                FormSubmissionTask.objects.select_for_update(skip_locked=True)
+                .filter(locked=False, status="pending", next_try_at__lte=now)
+                .order_by("next_try_at")[:limit]
+            )
+            if not tasks:
+                return []
+            FormSubmissionTask.objects.filter(pk__in=[t.pk for t in tasks]).update(
+                locked=True, status="processing", next_try_at=now + timedelta(seconds=self.config["LEASE_SECONDS"])
+            )
+        for task in tasks:
+            self.metrics.lag((now - task.next_try_at).total_seconds())
+        self.metrics.incr("claimed", len(tasks))
+        # the submissions are read here, not in the worker threads
+        claimed = FormSubmissionTask.objects.select_related("submission").filter(pk__in=[t.pk for t in tasks])
+        return list(claimed.order_by("next_try_at", "pk"))
+
+    def _finish(self, task, outcome):
+        """Record one task's outcome and release it."""
+        if outcome is DEFERRED:
+            # the circuit was open: back to the queue as it was, due when it may close
+            retry_at = timezone.now() + timedelta(seconds=self.breaker.retry_in())
+            FormSubmissionTask.objects.filter(pk=task.pk).update(status="pending", locked=False, next_try_at=retry_at)
+            self.metrics.incr("deferred")
+            return
+
+        success, data, error = outcome
+        submission_tasks.record_forward_result(task.submission, success, data, error)
+        task.attempts += 1
+        task.locked = False
+        if success:
+            task.status = "done"
+            task.last_error = None
+            self.metrics.incr("forwarded")
+        else:
+            task.last_error = error
+            self.metrics.incr("failed")
+            if task.attempts >= task.max_attempts:
+                task.status = "failed"
+                self.metrics.incr("dead")
+            else:
+                task.status = "pending"
+                task.next_try_at = timezone.now() + backoff(task.attempts)
+        task.save(update_fields=["attempts", "locked", "status", "next_try_at", "last_error"])
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, int(self.config["WORKERS"])), thread_name_prefix="form-forwarder"
+            )
+        return self._executor
+
+    def run_once(self, limit=None):
+        """Forward one batch of due tasks; returns the number of tasks claimed."""
+        if self.breaker.state == "open":
+            return 0
+        self.reclaim_expired()
+        tasks = self.claim(limit or self.config["BATCH_SIZE"])
+        if not tasks:
+            return 0
+        url, _timeout = submission_tasks.leads_api_settings()
+        host = urlsplit(url or "").netloc
+        futures = {self._pool().submit(self._send, task, host): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as exc:
+                logger.exception("Forwarding task %s failed unexpectedly", task.pk)
+                outcome = (False, None, {"exception": str(exc)})
+            try:
+                self._finish(task, outcome)
+            except Exception:
+                # the lease expires and the task is retried
+                logger.exception("Could not record the outcome of form submission task %s", task.pk)
+        self.metrics.incr("batches")
+        self.publish_metrics()
+        return len(tasks)
+
+    def run_forever(self, exit_when_idle=False):
+        """Daemon loop: forward batches until ``stop()`` (or, with ``exit_when_idle``, the queue is drained)."""
+        try:
+            while not self._stop.is_set():
+                if self.run_once():
+                    continue
+                if exit_when_idle and self.breaker.state == "closed":
+                    break
+                # wait for new tasks, or for the circuit to half-open
+                self._stop.wait(max(self.config["POLL_INTERVAL"], min(self.breaker.retry_in(), 60.0)))
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+        self.publish_metrics()
+
+    def publish_metrics(self):
+        now = timezone.now()
+        snapshot = dict(self.metrics.snapshot(), name=self.name, circuit=self.breaker.state, published_at=now.isoformat())
+        try:
+            FormForwarderStatus.objects.update_or_create(
+                name=self.name, defaults={"metrics": snapshot, "published_at": now}
+            )
+        except Exception:
+            logger.exception("Could not publish form forwarder metrics")
+        return snapshot
+
+
+def queue_stats():
+    """Backlog of the queue plus the metrics the forwarders published, the latest first."""
+    now = timezone.now()
+    counts = dict(
+        FormSubmissionTask.objects.values("status").annotate(n=Count("id")).values_list("status", "n")
+    )
+    due = FormSubmissionTask.objects.filter(status="pending", next_try_at__lte=now).aggregate(
+        count=Count("id"), oldest=Min("next_try_at")
+    )
+    forwarders = list(FormForwarderStatus.objects.order_by("-published_at").values_list("metrics", flat=True))
+    return {
+        "counts": counts,
+        "due": due["count"],
+        "lag_s": round((now - due["oldest"]).total_seconds(), 3) if due["oldest"] else 0.0,
+        "forwarder": forwarders[0] if forwarders else None,
+        "forwarders": forwarders,
+    }
@@ -1,71 +1,44 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db import transaction
-from datetime import timedelta
-
-from blog.models import FormSubmissionTask
-from blog import tasks as submission_tasks
+import signal
 
+from django.core.management.base import BaseCommand
 
-BATCH_SIZE = 20
+from blog.forwarder import Forwarder
 
 
 class Command(BaseCommand):
-    help = "Process pending FormSubmission tasks and forward submissions to Leads API"
+    help = (
+        "Forward pending FormSubmission tasks to the Leads API. Without --daemon one batch is "
+        "processed (cron mode); with --daemon batches are processed until SIGTERM/SIGINT."
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("--limit", type=int, default=BATCH_SIZE, help="Max tasks to process this run")
+        parser.add_argument("--limit", type=int, help="Max tasks per batch (default FORM_FORWARDER['BATCH_SIZE'])")
+        parser.add_argument("--daemon", action="store_true", help="Keep running and poll for new tasks")
+        parser.add_argument("--exit-when-idle", action="store_true", help="With --daemon, stop once the queue is drained")
+        parser.add_argument("--workers", type=int, help="Concurrent requests (default FORM_FORWARDER['WORKERS'])")
+        parser.add_argument("--poll-interval", type=float, help="Seconds between polls of an empty queue")
+        parser.add_argument("--name", help="Name the metrics are published under (default: the host name)")
 
     def handle(self, *args, **options):
-        limit = options.get("limit") or BATCH_SIZE
-        now = timezone.now()
-
-        # Pick candidate tasks that are pending and due
-        candidates = (
-            FormSubmissionTask.objects.filter(locked=False, status__in=("pending",), next_try_at__lte=now)
-            .order_by("next_try_at")[:limit]
+        forwarder = Forwarder(
+            batch_size=options.get("limit"),
+            workers=options.get("workers"),
+            poll_interval=options.get("poll_interval"),
+            name=options.get("name"),
         )
-
-        processed = 0
-        for task in candidates:
-            # try to atomically acquire the lock using an update
-            updated = (
-                FormSubmissionTask.objects.filter(pk=task.pk, locked=False)
-                .update(locked=True, status="processing")
-            )
-            if not updated:
-                # someone else grabbed it
-                continue
-
-            # refresh from DB to get latest submission relation
-            task.refresh_from_db()
-            submission = task.submission
-
+        if options["daemon"]:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: forwarder.stop())
+            forwarder.run_forever(exit_when_idle=options["exit_when_idle"])
+        else:
             try:
-                success, result = submission_tasks.forward_submission_to_leads(submission)
-            except Exception as exc:
-                success = False
-                result = {"exception": str(exc)}
-
-            # update task bookkeeping
-            with transaction.atomic():
-                task.refresh_from_db()
-                task.attempts = task.attempts + 1
-                task.locked = False
-                if success:
-                    task.status = "done"
-                    # mark submission already updated by worker
-                else:
-                    if task.attempts >= task.max_attempts:
-                        task.status = "failed"
-                    else:
-                        task.status = "pending"
-                        # exponential backoff in minutes
-                        backoff_minutes = min(60 * 24, 2 ** task.attempts)
-                        task.next_try_at = timezone.now() + timedelta(minutes=backoff_minutes)
-                task.last_error = result if not success else None
-                task.save()
-
-            processed += 1
-
-        self.stdout.write(self.style.SUCCESS(f"Processed {processed} tasks"))
+                forwarder.run_once()
+            finally:
+                forwarder.close()
+
+        stats = forwarder.metrics.snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['claimed']} tasks: {stats['forwarded']} forwarded, {stats['failed']} failed, "
+            f"{stats['deferred']} deferred (circuit {forwarder.breaker.state}), "
+            f"{stats['throughput_per_s']}/s, max lag {stats['max_lag_s']}s"
+        ))
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.1 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_remove_blogcomment_author_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormForwarderStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=191, unique=True)),
+                ('metrics', models.JSONField(default=dict)),
+                ('published_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
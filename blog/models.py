@@ -209,3 +209,14 @@ class FormSubmissionTask(models.Model):
 
     def __str__(self):
         return f"ForwardTask(submission={self.submission_id}, attempts={self.attempts}, status={self.status})"
+
+
+class FormForwarderStatus(models.Model):
+    """Metrics a ``process_form_queue`` forwarder published last, one row per forwarder name (its host)."""
+
+    name = models.CharField(max_length=191, unique=True)
+    metrics = models.JSONField(default=dict)
+    published_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"FormForwarderStatus({self.name} @ {self.published_at})"
@@ -1,8 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.db import transaction
-from .models import FormSubmission, FormSubmissionTask
+from .models import Blog, BlogComment, BlogLike, BlogSection, FormSubmission, FormSubmissionTask
 from django.utils import timezone
+from universal.public_cache import invalidate
 
 
 @receiver(post_save, sender=FormSubmission)
@@ -20,3 +21,21 @@ def on_form_submission_created(sender, instance, created, **kwargs):
             FormSubmissionTask.objects.create(submission=instance, next_try_at=timezone.now())
 
     transaction.on_commit(_create_task)
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def on_blog_changed(sender, instance, using=None, **kwargs):
+    """Drop the cached public blog pages showing this post (see universal.public_cache)."""
+    invalidate("blog", instance.pk, using=using)
+
+
+@receiver(post_save, sender=BlogSection)
+@receiver(post_delete, sender=BlogSection)
+@receiver(post_save, sender=BlogComment)
+@receiver(post_delete, sender=BlogComment)
+@receiver(post_save, sender=BlogLike)
+@receiver(post_delete, sender=BlogLike)
+def on_blog_content_changed(sender, instance, using=None, **kwargs):
+    # sections are rendered, likes and comments counted on the public pages
+    invalidate("blog", instance.blog_id, using=using)
@@ -10,18 +10,22 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-LEADS_API_URL = getattr(settings, "LEADS_API_URL", None)
-LEADS_API_TIMEOUT = getattr(settings, "LEADS_API_TIMEOUT", 10)
+def leads_api_settings():
+    """``(url, timeout)`` of the Leads API, read per call so settings overrides apply."""
+    return getattr(settings, "LEADS_API_URL", None), getattr(settings, "LEADS_API_TIMEOUT", 10)
 
 
-def forward_submission_to_leads(submission: FormSubmission):
-    """Forward a submission to the Leads API synchronously. Returns (success, result_dict_or_error).
+def send_to_leads(submission: FormSubmission, session=None):
+    """POST a submission to the Leads API without touching the database.
 
-    This function is intended to be called by the queue processor. It does not touch task rows; it
-    only updates the submission object based on outcome.
+    Returns ``(success, data, error)``: the decoded response body and, on
+    failure, ``{"http_status", "response"}`` or ``{"exception"}``.  Safe to
+    call from worker threads; ``session`` is a ``requests.Session`` to reuse
+    keep-alive connections (``requests.post`` when omitted).
     """
-    if LEADS_API_URL is None:
-        return False, {"error": "LEADS_API_URL not configured"}
+    url, timeout = leads_api_settings()
+    if url is None:
+        return False, None, {"error": "LEADS_API_URL not configured"}
 
     payload = submission.payload or {}
     # add trace data
@@ -30,52 +34,65 @@ def forward_submission_to_leads(submission: FormSubmission):
     try:
         import requests
 
-        resp = requests.post(LEADS_API_URL, json=payload_with_trace, timeout=LEADS_API_TIMEOUT)
+        post = session.post if session is not None else requests.post
+        resp = post(url, json=payload_with_trace, timeout=timeout)
         try:
             data = resp.json()
         except Exception:
             data = {"status_code": resp.status_code, "text": resp.text}
+    except Exception as exc:
+        return False, None, {"exception": str(exc)}
+
+    if resp.status_code in (200, 201):
+        return True, data, None
+    return False, data, {"http_status": resp.status_code, "response": data}
 
-        if resp.status_code in (200, 201):
-            # expected a lead id in response (best-effort)
-            lead_ref = None
-            if isinstance(data, dict):
-                lead_ref = data.get("lead_id") or data.get("id")
-            submission.is_forwarded = True
-            submission.status = "forwarded"
-            if lead_ref:
-                submission.lead_ref = str(lead_ref)
-            submission.error_details = None
-            submission.forwarded_at = timezone.now()
-            # store the full response safely (could be large) - best-effort
-            try:
-                submission.forwarded_response = data
-            except Exception:
-                submission.forwarded_response = {"note": "unable to serialize response"}
-            submission.save(update_fields=["is_forwarded", "status", "lead_ref", "error_details", "forwarded_at", "forwarded_response"])
-            logger.info("FormSubmission %s forwarded to Leads API: status=%s", submission.pk, resp.status_code)
-            return True, data
-
-        # non-success status code
-        submission.status = "error"
-        submission.error_details = {"http_status": resp.status_code, "response": data}
-        # also save last response for debugging
+
+def record_forward_result(submission: FormSubmission, success, data, error):
+    """Store the outcome of ``send_to_leads`` on the submission."""
+    if success:
+        # expected a lead id in response (best-effort)
+        lead_ref = None
+        if isinstance(data, dict):
+            lead_ref = data.get("lead_id") or data.get("id")
+        submission.is_forwarded = True
+        submission.status = "forwarded"
+        if lead_ref:
+            submission.lead_ref = str(lead_ref)
+        submission.error_details = None
+        submission.forwarded_at = timezone.now()
+        # store the full response safely (could be large) - best-effort
         try:
             submission.forwarded_response = data
         except Exception:
             submission.forwarded_response = {"note": "unable to serialize response"}
-        submission.save(update_fields=["status", "error_details", "forwarded_response"])
-        logger.warning("FormSubmission %s received non-success from Leads API: %s", submission.pk, resp.status_code)
-        return False, submission.error_details
+        submission.save(update_fields=["is_forwarded", "status", "lead_ref", "error_details", "forwarded_at", "forwarded_response"])
+        logger.info("FormSubmission %s forwarded to Leads API", submission.pk)
+        return
 
-    except Exception as exc:
-        err = {"exception": str(exc)}
-        submission.status = "error"
-        submission.error_details = err
-        try:
-            submission.forwarded_response = {"exception": str(exc)}
-        except Exception:
-            pass
-        submission.save(update_fields=["status", "error_details", "forwarded_response"])
-        logger.exception("Error forwarding FormSubmission %s to Leads API", submission.pk)
-        return False, err
+    if "error" in error:
+        # not configured: nothing was sent, leave the submission untouched
+        return
+    submission.status = "error"
+    submission.error_details = error
+    # also save last response for debugging
+    try:
+        submission.forwarded_response = data if "http_status" in error else {"exception": error["exception"]}
+    except Exception:
+        submission.forwarded_response = {"note": "unable to serialize response"}
+    submission.save(update_fields=["status", "error_details", "forwarded_response"])
+    if "http_status" in error:
+        logger.warning("FormSubmission %s received non-success from Leads API: %s", submission.pk, error["http_status"])
+    else:
+        logger.error("Error forwarding FormSubmission %s to Leads API: %s", submission.pk, error["exception"])
+
+
+def forward_submission_to_leads(submission: FormSubmission, session=None):
+    """Forward a submission to the Leads API synchronously. Returns (success, result_dict_or_error).
+
+    This function is intended to be called by the queue processor. It does not touch task rows; it
+    only updates the submission object based on outcome.
+    """
+    success, data, error = send_to_leads(submission, session=session)
+    record_forward_result(submission, success, data, error)
+    return (True, data) if success else (False, error)
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog.forwarder import CircuitBreaker, Forwarder, queue_stats
+from blog.models import FormForwarderStatus, FormSubmission, FormSubmissionTask, LeadForm
+
+
+class StubLeadsAPI:
+    """Local Leads API answering every POST with ``status`` after ``delay`` seconds."""
+
+    def __init__(self, status=201, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.calls += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.connections.add(self.client_address)
+                time.sleep(stub.delay)
+                with stub.lock:
+                    stub.in_flight -= 1
+                reply = json.dumps({"lead_id": f"L{body['trace_submission_id']}"}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/leads"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FormForwarderTests(TestCase):
+    def setUp(self):
+        self.form = LeadForm.objects.create(name="Contact", slug="contact", schema={}, active=True)
+
+    def _stub(self, **kwargs):
+        stub = StubLeadsAPI(**kwargs)
+        self.addCleanup(stub.close)
+        return stub
+
+    def _tasks(self, n):
+        with self.captureOnCommitCallbacks(execute=True):
+            submissions = [FormSubmission.objects.create(form=self.form, payload={"n": i}) for i in range(n)]
+        return list(FormSubmissionTask.objects.filter(submission__in=submissions).order_by("pk"))
+
+    def test_batch_is_forwarded_concurrently_within_the_host_limit(self):
+        stub = self._stub(delay=0.05)
+        tasks = self._tasks(8)
+        with override_settings(LEADS_API_URL=stub.url):
+            forwarder = Forwarder(workers=6, per_host_limit=2, name="worker-1")
+            try:
+                self.assertEqual(forwarder.run_once(), 8)
+            finally:
+                forwarder.close()
+
+        self.assertEqual(stub.calls, 8)
+        self.assertLessEqual(stub.max_in_flight, 2)
+        # keep-alive: the requests reused at most one connection per worker thread
+        self.assertLessEqual(len(stub.connections), 6)
+        for task in tasks:
+            task.refresh_from_db()
+            self.assertEqual((task.status, task.attempts, task.locked), ("done", 1, False))
+            self.assertEqual(task.submission.lead_ref, f"L{task.submission_id}")
+        stats = forwarder.metrics.snapshot()
+        self.assertEqual((stats["claimed"], stats["forwarded"], stats["failed"]), (8, 8, 0))
+        # published to the database, readable from any process
+        self.assertEqual(FormForwarderStatus.objects.get(name="worker-1").metrics["forwarded"], 8)
+        self.assertEqual(queue_stats()["forwarder"]["forwarded"], 8)
+
+    def test_circuit_opens_while_the_api_is_failing(self):
+        stub = self._stub(status=503)
+        tasks = self._tasks(5)
+        with override_settings(LEADS_API_URL=stub.url):
+            forwarder = Forwarder(workers=1, breaker_threshold=2, breaker_cooldown=60)
+            try:
+                forwarder.run_once()
+                # open circuit: nothing is claimed
+                self.assertEqual(forwarder.run_once(), 0)
+            finally:
+                forwarder.close()
+
+        self.assertEqual(stub.calls, 2)
+        self.assertEqual(forwarder.breaker.state, "open")
+        statuses = []
+        for task in tasks:
+            task.refresh_from_db()
+            statuses.append((task.status, task.attempts))
+            self.assertGreater(task.next_try_at, timezone.now())
+        self.assertEqual(statuses, [("pending", 1)] * 2 + [("pending", 0)] * 3)
+        self.assertEqual(tasks[0].submission.error_details["http_status"], 503)
+        self.assertEqual(forwarder.metrics.snapshot()["deferred"], 3)
+
+    def test_half_open_probe_closes_the_circuit(self):
+        now = [0.0]
+        breaker = CircuitBreaker(threshold=1, cooldown=10, clock=lambda: now[0])
+        breaker.record(False)
+        self.assertEqual((breaker.state, breaker.allow()), ("open", False))
+        now[0] = 11
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # one probe at a time
+        breaker.record(False)
+        self.assertEqual(breaker.state, "open")
+        now[0] = 22
+        self.assertTrue(breaker.allow())
+        breaker.record(True)
+        self.assertEqual(breaker.state, "closed")
+
+    def test_daemon_reclaims_expired_leases_and_drains_the_queue(self):
+        stub = self._stub()
+        stale, fresh = self._tasks(2)
+        FormSubmissionTask.objects.filter(pk=stale.pk).update(
+            status="processing", locked=True, next_try_at=timezone.now() - timedelta(seconds=1)
+        )
+        with override_settings(LEADS_API_URL=stub.url):
+            call_command("process_form_queue", daemon=True, exit_when_idle=True, poll_interval=0.01)
+
+        self.assertEqual(stub.calls, 2)
+        self.assertEqual(set(FormSubmissionTask.objects.values_list("status", flat=True)), {"done"})
+        self.assertEqual(queue_stats()["counts"], {"done": 2})
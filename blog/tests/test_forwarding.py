@@ -27,7 +27,7 @@ class FormForwardingTests(APITestCase):
         mock_resp.status_code = 201
         mock_resp.json.return_value = {"id": 555, "lead_id": 555}
 
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             call_command("process_form_queue", limit=10)
 
         submission = FormSubmission.objects.get(pk=submission_id)
@@ -49,7 +49,7 @@ class FormForwardingTests(APITestCase):
         # simulate network timeout
         import requests
 
-        with patch("requests.post", side_effect=requests.exceptions.Timeout()):
+        with patch("requests.Session.post", side_effect=requests.exceptions.Timeout()):
             call_command("process_form_queue", limit=10)
 
         submission = FormSubmission.objects.get(pk=submission_id)
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog.models import Blog, BlogComment
+
+
+class PublicBlogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog = Blog.objects.create(title="Hajj Guide", summary="s", status="published", published_at=timezone.now())
+        self.client = APIClient()
+
+    def test_anonymous_list_and_detail_are_cached(self):
+        url = f"/api/blog/blogs/{self.blog.pk}/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["comments_count"], 0)
+        self.assertEqual(self.client.get("/api/blog/blogs/").data["count"], 1)
+
+        with self.assertNumQueries(0):
+            self.client.get(url)
+            self.client.get("/api/blog/blogs/")
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BlogComment.objects.create(blog=self.blog, body="hello")
+            Blog.objects.create(title="Umrah Guide", summary="s", status="published", published_at=timezone.now())
+        self.assertEqual(self.client.get(url).data["comments_count"], 1)
+        self.assertEqual(self.client.get("/api/blog/blogs/").data["count"], 2)
+
+    def test_staff_bypass_the_shared_cache(self):
+        self.client.get("/api/blog/blogs/")
+        with self.captureOnCommitCallbacks(execute=True):
+            Blog.objects.create(title="Draft", status="draft")
+        staff = get_user_model().objects.create_user(username="editor", password="x", is_staff=True)
+        self.client.force_authenticate(staff)
+        response = self.client.get("/api/blog/blogs/")
+        self.assertEqual(response.data["count"], 2)
+        self.assertNotIn("ETag", response)
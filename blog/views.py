@@ -6,6 +6,7 @@ from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from . import models, serializers
+from universal.public_cache import cached_response
 from .permissions import IsStaffOrReadOnly, IsAuthorOrStaff
 from django.db import DatabaseError, OperationalError
 import logging
@@ -74,6 +75,23 @@ class BlogViewSet(viewsets.ModelViewSet):
 
         return qs.order_by("-published_at")
 
+    def _shared_view(self, request):
+        # staff also see drafts and scheduled posts; everyone else shares the published view
+        return not (request.user and request.user.is_staff)
+
+    def list(self, request, *args, **kwargs):
+        if not self._shared_view(request):
+            return super().list(request, *args, **kwargs)
+        return cached_response(request, "blog", lambda: super(BlogViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = str(kwargs.get(self.lookup_url_kwarg or self.lookup_field, ""))
+        if not (self._shared_view(request) and pk.isdigit()):
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            request, "blog", lambda: super(BlogViewSet, self).retrieve(request, *args, **kwargs), obj_id=int(pk)
+        )
+
     @action(detail=True, methods=["post"], permission_classes=[permissions.AllowAny])
     def comments(self, request, pk=None):
         """
@@ -190,3 +208,10 @@ class FormSubmissionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = models.FormSubmission.objects.all()
     serializer_class = serializers.FormSubmissionSerializer
     permission_classes = [permissions.IsAdminUser]
+
+    @action(detail=False, methods=["get"], url_path="queue-stats")
+    def queue_stats(self, request):
+        """Forwarding backlog and lag, plus the last throughput metrics a forwarder published."""
+        from .forwarder import queue_stats
+
+        return Response(queue_stats())
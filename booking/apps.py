@@ -8,6 +8,8 @@ class BookingConfig(AppConfig):
         # import signal handlers
         try:
             from . import signals  # noqa: F401
+            from . import events  # noqa: F401
+            from . import pax_facts  # noqa: F401
         except Exception:
             # avoid crashing if signals fail to import during migrations
             pass
@@ -0,0 +1,219 @@
+"""Post-commit booking event bus.
+
+A single ``Booking.save()`` used to fan out to a post_save receiver in each
+of finance, commissions, customers, leads, promotion_center, pax_movements
+and operations, every one of them re-querying the booking's passengers,
+tickets or payments, and all of them ran again for every extra save of the
+same booking in a request.
+
+Those receivers are now handlers registered on ``booking_events``.  The
+single post_save receiver here folds every save of a booking inside one
+transaction into one ``BookingEvent`` and dispatches it once the outermost
+transaction commits, with a snapshot of the booking loaded once (related
+organization, branch, agency and user, plus prefetched passengers, tickets
+and payments) and shared by all handlers.  Nothing is dispatched if the
+transaction rolls back.  Outside a transaction a save is dispatched straight
+away, as before.
+
+Handlers registered with ``background=True`` (contact and customer upserts)
+run on a small thread pool when ``BOOKING_EVENTS['BACKGROUND']`` is on.
+Every handler is timed; ``booking_events.metrics()`` returns the counters.
+
+Seat accounting (``booking.signals``) stays a plain post_save receiver: it
+has to move seats inside the booking's own transaction.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from universal import commit_batches
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "DEFER": True,
+    "BACKGROUND": True,
+    "MAX_WORKERS": 2,
+    "SLOW_HANDLER_MS": 500,
+}
+
+SNAPSHOT_RELATED = ("organization", "branch", "agency", "user")
+SNAPSHOT_PREFETCH = ("person_details", "ticket_details", "payment_details")
+
+
+def _config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "BOOKING_EVENTS", {}) or {})
+    return config
+
+
+class BookingEvent:
+    """Everything that happened to one booking within a transaction.
+
+    ``created`` is true if any of the folded saves created the booking,
+    ``previous`` is the stored state before the first save (as cached by
+    ``booking.signals.booking_pre_save``) and ``update_fields`` is the union
+    of the saves' ``update_fields`` or None if any save wrote every field.
+    """
+
+    def __init__(self, booking_id, created=False, previous=None, update_fields=None):
+        self.booking_id = booking_id
+        self.created = created
+        self.previous = previous
+        self.update_fields = set(update_fields) if update_fields is not None else None
+        self.saves = 1
+        self.booking = None
+
+    def merge(self, created, update_fields):
+        self.created = self.created or created
+        if self.update_fields is not None:
+            if update_fields is None:
+                self.update_fields = None
+            else:
+                self.update_fields.update(update_fields)
+        self.saves += 1
+
+
+class _Handler:
+    def __init__(self, name, func, background):
+        self.name = name
+        self.func = func
+        self.background = background
+
+
+class BookingEventBus:
+    def __init__(self):
+        self._handlers = []
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def register(self, name, background=False):
+        """Decorator registering ``func(event)`` under ``name`` (re-registering replaces it)."""
+        def decorator(func):
+            self.unregister(name)
+            self._handlers.append(_Handler(name, func, background))
+            return func
+        return decorator
+
+    def unregister(self, name):
+        self._handlers = [h for h in self._handlers if h.name != name]
+
+    def handlers(self):
+        return [h.name for h in self._handlers]
+
+    def metrics(self):
+        """``{handler name: {calls, errors, total_ms, max_ms}}`` since start-up."""
+        with self._lock:
+            return {name: dict(values) for name, values in self._metrics.items()}
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def _record(self, name, elapsed_ms, failed):
+        with self._lock:
+            values = self._metrics.setdefault(name, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            values["calls"] += 1
+            values["errors"] += int(failed)
+            values["total_ms"] += elapsed_ms
+            values["max_ms"] = max(values["max_ms"], elapsed_ms)
+
+    def _run(self, handler, event):
+        started = time.perf_counter()
+        failed = False
+        try:
+            handler.func(event)
+        except Exception:
+            failed = True
+            logger.exception("booking event handler %s failed for booking %s", handler.name, event.booking_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._record(handler.name, elapsed_ms, failed)
+        if elapsed_ms > _config()["SLOW_HANDLER_MS"]:
+            logger.warning("booking event handler %s took %.0f ms for booking %s", handler.name, elapsed_ms, event.booking_id)
+
+    def _run_in_background(self, handler, event):
+        close_old_connections()
+        try:
+            self._run(handler, event)
+        finally:
+            close_old_connections()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=_config()["MAX_WORKERS"], thread_name_prefix="booking-events"
+                )
+            return self._executor
+
+    def dispatch(self, event):
+        background = _config()["BACKGROUND"]
+        for handler in list(self._handlers):
+            if handler.background and background:
+                self._get_executor().submit(self._run_in_background, handler, event)
+            else:
+                self._run(handler, event)
+
+
+booking_events = BookingEventBus()
+
+
+def load_snapshots(booking_ids):
+    """``{booking_id: booking}`` with the relations handlers read, in three queries."""
+    from .models import Booking
+
+    bookings = (
+        Booking.objects.filter(pk__in=booking_ids)
+        .select_related(*SNAPSHOT_RELATED)
+        .prefetch_related(*SNAPSHOT_PREFETCH)
+    )
+    return {booking.pk: booking for booking in bookings}
+
+
+def dispatch_events(events):
+    """Load one snapshot per booking and hand each event to the handlers."""
+    snapshots = load_snapshots([event.booking_id for event in events])
+    for event in events:
+        event.booking = snapshots.get(event.booking_id)
+        if event.booking is None:
+            # deleted before commit
+            continue
+        booking_events.dispatch(event)
+
+
+class _PendingEvents(commit_batches.CommitBatch):
+    def __init__(self):
+        super().__init__()
+        self.events = {}
+
+    def run(self):
+        dispatch_events(list(self.events.values()))
+
+
+@receiver(post_save, sender="booking.Booking", dispatch_uid="booking_events")
+def booking_saved(sender, instance, created, update_fields=None, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_old_booking", None)
+
+    connection = transaction.get_connection(using)
+    if not _config()["DEFER"] or not connection.in_atomic_block:
+        event = BookingEvent(instance.pk, created, previous, update_fields)
+        event.booking = instance
+        booking_events.dispatch(event)
+        return
+
+    batch = commit_batches.pending("booking_events", _PendingEvents, using=using)
+    event = batch.events.get(instance.pk)
+    if event is None:
+        batch.events[instance.pk] = BookingEvent(instance.pk, created, previous, update_fields)
+    else:
+        event.merge(created, update_fields)
@@ -0,0 +1,351 @@
+"""Seat inventory ledger for tickets and umrah packages.
+
+Booking signals used to lock and save a Ticket / UmrahPackage row once per
+ticket detail and once per counter.  The helpers here collect every seat
+delta produced by a booking transition in memory first and then apply them
+with a single ``UPDATE ... SET col = col + delta`` per row inside one
+transaction, so a 40-pax group confirmation costs one statement per ticket.
+
+Optional seat holds (``SeatHold``) reserve seats for a limited time and are
+released back to inventory by ``release_expired_holds``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+PENDING_STATUSES = ('pending', 'unpaid')
+CONFIRMED_STATUSES = ('paid', 'confirmed')
+RELEASED_STATUSES = ('cancelled', 'expired')
+
+
+class InsufficientSeats(Exception):
+    """Raised by a strict ledger when a row does not have enough left seats."""
+
+    def __init__(self, kind, pk, requested):
+        self.kind = kind
+        self.pk = pk
+        self.requested = requested
+        super().__init__(f"Not enough seats left on {kind} #{pk} (requested {requested})")
+
+
+def _lower(status):
+    return str(status).lower() if status is not None else ''
+
+
+class SeatLedger:
+    """Accumulates seat deltas per ticket / package and applies them in one go.
+
+    Usage::
+
+        ledger = SeatLedger()
+        ledger.ticket(12, booked=4, left=-4)
+        ledger.package(3, booked=4, left=-4)
+        ledger.apply()
+
+    Deltas for the same row are merged, rows whose deltas cancel out are
+    skipped and rows are updated in primary-key order so two concurrent
+    ledgers touching the same tickets cannot deadlock each other.
+    """
+
+    TICKET_FIELDS = {
+        'booked': 'booked_tickets',
+        'confirmed': 'confirmed_tickets',
+        'left': 'left_seats',
+    }
+    PACKAGE_FIELDS = {
+        'booked': 'booked_seats',
+        'confirmed': 'confirmed_seats',
+        'left': 'left_seats',
+    }
+
+    def __init__(self):
+        self._tickets = defaultdict(lambda: defaultdict(int))
+        self._packages = defaultdict(lambda: defaultdict(int))
+
+    def ticket(self, ticket_id, booked=0, confirmed=0, left=0):
+        self._add(self._tickets, ticket_id, booked, confirmed, left)
+        return self
+
+    def package(self, package_id, booked=0, confirmed=0, left=0):
+        self._add(self._packages, package_id, booked, confirmed, left)
+        return self
+
+    @staticmethod
+    def _add(bucket, pk, booked, confirmed, left):
+        if not pk:
+            return
+        row = bucket[pk]
+        row['booked'] += booked or 0
+        row['confirmed'] += confirmed or 0
+        row['left'] += left or 0
+
+    def merge(self, other):
+        for pk, row in other._tickets.items():
+            self.ticket(pk, **row)
+        for pk, row in other._packages.items():
+            self.package(pk, **row)
+        return self
+
+    def ticket_deltas(self):
+        return {pk: dict(row) for pk, row in self._tickets.items() if any(row.values())}
+
+    def package_deltas(self):
+        return {pk: dict(row) for pk, row in self._packages.items() if any(row.values())}
+
+    def is_empty(self):
+        return not self.ticket_deltas() and not self.package_deltas()
+
+    @staticmethod
+    def _update(model, kind, fields, pk, row, strict):
+        values = {fields[key]: F(fields[key]) + delta for key, delta in row.items() if delta}
+        qs = model.objects.filter(pk=pk)
+        if strict and row.get('left', 0) < 0:
+            # conditional update: only take seats when enough are left
+            qs = qs.filter(**{f"{fields['left']}__gte": -row['left']})
+        updated = qs.update(**values)
+        if strict and not updated and row.get('left', 0) < 0 and model.objects.filter(pk=pk).exists():
+            raise InsufficientSeats(kind, pk, -row['left'])
+        return updated
+
+    @staticmethod
+    def _invalidate_caches(ticket_ids, package_ids):
+        """Drop the cached price catalogs and public package pages showing these seat counts.
+
+        The queryset updates above send no ``post_save``, so the receivers
+        that normally do this never run.
+        """
+        from tickets.models import Ticket
+        from packages.price_catalog import invalidate_price_catalog
+        from universal.public_cache import invalidate
+
+        if ticket_ids:
+            invalidate_price_catalog(*Ticket.objects.filter(pk__in=ticket_ids).values_list('organization_id', flat=True))
+        if package_ids:
+            invalidate("packages", *package_ids)
+
+    def apply(self, strict=False):
+        """Write all pending deltas, one UPDATE per ticket and per package.
+
+        With ``strict=True`` any row that would go below zero left seats
+        aborts the whole transaction with ``InsufficientSeats``.
+        Returns the number of rows updated.
+        """
+        from tickets.models import Ticket
+        from packages.models import UmrahPackage
+
+        tickets = self.ticket_deltas()
+        packages = self.package_deltas()
+        if not tickets and not packages:
+            return 0
+
+        updated = 0
+        with transaction.atomic():
+            for pk in sorted(tickets):
+                updated += self._update(Ticket, 'ticket', self.TICKET_FIELDS, pk, tickets[pk], strict)
+            for pk in sorted(packages):
+                updated += self._update(UmrahPackage, 'package', self.PACKAGE_FIELDS, pk, packages[pk], strict)
+            self._invalidate_caches(tickets, packages)
+
+        self._tickets.clear()
+        self._packages.clear()
+        return updated
+
+
+def _allocate_ticket_seats(ticket_details, included_count):
+    """Split ``included_count`` passengers over ticket details in order.
+
+    ``ticket_details`` is a list of ``(ticket_id, seats)`` pairs.  When
+    ``included_count`` is None every detail contributes its full seat count.
+    """
+    if included_count is None:
+        return [(ticket_id, seats or 0) for ticket_id, seats in ticket_details if (seats or 0) > 0]
+
+    allocation = []
+    remaining = included_count
+    if remaining <= 0:
+        return allocation
+    for ticket_id, seats in ticket_details:
+        assign = min(remaining, seats or 0)
+        if assign > 0:
+            allocation.append((ticket_id, assign))
+            remaining -= assign
+        if remaining <= 0:
+            break
+    return allocation
+
+
+def booking_transition_ledger(booking, created, old=None, ticket_details=None, ticket_included_count=None):
+    """Build the SeatLedger for one booking save.
+
+    ``old`` is the stored row read by ``booking_pre_save`` (status, total_pax).
+    ``ticket_details`` is a list of ``(ticket_id, seats)`` pairs for the
+    booking; it is loaded once when not given.
+    """
+    ledger = SeatLedger()
+    new_status = _lower(booking.status)
+    new_total_pax = booking.total_pax or 0
+    package_id = booking.umrah_package_id
+
+    if ticket_details is None:
+        ticket_details = list(booking.ticket_details.order_by('pk').values_list('ticket_id', 'seats'))
+    allocation = _allocate_ticket_seats(ticket_details, ticket_included_count)
+
+    if created:
+        if new_status in PENDING_STATUSES:
+            for ticket_id, seats in allocation:
+                ledger.ticket(ticket_id, booked=seats, left=-seats)
+            if package_id:
+                ledger.package(package_id, booked=new_total_pax, left=-new_total_pax)
+        return ledger
+
+    if not old:
+        return ledger
+
+    old_status = _lower(old.get('status'))
+    old_total_pax = old.get('total_pax') or 0
+
+    # payment / confirmation: pending -> confirmed
+    if old_status in PENDING_STATUSES and new_status in CONFIRMED_STATUSES:
+        for ticket_id, seats in allocation:
+            ledger.ticket(ticket_id, booked=-seats, confirmed=seats)
+        if package_id:
+            ledger.package(package_id, booked=-new_total_pax, confirmed=new_total_pax)
+
+    # cancellation / expiry: restore availability
+    if new_status in RELEASED_STATUSES:
+        for ticket_id, seats in allocation:
+            ledger.ticket(ticket_id, left=seats)
+            if old_status in PENDING_STATUSES:
+                ledger.ticket(ticket_id, booked=-seats)
+            elif old_status in CONFIRMED_STATUSES:
+                ledger.ticket(ticket_id, confirmed=-seats)
+        if package_id:
+            ledger.package(package_id, left=new_total_pax)
+            if old_status in PENDING_STATUSES:
+                ledger.package(package_id, booked=-new_total_pax)
+            elif old_status in CONFIRMED_STATUSES:
+                ledger.package(package_id, confirmed=-new_total_pax)
+
+    # passenger count change: reserve or release the difference
+    pax_diff = new_total_pax - old_total_pax
+    if pax_diff:
+        if package_id:
+            ledger.package(package_id, booked=pax_diff, left=-pax_diff)
+        elif ticket_details:
+            ledger.ticket(ticket_details[0][0], booked=pax_diff, left=-pax_diff)
+
+    return ledger
+
+
+def booking_release_ledger(status, total_pax, package_id):
+    """Ledger restoring package seats for a deleted booking."""
+    ledger = SeatLedger()
+    status = _lower(status)
+    total_pax = total_pax or 0
+    if package_id:
+        ledger.package(package_id, left=total_pax)
+        if status in PENDING_STATUSES:
+            ledger.package(package_id, booked=-total_pax)
+        elif status in CONFIRMED_STATUSES:
+            ledger.package(package_id, confirmed=-total_pax)
+    return ledger
+
+
+def ticket_detail_release_ledger(ticket_id, seats, booking_status=None):
+    """Ledger restoring ticket seats for a deleted BookingTicketDetails row."""
+    ledger = SeatLedger()
+    seats = seats or 0
+    if seats <= 0:
+        return ledger
+    status = _lower(booking_status)
+    if status in CONFIRMED_STATUSES:
+        ledger.ticket(ticket_id, left=seats, confirmed=-seats)
+    else:
+        # pending or unknown parent status: decrement booked (safer default)
+        ledger.ticket(ticket_id, left=seats, booked=-seats)
+    return ledger
+
+
+# --- Seat holds -------------------------------------------------------------
+
+def place_hold(booking=None, ticket_id=None, package_id=None, seats=0, minutes=30, strict=True):
+    """Reserve seats on a ticket and/or package for ``minutes``.
+
+    The seats are moved from left to booked immediately (with a conditional
+    update when ``strict``) and a ``SeatHold`` row records the reservation so
+    it can be converted or released later.
+    """
+    from .models import SeatHold
+
+    if seats <= 0 or not (ticket_id or package_id):
+        return None
+
+    ledger = SeatLedger()
+    if ticket_id:
+        ledger.ticket(ticket_id, booked=seats, left=-seats)
+    if package_id:
+        ledger.package(package_id, booked=seats, left=-seats)
+
+    with transaction.atomic():
+        ledger.apply(strict=strict)
+        return SeatHold.objects.create(
+            booking=booking,
+            ticket_id=ticket_id,
+            umrah_package_id=package_id,
+            seats=seats,
+            expires_at=timezone.now() + timedelta(minutes=minutes),
+        )
+
+
+def release_holds(holds):
+    """Release the given active holds and return their seats to inventory."""
+    from .models import SeatHold
+
+    ids = [hold.pk for hold in holds]
+    if not ids:
+        return 0
+
+    with transaction.atomic():
+        # lock and re-read so a concurrent release of the same holds is a no-op
+        locked = list(
+            SeatHold.objects.select_for_update()
+            .filter(pk__in=ids, status=SeatHold.STATUS_HELD)
+            .order_by('pk')
+        )
+        if not locked:
+            return 0
+
+        ledger = SeatLedger()
+        for hold in locked:
+            if hold.ticket_id:
+                ledger.ticket(hold.ticket_id, booked=-hold.seats, left=hold.seats)
+            if hold.umrah_package_id:
+                ledger.package(hold.umrah_package_id, booked=-hold.seats, left=hold.seats)
+
+        SeatHold.objects.filter(pk__in=[hold.pk for hold in locked]).update(
+            status=SeatHold.STATUS_RELEASED, released_at=timezone.now()
+        )
+        ledger.apply()
+    return len(locked)
+
+
+def release_expired_holds(now=None):
+    """Release every held reservation whose ``expires_at`` has passed."""
+    from .models import SeatHold
+
+    now = now or timezone.now()
+    qs = SeatHold.objects.filter(status=SeatHold.STATUS_HELD, expires_at__lt=now)
+    return release_holds(list(qs))
+
+
+def convert_holds(booking):
+    """Mark a booking's held seats as converted into a real booking."""
+    from .models import SeatHold
+
+    return SeatHold.objects.filter(booking=booking, status=SeatHold.STATUS_HELD).update(
+        status=SeatHold.STATUS_CONVERTED
+    )
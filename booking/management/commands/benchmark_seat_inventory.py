@@ -0,0 +1,112 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+
+from booking.inventory import SeatLedger
+from tickets.models import Ticket
+
+
+def _legacy_apply(ticket_id, booked_delta=0, left_delta=0):
+    """Previous per-delta strategy: lock, probe, fetch and save the row."""
+    with transaction.atomic():
+        qs = Ticket.objects.select_for_update().filter(pk=ticket_id)
+        if not qs.exists():
+            return
+        ticket = qs.first()
+        if booked_delta:
+            ticket.booked_tickets = F('booked_tickets') + booked_delta
+        if left_delta:
+            ticket.left_seats = F('left_seats') + left_delta
+        ticket.save()
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer one Ticket from many threads and compare the seat ledger '
+        '(one UPDATE per booking) with the legacy per-delta locking. '
+        'Counters are restored afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ticket_id', type=int)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--bookings', type=int, default=50, help='bookings per thread')
+        parser.add_argument('--pax', type=int, default=4, help='passengers per booking')
+        parser.add_argument('--skip-legacy', action='store_true')
+
+    def _run(self, label, worker, threads, bookings):
+        errors = []
+
+        def _target():
+            try:
+                for _ in range(bookings):
+                    worker()
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=_target) for _ in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        total = threads * bookings
+        self.stdout.write(
+            f'{label:<8} {total} bookings in {elapsed:.2f}s '
+            f'({total / elapsed if elapsed else 0:.1f}/s), errors={len(errors)}'
+        )
+        return errors
+
+    def handle(self, *args, **options):
+        ticket_id = options['ticket_id']
+        threads = options['threads']
+        bookings = options['bookings']
+        pax = options['pax']
+
+        before = Ticket.objects.filter(pk=ticket_id).values('booked_tickets', 'left_seats').first()
+        if before is None:
+            raise CommandError(f'Ticket {ticket_id} not found')
+
+        total_pax = threads * bookings * pax
+        runs = 0
+
+        if not options['skip_legacy']:
+            # legacy signal code issued one locked save per counter
+            def legacy():
+                _legacy_apply(ticket_id, booked_delta=pax)
+                _legacy_apply(ticket_id, left_delta=-pax)
+
+            self._run('legacy', legacy, threads, bookings)
+            runs += 1
+
+        def ledger():
+            SeatLedger().ticket(ticket_id, booked=pax, left=-pax).apply()
+
+        self._run('ledger', ledger, threads, bookings)
+        runs += 1
+
+        after = Ticket.objects.filter(pk=ticket_id).values('booked_tickets', 'left_seats').first()
+        expected_booked = before['booked_tickets'] + total_pax * runs
+        expected_left = before['left_seats'] - total_pax * runs
+        consistent = after['booked_tickets'] == expected_booked and after['left_seats'] == expected_left
+
+        # restore the original counters
+        SeatLedger().ticket(
+            ticket_id,
+            booked=before['booked_tickets'] - after['booked_tickets'],
+            left=before['left_seats'] - after['left_seats'],
+        ).apply()
+
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('Counters consistent: no lost updates'))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"Lost updates: booked={after['booked_tickets']} (expected {expected_booked}), "
+                f"left={after['left_seats']} (expected {expected_left})"
+            ))
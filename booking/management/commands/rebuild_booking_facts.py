@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from booking.models import Booking
+from booking.pax_facts import fact_date, rebuild_facts
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily booking facts behind the pax summary endpoints. "
+        "Without --from/--to every booking is processed, undated ones included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First booking creation date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last booking creation date, inclusive (YYYY-MM-DD)')
+        parser.add_argument('--organization', type=int, action='append', help='Only this organization id (repeatable)')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+
+    def _parse(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date {value!r}, expected YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        full = not options['date_from'] and not options['date_to']
+        bounds = Booking.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        date_from = self._parse(options['date_from']) if options['date_from'] else fact_date(bounds['first'])
+        date_to = self._parse(options['date_to']) if options['date_to'] else fact_date(bounds['last'])
+
+        if date_from and date_to and date_to < date_from:
+            raise CommandError('--to must not be before --from')
+
+        written = rebuild_facts(
+            date_from, date_to, options['organization'],
+            chunk_days=max(1, options['chunk_days']), include_undated=full,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} fact rows from {date_from} to {date_to}'))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.1 on 2026-10-18 20:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0059_remove_umrahpackage_adault_visa_price_and_more'),
+        ('tickets', '0041_merge_20251228_1828'),
+        ('booking', '0099_merge_20251231_0055'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('held', 'Held'), ('converted', 'Converted'), ('released', 'Released')], default='held', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='booking.booking')),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='tickets.ticket')),
+                ('umrah_package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seat_holds', to='packages.umrahpackage')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='booking_sea_status_0c8a9f_idx')],
+            },
+        ),
+    ]
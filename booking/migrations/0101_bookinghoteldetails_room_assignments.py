@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 20:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0100_seathold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookinghoteldetails',
+            name='room_assignments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.1 on 2026-10-18 21:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_booking_facts(apps, schema_editor):
+    from booking.pax_facts import fact_date, rebuild_facts
+
+    Booking = apps.get_model('booking', 'Booking')
+    bounds = Booking.objects.aggregate(first=models.Min('created_at'), last=models.Max('created_at'))
+    rebuild_facts(fact_date(bounds['first']), fact_date(bounds['last']), include_undated=True, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0059_remove_umrahpackage_adault_visa_price_and_more'),
+        ('tickets', '0041_merge_20251228_1828'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('organization', '0020_add_resellrequest_items'),
+        ('booking', '0101_bookinghoteldetails_room_assignments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(blank=True, null=True)),
+                ('kind', models.CharField(choices=[('booking', 'Booking'), ('hotel', 'Hotel'), ('transport', 'Transport'), ('flight', 'Flight')], max_length=20)),
+                ('booking_type', models.CharField(blank=True, max_length=20, null=True)),
+                ('status', models.CharField(blank=True, max_length=20, null=True)),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('pax', models.FloatField(default=0)),
+                ('agency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_daily_facts', to='organization.agency')),
+                ('airline', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='packages.airlines')),
+                ('arrival_city', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='packages.city')),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_daily_facts', to='organization.branch')),
+                ('departure_city', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='packages.city')),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tickets.hotels')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_daily_facts', to='organization.organization')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_daily_facts', to=settings.AUTH_USER_MODEL)),
+                ('vehicle_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.vehicletype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'date', 'kind'], name='booking_boo_organiz_658886_idx'), models.Index(fields=['kind', 'date'], name='booking_boo_kind_c68969_idx')],
+            },
+        ),
+        migrations.RunPython(fill_booking_facts, migrations.RunPython.noop),
+    ]
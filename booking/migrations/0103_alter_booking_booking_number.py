@@ -0,0 +1,47 @@
+# Generated by Django 4.2.1 on 2026-10-18 22:50
+
+from django.db import migrations, models
+
+
+def renumber_duplicates(apps, schema_editor):
+    """Give every booking but the oldest of a shared (or blank) number a fresh one.
+
+    The legacy random numbers were drawn in a racy exists() loop, so two
+    bookings may carry the same number; the unique index below would refuse
+    to build over them.
+    """
+    from booking.sequences import booking_number
+
+    Booking = apps.get_model('booking', 'Booking')
+    shared = (
+        Booking.objects.values('booking_number')
+        .annotate(n=models.Count('id'))
+        .filter(n__gt=1)
+        .values_list('booking_number', flat=True)
+    )
+    seen = set()
+    for booking in Booking.objects.filter(
+        models.Q(booking_number__in=list(shared)) | models.Q(booking_number='')
+    ).order_by('id').only('id', 'booking_number', 'date'):
+        if booking.booking_number and booking.booking_number not in seen:
+            seen.add(booking.booking_number)
+            continue
+        Booking.objects.filter(pk=booking.pk).update(
+            booking_number=booking_number(booking.date, apps=apps)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0102_bookingdailyfact'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='booking_number',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0103_alter_booking_booking_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='totals_stale',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
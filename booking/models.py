@@ -46,17 +46,19 @@ class Bank(models.Model):
         return f"Bank #{self.id}"
 
 
-    class TRNSequence(models.Model):
-        """Simple per-month sequence table to generate transaction numbers safely.
+class TRNSequence(models.Model):
+    """Per-prefix counters behind ``booking.sequences``.
+
+    prefix is like TRN-YYYYMM or BK-YYYYMMDD and last_seq stores the last
+    number handed out for it.
+    """
+    prefix = models.CharField(max_length=32, primary_key=True)
+    last_seq = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'booking_trnsequence'
 
-        prefix is like TRN-YYYYMM and last_seq stores the last used integer for that month.
-        We rely on DB-level INSERT ... ON DUPLICATE KEY UPDATE to atomically increment.
-        """
-        prefix = models.CharField(max_length=32, primary_key=True)
-        last_seq = models.IntegerField(default=0)
 
-        class Meta:
-            db_table = 'booking_trnsequence'
 class InternalNote(models.Model):
     NOTE_STATUS = (
         ("clear", "Clear"),
@@ -95,7 +97,7 @@ class Booking(models.Model):
     )
     selling_organization_id = models.IntegerField(blank=True, null=True)
     owner_organization_id = models.IntegerField(blank=True, null=True)
-    booking_number = models.CharField(max_length=20)
+    booking_number = models.CharField(max_length=20, unique=True)
     date = models.DateTimeField(auto_now_add=True)
     expiry_time= models.DateTimeField(blank=True, null=True)
     total_pax = models.IntegerField(default=0)
@@ -107,6 +109,8 @@ class Booking(models.Model):
     total_transport_amount = models.FloatField(default=0)
     total_visa_amount = models.FloatField(default=0)
     total_amount = models.FloatField(default=0)
+    # set when a passenger, ticket detail or booking item changed since the totals were computed
+    totals_stale = models.BooleanField(default=False, editable=False)
     
     total_hotel_amount_pkr = models.FloatField(default=0, blank=True, null=True)
     total_hotel_amount_sar = models.FloatField(default=0, blank=True, null=True)
@@ -218,49 +222,62 @@ class Booking(models.Model):
     total_discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     discount_notes = models.TextField(blank=True, null=True)
 
-    def generate_public_ref(self):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the row as loaded; save() diffs against it instead of re-reading it
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot(fields)
+
+    def _snapshot(self, fields=None):
+        """Record the current values of ``fields`` (all loaded fields when None) as the stored row."""
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.name not in fields and field.attname not in fields:
+                continue
+            if field.attname not in deferred:
+                loaded[field.attname] = getattr(self, field.attname)
+
+    def stored_values(self, *attnames):
+        """``{attname: value}`` of the stored row (None if there is none), from the snapshot when it has them."""
+        if not self.pk:
+            return None
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is not None and all(name in loaded for name in attnames):
+            return {name: loaded[name] for name in attnames}
+        return Booking.objects.filter(pk=self.pk).values(*attnames).first()
+
+    def generate_public_ref(self, when=None):
         """Generate a unique HMAC-SHA256 based public reference using SECRET_KEY and booking_number.
 
         Format: INV-{booking_number}-{HEX}
         Only first 12 chars of digest are kept for readability.
-        Ensures uniqueness by appending a counter if collision occurs (rare).
+        Unique because the booking number is (see booking.sequences); without
+        one the digest covers a random value.  ``when`` defaults to the
+        booking date, or now for a booking not saved yet.
         """
+        when = when or self.date or timezone.now()
         # base value uses booking_number if available, else fallback to id/secret
-        base = (self.booking_number or str(self.id) or secrets.token_hex(8)).encode()
+        base = (self.booking_number or str(self.id or "") or secrets.token_hex(8)).encode()
         key = settings.SECRET_KEY.encode()
-        digest = hmac.new(key, base + (str(self.date.timestamp()).encode() if getattr(self, 'date', None) else b""), hashlib.sha256).hexdigest()
+        digest = hmac.new(key, base + str(when.timestamp()).encode(), hashlib.sha256).hexdigest()
         short = digest[:12].upper()
-        candidate = f"INV-{self.booking_number}-{short}" if self.booking_number else f"INV-{short}"
-
-        # ensure uniqueness
-        from django.db import transaction
-
-        counter = 0
-        unique_candidate = candidate
-        while True:
-            exists = Booking.objects.filter(public_ref=unique_candidate).exists()
-            if not exists:
-                break
-            counter += 1
-            unique_candidate = f"{candidate}-{counter}"
+        self.public_ref = f"INV-{self.booking_number}-{short}" if self.booking_number else f"INV-{short}"
 
-        self.public_ref = unique_candidate
-
-    def generate_invoice_no(self):
-        """Generate a short unique invoice number for public bookings."""
-        import secrets
+    def generate_invoice_no(self, when=None):
+        """Generate a unique invoice number, INV-YYYYMM-NNNNNN, from the counter of ``when``'s month."""
+        from .sequences import invoice_number
 
         if self.invoice_no:
             return
-        base = (self.booking_number or str(self.id) or secrets.token_hex(6)).encode()
-        short = secrets.token_hex(6).upper()
-        candidate = f"INV-{short}"
-        counter = 0
-        unique_candidate = candidate
-        while Booking.objects.filter(invoice_no=unique_candidate).exists():
-            counter += 1
-            unique_candidate = f"{candidate}-{counter}"
-        self.invoice_no = unique_candidate
+        self.invoice_no = invoice_number(when or self.date or timezone.now())
     
     def create_ledger_entry(self):
         """
@@ -505,145 +522,83 @@ class Booking(models.Model):
             traceback.print_exc()
 
     def save(self, *args, **kwargs):
+        """Persist the booking, its derived totals and generated references in one write.
+
+        Totals are recomputed by ``booking.totals`` only when something they
+        depend on changed (see ``needs_recalculation``); saves inside
+        ``deferred_totals()`` or passing ``recalculate_totals=False`` skip
+        them.  The previous status comes from the row loaded with the
+        instance, so a loaded booking is not read again.
+        """
+        from .totals import apply_booking_totals, needs_recalculation
+
+        recalculate_totals = kwargs.pop('recalculate_totals', None)
+        update_fields = kwargs.get('update_fields')
+        # numbers are built from an explicit moment: on a new booking self.date
+        # is only stamped by auto_now_add during the insert
+        when = timezone.now()
+
         # Track status changes
-        old_status = None
         status_changed_to_approved = False
         status_changed_from_approved = False
-        
-        if self.pk:
-            try:
-                old_instance = Booking.objects.get(pk=self.pk)
-                old_status = old_instance.status
-                
+
+        stored = self.stored_values('status')
+        if stored is not None:
+            old_status = stored['status']
+            if old_status is not None:
                 # Status changed TO Approved
                 if old_status != 'Approved' and self.status == 'Approved':
                     status_changed_to_approved = True
-                
+
                 # Status changed FROM Approved to something else
                 if old_status == 'Approved' and self.status != 'Approved':
                     status_changed_from_approved = True
-            except Booking.DoesNotExist:
-                pass
-        
+
+        extra_fields = []
+
         # Generate booking_number if not present
         if not self.booking_number:
-            import secrets
-            from datetime import datetime
-            # Format: BK-YYYYMMDD-XXXX (e.g., BK-20251101-A3F2)
-            date_str = datetime.now().strftime('%Y%m%d')
-            random_str = secrets.token_hex(2).upper()
-            candidate = f"BK-{date_str}-{random_str}"
-            counter = 0
-            unique_candidate = candidate
-            while Booking.objects.filter(booking_number=unique_candidate).exists():
-                counter += 1
-                random_str = secrets.token_hex(2).upper()
-                unique_candidate = f"BK-{date_str}-{random_str}"
-            self.booking_number = unique_candidate
-        
-        # generate public_ref on first save if missing
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-        
+            from .sequences import booking_number
+            # Format: BK-YYYYMMDD-NNNNN (e.g., BK-20251101-00042), from a per-day counter
+            self.booking_number = booking_number(when)
+            extra_fields.append('booking_number')
+
+        # Recalculate amounts in memory so they are written with the row
+        if recalculate_totals is None:
+            recalculate_totals = needs_recalculation(self, update_fields)
+        if recalculate_totals:
+            extra_fields.extend(apply_booking_totals(self))
+
         # Auto-create ledger entry when status becomes 'Approved'
         if status_changed_to_approved and not self.ledger_entry:
             ledger_entry = self.create_ledger_entry()
             if ledger_entry:
                 self.ledger_entry = ledger_entry
-                super().save(update_fields=['ledger_entry'])
-        
+                extra_fields.append('ledger_entry')
+
         # Delete ledger entry when status changes FROM Approved to something else
         if status_changed_from_approved and self.ledger_entry:
             self.delete_ledger_entry()
-            super().save(update_fields=['ledger_entry'])
-        
-        # Recalculate amounts to ensure they're always correct
-        if self.pk:
-            from django.db.models import Sum
-            from decimal import Decimal
-            
-            # Try new system first (booking_items), fallback to old (ticket_details)
-            if self.booking_items.exists():
-                # New system: Use booking_items
-                self.total_ticket_amount = self.booking_items.filter(
-                    inventory_type='ticket').aggregate(total=Sum('final_amount'))['total'] or Decimal('0')
-                self.total_hotel_amount = self.booking_items.filter(
-                    inventory_type='hotel').aggregate(total=Sum('final_amount'))['total'] or Decimal('0')
-                self.total_transport_amount = self.booking_items.filter(
-                    inventory_type='transport').aggregate(total=Sum('final_amount'))['total'] or Decimal('0')
-                self.total_visa_amount = self.booking_items.filter(
-                    inventory_type='visa').aggregate(total=Sum('final_amount'))['total'] or Decimal('0')
-            else:
-                # Old system: Calculate from ticket_details (source of truth)
-                ticket_sum = Decimal('0')
-                
-                for ticket_detail in self.ticket_details.all():
-                    # Count passengers by age group
-                    adults = self.person_details.filter(age_group='Adult').count()
-                    children = self.person_details.filter(age_group='Child').count()
-                    infants = self.person_details.filter(age_group='Infant').count()
-                    
-                    # Calculate total from ticket prices
-                    ticket_sum += (
-                        Decimal(str(ticket_detail.adult_price or 0)) * adults +
-                        Decimal(str(ticket_detail.child_price or 0)) * children +
-                        Decimal(str(ticket_detail.infant_price or 0)) * infants
-                    )
-                
-                self.total_ticket_amount = ticket_sum
-            
-            # Calculate total visa amount in PKR from person_details
-            visa_sum_pkr = Decimal('0')
-            visa_sum_sar = Decimal('0')
-            
-            for person in self.person_details.all():
-                # Check if this person's visa is in PKR or SAR
-                if person.is_visa_price_pkr:
-                    # Visa is in PKR, use visa_rate_in_pkr directly
-                    visa_pkr = Decimal(str(person.visa_rate_in_pkr or 0))
-                    visa_sum_pkr += visa_pkr
-                else:
-                    # Visa is in SAR, use visa_rate_in_sar and convert to PKR
-                    visa_sar = Decimal(str(person.visa_rate_in_sar or 0))
-                    riyal_rate = Decimal(str(person.visa_riyal_rate or 50))
-                    visa_sum_pkr += visa_sar * riyal_rate
-                    visa_sum_sar += visa_sar
-            
-            self.total_visa_amount_pkr = float(visa_sum_pkr)
-            self.total_visa_amount_sar = float(visa_sum_sar)
-            self.total_visa_amount = float(visa_sum_pkr)  # Keep total_visa_amount as PKR for consistency
-            
-            # Calculate total amount in PKR (use PKR-converted values for all components)
-            self.total_amount = (
-                Decimal(str(self.total_ticket_amount_pkr or self.total_ticket_amount or 0)) +
-                Decimal(str(self.total_hotel_amount_pkr or 0)) +
-                Decimal(str(self.total_transport_amount_pkr or 0)) +
-                Decimal(str(self.total_visa_amount_pkr or self.total_visa_amount or 0)) +
-                Decimal(str(self.total_food_amount_pkr or 0)) +
-                Decimal(str(self.total_ziyarat_amount_pkr or 0))
-            )
-            
-            # Save the updated amounts
-            super().save(update_fields=[
-                'total_ticket_amount', 'total_hotel_amount', 
-                'total_transport_amount', 'total_visa_amount', 
-                'total_visa_amount_pkr', 'total_visa_amount_sar', 'total_amount'
-            ])
-        
-        # Generate invoice_no after first save (when we have an ID)
+            extra_fields.append('ledger_entry')
+
         if not self.invoice_no:
-            self.generate_invoice_no()
-            super().save(update_fields=["invoice_no"])
-        
+            self.generate_invoice_no(when)
+            extra_fields.append('invoice_no')
+
         try:
             if not self.public_ref:
-                # regenerate now that we have a PK/date
-                self.generate_public_ref()
-                super().save(update_fields=["public_ref"])
+                self.generate_public_ref(when)
+                extra_fields.append('public_ref')
         except Exception:
             # Do not block normal booking saves if public_ref generation fails
             pass
 
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(extra_fields)
+
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get('update_fields'))
+
         # voucher QR is provided via property (avoid DB migrations here)
         # No-op: voucher QR URL computed dynamically via `voucher_qr_url` property below
     
@@ -707,6 +662,8 @@ class BookingHotelDetails(models.Model):
     self_hotel_name = models.CharField(max_length=255, blank=True, null=True)
     # mark if this particular hotel detail row is from an outsourced/external hotel
     outsourced_hotel = models.BooleanField(default=False)
+    # beds given to pax by operations auto-assignment: [{"pax_id", "room_no", "bed_no"}]
+    room_assignments = models.JSONField(default=list, blank=True)
     
     # Organization tracking
     inventory_owner_organization_id = models.IntegerField(null=True, blank=True)
@@ -1164,57 +1121,14 @@ class Payment(models.Model):
         if not self.transaction_number:
             # Only generate for new records (avoid changing existing transaction numbers on updates)
             if not self.pk:
-                from django.db import transaction
-                import re
-
-                now = timezone.now()
-                prefix = f"TRN-{now.strftime('%Y%m')}"
-
-                # Use a dedicated counter row in the DB to atomically increment the per-month sequence.
-                # This approach uses an INSERT ... ON DUPLICATE KEY UPDATE to safely increment the
-                # counter even under high concurrency without complex locking.
-                from django.db import connection
+                from .sequences import transaction_number
                 try:
-                    with connection.cursor() as cur:
-                        # Try to insert a new counter row for this prefix (will fail if exists)
-                        cur.execute(
-                            "INSERT INTO booking_trnsequence (prefix, last_seq) VALUES (%s, 1) ON DUPLICATE KEY UPDATE last_seq = last_seq + 1",
-                            [prefix],
-                        )
-                        # Read back the current counter value
-                        cur.execute("SELECT last_seq FROM booking_trnsequence WHERE prefix = %s", [prefix])
-                        row = cur.fetchone()
-                        if row:
-                            seq = int(row[0])
-                        else:
-                            seq = 1
-
-                        self.transaction_number = f"{prefix}-{seq:05d}"
+                    self.transaction_number = transaction_number()
                 except Exception:
-                    # Final fallback: try select_for_update method, then timestamp+random
-                    try:
-                        with transaction.atomic():
-                            last = (
-                                Payment.objects.select_for_update()
-                                .filter(transaction_number__startswith=prefix)
-                                .order_by('-transaction_number')
-                                .first()
-                            )
-
-                            seq = 1
-                            if last and getattr(last, 'transaction_number', None):
-                                m = re.search(r"(\d{5})$", last.transaction_number)
-                                if m:
-                                    try:
-                                        seq = int(m.group(1)) + 1
-                                    except Exception:
-                                        seq = 1
-
-                            self.transaction_number = f"{prefix}-{seq:05d}"
-                    except Exception:
-                        ts = timezone.now().strftime('%Y%m%d%H%M%S')
-                        rand = secrets.token_hex(4).upper()
-                        self.transaction_number = f"TRX{ts}{rand}"
+                    # Final fallback: timestamp+random
+                    ts = timezone.now().strftime('%Y%m%d%H%M%S')
+                    rand = secrets.token_hex(4).upper()
+                    self.transaction_number = f"TRX{ts}{rand}"
 
         # perform the actual save first
         res = super().save(*args, **kwargs)
@@ -1727,10 +1641,22 @@ class BookingItem(models.Model):
         # Auto-fill unit_price from selected inventory if not already set
         if not self.unit_price or self.unit_price == 0:
             if self.hotel:
-                # Try to get price from hotel prices (get the latest/first price)
-                hotel_price = self.hotel.prices.first()
-                if hotel_price:
-                    self.unit_price = Decimal(str(hotel_price.price))
+                details = self.item_details or {}
+                quote = None
+                if details.get('check_in') and details.get('check_out') and details.get('room_type'):
+                    # Price the stay night by night from the hotel's rate calendar
+                    from tickets.rate_calendar import quote_stay
+                    try:
+                        quote = quote_stay(self.hotel_id, details['room_type'], details['check_in'], details['check_out'])
+                    except ValueError:
+                        quote = None
+                if quote and quote['complete']:
+                    self.unit_price = Decimal(str(quote['total']))
+                else:
+                    # Try to get price from hotel prices (get the latest/first price)
+                    hotel_price = self.hotel.prices.first()
+                    if hotel_price:
+                        self.unit_price = Decimal(str(hotel_price.price))
             elif self.transport:
                 # Use adult price from transport
                 self.unit_price = Decimal(str(self.transport.adault_price or 0))
@@ -1817,19 +1743,9 @@ class BookingPax(models.Model):
     def save(self, *args, **kwargs):
         # Auto-generate PAX ID
         if not self.pax_id:
-            import secrets
-            from datetime import datetime
-            # Format: PAX-YYYYMMDD-XXXX
-            date_str = datetime.now().strftime('%Y%m%d')
-            random_str = secrets.token_hex(2).upper()
-            candidate = f"PAX-{date_str}-{random_str}"
-            counter = 0
-            unique_candidate = candidate
-            while BookingPax.objects.filter(pax_id=unique_candidate).exists():
-                counter += 1
-                random_str = secrets.token_hex(2).upper()
-                unique_candidate = f"PAX-{date_str}-{random_str}"
-            self.pax_id = unique_candidate
+            from .sequences import pax_id
+            # Format: PAX-YYYYMMDD-NNNNN
+            self.pax_id = pax_id()
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -2039,4 +1955,81 @@ class BookingZiyaratDetails(models.Model):
     status = models.CharField(max_length=20, default='Pending') # e.g., Pending, Started, Completed, Canceled
     
     def __str__(self):
-        return f"{self.ziarat} - Booking {self.booking.booking_number}"
\ No newline at end of file
+        return f"{self.ziarat} - Booking {self.booking.booking_number}"
+
+class SeatHold(models.Model):
+    """Temporary seat reservation on a ticket and/or umrah package.
+
+    Created by ``booking.inventory.place_hold``; expired holds are returned
+    to inventory by ``release_expired_holds``.
+    """
+    STATUS_HELD = 'held'
+    STATUS_CONVERTED = 'converted'
+    STATUS_RELEASED = 'released'
+    STATUS_CHOICES = [
+        (STATUS_HELD, 'Held'),
+        (STATUS_CONVERTED, 'Converted'),
+        (STATUS_RELEASED, 'Released'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='seat_holds', blank=True, null=True)
+    ticket = models.ForeignKey('tickets.Ticket', on_delete=models.CASCADE, related_name='seat_holds', blank=True, null=True)
+    umrah_package = models.ForeignKey('packages.UmrahPackage', on_delete=models.CASCADE, related_name='seat_holds', blank=True, null=True)
+    seats = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_HELD)
+    expires_at = models.DateTimeField()
+    released_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.seats} seats ({self.status})"
+
+
+class BookingDailyFact(models.Model):
+    """Bookings and pax per creation day, maintained by ``booking.pax_facts``.
+
+    One row per (date, organization, branch, agency, user) and dimension:
+    booking type/status for ``KIND_BOOKING`` rows, the hotel, vehicle type
+    or airline and sector for the other kinds.  A booking is counted once
+    per dimension value however many detail rows it has.
+    """
+    KIND_BOOKING = 'booking'
+    KIND_HOTEL = 'hotel'
+    KIND_TRANSPORT = 'transport'
+    KIND_FLIGHT = 'flight'
+    KIND_CHOICES = [
+        (KIND_BOOKING, 'Booking'),
+        (KIND_HOTEL, 'Hotel'),
+        (KIND_TRANSPORT, 'Transport'),
+        (KIND_FLIGHT, 'Flight'),
+    ]
+
+    date = models.DateField(blank=True, null=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='booking_daily_facts')
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='booking_daily_facts')
+    agency = models.ForeignKey(Agency, on_delete=models.CASCADE, related_name='booking_daily_facts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_daily_facts')
+    booking_type = models.CharField(max_length=20, blank=True, null=True)
+    status = models.CharField(max_length=20, blank=True, null=True)
+    hotel = models.ForeignKey('tickets.Hotels', on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    vehicle_type = models.ForeignKey(VehicleType, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    airline = models.ForeignKey('packages.Airlines', on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    departure_city = models.ForeignKey(City, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    arrival_city = models.ForeignKey(City, on_delete=models.CASCADE, blank=True, null=True, related_name='+')
+    bookings = models.PositiveIntegerField(default=0)
+    pax = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'date', 'kind']),
+            models.Index(fields=['kind', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.kind}: {self.bookings} bookings / {self.pax} pax"
@@ -0,0 +1,258 @@
+"""Daily booking facts behind the pax summary endpoints.
+
+The pax summary views used to join Booking to its hotel, transport or ticket
+details (and on to trips and cities) for every request and count distinct
+bookings over the whole date range.  ``BookingDailyFact`` keeps those counts
+per creation day instead, keyed by organization, branch, agency and user (so
+``apply_user_scope`` applies unchanged) and by the dimension each endpoint
+groups on; the views only sum the matching rows.
+
+A day is rebuilt for one organization at a time (a "partition"), from a
+handful of grouped queries, so the counts never drift from the bookings:
+
+* booking saves arrive through the ``booking_events`` bus;
+* detail rows and booking deletes mark their partition dirty, and dirty
+  partitions are rebuilt once after the transaction commits;
+* ``manage.py rebuild_booking_facts`` rebuilds any date range, and the
+  migration creating the table fills it from the existing bookings.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from universal import commit_batches
+
+from .events import booking_events
+from .models import (
+    Booking,
+    BookingDailyFact,
+    BookingHotelDetails,
+    BookingTicketDetails,
+    BookingTransportDetails,
+)
+
+
+logger = logging.getLogger(__name__)
+
+BASE_FIELDS = ("date", "organization_id", "branch_id", "agency_id", "user_id")
+
+
+def fact_date(value):
+    """The fact day of a booking ``created_at`` (local date), or None."""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def _models(apps=None):
+    """The booking models, from ``apps`` (a migration's historical registry) when given."""
+    if apps is None:
+        return Booking, BookingDailyFact, BookingHotelDetails, BookingTransportDetails, BookingTicketDetails
+    return tuple(apps.get_model("booking", model._meta.object_name) for model in _models())
+
+
+def build_fact_rows(bookings, apps=None):
+    """Unsaved ``BookingDailyFact`` rows for the ``bookings`` queryset (four queries)."""
+    _, Fact, HotelDetails, TransportDetails, TicketDetails = _models(apps)
+    base = {}
+    for row in bookings.values(
+        "id", "created_at", "organization_id", "branch_id", "agency_id", "user_id",
+        "booking_type", "status", "total_pax",
+    ).order_by():
+        key = (fact_date(row["created_at"]), row["organization_id"], row["branch_id"], row["agency_id"], row["user_id"])
+        base[row["id"]] = (key, float(row["total_pax"] or 0), row["booking_type"], row["status"])
+
+    ids = bookings.values("id")
+    dimensions = {
+        BookingDailyFact.KIND_BOOKING: (
+            ("booking_type", "status"),
+            [(pk, (booking_type, status)) for pk, (_, _, booking_type, status) in base.items()],
+        ),
+        BookingDailyFact.KIND_HOTEL: (
+            ("hotel_id",),
+            [
+                (pk, (hotel_id,))
+                for pk, hotel_id in HotelDetails.objects.filter(booking_id__in=ids)
+                .values_list("booking_id", "hotel_id").distinct().order_by()
+            ],
+        ),
+        BookingDailyFact.KIND_TRANSPORT: (
+            ("vehicle_type_id",),
+            [
+                (pk, (vehicle_type_id,))
+                for pk, vehicle_type_id in TransportDetails.objects.filter(booking_id__in=ids)
+                .values_list("booking_id", "vehicle_type_id").distinct().order_by()
+            ],
+        ),
+        BookingDailyFact.KIND_FLIGHT: (
+            ("airline_id", "departure_city_id", "arrival_city_id"),
+            [
+                (pk, (airline_id, departure_id, arrival_id))
+                for pk, airline_id, departure_id, arrival_id in TicketDetails.objects.filter(booking_id__in=ids)
+                .values_list(
+                    "booking_id", "ticket__airline_id",
+                    "ticket__trip_details__departure_city_id", "ticket__trip_details__arrival_city_id",
+                ).distinct().order_by()
+            ],
+        ),
+    }
+
+    rows = []
+    for kind, (fields, pairs) in dimensions.items():
+        totals = {}
+        for pk, values in pairs:
+            if pk not in base:
+                continue
+            key, pax = base[pk][0], base[pk][1]
+            counts = totals.setdefault((key, values), [0, 0.0])
+            counts[0] += 1
+            counts[1] += pax
+        for (key, values), (count, pax) in totals.items():
+            rows.append(Fact(
+                kind=kind, bookings=count, pax=pax,
+                **dict(zip(BASE_FIELDS, key)), **dict(zip(fields, values)),
+            ))
+    return rows
+
+
+def _partition_bookings(date, organization_id):
+    bookings = Booking.objects.filter(organization_id=organization_id)
+    if date is None:
+        return bookings.filter(created_at__isnull=True)
+    return bookings.filter(created_at__date=date)
+
+
+def rebuild_partition(date, organization_id):
+    """Replace the facts of one organization's day; returns the number of rows written."""
+    from organization.models import Organization
+
+    facts = BookingDailyFact.objects.filter(organization_id=organization_id)
+    facts = facts.filter(date__isnull=True) if date is None else facts.filter(date=date)
+    with transaction.atomic():
+        # serialise rebuilds of the same organization
+        list(Organization.objects.select_for_update().filter(pk=organization_id).values_list("pk", flat=True))
+        return _replace(_partition_bookings(date, organization_id), facts)
+
+
+def _replace(bookings, facts, organization_ids=None, apps=None):
+    if organization_ids:
+        bookings = bookings.filter(organization_id__in=organization_ids)
+        facts = facts.filter(organization_id__in=organization_ids)
+    with transaction.atomic():
+        facts.delete()
+        rows = build_fact_rows(bookings, apps)
+        facts.model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def rebuild_facts(date_from, date_to, organization_ids=None, chunk_days=31, include_undated=False, apps=None):
+    """Rebuild every fact between ``date_from`` and ``date_to`` (inclusive), ``chunk_days`` at a time."""
+    Booking, BookingDailyFact = _models(apps)[:2]
+    written = 0
+    start = date_from
+    while start is not None and date_to is not None and start <= date_to:
+        end = min(start + timedelta(days=chunk_days - 1), date_to)
+        written += _replace(
+            Booking.objects.filter(created_at__date__gte=start, created_at__date__lte=end),
+            BookingDailyFact.objects.filter(date__gte=start, date__lte=end),
+            organization_ids,
+            apps,
+        )
+        start = end + timedelta(days=1)
+    if include_undated:
+        written += _replace(
+            Booking.objects.filter(created_at__isnull=True),
+            BookingDailyFact.objects.filter(date__isnull=True),
+            organization_ids,
+            apps,
+        )
+    return written
+
+
+def refresh_partitions(partitions=(), booking_ids=()):
+    """Rebuild ``(date, organization_id)`` partitions plus those of ``booking_ids``."""
+    partitions = set(partitions)
+    if booking_ids:
+        for created_at, organization_id in Booking.objects.filter(pk__in=booking_ids).values_list(
+            "created_at", "organization_id"
+        ):
+            partitions.add((fact_date(created_at), organization_id))
+    for date, organization_id in partitions:
+        try:
+            rebuild_partition(date, organization_id)
+        except Exception:
+            # non-fatal: the rebuild command repairs the partition
+            logger.exception("booking fact rebuild failed for organization %s on %s", organization_id, date)
+
+
+class _DirtyPartitions(commit_batches.CommitBatch):
+    def __init__(self):
+        super().__init__()
+        self.partitions = set()
+        self.booking_ids = set()
+
+    def run(self):
+        refresh_partitions(self.partitions, self.booking_ids)
+
+
+def mark_dirty(partitions=(), booking_ids=(), using=None):
+    """Schedule a rebuild of the given partitions / bookings' partitions after commit."""
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        refresh_partitions(partitions, booking_ids)
+        return
+    batch = commit_batches.pending("booking_facts", _DirtyPartitions, using=using)
+    batch.partitions.update(partitions)
+    batch.booking_ids.update(pk for pk in booking_ids if pk)
+
+
+@booking_events.register("booking.pax_facts")
+def update_booking_facts(event):
+    booking = event.booking
+    partitions = {(fact_date(booking.created_at), booking.organization_id)}
+    previous = event.previous
+    if previous and previous.get("organization_id"):
+        # an organization change moves the booking out of its old partition
+        partitions.add((fact_date(previous.get("created_at")), previous["organization_id"]))
+    mark_dirty(partitions)
+
+
+@receiver(post_delete, sender=Booking, dispatch_uid="booking_facts_booking_deleted")
+def booking_deleted(sender, instance, using=None, **kwargs):
+    mark_dirty({(fact_date(instance.created_at), instance.organization_id)}, using=using)
+
+
+@receiver(post_save, sender=BookingHotelDetails, dispatch_uid="booking_facts_hotel_saved")
+@receiver(post_delete, sender=BookingHotelDetails, dispatch_uid="booking_facts_hotel_deleted")
+@receiver(post_save, sender=BookingTransportDetails, dispatch_uid="booking_facts_transport_saved")
+@receiver(post_delete, sender=BookingTransportDetails, dispatch_uid="booking_facts_transport_deleted")
+@receiver(post_save, sender=BookingTicketDetails, dispatch_uid="booking_facts_ticket_saved")
+@receiver(post_delete, sender=BookingTicketDetails, dispatch_uid="booking_facts_ticket_deleted")
+def booking_detail_changed(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    mark_dirty(booking_ids=[instance.booking_id], using=using)
+
+
+def fact_rows(user, kind, date_from=None, date_to=None):
+    """Facts of ``kind`` visible to ``user`` between two dates (inclusive)."""
+    from universal.scope import apply_user_scope
+
+    facts = apply_user_scope(BookingDailyFact.objects.filter(kind=kind), user)
+    if date_from:
+        facts = facts.filter(date__gte=date_from)
+    if date_to:
+        facts = facts.filter(date__lte=date_to)
+    return facts
+
+
+def rollup(facts, *fields):
+    """Sum bookings and pax of ``facts`` grouped by ``fields``."""
+    return facts.values(*fields).annotate(total_bookings=Sum("bookings"), total_pax=Sum("pax")).order_by()
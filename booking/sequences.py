@@ -0,0 +1,114 @@
+"""Collision-free document numbers from per-prefix counters.
+
+Booking numbers, invoice numbers and pax ids used to be random hex suffixes
+checked with ``exists()`` in a loop until one was free, racy because nothing
+in the schema stopped two requests from picking the same value.  They now
+come from ``TRNSequence`` (``booking_trnsequence``), the counter table
+Payment already used for transaction numbers:
+
+    next_number("BK-20251101")        -> "BK-20251101-00001"
+    next_number("TRN-202511", width=5) -> "TRN-202511-00042"
+
+A counter row is incremented with a single ``UPDATE ... SET last_seq =
+last_seq + n`` whose row lock serialises concurrent callers, so no value is
+ever handed out twice and nothing is probed.  The lock lasts until the
+caller's transaction ends.
+
+With ``SEQUENCES['BLOCK_SIZE']`` above 1 each process reserves that many
+values at a time and hands them out from memory.  A block reserved inside a
+transaction only becomes usable once that transaction commits, so a rollback
+(which returns the block to the counter) cannot leave this process handing
+out values another process then reserves again.  Until it commits each call
+reserves a fresh block under the row lock the transaction already holds, and
+only the last block's remainder is kept.  Numbers are
+unique either way but no longer consecutive across processes, and a
+restarted process leaves the rest of its block unused.
+
+The ``apps`` arguments let migrations allocate numbers through the
+historical ``TRNSequence`` model.
+"""
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TRNSequence
+
+
+DEFAULT_WIDTH = 5
+
+_blocks = {}
+_lock = threading.Lock()
+
+
+def block_size():
+    return max(1, int((getattr(settings, "SEQUENCES", {}) or {}).get("BLOCK_SIZE", 1)))
+
+
+def reserve(prefix, count=1, apps=None):
+    """Reserve ``count`` values of ``prefix``; returns the first one."""
+    counters = (apps.get_model("booking", "TRNSequence") if apps else TRNSequence).objects
+    with transaction.atomic():
+        if not counters.filter(prefix=prefix).update(last_seq=F("last_seq") + count):
+            try:
+                with transaction.atomic():
+                    counters.create(prefix=prefix, last_seq=count)
+                return 1
+            except IntegrityError:
+                # another caller created the row first
+                counters.filter(prefix=prefix).update(last_seq=F("last_seq") + count)
+        last = counters.filter(prefix=prefix).values_list("last_seq", flat=True).get()
+    return last - count + 1
+
+
+def _install(prefix, start, end):
+    with _lock:
+        _blocks[prefix] = [start, end]
+
+
+def next_value(prefix):
+    """The next value of ``prefix``'s counter, from this process's block if it has one."""
+    with _lock:
+        block = _blocks.get(prefix)
+        if block and block[0] < block[1]:
+            value = block[0]
+            block[0] += 1
+            return value
+
+    size = block_size()
+    if size == 1:
+        return reserve(prefix)
+    first = reserve(prefix, size)
+    # outside a transaction this runs right away
+    transaction.on_commit(lambda: _install(prefix, first + 1, first + size))
+    return first
+
+
+def next_number(prefix, width=DEFAULT_WIDTH):
+    """``"{prefix}-{value}"`` with the value zero-padded to ``width`` digits."""
+    return f"{prefix}-{next_value(prefix):0{width}d}"
+
+
+def booking_number(when=None, apps=None):
+    """BK-YYYYMMDD-NNNNN"""
+    prefix = f"BK-{timezone.localtime(when).strftime('%Y%m%d')}"
+    if apps is not None:
+        return f"{prefix}-{reserve(prefix, apps=apps):0{DEFAULT_WIDTH}d}"
+    return next_number(prefix)
+
+
+def invoice_number(when=None):
+    """INV-YYYYMM-NNNNNN"""
+    return next_number(f"INV-{timezone.localtime(when).strftime('%Y%m')}", width=6)
+
+
+def transaction_number(when=None):
+    """TRN-YYYYMM-NNNNN, continuing the counters Payment has always used."""
+    return next_number(f"TRN-{timezone.localtime(when).strftime('%Y%m')}")
+
+
+def pax_id(when=None):
+    """PAX-YYYYMMDD-NNNNN"""
+    return next_number(f"PAX-{timezone.localtime(when).strftime('%Y%m%d')}")
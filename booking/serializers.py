@@ -1,7 +1,5 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-import uuid
-from django.utils.timezone import now
 from organization.serializers import OrganizationSerializer, AgencySerializer, BranchSerializer
 from packages.serializers import RiyalRateSerializer, UmrahPackageSerializer
 from tickets.serializers import HotelsSerializer
@@ -45,6 +43,7 @@ from .models import (
     BookingPayment,
 )
 from .models import Bank
+from .sequences import booking_number as next_booking_number
 from django.db import transaction
 
 # Small helper field: accept '0', 0, '' as null to be more tolerant of frontend payloads
@@ -975,10 +974,7 @@ class PaymentSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        # Generate transaction_number if not provided
-        if not validated_data.get('transaction_number'):
-            import uuid
-            validated_data['transaction_number'] = f"TXN-{uuid.uuid4().hex[:8].upper()}"
+        # Payment.save assigns a TRN-YYYYMM-NNNNN transaction_number when none is provided
         # No bank_name field — nothing to populate here
         return super().create(validated_data)
 
@@ -1091,7 +1087,97 @@ class HotelOutsourcingSerializer(serializers.ModelSerializer):
 
 
 # --- Main Booking Serializer ---
-class BookingSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Sparse fieldsets for read responses.
+
+    The view passes ``fields`` and/or ``expand`` (sets of field names) in
+    the serializer context.  ``fields`` keeps only those output fields;
+    with either key present the relations in ``EXPANDABLE_FIELDS`` are
+    rendered as their primary key unless listed in ``expand``.  Without
+    both keys the serializer behaves as before.
+    """
+
+    # name -> model attribute of the nested relation
+    EXPANDABLE_FIELDS = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        expand = self.context.get('expand')
+        if fields is None and expand is None:
+            return
+        if fields:
+            for name in list(self.fields):
+                if name not in fields and not self.fields[name].write_only:
+                    self.fields.pop(name)
+        for name, source in self.EXPANDABLE_FIELDS.items():
+            if name in self.fields and name not in (expand or ()):
+                options = {'source': source} if source != name else {}
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **options)
+
+
+BOOKING_TYPE_LABELS = {
+    'TICKET': 'Group Ticket',
+    'CUSTOM_PACKAGE': 'Custom Package',
+    'UMRAH': 'Umrah Package',
+    'PACKAGE': 'Umrah Package',
+}
+
+
+class BookingListSerializer(serializers.Serializer):
+    """Compact read-only booking row for list views.
+
+    Serializes the dicts produced by ``values(*BookingListSerializer.PROJECTION)``
+    (plus the view's ``paid_amount``/``remaining_amount`` annotations), so no
+    model instances or nested serializers are involved.
+    """
+
+    PROJECTION = (
+        'id', 'booking_number', 'invoice_no', 'booking_type', 'status', 'date', 'expiry_time',
+        'total_pax', 'total_adult', 'total_child', 'total_infant', 'total_amount', 'total_in_pkr',
+        'customer_name', 'customer_contact', 'call_status', 'is_public_booking',
+        'umrah_package_id', 'agency_id', 'user_id', 'organization_id', 'branch_id',
+        'paid_amount', 'remaining_amount',
+    )
+    RELATED_PROJECTION = {
+        'agency_name': 'agency__name',
+        'branch_name': 'branch__name',
+        'umrah_package_title': 'umrah_package__title',
+    }
+
+    id = serializers.IntegerField()
+    booking_number = serializers.CharField()
+    invoice_no = serializers.CharField(allow_null=True)
+    booking_type = serializers.SerializerMethodField()
+    status = serializers.CharField(allow_null=True)
+    date = serializers.DateTimeField()
+    expiry_time = serializers.DateTimeField(allow_null=True)
+    total_pax = serializers.IntegerField()
+    total_adult = serializers.IntegerField()
+    total_child = serializers.IntegerField()
+    total_infant = serializers.IntegerField()
+    total_amount = serializers.FloatField()
+    total_in_pkr = serializers.FloatField(allow_null=True)
+    paid_amount = serializers.FloatField()
+    remaining_amount = serializers.FloatField()
+    customer_name = serializers.CharField(allow_null=True)
+    customer_contact = serializers.CharField(allow_null=True)
+    call_status = serializers.BooleanField()
+    is_public_booking = serializers.BooleanField()
+    umrah_package_id = serializers.IntegerField(allow_null=True)
+    umrah_package_title = serializers.CharField(allow_null=True)
+    agency_id = serializers.IntegerField(allow_null=True)
+    agency_name = serializers.CharField(allow_null=True)
+    user_id = serializers.IntegerField(allow_null=True)
+    organization_id = serializers.IntegerField(allow_null=True)
+    branch_id = serializers.IntegerField(allow_null=True)
+    branch_name = serializers.CharField(allow_null=True)
+
+    def get_booking_type(self, row):
+        return BOOKING_TYPE_LABELS.get(row.get('booking_type'), row.get('booking_type'))
+
+
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     organization_id = serializers.PrimaryKeyRelatedField(
         queryset=Organization.objects.all(), source="organization", write_only=True
     )
@@ -1127,7 +1213,14 @@ class BookingSerializer(serializers.ModelSerializer):
     branch = BranchSerializer(read_only=True)
     approved_by = UserSerializer(read_only=True, source='confirmed_by')
 
-
+    EXPANDABLE_FIELDS = {
+        'umrah_package': 'umrah_package',
+        'agency': 'agency',
+        'user': 'user',
+        'organization': 'organization',
+        'branch': 'branch',
+        'approved_by': 'confirmed_by',
+    }
 
 
     class Meta:
@@ -1319,26 +1412,23 @@ class BookingSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
         
-        # Clean up user object
+        # Clean up user object (a plain id when not expanded)
         user_data = data.get('user', {})
-        user_data.pop('agency_details', None)
-        user_data.pop('organization_details', None)
-        user_data.pop('branch_details', None)
-        user_data.pop('group_details', None)
+        if isinstance(user_data, dict):
+            user_data.pop('agency_details', None)
+            user_data.pop('organization_details', None)
+            user_data.pop('branch_details', None)
+            user_data.pop('group_details', None)
         
         # Remove branches array from organization object
         organization_data = data.get('organization', {})
-        if organization_data:
+        if isinstance(organization_data, dict):
             organization_data.pop('branches', None)
         
         # Customize booking_type display
         booking_type_value = data.get('booking_type')
-        if booking_type_value == 'TICKET':
-            data['booking_type'] = 'Group Ticket'
-        elif booking_type_value == 'CUSTOM_PACKAGE':
-            data['booking_type'] = 'Custom Package'
-        elif booking_type_value == 'UMRAH' or booking_type_value == 'PACKAGE':
-            data['booking_type'] = 'Umrah Package'
+        if booking_type_value in BOOKING_TYPE_LABELS:
+            data['booking_type'] = BOOKING_TYPE_LABELS[booking_type_value]
         
         return data
     @transaction.atomic
@@ -1390,7 +1480,7 @@ class BookingSerializer(serializers.ModelSerializer):
         # Pop ManyToMany field - can't be set during create()
         internals_data = validated_data.pop("internals", [])
 
-        booking_number = f"BK-{now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
+        booking_number = next_booking_number()
 
         # Handle public bookings: get organization_id from package
         if validated_data.get('is_public_booking', False):
@@ -1495,7 +1585,8 @@ class BookingSerializer(serializers.ModelSerializer):
         # attach journal if provided (stored as JSON on Booking)
         if journal_data:
             booking.journal_items = journal_data
-        booking.save()
+            # totals are computed once by the final save below
+            booking.save(update_fields=['journal_items'], recalculate_totals=False)
 
         # --- Flat relations (bulk_create) ---
         # if hotel_data:
@@ -1562,7 +1653,7 @@ class BookingSerializer(serializers.ModelSerializer):
             BookingHotelDetails.objects.bulk_create(hotel_instances)
         booking.total_hotel_amount_pkr = total_pkr_sum
         booking.total_hotel_amount_sar = total_riyal_sum
-        booking.save()
+        booking.save(update_fields=['total_hotel_amount_pkr', 'total_hotel_amount_sar'], recalculate_totals=False)
         # if transport_data:
         #     BookingTransportDetails.objects.bulk_create(
         #         [BookingTransportDetails(booking=booking, **td) for td in transport_data]
@@ -21,6 +21,8 @@ _SUBMODULES = [
     # added test modules created by recent work
     "test_admin_public_bookings",
     "test_admin_actions_notifications",
+    "test_seat_inventory",
+    "test_booking_totals",
 ]
 
 for _m in _SUBMODULES:
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from organization.models import Organization, Branch, Agency
+from booking.models import Booking
+
+
+class BookingListProjectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lister')
+        self.org = Organization.objects.create(name='Org')
+        self.branch = Branch.objects.create(name='Main', organization=self.org)
+        self.agency = Agency.objects.create(name='Agency', branch=self.branch)
+        now = timezone.now()
+        for i in range(5):
+            booking = Booking.objects.create(
+                user=self.user, organization=self.org, branch=self.branch, agency=self.agency,
+                booking_number=f'BK-{i}', status='new', booking_type='TICKET',
+            )
+            Booking.objects.filter(pk=booking.pk).update(date=now - timedelta(days=i))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_default_list_is_unchanged(self):
+        data = self.client.get('/api/bookings/').json()
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]['booking_number'], 'BK-0')
+        self.assertEqual(data[0]['agency']['name'], 'Agency')
+        self.assertEqual(data[0]['booking_type'], 'Group Ticket')
+
+    def test_sparse_fields_and_expand(self):
+        data = self.client.get('/api/bookings/', {'fields': 'id,booking_number,agency,user'}).json()
+        self.assertEqual(set(data[0]), {'id', 'booking_number', 'agency', 'user'})
+        self.assertEqual(data[0]['agency'], self.agency.id)
+
+        data = self.client.get('/api/bookings/', {'fields': 'id,agency', 'expand': 'agency'}).json()
+        self.assertEqual(data[0]['agency']['name'], 'Agency')
+
+    def test_compact_view_with_keyset_pages(self):
+        response = self.client.get('/api/bookings/', {'view': 'compact', 'page_size': 2}).json()
+        self.assertEqual([r['booking_number'] for r in response['results']], ['BK-0', 'BK-1'])
+        row = response['results'][0]
+        self.assertEqual(row['agency_name'], 'Agency')
+        self.assertEqual(row['booking_type'], 'Group Ticket')
+        self.assertEqual(row['paid_amount'], 0.0)
+
+        seen = [r['booking_number'] for r in response['results']]
+        next_url = response['next']
+        while next_url:
+            response = self.client.get(next_url).json()
+            seen += [r['booking_number'] for r in response['results']]
+            next_url = response['next']
+        self.assertEqual(seen, [f'BK-{i}' for i in range(5)])
@@ -0,0 +1,106 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from booking.models import Booking, BookingPersonDetail, BookingTicketDetails
+from booking.totals import compute_booking_totals, deferred_totals, recalculate_booking_totals
+from organization.models import Organization, Branch, Agency
+from packages.models import Airlines
+from tickets.models import Ticket
+
+
+class BookingTotalsTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org")
+        self.branch = Branch.objects.create(name="Main", organization=self.org)
+        self.agency = Agency.objects.create(name="Agency", branch=self.branch)
+        self.user = User.objects.create_user(username="agent")
+        airline = Airlines.objects.create(organization=self.org, name="PIA", code="PK")
+        self.ticket = Ticket.objects.create(organization=self.org, airline=airline, total_seats=10, left_seats=10)
+        self.booking = Booking.objects.create(
+            user=self.user, organization=self.org, branch=self.branch, agency=self.agency,
+        )
+        BookingTicketDetails.objects.create(
+            booking=self.booking, ticket=self.ticket, pnr="P1", adult_price=100, child_price=60,
+            infant_price=10, seats=3, trip_type="oneway", departure_stay_type="", return_stay_type="",
+        )
+        BookingPersonDetail.objects.create(booking=self.booking, age_group="Adult", visa_rate_in_pkr=1000)
+        BookingPersonDetail.objects.create(booking=self.booking, age_group="Adult", visa_rate_in_pkr=1000)
+        BookingPersonDetail.objects.create(
+            booking=self.booking, age_group="Child", is_visa_price_pkr=False, visa_rate_in_sar=10, visa_riyal_rate=0,
+        )
+
+    def test_totals_computed_in_single_pass(self):
+        totals = compute_booking_totals(self.booking)
+        self.assertEqual(totals['total_ticket_amount'], 260.0)
+        # SAR visa without a rate falls back to 50
+        self.assertEqual(totals['total_visa_amount_pkr'], 2500.0)
+        self.assertEqual(totals['total_visa_amount_sar'], 10.0)
+        self.assertEqual(totals['total_amount'], 2760.0)
+
+    def test_save_writes_booking_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.booking.save()
+        writes = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "booking_booking"')]
+        self.assertEqual(len(writes), 1)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_amount, 2760.0)
+
+    def test_non_pricing_update_skips_recalculation(self):
+        self.booking.client_note = "call back"
+        with CaptureQueriesContext(connection) as ctx:
+            self.booking.save(update_fields=['client_note'])
+        aggregates = [
+            q for q in ctx.captured_queries
+            if 'FROM "booking_bookingpersondetail"' in q['sql'] and 'COUNT(' in q['sql']
+        ]
+        self.assertEqual(aggregates, [])
+
+    def test_loaded_booking_is_diffed_against_its_snapshot(self):
+        self.booking.save()
+        booking = Booking.objects.get(pk=self.booking.pk)
+
+        booking.client_note = "call back"
+        with CaptureQueriesContext(connection) as ctx:
+            booking.save()
+        # the totals inputs are not read again
+        reads = [
+            q for q in ctx.captured_queries
+            if 'FROM "booking_bookingpersondetail"' in q['sql'] and 'COUNT(' in q['sql']
+        ]
+        self.assertEqual(reads, [])
+
+        booking.total_food_amount_pkr = 40
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_amount, 2800.0)
+
+        # a new passenger makes the next save recompute
+        BookingPersonDetail.objects.create(booking=booking, age_group="Adult", visa_rate_in_pkr=500)
+        booking.save()
+        self.assertEqual(booking.total_amount, 3400.0)
+
+    def test_deferred_totals_and_batch_recalculation(self):
+        with deferred_totals():
+            self.booking.save()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_amount, 0)
+
+        self.assertEqual(recalculate_booking_totals([self.booking.pk]), 1)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_amount, 2760.0)
+
+    def test_child_changes_are_recorded_on_the_row(self):
+        self.booking.save()
+        booking = Booking.objects.get(pk=self.booking.pk)
+        self.assertFalse(booking.totals_stale)
+
+        # saved through another instance: the flag is persisted, not kept in memory
+        BookingPersonDetail.objects.create(booking_id=booking.pk, age_group="Adult", visa_rate_in_pkr=500)
+        self.assertTrue(Booking.objects.get(pk=booking.pk).totals_stale)
+
+        booking.client_note = "call back"
+        booking.save()
+        self.assertEqual(booking.total_amount, 3360.0)
+        self.assertFalse(Booking.objects.get(pk=booking.pk).totals_stale)
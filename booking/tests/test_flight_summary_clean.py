@@ -32,18 +32,20 @@ class FlightSummaryCleanAPITest(TestCase):
         t2 = Ticket.objects.create(organization=self.org, airline=airline2, pnr="P2", total_seats=10, left_seats=10, booked_tickets=0, confirmed_tickets=0)
         TicketTripDetails.objects.create(ticket=t2, departure_date_time=datetime.datetime.now(), arrival_date_time=datetime.datetime.now(), departure_city=c2, arrival_city=c3, trip_type="oneway")
 
-        b1 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="FB1", total_pax=2)
-        BookingTicketDetails.objects.create(booking=b1, ticket=t1, seats=2)
+        # the pax summaries read facts rebuilt when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            b1 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="FB1", total_pax=2)
+            BookingTicketDetails.objects.create(booking=b1, ticket=t1, seats=2)
 
-        b2 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="FB2", total_pax=3)
-        BookingTicketDetails.objects.create(booking=b2, ticket=t2, seats=3)
+            b2 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="FB2", total_pax=3)
+            BookingTicketDetails.objects.create(booking=b2, ticket=t2, seats=3)
 
-        # older booking
-        b3 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="FB3", total_pax=4)
-        from django.utils import timezone
-        old_dt = timezone.make_aware(datetime.datetime(2020, 1, 1, 0, 0, 0))
-        Booking.objects.filter(pk=b3.pk).update(created_at=old_dt)
-        BookingTicketDetails.objects.create(booking=b3, ticket=t1, seats=4)
+            # older booking
+            b3 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="FB3", total_pax=4)
+            from django.utils import timezone
+            old_dt = timezone.make_aware(datetime.datetime(2020, 1, 1, 0, 0, 0))
+            Booking.objects.filter(pk=b3.pk).update(created_at=old_dt)
+            BookingTicketDetails.objects.create(booking=b3, ticket=t1, seats=4)
 
     def test_flight_summary_basic(self):
         resp = self.client.get("/api/pax-summary/flight-status/")
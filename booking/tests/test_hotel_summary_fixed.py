@@ -28,19 +28,21 @@ class HotelSummaryAPITest(TestCase):
         h1 = Hotels.objects.create(name="Hilton Makkah", city=city1, organization=self.org, address="x", category="4", available_start_date=today, available_end_date=today)
         h2 = Hotels.objects.create(name="Zamzam Tower", city=city2, organization=self.org, address="y", category="3", available_start_date=today, available_end_date=today)
 
-        b1 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="HB1", total_pax=2)
-        BookingHotelDetails.objects.create(booking=b1, hotel=h1, number_of_nights=2, total_price=200)
-
-        b2 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="HB2", total_pax=3)
-        BookingHotelDetails.objects.create(booking=b2, hotel=h2, number_of_nights=3, total_price=300)
-
-        # older booking to test date filtering
-        b3 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="HB3", total_pax=4)
-        # auto_now_add prevents passing created_at on create; set it explicitly with an update
-        from django.utils import timezone
-        old_dt = timezone.make_aware(datetime.datetime(2020, 1, 1, 0, 0, 0))
-        Booking.objects.filter(pk=b3.pk).update(created_at=old_dt)
-        BookingHotelDetails.objects.create(booking=b3, hotel=h1, number_of_nights=1, total_price=100)
+        # the pax summaries read facts rebuilt when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            b1 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="HB1", total_pax=2)
+            BookingHotelDetails.objects.create(booking=b1, hotel=h1, number_of_nights=2, total_price=200)
+
+            b2 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="HB2", total_pax=3)
+            BookingHotelDetails.objects.create(booking=b2, hotel=h2, number_of_nights=3, total_price=300)
+
+            # older booking to test date filtering
+            b3 = Booking.objects.create(user=self.staff, organization=self.org, branch=self.branch, agency=self.agency, booking_number="HB3", total_pax=4)
+            # auto_now_add prevents passing created_at on create; set it explicitly with an update
+            from django.utils import timezone
+            old_dt = timezone.make_aware(datetime.datetime(2020, 1, 1, 0, 0, 0))
+            Booking.objects.filter(pk=b3.pk).update(created_at=old_dt)
+            BookingHotelDetails.objects.create(booking=b3, hotel=h1, number_of_nights=1, total_price=100)
 
     def test_hotel_summary_basic(self):
         resp = self.client.get("/api/pax-summary/hotel-status/")
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from organization.models import Organization, Branch, Agency
+from packages.models import City
+from tickets.models import Hotels
+from booking.models import Booking, BookingDailyFact, BookingHotelDetails
+
+
+class BookingDailyFactTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='facts')
+        self.org = Organization.objects.create(name='Org')
+        self.branch = Branch.objects.create(name='Main', organization=self.org)
+        self.agency = Agency.objects.create(name='Agency', branch=self.branch)
+        city = City.objects.create(organization=self.org, name='Makkah', code='MAK')
+        self.hotel = Hotels.objects.create(
+            organization=self.org, name='Hilton', city=city, address='-',
+            available_start_date='2025-01-01', available_end_date='2026-12-31',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _booking(self, number, pax, nights=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                user=self.user, organization=self.org, branch=self.branch, agency=self.agency,
+                booking_number=number, status='new', booking_type='UMRAH',
+            )
+            Booking.objects.filter(pk=booking.pk).update(total_pax=pax)
+            for count in nights:
+                BookingHotelDetails.objects.create(booking=booking, hotel=self.hotel, number_of_nights=count)
+        return booking
+
+    def test_summaries_read_maintained_facts(self):
+        self._booking('PF-1', 3, nights=(2, 4))
+        second = self._booking('PF-2', 2, nights=(5,))
+        self._booking('PF-3', 1)
+
+        data = self.client.get('/api/pax-summary/', {'group_by': 'status'}).json()
+        self.assertEqual(data['total_bookings'], 3)
+        self.assertEqual(data['total_pax'], 6.0)
+
+        # a booking with two stays at the same hotel is counted once
+        hotels = self.client.get('/api/pax-summary/hotel-status/').json()
+        self.assertEqual(hotels, [{'hotel': 'Hilton', 'city': 'Makkah', 'bookings': 2, 'pax': 5.0}])
+        self.assertEqual(self.client.get('/api/pax-summary/transport-status/').json(), [])
+        self.assertEqual(self.client.get('/api/pax-summary/flight-status/').json(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        hotels = self.client.get('/api/pax-summary/hotel-status/').json()
+        self.assertEqual(hotels[0]['bookings'], 1)
+        self.assertEqual(self.client.get('/api/pax-summary/').json()['total_bookings'], 2)
+
+    def test_rebuild_command_matches_incremental_facts(self):
+        self._booking('PF-4', 2, nights=(3,))
+        self._booking('PF-5', 4)
+        fields = ('date', 'kind', 'booking_type', 'status', 'hotel_id', 'bookings', 'pax')
+        incremental = sorted(BookingDailyFact.objects.values_list(*fields), key=str)
+
+        BookingDailyFact.objects.all().delete()
+        call_command('rebuild_booking_facts', stdout=StringIO())
+        self.assertEqual(sorted(BookingDailyFact.objects.values_list(*fields), key=str), incremental)
+        self.assertEqual(BookingDailyFact.objects.filter(kind=BookingDailyFact.KIND_HOTEL).count(), 1)
+
+    def test_migration_fills_facts_for_existing_bookings(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        self._booking('PF-6', 3, nights=(2,))
+        incremental = sorted(BookingDailyFact.objects.values_list('kind', 'bookings', 'pax'), key=str)
+
+        BookingDailyFact.objects.all().delete()
+        import_module('booking.migrations.0102_bookingdailyfact').fill_booking_facts(apps, None)
+        self.assertEqual(sorted(BookingDailyFact.objects.values_list('kind', 'bookings', 'pax'), key=str), incremental)
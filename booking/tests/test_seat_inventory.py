@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from booking.inventory import (
+    InsufficientSeats,
+    SeatLedger,
+    booking_transition_ledger,
+    place_hold,
+    release_expired_holds,
+)
+from booking.models import Booking, SeatHold
+from organization.models import Organization, Branch, Agency
+from packages.models import Airlines, UmrahPackage
+from tickets.models import Ticket
+
+
+class SeatLedgerTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org")
+        self.branch = Branch.objects.create(name="Main", organization=self.org)
+        self.agency = Agency.objects.create(name="Agency", branch=self.branch)
+        self.user = User.objects.create_user(username="agent")
+        airline = Airlines.objects.create(organization=self.org, name="PIA", code="PK")
+        self.ticket = Ticket.objects.create(
+            organization=self.org, airline=airline, total_seats=10, left_seats=10
+        )
+
+    def test_deltas_are_merged_into_one_update(self):
+        ledger = SeatLedger()
+        ledger.ticket(self.ticket.id, booked=3, left=-3)
+        ledger.ticket(self.ticket.id, booked=-3, confirmed=3)
+        self.assertEqual(ledger.ticket_deltas(), {self.ticket.id: {'booked': 0, 'confirmed': 3, 'left': -3}})
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(ledger.apply(), 1)
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.booked_tickets, 0)
+        self.assertEqual(self.ticket.confirmed_tickets, 3)
+        self.assertEqual(self.ticket.left_seats, 7)
+
+    def test_strict_apply_refuses_overbooking(self):
+        ledger = SeatLedger().ticket(self.ticket.id, booked=11, left=-11)
+        with self.assertRaises(InsufficientSeats):
+            ledger.apply(strict=True)
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.left_seats, 10)
+
+    def test_transition_ledger_allocates_included_pax(self):
+        class _Booking:
+            status = 'Confirmed'
+            total_pax = 3
+            umrah_package_id = None
+
+        ledger = booking_transition_ledger(
+            _Booking(),
+            created=False,
+            old={'status': 'Pending', 'total_pax': 3},
+            ticket_details=[(self.ticket.id, 2), (99, 5)],
+            ticket_included_count=3,
+        )
+        self.assertEqual(ledger.ticket_deltas(), {
+            self.ticket.id: {'booked': -2, 'confirmed': 2, 'left': 0},
+            99: {'booked': -1, 'confirmed': 1, 'left': 0},
+        })
+
+    def test_transition_of_a_stale_instance_is_not_applied_twice(self):
+        package = UmrahPackage.objects.create(organization=self.org, title="Gold", total_seats=10, left_seats=10)
+        booking = Booking.objects.create(
+            user=self.user, organization=self.org, branch=self.branch, agency=self.agency,
+            umrah_package=package, status="Pending", total_pax=2,
+        )
+        stale = Booking.objects.get(pk=booking.pk)
+
+        booking.status = "Confirmed"
+        booking.save()
+        # loaded before the confirmation: its snapshot still says Pending
+        stale.status = "Confirmed"
+        stale.save()
+
+        package.refresh_from_db()
+        self.assertEqual((package.booked_seats, package.confirmed_seats, package.left_seats), (0, 2, 8))
+
+    def test_expired_holds_are_released(self):
+        hold = place_hold(ticket_id=self.ticket.id, seats=4)
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.left_seats, 6)
+
+        SeatHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timezone.timedelta(minutes=1))
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(release_expired_holds(), 0)
+
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.left_seats, 10)
+        self.assertEqual(self.ticket.booked_tickets, 0)
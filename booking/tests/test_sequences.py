@@ -0,0 +1,124 @@
+import threading
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from booking import sequences
+from booking.models import Booking, TRNSequence
+from organization.models import Organization, Branch, Agency
+
+
+class SequenceNumberTests(TestCase):
+    def test_bookings_get_consecutive_numbers_without_probing(self):
+        user = User.objects.create_user(username='seq')
+        org = Organization.objects.create(name='Org')
+        branch = Branch.objects.create(name='Main', organization=org)
+        agency = Agency.objects.create(name='Agency', branch=branch)
+        day = timezone.localtime().strftime('%Y%m%d')
+        month = timezone.localtime().strftime('%Y%m')
+
+        first = Booking.objects.create(user=user, organization=org, branch=branch, agency=agency, status='new')
+        second = Booking.objects.create(user=user, organization=org, branch=branch, agency=agency, status='new')
+
+        self.assertEqual((first.booking_number, second.booking_number), (f'BK-{day}-00001', f'BK-{day}-00002'))
+        self.assertEqual((first.invoice_no, second.invoice_no), (f'INV-{month}-000001', f'INV-{month}-000002'))
+        self.assertTrue(second.public_ref.startswith(f'INV-BK-{day}-00002-'))
+        self.assertEqual(TRNSequence.objects.get(prefix=f'BK-{day}').last_seq, 2)
+
+    def test_reserve_continues_existing_counter(self):
+        TRNSequence.objects.create(prefix='TRN-202501', last_seq=41)
+        self.assertEqual(sequences.reserve('TRN-202501'), 42)
+        self.assertEqual(sequences.reserve('TRN-202501', 10), 43)
+        self.assertEqual(sequences.next_number('TRN-202501'), 'TRN-202501-00053')
+
+    def test_migration_numbers_blank_booking_numbers(self):
+        # duplicates cannot be built once the unique index exists; a blank
+        # legacy number takes the same renumbering path
+        user = User.objects.create_user(username='dup')
+        org = Organization.objects.create(name='Org')
+        branch = Branch.objects.create(name='Main', organization=org)
+        agency = Agency.objects.create(name='Agency', branch=branch)
+        kept, blank = [
+            Booking.objects.create(user=user, organization=org, branch=branch, agency=agency, status='new')
+            for _ in range(2)
+        ]
+        Booking.objects.filter(pk=kept.pk).update(booking_number='BK-20250101-A3F2')
+        Booking.objects.filter(pk=blank.pk).update(booking_number='')
+
+        import_module('booking.migrations.0103_alter_booking_booking_number').renumber_duplicates(apps, None)
+
+        day = timezone.localtime(blank.date).strftime('%Y%m%d')
+        self.assertEqual(
+            list(Booking.objects.order_by('id').values_list('booking_number', flat=True)),
+            ['BK-20250101-A3F2', f'BK-{day}-00003'],
+        )
+
+class ConcurrentSequenceTests(TransactionTestCase):
+    def tearDown(self):
+        sequences._blocks.clear()
+
+    def _allocate(self, threads=4, per_thread=25):
+        numbers = []
+        errors = []
+        lock = threading.Lock()
+
+        def allocate():
+            # SQLite's shared test database refuses concurrent writers instead of
+            # waiting on the row lock; the failed reservation rolled back, so retry
+            while True:
+                try:
+                    return sequences.next_number('CONC')
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+
+        def worker():
+            try:
+                got = [allocate() for _ in range(per_thread)]
+                with lock:
+                    numbers.extend(got)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+        return numbers
+
+    def test_numbers_are_unique_under_concurrency(self):
+        numbers = self._allocate()
+        self.assertEqual(len(numbers), 100)
+        self.assertEqual(len(set(numbers)), 100)
+        self.assertEqual(TRNSequence.objects.get(prefix='CONC').last_seq, 100)
+
+    @override_settings(SEQUENCES={'BLOCK_SIZE': 10})
+    def test_block_preallocation_stays_unique(self):
+        numbers = self._allocate()
+        self.assertEqual(len(set(numbers)), 100)
+        # one counter update per block of ten instead of one per number
+        self.assertEqual(TRNSequence.objects.get(prefix='CONC').last_seq % 10, 0)
+
+    @override_settings(SEQUENCES={'BLOCK_SIZE': 10})
+    def test_blocks_reserved_in_a_transaction_wait_for_commit(self):
+        try:
+            with transaction.atomic():
+                self.assertEqual(sequences.next_number('ATOM'), 'ATOM-00001')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        # the rolled-back block went back to the counter and was not kept
+        self.assertNotIn('ATOM', sequences._blocks)
+
+        with transaction.atomic():
+            self.assertEqual(sequences.next_number('ATOM'), 'ATOM-00001')
+        self.assertEqual(sequences.next_number('ATOM'), 'ATOM-00002')
+        self.assertEqual(TRNSequence.objects.get(prefix='ATOM').last_seq, 10)
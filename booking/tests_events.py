@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from organization.models import Organization, Branch, Agency
+from booking.events import booking_events
+from booking.models import Booking
+
+
+@override_settings(BOOKING_EVENTS={'DEFER': True, 'BACKGROUND': False})
+class BookingEventBusTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='events')
+        self.org = Organization.objects.create(name='Org')
+        self.branch = Branch.objects.create(name='Main', organization=self.org)
+        self.agency = Agency.objects.create(name='Agency', branch=self.branch)
+        self.events = []
+        booking_events.register('tests.capture')(self.events.append)
+        self.addCleanup(booking_events.unregister, 'tests.capture')
+
+    def _booking(self, number):
+        return Booking.objects.create(
+            user=self.user, organization=self.org, branch=self.branch, agency=self.agency,
+            booking_number=number, status='new',
+        )
+
+    def test_saves_in_one_transaction_dispatch_one_event_after_commit(self):
+        booking_events.reset_metrics()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                booking = self._booking('BKG-E1')
+                booking.status = 'confirmed'
+                booking.save()
+                booking.save(update_fields=['status'])
+                self.assertEqual(self.events, [])
+
+        self.assertEqual(len(self.events), 1)
+        event = self.events[0]
+        self.assertTrue(event.created)
+        self.assertGreaterEqual(event.saves, 3)
+        self.assertIsNone(event.update_fields)
+        self.assertEqual(event.booking.status, 'confirmed')
+        # the snapshot carries the relations handlers read
+        with self.assertNumQueries(0):
+            event.booking.organization, event.booking.agency
+            list(event.booking.person_details.all())
+        self.assertEqual(booking_events.metrics()['tests.capture']['calls'], 1)
+
+    def test_rolled_back_transaction_dispatches_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._booking('BKG-E2')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.events, [])
+
+    def test_handler_errors_are_counted_and_do_not_stop_others(self):
+        def broken(event):
+            raise ValueError('boom')
+
+        booking_events.register('tests.broken')(broken)
+        self.addCleanup(booking_events.unregister, 'tests.broken')
+        # run the capturing handler after the broken one
+        booking_events.register('tests.capture')(self.events.append)
+        booking_events.reset_metrics()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._booking('BKG-E3')
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(booking_events.metrics()['tests.broken']['errors'], 1)
+
+    def test_save_after_a_flushed_batch_opens_a_new_one(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self._booking('BKG-E4')
+        booking.status = 'confirmed'
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        self.assertEqual([event.created for event in self.events], [True, False])
@@ -0,0 +1,232 @@
+"""Single-pass booking totals calculator.
+
+``Booking.save()`` used to re-run one aggregate per inventory type, recount
+passengers by age group for every ticket detail and then write the row
+again for the totals, the invoice number and the public reference.
+
+``compute_booking_totals`` loads everything it needs with three grouped
+queries (booking items by inventory type, ticket detail price sums and a
+conditional aggregate over passengers) and returns the totals as a dict so
+the caller can persist them in the same write as the rest of the booking.
+
+A save only recomputes the totals when one of their inputs changed: a
+pricing field differs from the row the booking was loaded with (its
+``from_db`` snapshot), or a passenger, ticket detail or booking item of it
+was saved or deleted since its totals were last computed.  The receivers in
+``booking.signals`` record the latter in the booking's ``totals_stale``
+column (``mark_stale``), so every process sees it; computing the totals
+clears it.  Writes that bypass signals (``update()``, ``bulk_create``) need
+``recalculate_booking_totals`` or ``save(recalculate_totals=True)``.
+
+Bulk imports can wrap their work in ``deferred_totals()`` and call
+``recalculate_booking_totals`` once for all touched bookings afterwards.
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+
+# Fields written by the calculator
+TOTAL_FIELDS = (
+    'total_ticket_amount',
+    'total_hotel_amount',
+    'total_transport_amount',
+    'total_visa_amount',
+    'total_visa_amount_pkr',
+    'total_visa_amount_sar',
+    'total_amount',
+)
+
+# Booking fields that feed into the totals. A save restricted to other
+# fields (e.g. ``save(update_fields=['is_paid'])``) skips recalculation.
+PRICING_FIELDS = frozenset(TOTAL_FIELDS) | frozenset((
+    'total_ticket_amount_pkr',
+    'total_hotel_amount_pkr',
+    'total_hotel_amount_sar',
+    'total_transport_amount_pkr',
+    'total_transport_amount_sar',
+    'total_food_amount_pkr',
+    'total_food_amount_sar',
+    'total_ziyarat_amount_pkr',
+    'total_ziyarat_amount_sar',
+    'total_pax',
+    'total_adult',
+    'total_child',
+    'total_infant',
+))
+
+DEFAULT_RIYAL_RATE = 50
+
+_state = threading.local()
+
+
+@contextmanager
+def deferred_totals():
+    """Skip per-save totals recalculation inside the block (bulk imports)."""
+    depth = getattr(_state, 'deferred', 0)
+    _state.deferred = depth + 1
+    try:
+        yield
+    finally:
+        _state.deferred = depth
+
+
+def totals_deferred():
+    return getattr(_state, 'deferred', 0) > 0
+
+
+def mark_stale(booking_id, booking=None, using=None):
+    """Note that rows the totals of ``booking_id`` are computed from changed.
+
+    ``booking`` is an instance of it already in memory, flagged as well so
+    its next save sees the change without reading the row.
+    """
+    from .models import Booking
+
+    if not booking_id:
+        return
+    Booking.objects.using(using).filter(pk=booking_id, totals_stale=False).update(totals_stale=True)
+    if booking is not None:
+        booking.totals_stale = True
+
+
+def needs_recalculation(booking, update_fields=None):
+    """Decide whether a save has to recompute the totals.
+
+    Saves inside ``deferred_totals()``, saves restricted by ``update_fields``
+    to non-pricing columns and saves of a loaded booking whose pricing fields
+    and child rows are unchanged keep the stored totals as they are.
+    """
+    if totals_deferred():
+        return False
+    if update_fields is not None:
+        return bool(PRICING_FIELDS.intersection(update_fields))
+    loaded = getattr(booking, '_loaded_values', None)
+    if not booking.pk or loaded is None or booking.totals_stale:
+        return True
+    if any(field not in loaded or getattr(booking, field) != loaded[field] for field in PRICING_FIELDS):
+        return True
+    # a child row may have changed after this instance was loaded
+    return type(booking).objects.filter(pk=booking.pk, totals_stale=True).exists()
+
+
+def _d(value):
+    return Decimal(str(value or 0))
+
+
+def _item_totals(booking):
+    """Sum of booking_items.final_amount per inventory type (one query)."""
+    rows = booking.booking_items.values('inventory_type').annotate(total=Sum('final_amount')).order_by()
+    return {row['inventory_type']: row['total'] or Decimal('0') for row in rows}
+
+
+def _person_aggregate(booking):
+    """Passenger counts by age group and visa sums (one query)."""
+    in_sar = Q(is_visa_price_pkr=False)
+    rate = Coalesce(NullIf(F('visa_riyal_rate'), Value(0.0)), Value(float(DEFAULT_RIYAL_RATE)), output_field=FloatField())
+    return booking.person_details.aggregate(
+        adults=Count('id', filter=Q(age_group='Adult')),
+        children=Count('id', filter=Q(age_group='Child')),
+        infants=Count('id', filter=Q(age_group='Infant')),
+        visa_pkr=Sum('visa_rate_in_pkr', filter=Q(is_visa_price_pkr=True)),
+        visa_sar=Sum('visa_rate_in_sar', filter=in_sar),
+        visa_sar_in_pkr=Sum(
+            Coalesce(F('visa_rate_in_sar'), Value(0.0), output_field=FloatField()) * rate,
+            filter=in_sar,
+            output_field=FloatField(),
+        ),
+    )
+
+
+def _ticket_price_sums(booking):
+    """Adult / child / infant price sums over ticket details (one query)."""
+    return booking.ticket_details.aggregate(
+        adult=Sum('adult_price'),
+        child=Sum('child_price'),
+        infant=Sum('infant_price'),
+    )
+
+
+def compute_booking_totals(booking):
+    """Return ``{field: value}`` for every field in TOTAL_FIELDS.
+
+    Unsaved bookings have no child rows yet, so their totals are derived
+    from the in-memory PKR components without touching the database.
+    """
+    if booking.pk:
+        items = _item_totals(booking)
+        persons = _person_aggregate(booking)
+    else:
+        items = {}
+        persons = {}
+
+    totals = {}
+    if items:
+        # New system: booking_items are the source of truth
+        totals['total_ticket_amount'] = float(items.get('ticket', 0))
+        totals['total_hotel_amount'] = float(items.get('hotel', 0))
+        totals['total_transport_amount'] = float(items.get('transport', 0))
+    else:
+        # Old system: ticket prices times passengers per age group
+        prices = _ticket_price_sums(booking) if booking.pk else {}
+        totals['total_ticket_amount'] = float(
+            _d(prices.get('adult')) * (persons.get('adults') or 0)
+            + _d(prices.get('child')) * (persons.get('children') or 0)
+            + _d(prices.get('infant')) * (persons.get('infants') or 0)
+        )
+
+    visa_sum_pkr = _d(persons.get('visa_pkr')) + _d(persons.get('visa_sar_in_pkr'))
+    visa_sum_sar = _d(persons.get('visa_sar'))
+    totals['total_visa_amount_pkr'] = float(visa_sum_pkr)
+    totals['total_visa_amount_sar'] = float(visa_sum_sar)
+    # Keep total_visa_amount as PKR for consistency
+    totals['total_visa_amount'] = float(visa_sum_pkr)
+
+    ticket_amount = totals['total_ticket_amount']
+    totals['total_amount'] = float(
+        _d(booking.total_ticket_amount_pkr or ticket_amount)
+        + _d(booking.total_hotel_amount_pkr)
+        + _d(booking.total_transport_amount_pkr)
+        + visa_sum_pkr
+        + _d(booking.total_food_amount_pkr)
+        + _d(booking.total_ziyarat_amount_pkr)
+    )
+    return totals
+
+
+def apply_booking_totals(booking):
+    """Compute totals, set them on ``booking`` and return the changed field names.
+
+    ``totals_stale`` is cleared and listed too when it was set.
+    """
+    changed = []
+    if booking.totals_stale:
+        changed.append('totals_stale')
+    booking.totals_stale = False
+    for field, value in compute_booking_totals(booking).items():
+        if getattr(booking, field) != value:
+            setattr(booking, field, value)
+            changed.append(field)
+    return changed
+
+
+def recalculate_booking_totals(bookings):
+    """Recompute totals for many bookings and write them with one bulk_update.
+
+    Accepts booking instances or ids. Returns the number of bookings whose
+    stored totals changed.
+    """
+    from .models import Booking
+
+    bookings = list(bookings)
+    if bookings and not isinstance(bookings[0], Booking):
+        bookings = list(Booking.objects.filter(pk__in=bookings))
+
+    changed = [(b, apply_booking_totals(b)) for b in bookings]
+    dirty = [b for b, fields in changed if fields]
+    if dirty:
+        Booking.objects.bulk_update(dirty, [*TOTAL_FIELDS, 'totals_stale'], batch_size=500)
+    return sum(1 for _, fields in changed if set(fields) - {'totals_stale'})
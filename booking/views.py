@@ -5,18 +5,19 @@ from rest_framework.permissions import AllowAny
 from rest_framework.throttling import SimpleRateThrottle
 from rest_framework.exceptions import PermissionDenied
 from universal.models import PaxMovement
-from django.db.models import Prefetch, Sum, F, Value, DecimalField, FloatField, Count
+from django.db.models import Prefetch, Sum, F, Value, DecimalField, FloatField
 from django.db.models.functions import Coalesce, Round, Cast
 from django.utils.dateparse import parse_datetime, parse_date
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 from rest_framework.decorators import action
 from django.db import connection
 from django.db import transaction
 from rest_framework import generics
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
-from .serializers import PublicBookingCreateSerializer, PublicPaymentCreateSerializer, BookingSerializer
+from .serializers import PublicBookingCreateSerializer, PublicPaymentCreateSerializer, BookingSerializer, BookingListSerializer
+from rest_framework.pagination import CursorPagination
 from packages.models import UmrahPackage
 from leads.models import Lead, FollowUp
 from django.contrib.auth import get_user_model
@@ -154,8 +155,6 @@ class AdminApprovePaymentAPIView(APIView):
 
 from .models import (
     Booking,
-    BookingHotelDetails,
-    BookingTransportDetails,
     BookingTicketDetails,
     BookingTicketTicketTripDetails,
     BookingTicketStopoverDetails,
@@ -175,7 +174,6 @@ from .models import (
 from .serializers import BookingSerializer, PaymentSerializer, SectorSerializer, BigSectorSerializer, VehicleTypeSerializer, InternalNoteSerializer, DiscountGroupSerializer, BankAccountSerializer, OrganizationLinkSerializer, AllowedResellerSerializer, MarkupSerializer, BookingCallRemarkSerializer
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.response import Response
-from universal.scope import apply_user_scope
 
 import json
 class BookingViewSet(viewsets.ModelViewSet):
@@ -292,10 +290,62 @@ class BookingViewSet(viewsets.ModelViewSet):
         "hotel_details",
         "transport_details",
     ]
+    PREFETCHED_FIELDS = {
+        "hotel_details": "hotel_details",
+        "transport_details": "transport_details",
+        "food_details": "food_details",
+        "ziyarat_details": "ziyarat_details",
+        "ticket_details": Prefetch(
+            "ticket_details",
+            queryset=BookingTicketDetails.objects.prefetch_related("trip_details", "stopover_details"),
+        ),
+        "person_details": "person_details",
+        "payment_details": "payment_details",
+    }
+
+    class BookingKeysetPagination(CursorPagination):
+        """Keyset pagination on ``-date``; only used when ``cursor`` or ``page_size`` is passed."""
+        ordering = ("-date", "-id")
+        page_size = 50
+        page_size_query_param = "page_size"
+        max_page_size = 200
+
+    pagination_class = BookingKeysetPagination
+
+    def _csv_param(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return {part.strip() for part in value.split(",") if part.strip()}
+
+    def _is_compact_list(self):
+        return self.action == "list" and self.request.query_params.get("view") == "compact"
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.request.method in ("GET", "HEAD"):
+            fields = self._csv_param("fields")
+            expand = self._csv_param("expand")
+            if fields is not None:
+                context["fields"] = fields
+            if expand is not None:
+                context["expand"] = expand
+        return context
+
+    def paginate_queryset(self, queryset):
+        # keep the plain list response unless the client asks for pages
+        params = self.request.query_params
+        if "cursor" not in params and "page_size" not in params:
+            return None
+        return super().paginate_queryset(queryset)
+
     def get_queryset(self):
         """
         Optimized queryset to prevent N+1 queries using select_related and prefetch_related.
         Excludes public bookings to prevent finance conflicts.
+
+        With ``?fields=`` only the relations that are rendered are prefetched
+        and ``?expand=`` decides which nested objects are joined in.
         """
         qs = (
             Booking.objects.filter(is_public_booking=False)  # Exclude public bookings
@@ -317,27 +367,42 @@ class BookingViewSet(viewsets.ModelViewSet):
                     FloatField()
                 )
             )
-            .prefetch_related(
-                "hotel_details",
-                "transport_details",
-                "food_details",
-                "ziyarat_details",
-                Prefetch(
-                    "ticket_details",
-                    queryset=BookingTicketDetails.objects.prefetch_related(
-                        "trip_details", "stopover_details"
-                    ),
-                ),
-                "person_details",
-                "payment_details",
-            )
             .order_by("-date")
         )
         booking_number = self.request.query_params.get("booking_number")
         if booking_number:
             qs = qs.filter(booking_number=booking_number)
-    
-        return qs
+
+        if self._is_compact_list():
+            return qs
+
+        fields = self._csv_param("fields") if self.request.method in ("GET", "HEAD") else None
+        expand = self._csv_param("expand") if self.request.method in ("GET", "HEAD") else None
+        prefetches = [
+            lookup for name, lookup in self.PREFETCHED_FIELDS.items()
+            if not fields or name in fields
+        ]
+        related = dict(BookingSerializer.EXPANDABLE_FIELDS)
+        if fields is not None or expand is not None:
+            related = {
+                name: source for name, source in related.items()
+                if name in (expand or ()) and (not fields or name in fields)
+            }
+        return qs.select_related(*related.values()).prefetch_related(*prefetches)
+
+    def list(self, request, *args, **kwargs):
+        if not self._is_compact_list():
+            return super().list(request, *args, **kwargs)
+
+        # compact rows straight from a values() projection
+        rows = self.filter_queryset(self.get_queryset()).values(
+            *BookingListSerializer.PROJECTION,
+            **{name: F(lookup) for name, lookup in BookingListSerializer.RELATED_PROJECTION.items()},
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(BookingListSerializer(page, many=True).data)
+        return Response(BookingListSerializer(rows, many=True).data)
 
 
 
@@ -1527,43 +1592,41 @@ class PublicBookingStatusAPIView(APIView):
     # focused on GET lookups to avoid exposing write actions publicly.
 
 
+def _pax_summary_dates(params):
+    """``(date_from, date_to)`` days from the query string; datetimes count by their local day."""
+    dates = []
+    for name in ("date_from", "date_to"):
+        value = params.get(name)
+        parsed = (parse_date(value) or parse_datetime(value)) if value else None
+        if isinstance(parsed, datetime):
+            parsed = (timezone.localtime(parsed) if timezone.is_aware(parsed) else parsed).date()
+        dates.append(parsed)
+    return dates
+
+
 class PaxSummaryAPIView(APIView):
     """Simple Pax summary aggregator.
 
     Query params:
-      - date_from, date_to (ISO date)
-      - group_by (booking_type|status) — default booking_type
+      - date_from, date_to (ISO date, both days included)
+      - group_by (booking_type|status|organization|branch|agency) — default booking_type
 
     Response: { total_bookings, total_pax, breakdown: [{key, bookings, pax}] }
+
+    Reads the daily facts maintained by ``booking.pax_facts``.
     """
     permission_classes = []  # use default auth elsewhere; rely on apply_user_scope
 
     def get(self, request):
-        qs = Booking.objects.all()
-
-        # apply user scope so callers only see their allowed data
-        qs = apply_user_scope(qs, request.user)
-
-        # date filtering (created_at is used for booking creation time when available)
-        date_from = request.query_params.get("date_from")
-        date_to = request.query_params.get("date_to")
-        if date_from:
-            # accept date or datetime
-            dt = parse_date(date_from) or parse_datetime(date_from)
-            if dt:
-                qs = qs.filter(created_at__gte=dt)
-        if date_to:
-            dt = parse_date(date_to) or parse_datetime(date_to)
-            if dt:
-                # include the whole day if date provided
-                if isinstance(dt, (type(None),)):
-                    qs = qs.filter(created_at__lte=dt)
-                else:
-                    qs = qs.filter(created_at__lte=dt)
+        from .models import BookingDailyFact
+        from .pax_facts import fact_rows, rollup
+
+        date_from, date_to = _pax_summary_dates(request.query_params)
+        facts = fact_rows(request.user, BookingDailyFact.KIND_BOOKING, date_from, date_to)
 
         group_by = request.query_params.get("group_by", "booking_type")
 
-        # map group_by to model field
+        # map group_by to fact field
         if group_by == "status":
             key_field = "status"
         elif group_by == "organization":
@@ -1575,18 +1638,10 @@ class PaxSummaryAPIView(APIView):
         else:
             key_field = "booking_type"
 
-        # use DB aggregation: Count bookings and Sum total_pax
-        agg_qs = (
-            qs.values(key_field)
-            .annotate(bookings=Count("id"), pax=Coalesce(Sum("total_pax", output_field=FloatField()), Value(0, output_field=FloatField()), output_field=FloatField()))
-            .order_by()
-        )
-
         breakdown = []
-        for row in agg_qs:
-            key = row.get(key_field)
+        for row in rollup(facts, key_field):
             # For foreign keys, present the id (caller can resolve names separately if needed)
-            breakdown.append({"key": key, "bookings": int(row.get("bookings") or 0), "pax": float(row.get("pax") or 0)})
+            breakdown.append({"key": row.get(key_field), "bookings": int(row.get("total_bookings") or 0), "pax": float(row.get("total_pax") or 0)})
 
         total_bookings = sum(item["bookings"] for item in breakdown)
         total_pax = sum(item["pax"] for item in breakdown)
@@ -1600,36 +1655,19 @@ class HotelPaxSummaryAPIView(APIView):
     permission_classes = []
 
     def get(self, request):
-        # base booking queryset with scope and date filters
-        bs = Booking.objects.all()
-        bs = apply_user_scope(bs, request.user)
-
-        date_from = request.query_params.get("date_from")
-        date_to = request.query_params.get("date_to")
-        if date_from:
-            dt = parse_date(date_from) or parse_datetime(date_from)
-            if dt:
-                bs = bs.filter(created_at__gte=dt)
-        if date_to:
-            dt = parse_date(date_to) or parse_datetime(date_to)
-            if dt:
-                bs = bs.filter(created_at__lte=dt)
-
-        # aggregate over BookingHotelDetails to avoid duplicated bookings
-        agg_qs = (
-            BookingHotelDetails.objects.filter(booking__in=bs)
-            .values("hotel__name", "hotel__city__name")
-            .annotate(bookings=Count("booking", distinct=True), pax=Coalesce(Sum("booking__total_pax", output_field=FloatField()), Value(0, output_field=FloatField()), output_field=FloatField()))
-            .order_by()
-        )
+        from .models import BookingDailyFact
+        from .pax_facts import fact_rows, rollup
+
+        date_from, date_to = _pax_summary_dates(request.query_params)
+        facts = fact_rows(request.user, BookingDailyFact.KIND_HOTEL, date_from, date_to)
 
         out = []
-        for row in agg_qs:
+        for row in rollup(facts, "hotel__name", "hotel__city__name"):
             out.append({
                 "hotel": row.get("hotel__name"),
                 "city": row.get("hotel__city__name"),
-                "bookings": int(row.get("bookings") or 0),
-                "pax": float(row.get("pax") or 0.0),
+                "bookings": int(row.get("total_bookings") or 0),
+                "pax": float(row.get("total_pax") or 0.0),
             })
 
         return Response(out)
@@ -1640,26 +1678,18 @@ class TransportPaxSummaryAPIView(APIView):
     permission_classes = []
 
     def get(self, request):
-        bs = Booking.objects.all()
-        bs = apply_user_scope(bs, request.user)
-
-        date_from = request.query_params.get("date_from")
-        date_to = request.query_params.get("date_to")
-        if date_from:
-            dt = parse_date(date_from) or parse_datetime(date_from)
-            if dt:
-                bs = bs.filter(created_at__gte=dt)
-        if date_to:
-            dt = parse_date(date_to) or parse_datetime(date_to)
-            if dt:
-                bs = bs.filter(created_at__lte=dt)
+        from .models import BookingDailyFact
+        from .pax_facts import fact_rows, rollup
+
+        date_from, date_to = _pax_summary_dates(request.query_params)
+        facts = fact_rows(request.user, BookingDailyFact.KIND_TRANSPORT, date_from, date_to)
 
         # group by vehicle type name and small sector (route)
-        agg_qs = (
-            BookingTransportDetails.objects.filter(booking__in=bs)
-            .values("vehicle_type__vehicle_name", "vehicle_type__small_sector__departure_city__name", "vehicle_type__small_sector__arrival_city__name")
-            .annotate(bookings=Count("booking", distinct=True), pax=Coalesce(Sum("booking__total_pax", output_field=FloatField()), Value(0, output_field=FloatField()), output_field=FloatField()))
-            .order_by()
+        agg_qs = rollup(
+            facts,
+            "vehicle_type__vehicle_name",
+            "vehicle_type__small_sector__departure_city__name",
+            "vehicle_type__small_sector__arrival_city__name",
         )
 
         out = []
@@ -1673,8 +1703,8 @@ class TransportPaxSummaryAPIView(APIView):
             out.append({
                 "transport": row.get("vehicle_type__vehicle_name"),
                 "route": route,
-                "bookings": int(row.get("bookings") or 0),
-                "pax": float(row.get("pax") or 0.0),
+                "bookings": int(row.get("total_bookings") or 0),
+                "pax": float(row.get("total_pax") or 0.0),
             })
 
         return Response(out)
@@ -1685,41 +1715,25 @@ class FlightPaxSummaryAPIView(APIView):
     permission_classes = []
 
     def get(self, request):
-        bs = Booking.objects.all()
-        bs = apply_user_scope(bs, request.user)
-
-        date_from = request.query_params.get("date_from")
-        date_to = request.query_params.get("date_to")
-        if date_from:
-            dt = parse_date(date_from) or parse_datetime(date_from)
-            if dt:
-                bs = bs.filter(created_at__gte=dt)
-        if date_to:
-            dt = parse_date(date_to) or parse_datetime(date_to)
-            if dt:
-                bs = bs.filter(created_at__lte=dt)
-
-        # aggregate over BookingTicketDetails
-        agg_qs = (
-            BookingTicketDetails.objects.filter(booking__in=bs)
-            .values("ticket__airline__name", "ticket__trip_details__departure_city__name", "ticket__trip_details__arrival_city__name")
-            .annotate(bookings=Count("booking", distinct=True), pax=Coalesce(Sum("booking__total_pax", output_field=FloatField()), Value(0, output_field=FloatField()), output_field=FloatField()))
-            .order_by()
-        )
+        from .models import BookingDailyFact
+        from .pax_facts import fact_rows, rollup
+
+        date_from, date_to = _pax_summary_dates(request.query_params)
+        facts = fact_rows(request.user, BookingDailyFact.KIND_FLIGHT, date_from, date_to)
 
         out = []
-        for row in agg_qs:
-            dep = row.get("ticket__trip_details__departure_city__name")
-            arr = row.get("ticket__trip_details__arrival_city__name")
+        for row in rollup(facts, "airline__name", "departure_city__name", "arrival_city__name"):
+            dep = row.get("departure_city__name")
+            arr = row.get("arrival_city__name")
             sector = None
             if dep or arr:
                 sector = f"{dep or '---'} → {arr or '---'}"
 
             out.append({
-                "airline": row.get("ticket__airline__name"),
+                "airline": row.get("airline__name"),
                 "sector": sector,
-                "bookings": int(row.get("bookings") or 0),
-                "pax": float(row.get("pax") or 0.0),
+                "bookings": int(row.get("total_bookings") or 0),
+                "pax": float(row.get("total_pax") or 0.0),
             })
 
         return Response(out)
@@ -2451,9 +2465,28 @@ def get_inventory_price(request):
         if inventory_type == 'hotel':
             from tickets.models import Hotels
             hotel = Hotels.objects.prefetch_related('prices').get(id=inventory_id)
-            # Get first available price (you can customize this logic)
+            check_in = request.GET.get('check_in')
+            check_out = request.GET.get('check_out')
+            room_type = request.GET.get('room_type')
             hotel_price = hotel.prices.first()
-            if hotel_price:
+            if check_in and check_out and (room_type or hotel_price):
+                # Price the stay night by night across seasons
+                from tickets.rate_calendar import quote_stay
+                quote = quote_stay(hotel.id, room_type or hotel_price.room_type, check_in, check_out)
+                price = quote['total']
+                details = {
+                    'room_type': quote['room_type'],
+                    'hotel_name': hotel.name,
+                    'nights': quote['nights'],
+                    'complete': quote['complete'],
+                    'breakdown': [
+                        {'date': night['date'].isoformat(), 'price': night['price']}
+                        for night in quote['breakdown']
+                    ],
+                    'missing_dates': [night.isoformat() for night in quote['missing_dates']],
+                }
+            elif hotel_price:
+                # Without stay dates fall back to the first price row
                 price = float(hotel_price.price)
                 details = {
                     'room_type': hotel_price.room_type,
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.1 on 2026-10-18 21:37
+
+from django.db import migrations, models
+
+
+def backfill_rule_id(apps, schema_editor):
+    # the first earning of each (booking, rule) pair takes the key; the
+    # duplicates earlier saves created keep rule_id NULL (extra still has it)
+    CommissionEarning = apps.get_model('commissions', 'CommissionEarning')
+    seen = set()
+    batch = []
+    rows = (
+        CommissionEarning.objects.filter(booking_id__isnull=False, extra__isnull=False)
+        .order_by('id').values_list('id', 'booking_id', 'extra')
+    )
+    for pk, booking_id, extra in rows.iterator(chunk_size=2000):
+        rule_id = extra.get('rule_id') if isinstance(extra, dict) else None
+        if rule_id is None or (booking_id, rule_id) in seen:
+            continue
+        seen.add((booking_id, rule_id))
+        batch.append(CommissionEarning(pk=pk, rule_id=rule_id))
+        if len(batch) >= 1000:
+            CommissionEarning.objects.bulk_update(batch, ['rule_id'])
+            batch = []
+    if batch:
+        CommissionEarning.objects.bulk_update(batch, ['rule_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commissions', '0005_commissionrule_commission_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commissionearning',
+            name='rule_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_rule_id, reverse_code=migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='commissionearning',
+            constraint=models.UniqueConstraint(fields=('booking_id', 'rule_id'), name='comm_earning_booking_rule_uniq'),
+        ),
+    ]
@@ -55,6 +55,8 @@ class CommissionEarning(models.Model):
     STATUS_CHOICES = (('pending', 'Pending'), ('earned', 'Earned'), ('paid', 'Paid'), ('cancelled', 'Cancelled'))
 
     booking_id = models.BigIntegerField(null=True, blank=True)
+    # CommissionRule that produced the earning; one earning per (booking, rule)
+    rule_id = models.BigIntegerField(null=True, blank=True)
     service_type = models.CharField(max_length=100, null=True, blank=True)
     earned_by_type = models.CharField(max_length=50)  # 'branch', 'area_agent', 'employee'
     earned_by_id = models.BigIntegerField(null=True, blank=True)
@@ -74,6 +76,9 @@ class CommissionEarning(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['redeemed']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['booking_id', 'rule_id'], name='comm_earning_booking_rule_uniq'),
+        ]
 
     def __str__(self):
         return f"Earning {self.id} booking:{self.booking_id} amount:{self.commission_amount} status:{self.status}"
@@ -0,0 +1,120 @@
+"""Compiled, per-organization index of active commission rules.
+
+``evaluate_rules_for_booking`` used to load every active ``CommissionRule`` on
+each booking save and test them one by one in Python.  ``rules_for`` now
+returns a ``RuleIndex`` for the booking's organization (its own rules plus the
+global ones without an organization), compiled once and reused for
+``COMMISSION_RULE_INDEX['CACHE_TIMEOUT']`` seconds:
+
+* rules are bucketed by ``(product_id, inventory_item_id)``, so a booking only
+  looks at the buckets that can match its product and inventory item;
+* each bucket is sorted by ``min_amount``, so a bisect drops every rule whose
+  minimum is above the booking total before ``max_amount`` is checked.
+
+Saving or deleting a rule drops this process's indexes right away and bumps
+a generation number (``universal.cache_versions``) after commit, which makes
+every other process recompile on its next lookup.  Queryset ``update()``
+calls bypass this; call ``invalidate()`` after them.
+"""
+import threading
+import time
+from bisect import bisect_right
+
+from django.conf import settings
+from django.db.models import Q
+
+from universal import cache_versions
+from .models import CommissionRule
+
+
+GENERATION_KEY = "commissions:rule_index:generation"
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def index_timeout():
+    return (getattr(settings, "COMMISSION_RULE_INDEX", {}) or {}).get("CACHE_TIMEOUT", 300)
+
+
+def invalidate(using=None):
+    """Drop every compiled index: in this process now, in the others once the transaction commits."""
+    with _lock:
+        _indexes.clear()
+    cache_versions.bump(GENERATION_KEY, using=using)
+
+
+def _key(value):
+    return int(value) if value else None
+
+
+def _amount(value, default):
+    return default if value is None else float(value)
+
+
+class RuleIndex:
+    """Active rules of one organization, bucketed for ``match``."""
+
+    def __init__(self, rules):
+        # {product_id: {inventory_item_id: (sorted minimums, rules)}}; None for "any"
+        grouped = {}
+        for rule in rules:
+            items = grouped.setdefault(_key(rule.product_id), {})
+            items.setdefault(_key(rule.inventory_item_id), []).append(rule)
+        self.buckets = {}
+        for product_id, items in grouped.items():
+            for item_id, bucket in items.items():
+                bucket.sort(key=lambda rule: (_amount(rule.min_amount, float("-inf")), rule.pk))
+                minimums = [_amount(rule.min_amount, float("-inf")) for rule in bucket]
+                self.buckets.setdefault(product_id, {})[item_id] = (minimums, bucket)
+
+    @staticmethod
+    def _keys(mapping, value):
+        # a rule without a product (or item) matches any booking, and a booking
+        # without one matches the rules of every product (or item)
+        if value is None:
+            return list(mapping)
+        return [key for key in (None, value) if key in mapping]
+
+    def match(self, total_amount, product_id=None, inventory_item_id=None):
+        """Rules applying to a booking, in rule id order."""
+        product_id = None if product_id is None else int(product_id)
+        inventory_item_id = None if inventory_item_id is None else int(inventory_item_id)
+        matches = []
+        for product_key in self._keys(self.buckets, product_id):
+            items = self.buckets[product_key]
+            for item_key in self._keys(items, inventory_item_id):
+                minimums, rules = items[item_key]
+                for rule in rules[:bisect_right(minimums, total_amount)]:
+                    if rule.max_amount is not None and total_amount > float(rule.max_amount):
+                        continue
+                    matches.append(rule)
+        matches.sort(key=lambda rule: rule.pk)
+        return matches
+
+
+def compile_index(organization_id):
+    rules = CommissionRule.objects.filter(active=True)
+    if organization_id is None:
+        rules = rules.filter(organization_id__isnull=True)
+    else:
+        rules = rules.filter(Q(organization_id=organization_id) | Q(organization_id__isnull=True))
+    return RuleIndex(list(rules))
+
+
+def rules_for(organization_id):
+    """The ``RuleIndex`` of ``organization_id``, compiled at most once per timeout."""
+    timeout = index_timeout()
+    if not timeout:
+        return compile_index(organization_id)
+    generation = cache_versions.version(GENERATION_KEY)
+    now = time.monotonic()
+    with _lock:
+        cached = _indexes.get(organization_id)
+    if cached is not None and cached[0] == generation and cached[1] > now:
+        return cached[2]
+    index = compile_index(organization_id)
+    with _lock:
+        _indexes[organization_id] = (generation, now + timeout, index)
+    return index
+
@@ -1,6 +1,6 @@
 from typing import List, Tuple
 
-from .models import CommissionRule
+from .models import CommissionEarning, CommissionRule
 from decimal import Decimal
 from django.db import transaction
 from logs.models import SystemLog
@@ -140,34 +140,25 @@ def evaluate_rules_for_booking(booking) -> List[Tuple[CommissionRule, float]]:
     that should be created for this booking.
 
     This is a simple implementation:
-    - Find active rules
+    - Take the active rules of the booking's organization plus the global ones,
+      from the compiled index in ``commissions.rule_index``
     - Match by product_id or inventory_item_id if present on booking
     - If rule is percent, compute percentage of booking.total_amount (fallback to 0)
     - If rule is flat, use rule.commission_amount
 
     Returns an empty list if no rules match.
     """
+    from .rule_index import rules_for
+
     matches = []
     try:
         total_amount = float(getattr(booking, "total_amount", 0) or 0)
         product_id = getattr(booking, "product_id", None)
         inventory_item_id = getattr(booking, "inventory_item_id", None)
 
-        qs = CommissionRule.objects.filter(active=True)
-
-        for rule in qs:
-            # Match by product or inventory if rule specifies them
-            if rule.product_id and product_id is not None and int(rule.product_id) != int(product_id):
-                continue
-            if rule.inventory_item_id and inventory_item_id is not None and int(rule.inventory_item_id) != int(inventory_item_id):
-                continue
-
-            # Check min/max thresholds
-            if rule.min_amount is not None and total_amount < float(rule.min_amount):
-                continue
-            if rule.max_amount is not None and total_amount > float(rule.max_amount):
-                continue
+        index = rules_for(getattr(booking, "organization_id", None))
 
+        for rule in index.match(total_amount, product_id, inventory_item_id):
             # commission_type is expected to be 'percentage' or 'flat'
             if (rule.commission_type or "").lower() == "percentage":
                 # commission_value stores the percent (e.g. 5.0 means 5%)
@@ -185,3 +176,60 @@ def evaluate_rules_for_booking(booking) -> List[Tuple[CommissionRule, float]]:
         traceback.print_exc()
 
     return matches
+
+
+def _earned_by_id(booking, receiver_type):
+    # Map rule receiver to earned_by fields
+    if receiver_type == "branch":
+        return getattr(booking, "branch_id", None)
+    if receiver_type == "agency":
+        return getattr(booking, "agency_id", None)
+    return None
+
+
+def create_earnings_for_booking(booking) -> List[int]:
+    """
+    Create the CommissionEarning rows of ``booking`` that do not exist yet.
+
+    Earnings are keyed by (booking_id, rule_id): a rule that already has an
+    earning for the booking is skipped, so the booking's repeated saves neither
+    duplicate nor recompute it.  Missing earnings are written with one
+    ``bulk_create``; the unique constraint on the pair settles concurrent saves.
+
+    Returns the ids of the earnings created.
+    """
+    booking_id = getattr(booking, "id", None)
+    if not booking_id:
+        return []
+    matches = evaluate_rules_for_booking(booking)
+    if not matches:
+        return []
+
+    existing = set(
+        CommissionEarning.objects.filter(booking_id=booking_id, rule_id__in=[rule.id for rule, _ in matches])
+        .values_list("rule_id", flat=True)
+    )
+    earnings = [
+        CommissionEarning(
+            booking_id=booking_id,
+            rule_id=rule.id,
+            service_type=getattr(booking, "booking_type", None),
+            earned_by_type=rule.receiver_type or "branch",
+            earned_by_id=_earned_by_id(booking, rule.receiver_type),
+            commission_amount=Decimal(str(round(amount, 2))),
+            status="pending",
+            extra={"rule_id": rule.id},
+        )
+        for rule, amount in matches
+        if rule.id not in existing
+    ]
+    if not earnings:
+        return []
+
+    CommissionEarning.objects.bulk_create(earnings, ignore_conflicts=True)
+    # ignore_conflicts leaves the primary keys unset; read back what this call wrote
+    return list(
+        CommissionEarning.objects.filter(
+            booking_id=booking_id, rule_id__in=[earning.rule_id for earning in earnings]
+        ).order_by("id").values_list("id", flat=True)
+    )
@@ -1,47 +1,24 @@
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.db.models.signals import post_save
-from django.conf import settings
-from django.utils import timezone
 
-from booking.models import Booking
-from .models import CommissionEarning, CommissionRule
-from .services import evaluate_rules_for_booking
+from booking.events import booking_events
+from .models import CommissionRule
+from .rule_index import invalidate as invalidate_rule_indexes
+from .services import create_earnings_for_booking
 from logs.models import SystemLog
 
 
-@receiver(post_save, sender=Booking)
-def booking_post_save_create_commissions(sender, instance, created, **kwargs):
+@booking_events.register("commissions.earnings")
+def booking_post_save_create_commissions(event):
     """
     On booking creation (or update where status/payment occurs), evaluate commission
-    rules and create CommissionEarning records as necessary.
+    rules and create the CommissionEarning records the booking does not have yet.
     This function intentionally keeps logic lean and delegates calculation to services.
     """
-    # Only run on create or when booking is confirmed/paid — keep simple for now
+    instance = event.booking
     try:
         booking_id = instance.id
-        # evaluate matching rules
-        matches = evaluate_rules_for_booking(instance)
-        created_earnings = []
-        for rule, amount in matches:
-            # Map rule receiver to earned_by fields
-            receiver_type = getattr(rule, "receiver_type", None)
-            if receiver_type == "branch":
-                earned_by_id = getattr(instance, "branch_id", None)
-            elif receiver_type == "agency":
-                earned_by_id = getattr(instance, "agency_id", None)
-            else:
-                earned_by_id = None
-
-            earning = CommissionEarning.objects.create(
-                booking_id=booking_id,
-                service_type=getattr(instance, "booking_type", None),
-                earned_by_type=receiver_type or "branch",
-                earned_by_id=earned_by_id,
-                commission_amount=amount,
-                status="pending",
-                extra={"rule_id": getattr(rule, "id", None)},
-            )
-            created_earnings.append(earning.id)
+        created_earnings = create_earnings_for_booking(instance)
 
         # Log created earnings in SystemLog
         if created_earnings:
@@ -62,3 +39,10 @@ def booking_post_save_create_commissions(sender, instance, created, **kwargs):
         import traceback
 
         traceback.print_exc()
+
+
+@receiver(post_save, sender=CommissionRule, dispatch_uid="commission_rule_index_saved")
+@receiver(post_delete, sender=CommissionRule, dispatch_uid="commission_rule_index_deleted")
+def commission_rule_changed(sender, instance, using=None, **kwargs):
+    # recompile the rule indexes on the next booking save
+    invalidate_rule_indexes(using=using)
@@ -42,11 +42,13 @@ class CommissionReportAndAuditTests(TestCase):
             self.assertIn(resp2.status_code, (301, 302, 404))
 
     def test_booking_signal_creates_earning_and_systemlog(self):
-        # create a global commission rule
-        CommissionRule.objects.create(organization_id=self.org.id, commission_type="flat", commission_value=50, active=True, receiver_type="branch")
+        # booking events are dispatched once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            # create a global commission rule
+            CommissionRule.objects.create(organization_id=self.org.id, commission_type="flat", commission_value=50, active=True, receiver_type="branch")
 
-        # create booking to trigger signal
-        b = Booking.objects.create(user=self.user, organization=self.org, branch=self.branch, agency=self.agency, booking_number="B1", total_amount=100, status="confirmed")
+            # create booking to trigger signal
+            b = Booking.objects.create(user=self.user, organization=self.org, branch=self.branch, agency=self.agency, booking_number="B1", total_amount=100, status="confirmed")
 
         # commission earning should be created
         earnings = CommissionEarning.objects.filter(booking_id=b.id)
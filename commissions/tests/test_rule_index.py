@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from booking.models import Booking
+from commissions.models import CommissionEarning, CommissionRule
+from commissions.rule_index import invalidate, rules_for
+from logs.models import SystemLog
+from organization.models import Organization, Branch, Agency
+
+
+class CommissionRuleIndexTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Rules Org")
+        self.other = Organization.objects.create(name="Other Org")
+        invalidate()
+
+    def _rule(self, organization=None, **fields):
+        fields.setdefault("commission_type", "flat")
+        fields.setdefault("commission_value", 10)
+        return CommissionRule.objects.create(
+            organization_id=organization.id if organization else None, active=True, **fields
+        )
+
+    def test_match_buckets_by_product_item_and_amount(self):
+        global_rule = self._rule()
+        product = self._rule(self.org, product_id=5)
+        item = self._rule(self.org, product_id=5, inventory_item_id=7)
+        ranged = self._rule(self.org, min_amount=Decimal("100"), max_amount=Decimal("500"))
+        self._rule(self.other)
+        CommissionRule.objects.create(organization_id=self.org.id, active=False, commission_value=10)
+
+        index = rules_for(self.org.id)
+        self.assertEqual(index.match(50, 5, 7), [global_rule, product, item])
+        self.assertEqual(index.match(100, 6, None), [global_rule, ranged])
+        self.assertEqual(index.match(500, 5, 8), [global_rule, product, ranged])
+        self.assertEqual(index.match(501, None, None), [global_rule, product, item])
+        self.assertEqual(rules_for(None).match(200), [global_rule])
+
+    def test_index_is_reused_until_a_rule_changes(self):
+        first = self._rule(self.org)
+        self.assertEqual(rules_for(self.org.id).match(10), [first])
+        with self.assertNumQueries(0):
+            rules_for(self.org.id)
+
+        second = self._rule(self.org)
+        self.assertEqual(rules_for(self.org.id).match(10), [first, second])
+        first.delete()
+        self.assertEqual(rules_for(self.org.id).match(10), [second])
+
+    def test_generation_bumped_by_another_process_recompiles(self):
+        from commissions.rule_index import GENERATION_KEY
+        from universal import cache_versions
+
+        rule = self._rule(self.org)
+        self.assertEqual(rules_for(self.org.id).match(10), [rule])
+        # another worker deactivated the rule: only the shared generation moved
+        CommissionRule.objects.filter(pk=rule.pk).update(active=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_versions.bump(GENERATION_KEY)
+        self.assertEqual(rules_for(self.org.id).match(10), [])
+
+    def test_repeated_booking_saves_create_each_earning_once(self):
+        user = get_user_model().objects.create_user(username="rules")
+        branch = Branch.objects.create(name="Main", organization=self.org)
+        agency = Agency.objects.create(name="A1", branch=branch)
+        flat = self._rule(self.org, receiver_type="branch", commission_value=50)
+        self._rule(self.other, commission_value=70)
+
+        # commit after each save so every one of them dispatches its own event
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                user=user, organization=self.org, branch=branch, agency=agency,
+                booking_number="RI-1", total_amount=100, status="confirmed",
+            )
+        booking.status = "approved"
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                booking.save()
+
+        earnings = CommissionEarning.objects.filter(booking_id=booking.id)
+        self.assertEqual(list(earnings.values_list("rule_id", "earned_by_id", "commission_amount")),
+                         [(flat.id, branch.id, Decimal("50.00"))])
+        self.assertEqual(SystemLog.objects.filter(action_type="commission:create").count(), 1)
+
+        # a rule added later is picked up by the next save, the existing earning is left alone
+        with self.captureOnCommitCallbacks(execute=True):
+            later = self._rule(self.org, receiver_type="agency", commission_value=20)
+            booking.save()
+        self.assertEqual(sorted(earnings.values_list("rule_id", flat=True)), [flat.id, later.id])
@@ -217,6 +217,122 @@ KUICKPAY_CONFIG = {
     'PASSWORD': '12345',
     'TIMEOUT': 10,
 }
+# ----------------------------------------------------
+# System log writer (logs.writer): buffered audit-log inserts
+# ----------------------------------------------------
+SYSTEM_LOG_WRITER = {
+    # write synchronously under the test runner so assertions see the rows
+    'ASYNC': 'test' not in sys.argv,
+    'MAX_QUEUE': 10000,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 1.0,
+    'PUT_TIMEOUT': 0.05,
+}
+
+# ----------------------------------------------------
+# Profit/loss recompute (finance.recompute): coalesced per transaction
+# ----------------------------------------------------
+FINANCE_PROFIT_RECOMPUTE = {
+    # 'on_commit' recomputes after commit in the request thread, 'worker'
+    # hands the ids to a background thread, 'sync' recomputes inline
+    'MODE': 'on_commit',
+    'BATCH_SIZE': 200,
+    'WORKER_DELAY': 0.5,
+}
+
+# ----------------------------------------------------
+# Booking event bus (booking.events): one post-commit event per booking
+# ----------------------------------------------------
+BOOKING_EVENTS = {
+    # fold a transaction's saves into one event dispatched after commit, and
+    # run the handlers registered as background ones on a thread pool
+    'DEFER': True,
+    'BACKGROUND': True,
+    'MAX_WORKERS': 2,
+    'SLOW_HANDLER_MS': 500,
+}
+
+# ----------------------------------------------------
+# Finance summary reports (finance.report_queries)
+# ----------------------------------------------------
+FINANCE_REPORTS = {
+    # seconds a sales/financial summary is reused for the same filters;
+    # 0 disables the cache
+    'CACHE_TIMEOUT': 60,
+}
+
+# ----------------------------------------------------
+# Pax movement counters (pax_movements.counters)
+# ----------------------------------------------------
+PAX_MOVEMENT_COUNTERS = {
+    # keep per (organization, status, city) counters for
+    # /pax-movements/summary/?source=counters
+    'MAINTAIN': True,
+}
+
+# ----------------------------------------------------
+# Promotion contact CSV import (promotion_center.imports)
+# ----------------------------------------------------
+PROMOTION_IMPORT = {
+    # import on a background thread and answer 202 with the job
+    'BACKGROUND': True,
+    'CHUNK_SIZE': 1000,
+    'MAX_ERRORS': 1000,
+}
+
+# ----------------------------------------------------
+# Commission rule index (commissions.rule_index)
+# ----------------------------------------------------
+COMMISSION_RULE_INDEX = {
+    # seconds a compiled per-organization rule index is reused; rule saves
+    # and deletes invalidate it earlier. 0 compiles per booking save
+    'CACHE_TIMEOUT': 300,
+}
+
+# ----------------------------------------------------
+# Customer / promotion contact identity keys (customers.identity)
+# ----------------------------------------------------
+CUSTOMER_IDENTITY = {
+    # country code given to national phone numbers ("0300...") in E.164 keys
+    'DEFAULT_COUNTRY_CODE': '92',
+}
+
+# ----------------------------------------------------
+# Document number sequences (booking.sequences)
+# ----------------------------------------------------
+SEQUENCES = {
+    # values each process reserves per counter round trip; 1 keeps numbers
+    # consecutive, larger blocks cut contention on the counter rows
+    'BLOCK_SIZE': 1,
+}
+
+# ----------------------------------------------------
+# Public read cache (universal.public_cache): anonymous package/blog pages
+# ----------------------------------------------------
+PUBLIC_CACHE = {
+    # seconds a rendered public response is reused; saves invalidate it
+    # earlier. 0 disables the cache
+    'TIMEOUT': 300,
+    # Cache-Control max-age sent to browsers and shared caches
+    'MAX_AGE': 60,
+}
+
+# ----------------------------------------------------
+# Form submission forwarder (blog.forwarder, manage.py process_form_queue)
+# ----------------------------------------------------
+FORM_FORWARDER = {
+    # concurrent Leads API requests per forwarder, capped per host
+    'WORKERS': 8,
+    'PER_HOST_LIMIT': 4,
+    'BATCH_SIZE': 50,
+    'POLL_INTERVAL': 2.0,
+    # seconds a claimed task stays leased before another forwarder may retry it
+    'LEASE_SECONDS': 300,
+    # consecutive outages that open the circuit, and seconds it stays open
+    'BREAKER_THRESHOLD': 5,
+    'BREAKER_COOLDOWN': 30.0,
+}
+
 # ----------------------------------------------------
 # CORS & INTERNAL IPs
 # ----------------------------------------------------
@@ -0,0 +1,272 @@
+"""Identity resolution for customers and promotion contacts.
+
+``upsert_customer_from_data`` used to try phone, then email, then passport
+with up to three queries on the raw columns, so "0300 1234567" and
+"+92-300-1234567" became two customers.  Every Customer and PromotionContact
+now owns normalized ``IdentityKey`` rows:
+
+* phone: E.164, from ``promotion_center.models.normalize_phone``; a national
+  number starting with a single 0 gets
+  ``CUSTOMER_IDENTITY['DEFAULT_COUNTRY_CODE']``;
+* email: trimmed and lowercased;
+* passport: uppercased letters and digits.
+
+``resolve_customer`` / ``resolve_contact`` find the owner of the first
+matching key (phone, then email, then passport) with one query;
+``resolve_customers`` / ``resolve_contacts`` do the same for a whole batch of
+records, and ``index_customers`` / ``index_contacts`` claim the keys of bulk
+written rows.  Keys follow saves through the receivers below; rows written
+with ``bulk_create``/``update()`` need ``index_*``.  The migration creating
+the table indexes the rows that already exist (the oldest row claims a shared
+key); ``manage.py backfill_identity_keys`` re-indexes and merges duplicate
+customers.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from promotion_center.models import PromotionContact, normalize_phone
+from .models import Customer, IdentityKey
+
+
+logger = logging.getLogger(__name__)
+
+SCOPE_CUSTOMER = IdentityKey.SCOPE_CUSTOMER
+SCOPE_CONTACT = IdentityKey.SCOPE_CONTACT
+OWNER_FIELDS = {SCOPE_CUSTOMER: "customer", SCOPE_CONTACT: "contact"}
+# fields whose change re-indexes a saved row
+CUSTOMER_IDENTITY_FIELDS = {"phone", "email", "passport_number"}
+CONTACT_IDENTITY_FIELDS = {"phone", "email"}
+BATCH_SIZE = 500
+
+
+def default_country_code():
+    return str((getattr(settings, "CUSTOMER_IDENTITY", {}) or {}).get("DEFAULT_COUNTRY_CODE", "92"))
+
+
+def phone_key(value):
+    """E.164 key of a phone number, or None.
+
+    A number stored without ``+`` drops an international ``00`` prefix or
+    swaps its national ``0`` for the default country code.
+    """
+    if not value or "@" in str(value):
+        return None
+    phone = normalize_phone(str(value))
+    digits = phone.lstrip("+")
+    if not phone.startswith("+"):
+        if digits.startswith("00"):
+            digits = digits[2:]
+        elif digits.startswith("0"):
+            digits = default_country_code() + digits[1:]
+    return f"+{digits}" if digits else None
+
+
+def normalize_email(value):
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    return value if "@" in value else None
+
+
+def normalize_passport(value):
+    if not value:
+        return None
+    return "".join(c for c in str(value).upper() if c.isalnum()) or None
+
+
+def identity_keys(phone=None, email=None, passport_number=None):
+    """``(kind, value)`` keys of the given identifiers, in matching priority."""
+    keys = []
+    for kind, value in (
+        (IdentityKey.KIND_PHONE, phone_key(phone)),
+        (IdentityKey.KIND_EMAIL, normalize_email(email)),
+        (IdentityKey.KIND_PASSPORT, normalize_passport(passport_number)),
+    ):
+        if value and len(value) <= 255:
+            keys.append((kind, value))
+    return keys
+
+
+def customer_keys(customer):
+    return identity_keys(customer.phone, customer.email, customer.passport_number)
+
+
+def contact_keys(contact):
+    return identity_keys(contact.phone, contact.email)
+
+
+def _keys_q(keys):
+    values = {}
+    for kind, value in keys:
+        values.setdefault(kind, set()).add(value)
+    query = Q()
+    for kind, kind_values in values.items():
+        query |= Q(kind=kind, value__in=sorted(kind_values))
+    return query
+
+
+def _owners(scope, keys):
+    """``{key: owner}`` for the given keys, in one query."""
+    keys = set(keys)
+    if not keys:
+        return {}
+    field = OWNER_FIELDS[scope]
+    return {
+        (row.kind, row.value): getattr(row, field)
+        for row in IdentityKey.objects.filter(_keys_q(keys), scope=scope).select_related(field)
+    }
+
+
+def _first(keys, owners):
+    return next((owners[key] for key in keys if key in owners), None)
+
+
+def resolve_customer(phone=None, email=None, passport_number=None):
+    """The Customer owning the first matching identifier, or None (one query)."""
+    keys = identity_keys(phone, email, passport_number)
+    return _first(keys, _owners(SCOPE_CUSTOMER, keys))
+
+
+def resolve_contact(phone=None, email=None):
+    """The PromotionContact owning ``phone`` or else ``email``, or None (one query)."""
+    keys = identity_keys(phone, email)
+    return _first(keys, _owners(SCOPE_CONTACT, keys))
+
+
+def _resolve_many(scope, key_lists):
+    resolved = []
+    for start in range(0, len(key_lists), BATCH_SIZE):
+        chunk = key_lists[start:start + BATCH_SIZE]
+        owners = _owners(scope, (key for keys in chunk for key in keys))
+        resolved.extend(_first(keys, owners) for keys in chunk)
+    return resolved
+
+
+def resolve_customers(records):
+    """Batch ``resolve_customer`` for dicts with phone/email/passport_number; one query per BATCH_SIZE."""
+    return _resolve_many(SCOPE_CUSTOMER, [
+        identity_keys(record.get("phone"), record.get("email"), record.get("passport_number"))
+        for record in records
+    ])
+
+
+def resolve_contacts(records):
+    """Batch ``resolve_contact`` for dicts with phone/email; one query per BATCH_SIZE."""
+    return _resolve_many(SCOPE_CONTACT, [identity_keys(record.get("phone"), record.get("email")) for record in records])
+
+
+def _claim(scope, owned_keys):
+    """Insert keys for ``[(owner_id, keys)]``; keys another row already owns are left to it."""
+    field = f"{OWNER_FIELDS[scope]}_id"
+    rows = [
+        IdentityKey(scope=scope, kind=kind, value=value, **{field: owner_id})
+        for owner_id, keys in owned_keys
+        for kind, value in keys
+    ]
+    IdentityKey.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def index_customers(customers):
+    """Claim the keys of saved customers (e.g. after a bulk import)."""
+    _claim(SCOPE_CUSTOMER, [(customer.pk, customer_keys(customer)) for customer in customers if customer.pk])
+
+
+def index_contacts(contacts):
+    """Claim the keys of saved promotion contacts (e.g. after a bulk import)."""
+    _claim(SCOPE_CONTACT, [(contact.pk, contact_keys(contact)) for contact in contacts if contact.pk])
+
+
+def reindex(scope, owner_id, keys):
+    """Make ``keys`` the keys of one row: release the stale ones, claim the new ones."""
+    owned = IdentityKey.objects.filter(scope=scope, **{f"{OWNER_FIELDS[scope]}_id": owner_id})
+    current = set(owned.values_list("kind", "value"))
+    wanted = set(keys)
+    if current - wanted:
+        owned.filter(_keys_q(current - wanted)).delete()
+    if wanted - current:
+        _claim(scope, [(owner_id, wanted - current)])
+
+
+def _sync(scope, instance, keys, created, update_fields, identity_fields):
+    if update_fields is not None and not identity_fields & set(update_fields):
+        return
+    try:
+        # savepoint: a failure must not break the caller's transaction
+        with transaction.atomic():
+            if created:
+                _claim(scope, [(instance.pk, keys)])
+            else:
+                reindex(scope, instance.pk, keys)
+    except Exception:
+        logger.exception("identity keys of %s %s could not be updated", scope, instance.pk)
+
+
+@receiver(post_save, sender=Customer, dispatch_uid="customer_identity_keys")
+def customer_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    _sync(SCOPE_CUSTOMER, instance, customer_keys(instance), created, update_fields, CUSTOMER_IDENTITY_FIELDS)
+
+
+@receiver(post_save, sender=PromotionContact, dispatch_uid="contact_identity_keys")
+def contact_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    _sync(SCOPE_CONTACT, instance, contact_keys(instance), created, update_fields, CONTACT_IDENTITY_FIELDS)
+
+
+def upsert_contact(phone=None, email=None, defaults=None):
+    """Update the PromotionContact owning ``phone`` (else ``email``) with ``defaults``, or create one.
+
+    A contact created from an email alone stores the email as its phone, as
+    the registration signal always did.  Returns ``(contact, created)``.
+    """
+    defaults = dict(defaults or {})
+    contact = resolve_contact(phone, email)
+    if contact is not None:
+        for field, value in defaults.items():
+            setattr(contact, field, value)
+        contact.save()
+        return contact, False
+    if phone:
+        # rows bulk written before their keys still match on the unique phone column
+        return PromotionContact.objects.update_or_create(phone=normalize_phone(phone), defaults=defaults)
+    if email:
+        defaults.setdefault("email", email)
+        return PromotionContact.objects.create(phone=email, **defaults), True
+    return None, False
+
+
+def merge_customers(survivor, duplicates):
+    """Fold ``duplicates`` into ``survivor`` and delete them.
+
+    Empty fields of the survivor are filled from the duplicates (oldest
+    first), rows referencing a duplicate are pointed at the survivor, and the
+    survivor stays active if any of them was.
+    """
+    duplicates = [customer for customer in duplicates if customer.pk != survivor.pk]
+    if not duplicates:
+        return survivor
+    duplicate_ids = [customer.pk for customer in duplicates]
+    with transaction.atomic():
+        for customer in sorted(duplicates, key=lambda c: c.pk):
+            for field in ("phone", "email", "passport_number", "city", "service_type", "branch_id", "organization_id"):
+                if not getattr(survivor, field) and getattr(customer, field):
+                    setattr(survivor, field, getattr(customer, field))
+            if customer.last_activity and (not survivor.last_activity or customer.last_activity > survivor.last_activity):
+                survivor.last_activity = customer.last_activity
+            survivor.is_active = survivor.is_active or customer.is_active
+        for relation in Customer._meta.related_objects:
+            if relation.related_model is IdentityKey or relation.many_to_many:
+                continue
+            relation.related_model._base_manager.filter(
+                **{f"{relation.field.name}__in": duplicate_ids}
+            ).update(**{relation.field.name: survivor})
+        Customer.objects.filter(pk__in=duplicate_ids).delete()
+        survivor.save()
+    return survivor
@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from customers.identity import (
+    SCOPE_CONTACT,
+    SCOPE_CUSTOMER,
+    identity_keys,
+    index_contacts,
+    index_customers,
+    merge_customers,
+)
+from customers.models import Customer, IdentityKey
+from promotion_center.models import PromotionContact
+
+
+def _duplicate_groups(rows):
+    """Group ``(id, keys)`` rows that share a key, transitively; returns lists of ids, oldest first."""
+    parent = {}
+
+    def find(pk):
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    owners = {}
+    for pk, keys in rows:
+        parent[pk] = pk
+        for key in keys:
+            owner = owners.setdefault(key, pk)
+            if owner != pk:
+                a, b = find(owner), find(pk)
+                parent[max(a, b)] = min(a, b)
+    groups = {}
+    for pk in parent:
+        groups.setdefault(find(pk), []).append(pk)
+    return [sorted(ids) for ids in groups.values() if len(ids) > 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Index the normalized phone/email/passport keys of customers and promotion contacts, "
+        "merging customers (into the oldest) and flagging contacts that share a key"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scope", choices=[SCOPE_CUSTOMER, SCOPE_CONTACT], help="Only this scope (default: both)")
+        parser.add_argument("--no-merge", action="store_true", help="Only index; leave duplicate customers alone")
+        parser.add_argument("--dry-run", action="store_true", help="Report duplicate groups without writing")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows indexed per transaction")
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        if options["scope"] in (None, SCOPE_CUSTOMER):
+            self._customers(options, chunk_size)
+        if options["scope"] in (None, SCOPE_CONTACT):
+            self._contacts(options, chunk_size)
+
+    def _rows(self, queryset, fields, keys):
+        for row in queryset.order_by("pk").values_list("pk", *fields).iterator(chunk_size=5000):
+            yield row[0], keys(*row[1:])
+
+    def _reindex(self, model, scope, index, chunk_size):
+        field = "customer_id" if scope == SCOPE_CUSTOMER else "contact_id"
+        ids = list(model.objects.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            with transaction.atomic():
+                IdentityKey.objects.filter(scope=scope, **{f"{field}__in": chunk}).delete()
+                index(model.objects.filter(pk__in=chunk).order_by("pk"))
+        return len(ids)
+
+    def _customers(self, options, chunk_size):
+        groups = _duplicate_groups(self._rows(Customer.objects.all(), ("phone", "email", "passport_number"), identity_keys))
+        merged = sum(len(ids) - 1 for ids in groups)
+        if options["dry_run"]:
+            self.stdout.write(f"{len(groups)} duplicate customer groups ({merged} customers would be merged)")
+            return
+        if groups and not options["no_merge"]:
+            for ids in groups:
+                customers = list(Customer.objects.filter(pk__in=ids).order_by("pk"))
+                if customers:
+                    merge_customers(customers[0], customers[1:])
+            self.stdout.write(self.style.SUCCESS(f"Merged {merged} duplicate customers into {len(groups)}"))
+        indexed = self._reindex(Customer, SCOPE_CUSTOMER, index_customers, chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} customers"))
+
+    def _contacts(self, options, chunk_size):
+        groups = _duplicate_groups(self._rows(PromotionContact.objects.all(), ("phone", "email"), identity_keys))
+        duplicates = [pk for ids in groups for pk in ids[1:]]
+        if options["dry_run"]:
+            self.stdout.write(f"{len(groups)} duplicate contact groups ({len(duplicates)} contacts would be flagged)")
+            return
+        if duplicates:
+            PromotionContact.objects.filter(pk__in=duplicates).update(is_duplicate=True)
+            self.stdout.write(self.style.SUCCESS(f"Flagged {len(duplicates)} duplicate contacts"))
+        indexed = self._reindex(PromotionContact, SCOPE_CONTACT, index_contacts, chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} contacts"))
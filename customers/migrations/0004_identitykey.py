@@ -0,0 +1,53 @@
+# Generated by Django 4.2.1 on 2026-10-18 21:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def index_existing(apps, schema_editor):
+    # customers.identity resolves through the keys only, so existing rows
+    # must own theirs before the first save after this migration
+    from customers.identity import contact_keys, customer_keys
+
+    IdentityKey = apps.get_model('customers', 'IdentityKey')
+    owners = (
+        (apps.get_model('customers', 'Customer'), 'customer', 'customer_id', customer_keys),
+        (apps.get_model('promotion_center', 'PromotionContact'), 'contact', 'contact_id', contact_keys),
+    )
+    for model, scope, field, keys in owners:
+        rows = []
+        # oldest first: a key shared by duplicates goes to the oldest row
+        for owner in model.objects.order_by('pk').iterator(chunk_size=2000):
+            rows.extend(IdentityKey(scope=scope, kind=kind, value=value, **{field: owner.pk}) for kind, value in keys(owner))
+            if len(rows) >= 2000:
+                IdentityKey.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+        IdentityKey.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotion_center', '0005_promotionimportjob'),
+        ('customers', '0003_customer_passport_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentityKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('customer', 'Customer'), ('contact', 'Promotion contact')], max_length=16)),
+                ('kind', models.CharField(choices=[('phone', 'Phone'), ('email', 'Email'), ('passport', 'Passport')], max_length=16)),
+                ('value', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='identity_keys', to='promotion_center.promotioncontact')),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='identity_keys', to='customers.customer')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='identitykey',
+            constraint=models.UniqueConstraint(fields=('scope', 'kind', 'value'), name='customers_identity_key_uniq'),
+        ),
+        migrations.RunPython(index_existing, migrations.RunPython.noop),
+    ]
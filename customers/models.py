@@ -70,3 +70,43 @@ class LoanCommitment(models.Model):
 
     def __str__(self):
         return f"Loan {self.id} - status={self.status}"
+
+
+class IdentityKey(models.Model):
+    """A normalized identifier (phone, email, passport) owned by one record.
+
+    ``customers.identity`` resolves incoming identifiers against this table
+    instead of the raw columns.  Within a scope each key belongs to a single
+    Customer or PromotionContact.
+    """
+
+    SCOPE_CUSTOMER = "customer"
+    SCOPE_CONTACT = "contact"
+    SCOPE_CHOICES = [
+        (SCOPE_CUSTOMER, "Customer"),
+        (SCOPE_CONTACT, "Promotion contact"),
+    ]
+
+    KIND_PHONE = "phone"
+    KIND_EMAIL = "email"
+    KIND_PASSPORT = "passport"
+    KIND_CHOICES = [
+        (KIND_PHONE, "Phone"),
+        (KIND_EMAIL, "Email"),
+        (KIND_PASSPORT, "Passport"),
+    ]
+
+    scope = models.CharField(max_length=16, choices=SCOPE_CHOICES)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    value = models.CharField(max_length=255)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, null=True, blank=True, related_name='identity_keys')
+    contact = models.ForeignKey('promotion_center.PromotionContact', on_delete=models.CASCADE, null=True, blank=True, related_name='identity_keys')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'kind', 'value'], name='customers_identity_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.kind}:{self.value}"
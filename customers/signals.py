@@ -1,13 +1,14 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from booking.models import Booking
+from booking.events import booking_events
 from .models import Customer, Lead
 from .utils import upsert_customer_from_data
 
 
-@receiver(post_save, sender=Booking)
-def booking_create_or_update_customer(sender, instance, created, **kwargs):
+@booking_events.register("customers.upsert", background=True)
+def booking_create_or_update_customer(event):
     """When a Booking is created/updated, upsert a Customer record based on primary passenger/contact."""
+    instance = event.booking
     try:
         person = instance.person_details.first()
     except Exception:
@@ -59,9 +60,10 @@ try:
     @receiver(post_save, sender=ExternalLead)
     def external_lead_upsert_customer(sender, instance, created, **kwargs):
         """If a separate 'leads' app is present, use its Lead model to upsert Customers."""
+        # leads.Lead names its fields customer_full_name / contact_number
         upsert_customer_from_data(
-            full_name=getattr(instance, "full_name", None),
-            phone=getattr(instance, "phone", None),
+            full_name=getattr(instance, "customer_full_name", None) or getattr(instance, "full_name", None),
+            phone=getattr(instance, "contact_number", None) or getattr(instance, "phone", None),
             email=getattr(instance, "email", None),
             passport_number=getattr(instance, "passport_number", None),
             branch=getattr(instance, "branch", None),
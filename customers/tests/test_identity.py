@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from customers.identity import (
+    identity_keys,
+    resolve_contact,
+    resolve_customer,
+    resolve_customers,
+    upsert_contact,
+)
+from customers.models import Customer, IdentityKey
+from customers.utils import upsert_customer_from_data, upsert_customers
+from promotion_center.models import PromotionContact
+
+
+class IdentityResolutionTests(TestCase):
+    def test_identity_keys_are_normalized(self):
+        self.assertEqual(
+            identity_keys(" 0300-1234567 ", " Ali@Example.COM ", "ab 12-34"),
+            [("phone", "+923001234567"), ("email", "ali@example.com"), ("passport", "AB1234")],
+        )
+        self.assertEqual(identity_keys("0092 300 1234567"), [("phone", "+923001234567")])
+        self.assertEqual(identity_keys("n/a", "not-an-email"), [])
+
+    def test_upsert_matches_differently_formatted_identifiers_in_one_query(self):
+        customer, created = upsert_customer_from_data(full_name="Ali", phone="+92-300-1234567", email="ali@example.com")
+        self.assertTrue(created)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_customer(phone="03001234567"), customer)
+        again, created = upsert_customer_from_data(full_name="Ali Khan", phone="0300 1234567")
+        self.assertFalse(created)
+        self.assertEqual(again.pk, customer.pk)
+        # email matches when the phone is unknown
+        self.assertEqual(upsert_customer_from_data(phone="+1555", email="ALI@example.com")[0].pk, customer.pk)
+
+        customer.refresh_from_db()
+        self.assertEqual(customer.full_name, "Ali Khan")
+        self.assertEqual(Customer.objects.count(), 1)
+
+        # changing an identifier moves its key
+        customer.email = "khan@example.com"
+        customer.save()
+        self.assertIsNone(resolve_customer(email="ali@example.com"))
+        self.assertEqual(resolve_customer(email="khan@example.com"), customer)
+
+    def test_batch_upsert(self):
+        existing = Customer.objects.create(full_name="Old", phone="03001111111", is_active=False)
+        records = [
+            {"full_name": "Old Renamed", "phone": "+923001111111"},
+            {"full_name": "New", "phone": "03002222222", "passport_number": "P1"},
+            {"full_name": "New Again", "passport_number": "p-1"},
+        ]
+        with self.assertNumQueries(1):
+            resolved = resolve_customers(records)
+        self.assertEqual(resolved, [existing, None, None])
+
+        self.assertEqual(upsert_customers(records, reactivate=True), (1, 2))
+        existing.refresh_from_db()
+        self.assertEqual((existing.full_name, existing.is_active), ("Old Renamed", True))
+        self.assertEqual(Customer.objects.get(passport_number="P1").full_name, "New Again")
+
+    def test_contact_upsert_by_phone_and_email(self):
+        contact, created = upsert_contact(phone="03003333333", defaults={"name": "C"})
+        self.assertTrue(created)
+        same, created = upsert_contact(phone="+92 300 3333333", defaults={"name": "C2"})
+        self.assertEqual((same.pk, created), (contact.pk, False))
+
+        by_email, created = upsert_contact(email="reg@example.com", defaults={"name": "Reg", "email": "reg@example.com"})
+        self.assertTrue(created)
+        self.assertEqual(resolve_contact(email="REG@example.com"), by_email)
+        self.assertEqual(PromotionContact.objects.count(), 2)
+
+    def test_backfill_merges_duplicate_customers(self):
+        first = Customer.objects.create(full_name="First", phone="03004444444")
+        second = Customer.objects.create(full_name="Second", phone="+923004444444", email="dup@example.com")
+        third = Customer.objects.create(full_name="Third", email="DUP@example.com", city="Lahore")
+        IdentityKey.objects.all().delete()
+
+        call_command("backfill_identity_keys", stdout=StringIO())
+
+        self.assertEqual(list(Customer.objects.values_list("pk", flat=True)), [first.pk])
+        first.refresh_from_db()
+        self.assertEqual((first.email, first.city), ("dup@example.com", "Lahore"))
+        self.assertEqual(resolve_customer(email="dup@example.com"), first)
+        self.assertFalse(Customer.objects.filter(pk__in=[second.pk, third.pk]).exists())
+
+    def test_migration_indexes_existing_rows(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        older = Customer.objects.create(full_name="Older", phone="03005555555")
+        Customer.objects.create(full_name="Newer", phone="+923005555555", email="newer@example.com")
+        contact = PromotionContact.objects.create(phone="03006666666")
+        IdentityKey.objects.all().delete()
+
+        import_module("customers.migrations.0004_identitykey").index_existing(apps, None)
+
+        self.assertEqual(resolve_customer(phone="+92 300 5555555"), older)
+        self.assertEqual(resolve_customer(email="newer@example.com").full_name, "Newer")
+        self.assertEqual(resolve_contact(phone="+923006666666"), contact)
+        customer, created = upsert_customer_from_data(full_name="Older", phone="0300-5555555")
+        self.assertEqual((customer.pk, created), (older.pk, False))
@@ -1,7 +1,30 @@
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .identity import resolve_customer, resolve_customers
 from .models import Customer
 
 
+def _apply_updates(customer, full_name=None, branch=None, organization=None, last_activity=None):
+    """Set the given values on ``customer``; returns the names of the fields changed."""
+    changed = []
+    if full_name and customer.full_name != full_name:
+        customer.full_name = full_name
+        changed.append("full_name")
+    if branch and customer.branch_id != branch.pk:
+        customer.branch = branch
+        changed.append("branch")
+    if organization and customer.organization_id != organization.pk:
+        customer.organization = organization
+        changed.append("organization")
+    if last_activity:
+        customer.last_activity = last_activity
+        changed.append("last_activity")
+    return changed
+
+
 def upsert_customer_from_data(
     full_name: Optional[str] = None,
     phone: Optional[str] = None,
@@ -14,34 +37,17 @@ def upsert_customer_from_data(
 ) -> Tuple[Customer, bool]:
     """Upsert a Customer record using available identifiers.
 
-    Matching priority: phone -> email -> passport_number.
+    Matching priority: phone -> email -> passport_number, on normalized
+    identity keys (see customers.identity), in one query.
 
     Returns (customer, created_flag)
     """
-    customer = None
-    if phone:
-        customer = Customer.objects.filter(phone=phone).first()
-    if not customer and email:
-        customer = Customer.objects.filter(email=email).first()
-    if not customer and passport_number:
-        customer = Customer.objects.filter(passport_number=passport_number).first()
+    customer = resolve_customer(phone, email, passport_number)
 
     if customer:
-        changed = False
-        if full_name and customer.full_name != full_name:
-            customer.full_name = full_name
-            changed = True
-        if branch and customer.branch != branch:
-            customer.branch = branch
-            changed = True
-        if organization and customer.organization != organization:
-            customer.organization = organization
-            changed = True
-        if last_activity:
-            customer.last_activity = last_activity
-            changed = True
+        changed = _apply_updates(customer, full_name, branch, organization, last_activity)
         if changed:
-            customer.save()
+            customer.save(update_fields=changed + ["updated_at"])
         return customer, False
 
     # create new
@@ -56,3 +62,46 @@ def upsert_customer_from_data(
         last_activity=last_activity,
     )
     return customer, True
+
+
+def upsert_customers(records: Iterable[dict], reactivate: bool = False) -> Tuple[int, int]:
+    """Batch ``upsert_customer_from_data`` for imports and scans.
+
+    ``records`` are dicts of its keyword arguments.  Existing customers are
+    resolved in one query per 500 records and written with one
+    ``bulk_update``; records without a match are created one by one (so their
+    identity keys are claimed), and later records sharing one of their
+    identifiers update them instead of creating another customer.  With
+    ``reactivate`` matched customers are marked active again.
+
+    Returns (created, updated).
+    """
+    records = list(records)
+    resolved = resolve_customers(records)
+    created = updated = 0
+    to_update = {}
+    fields = {"updated_at"}
+    now = timezone.now()
+    with transaction.atomic():
+        for record, customer in zip(records, resolved):
+            if customer is None:
+                # a customer created earlier in this batch owns its keys by now
+                customer = resolve_customer(record.get("phone"), record.get("email"), record.get("passport_number"))
+                if customer is None:
+                    upsert_customer_from_data(**record)
+                    created += 1
+                    continue
+            customer = to_update.setdefault(customer.pk, customer)
+            fields.update(_apply_updates(
+                customer, record.get("full_name"), record.get("branch"),
+                record.get("organization"), record.get("last_activity"),
+            ))
+            if reactivate and not customer.is_active:
+                customer.is_active = True
+                fields.add("is_active")
+            # bulk_update skips auto_now
+            customer.updated_at = now
+            updated += 1
+        if to_update:
+            Customer.objects.bulk_update(list(to_update.values()), sorted(fields), batch_size=500)
+    return created, updated
@@ -11,8 +11,8 @@ from .serializers import (
     FollowUpHistorySerializer,
     LoanCommitmentSerializer,
 )
+from .utils import upsert_customers
 from booking.models import Booking
-from django.db import transaction
 from django.utils import timezone
 
 
@@ -138,44 +138,37 @@ class CustomerViewSet(viewsets.ModelViewSet):
         # POST behavior: scan recent bookings and upsert
         cutoff_days = int(request.data.get("cutoff_days", 30))
         since = timezone.now() - timezone.timedelta(days=cutoff_days)
-        bookings = Booking.objects.filter(created_at__gte=since)
-        created = 0
-        updated = 0
-        with transaction.atomic():
-            for b in bookings:
-                # Extract primary contact from booking person details
-                person = None
-                try:
-                    person = b.person_details.first()
-                except Exception:
-                    person = None
+        bookings = (
+            Booking.objects.filter(created_at__gte=since)
+            .select_related("user", "branch", "organization")
+            .prefetch_related("person_details")
+        )
+        records = []
+        for b in bookings:
+            # Extract primary contact from booking person details
+            persons = list(b.person_details.all())
+            person = min(persons, key=lambda p: p.pk) if persons else None
 
-                if not person:
-                    continue
+            if not person:
+                continue
 
-                full_name = " ".join(filter(None, [person.first_name, person.last_name])).strip() or b.user.username
-                phone = person.contact_number or None
-                email = None
+            full_name = " ".join(filter(None, [person.first_name, person.last_name])).strip() or b.user.username
+            phone = person.contact_number or None
 
-                if not (phone or email):
-                    continue
+            if not phone:
+                continue
 
-                obj, created_flag = Customer.objects.update_or_create(
-                    phone=phone,
-                    defaults={
-                        "full_name": full_name,
-                        "email": email,
-                        "branch": b.branch,
-                        "organization": b.organization,
-                        "source": "Booking",
-                        "last_activity": b.date,
-                        "is_active": True,
-                    },
-                )
-                if created_flag:
-                    created += 1
-                else:
-                    updated += 1
+            records.append({
+                "full_name": full_name,
+                "phone": phone,
+                "branch": b.branch,
+                "organization": b.organization,
+                "source": "Booking",
+                "last_activity": b.date,
+            })
+
+        # one identity lookup per 500 bookings instead of a query per booking
+        created, updated = upsert_customers(records, reactivate=True)
 
         return Response({"created": created, "updated": updated})
 
@@ -0,0 +1,51 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from booking.models import Booking
+from finance.recompute import recompute_profit_loss
+
+
+class Command(BaseCommand):
+    help = "Recalculate FinancialRecords for bookings created in a date range, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', required=True, help='First booking date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', required=True, help='Last booking date, inclusive (YYYY-MM-DD)')
+        parser.add_argument('--organization', type=int, help='Only bookings of this organization id')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Bookings recalculated per batch')
+
+    def _parse(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date {value!r}, expected YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        date_from = self._parse(options['date_from'])
+        date_to = self._parse(options['date_to'])
+        if date_to < date_from:
+            raise CommandError('--to must not be before --from')
+        chunk_size = max(1, options['chunk_size'])
+
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        bookings = Booking.objects.filter(date__gte=start, date__lt=end)
+        if options.get('organization'):
+            bookings = bookings.filter(organization_id=options['organization'])
+
+        # walk the ids in chunks so a long range never loads every booking at once
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                bookings.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            total += recompute_profit_loss(ids, chunk_size)
+            last_id = ids[-1]
+            self.stdout.write(f'Recalculated {total} bookings (up to id {last_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {total} financial records'))
@@ -0,0 +1,107 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from booking.models import Booking
+from finance.report_queries import cached_report, financial_summary, sales_summary
+from ledger.models import LedgerEntry
+from organization.models import Agency, Branch, Organization
+
+
+CATEGORIES = ('Ticket', 'Umrah', 'Visa', 'Transport', '')
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Build synthetic bookings and ledger entries inside a rolled back '
+        'transaction and time the sales and financial summary reports.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=100000)
+        parser.add_argument('--agents', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _time(self, label, func, repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        queries = len(ctx.captured_queries)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - started) / repeat
+        self.stdout.write(f'{label:<10} {elapsed * 1000:9.1f} ms/call  {queries:5d} queries')
+
+    def _build(self, total, agents):
+        org = Organization.objects.create(name='Report benchmark')
+        seller = Organization.objects.create(name='Report benchmark seller')
+        branch = Branch.objects.create(organization=org, name='Benchmark')
+        agencies = Agency.objects.bulk_create([
+            Agency(branch=branch, name=f'Benchmark agent {i}') for i in range(agents)
+        ])
+        user = User.objects.create_user(username='report-benchmark')
+        now = timezone.now()
+
+        # bulk_create skips Booking.save(), so totals are written as given
+        bookings = []
+        for i in range(total):
+            amount = float(100 + i % 900)
+            paid = amount if i % 3 == 0 else amount * (i % 2) / 2
+            bookings.append(Booking(
+                user=user, organization=org, branch=branch, agency=agencies[i % agents],
+                booking_number=f'RB-{i}', status='new', category=CATEGORIES[i % len(CATEGORIES)],
+                total_pax=1 + i % 4, total_amount=amount, paid_payment=paid,
+                pending_payment=amount - paid, total_ticket_amount=amount / 2,
+                total_transport_amount=amount / 10 if i % 4 == 0 else 0,
+                total_food_amount_pkr=amount / 20 if i % 5 == 0 else 0,
+                expiry_time=now - timedelta(days=1) if i % 7 == 0 else None,
+            ))
+        Booking.objects.bulk_create(bookings, batch_size=2000)
+
+        booking_ids = list(Booking.objects.filter(organization=org).values_list('id', flat=True)[:total // 4])
+        LedgerEntry.objects.bulk_create([
+            LedgerEntry(
+                organization=org, seller_organization=seller, booking_id=booking_id,
+                transaction_type='credit' if n % 2 else 'debit',
+                transaction_amount=Decimal(100 + n % 500), remarks='settled' if n % 3 == 0 else '',
+            )
+            for n, booking_id in enumerate(booking_ids)
+        ], batch_size=2000)
+        return org
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                org = self._build(options['bookings'], options['agents'])
+                self.stdout.write(
+                    f"{options['bookings']} bookings over {options['agents']} agents "
+                    f"built in {time.perf_counter() - started:.1f}s"
+                )
+                now = timezone.now()
+                date_from, date_to = now - timedelta(days=1), now + timedelta(days=1)
+                bookings = Booking.objects.filter(
+                    organization_id=org.id, created_at__gte=date_from, created_at__lte=date_to
+                )
+
+                self._time('sales', lambda: sales_summary(bookings, date_from, date_to), repeat)
+                self._time('financial', lambda: financial_summary(org), repeat)
+                key = (org.id, None, None, date_from.isoformat(), date_to.isoformat())
+                build = lambda: sales_summary(bookings, date_from, date_to)
+                cached_report('benchmark_sales', key, build)
+                self._time('cached', lambda: cached_report('benchmark_sales', key, build), repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Synthetic bookings rolled back'))
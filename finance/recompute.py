@@ -0,0 +1,147 @@
+"""Deferred, coalesced profit/loss recomputation.
+
+Saving a booking or one of its payments used to recalculate the booking's
+FinancialRecord inside the save, so a request that touched a booking five
+times recomputed it five times before the transaction even committed.
+
+``mark_booking_dirty`` only records the booking id.  Ids marked in the same
+transaction are collected in one batch that runs once, after the outermost
+transaction commits (nothing runs if it rolls back).  Outside a transaction
+the id is processed straight away, as before.
+
+The batch either runs inline in the committing thread or, with
+``FINANCE_PROFIT_RECOMPUTE['MODE'] = 'worker'``, is handed to a background
+thread that keeps coalescing ids until it gets to them.  ``'sync'``
+recalculates immediately inside the save, which the test runner uses.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from universal import commit_batches
+
+
+logger = logging.getLogger(__name__)
+
+MODE_SYNC = "sync"
+MODE_ON_COMMIT = "on_commit"
+MODE_WORKER = "worker"
+
+DEFAULTS = {
+    "MODE": MODE_ON_COMMIT,
+    "BATCH_SIZE": 200,
+    "WORKER_DELAY": 0.5,
+}
+
+
+def _config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "FINANCE_PROFIT_RECOMPUTE", {}) or {})
+    return config
+
+
+def recompute_profit_loss(booking_ids, chunk_size=None):
+    """Recalculate FinancialRecords for ``booking_ids`` in chunks; returns the count written."""
+    from .utils import calculate_profit_loss_batch
+
+    booking_ids = sorted({int(pk) for pk in booking_ids if pk})
+    chunk_size = max(1, int(chunk_size or _config()["BATCH_SIZE"]))
+    written = 0
+    for start in range(0, len(booking_ids), chunk_size):
+        chunk = booking_ids[start:start + chunk_size]
+        try:
+            written += len(calculate_profit_loss_batch(chunk))
+        except Exception:
+            # non-fatal, same as the inline signal handlers used to be
+            logger.exception("profit/loss recompute failed for bookings %s", chunk)
+    return written
+
+
+class ProfitLossWorker:
+    """Background thread that coalesces dirty booking ids and recomputes them in batches."""
+
+    def __init__(self, delay=None, batch_size=None):
+        config = _config()
+        self.delay = config["WORKER_DELAY"] if delay is None else delay
+        self.batch_size = batch_size or config["BATCH_SIZE"]
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def enqueue(self, booking_ids):
+        with self._cond:
+            self._pending.update(booking_ids)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profit-loss-worker", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def drain(self):
+        """Process whatever is pending in the calling thread."""
+        with self._cond:
+            pending, self._pending = self._pending, set()
+        if pending:
+            recompute_profit_loss(pending, self.batch_size)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # let more saves for the same bookings pile up before recomputing
+            time.sleep(self.delay)
+            try:
+                close_old_connections()
+                self.drain()
+            finally:
+                close_old_connections()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ProfitLossWorker()
+        return _worker
+
+
+def _dispatch(booking_ids, mode):
+    if mode == MODE_WORKER:
+        get_worker().enqueue(booking_ids)
+    else:
+        recompute_profit_loss(booking_ids)
+
+
+class _DirtyBatch(commit_batches.CommitBatch):
+    def __init__(self, mode):
+        super().__init__()
+        self.mode = mode
+        self.booking_ids = set()
+
+    def run(self):
+        _dispatch(self.booking_ids, self.mode)
+
+
+def mark_booking_dirty(booking_id, using=None):
+    """Schedule a profit/loss recompute of ``booking_id`` once the current transaction commits."""
+    if not booking_id:
+        return
+    mode = _config()["MODE"]
+    if mode == MODE_SYNC:
+        recompute_profit_loss([booking_id])
+        return
+
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        _dispatch({booking_id}, mode)
+        return
+
+    batch = commit_batches.pending("profit_loss", lambda: _DirtyBatch(mode), using=using)
+    batch.booking_ids.add(int(booking_id))
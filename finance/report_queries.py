@@ -0,0 +1,273 @@
+"""Single-pass queries for the sales and financial summary reports.
+
+``sales_summary_report`` used to run a ``count()`` per category, payment
+and expiry bucket and a dozen more aggregates per agent;
+``financial_summary_report`` looped over counterparties and agents with two
+aggregates each.  The builders here compute every bucket with conditional
+``Count``/``Sum(filter=Q(...))`` in one aggregate over the filtered rows, and
+the per-agent / per-counterparty breakdowns with one grouped query each:
+
+* sales summary: totals, agent buckets, hotel nights, agent names (4 queries)
+* financial summary: totals, counterparties and their names, agent totals
+  and their names (5 queries)
+
+Booking has no payment status column; a booking counts as paid once it has
+a payment and nothing pending, and as unpaid while ``pending_payment`` is
+above zero.
+
+Results are cached per (organization, branch, agent, date range) for
+``FINANCE_REPORTS['CACHE_TIMEOUT']`` seconds; ``?refresh=1`` bypasses it.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, FloatField, IntegerField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+CACHE_PREFIX = "finance_report"
+ZERO_DECIMAL = Value(0, output_field=DecimalField(max_digits=18, decimal_places=2))
+
+# booking buckets
+UMRAH = Q(category__iexact='umrah') | Q(umrah_package__isnull=False)
+TICKET = Q(category__icontains='ticket')
+VISA = Q(category__icontains='visa')
+TRANSPORT = Q(category__icontains='transport') | Q(total_transport_amount__gt=0)
+FOOD = Q(total_food_amount_pkr__gt=0) | Q(total_food_amount_sar__gt=0)
+ZIYARAT = Q(total_ziyarat_amount_pkr__gt=0) | Q(total_ziyarat_amount_sar__gt=0)
+GROUP = Q(total_pax__gt=1)
+PAID = Q(paid_payment__gt=0, pending_payment__lte=0)
+UNPAID = Q(pending_payment__gt=0)
+
+
+def _expired(now):
+    return Q(expiry_time__lt=now) & ~PAID
+
+
+def _count(condition=None):
+    return Count('id', filter=condition)
+
+
+def _sum(field, condition=None):
+    return Coalesce(Sum(field, filter=condition), 0.0, output_field=FloatField())
+
+
+def report_cache_timeout():
+    return (getattr(settings, 'FINANCE_REPORTS', {}) or {}).get('CACHE_TIMEOUT', 60)
+
+
+def cached_report(name, key_parts, builder, use_cache=True):
+    """Return ``builder()``, cached under ``name`` and ``key_parts`` when enabled."""
+    timeout = report_cache_timeout()
+    if not use_cache or not timeout:
+        return builder()
+    raw = "|".join(str(part) for part in key_parts)
+    key = f"{CACHE_PREFIX}:{name}:{hashlib.md5(raw.encode()).hexdigest()}"
+    result = cache.get(key)
+    if result is None:
+        result = builder()
+        cache.set(key, result, timeout)
+    return result
+
+
+def sales_buckets(now):
+    """Aggregate expressions for every booking-level bucket of the sales report."""
+    expired = _expired(now)
+    return {
+        'total_bookings': _count(),
+        'total_group_bookings': _count(GROUP),
+        'total_ticket_bookings': _count(TICKET),
+        'total_umrah_bookings': _count(UMRAH),
+        'total_visa_bookings': _count(VISA),
+        'total_transport_bookings': _count(TRANSPORT),
+        'total_food_bookings': _count(FOOD),
+        'total_ziyarat_bookings': _count(ZIYARAT),
+        'total_paid_orders': _count(PAID),
+        'total_unpaid_orders': _count(UNPAID),
+        'total_expired_orders': _count(expired),
+        'total_amount': _sum('total_amount'),
+        'total_paid_amount': _sum('total_amount', PAID),
+        'total_unpaid_amount': _sum('total_amount', UNPAID),
+        'total_expired_amount': _sum('total_amount', expired),
+    }
+
+
+def agent_buckets():
+    """Per-agent aggregate expressions (used with ``values('agency_id')``)."""
+    return {
+        'total_orders': _count(),
+        'paid_orders': _count(PAID),
+        'unpaid_orders': _count(UNPAID),
+        'total_sales_amount': _sum('total_amount'),
+        'paid_sales_amount': _sum('total_amount', PAID),
+        'umrah_count': _count(UMRAH),
+        'umrah_amount': _sum('total_amount', UMRAH),
+        'visa_count': _count(VISA),
+        'visa_amount': _sum('total_visa_amount', VISA),
+        'ticket_count': _count(TICKET),
+        'ticket_amount': _sum('total_ticket_amount', TICKET),
+        'hotel_amount': _sum('total_hotel_amount'),
+        'transport_count': _count(Q(total_transport_amount__gt=0)),
+        'transport_amount': _sum('total_transport_amount'),
+        'food_count': _count(FOOD),
+        'food_amount': _sum('total_food_amount_pkr'),
+        'ziyarat_count': _count(ZIYARAT),
+        'ziyarat_amount': _sum('total_ziyarat_amount_pkr'),
+    }
+
+
+def sales_summary(bookings, date_from, date_to, now=None):
+    """Sales report payload for the filtered ``bookings`` queryset."""
+    from booking.models import BookingHotelDetails
+    from organization.models import Agency
+
+    now = now or timezone.now()
+    totals = bookings.aggregate(**sales_buckets(now))
+
+    nights = (
+        BookingHotelDetails.objects.filter(booking__in=bookings.values('id'))
+        .values('booking__agency_id')
+        .annotate(nights=Coalesce(Sum('number_of_nights'), 0, output_field=IntegerField()))
+        .order_by()
+    )
+    nights_by_agent = {row['booking__agency_id']: row['nights'] for row in nights}
+
+    agent_rows = list(
+        bookings.exclude(agency_id__isnull=True)
+        .values('agency_id')
+        .annotate(**agent_buckets())
+        .order_by('agency_id')
+    )
+    names = dict(
+        Agency.objects.filter(id__in=[row['agency_id'] for row in agent_rows]).values_list('id', 'name')
+    )
+
+    agent_wise_data = []
+    for row in agent_rows:
+        agent_id = row['agency_id']
+        if agent_id not in names:
+            continue
+        agent_wise_data.append({
+            "agent_id": agent_id,
+            "agent_name": names[agent_id] or f"Agent {agent_id}",
+            "total_orders": row['total_orders'],
+            "paid_orders": row['paid_orders'],
+            "unpaid_orders": row['unpaid_orders'],
+            "total_sales_amount": float(row['total_sales_amount']),
+            "paid_sales_amount": float(row['paid_sales_amount']),
+            "service_breakdown": {
+                "umrah": {"count": row['umrah_count'], "amount": float(row['umrah_amount'])},
+                "visa": {"count": row['visa_count'], "amount": float(row['visa_amount'])},
+                "tickets": {"count": row['ticket_count'], "amount": float(row['ticket_amount'])},
+                "hotel": {"nights": nights_by_agent.get(agent_id, 0), "amount": float(row['hotel_amount'])},
+                "transport": {"count": row['transport_count'], "amount": float(row['transport_amount'])},
+                "food": {"count": row['food_count'], "amount": float(row['food_amount'])},
+                "ziyarat": {"count": row['ziyarat_count'], "amount": float(row['ziyarat_amount'])},
+            },
+        })
+
+    data = {key: totals[key] for key in (
+        'total_bookings', 'total_group_bookings', 'total_ticket_bookings', 'total_umrah_bookings',
+        'total_visa_bookings',
+    )}
+    data["total_hotel_nights"] = sum(nights_by_agent.values())
+    for key in (
+        'total_transport_bookings', 'total_food_bookings', 'total_ziyarat_bookings',
+        'total_paid_orders', 'total_unpaid_orders', 'total_expired_orders',
+    ):
+        data[key] = totals[key]
+    for key in ('total_amount', 'total_paid_amount', 'total_unpaid_amount', 'total_expired_amount'):
+        data[key] = float(totals[key])
+    data["agent_wise_summary"] = agent_wise_data
+    data["date_range"] = {
+        "from": date_from.strftime('%Y-%m-%d'),
+        "to": date_to.strftime('%Y-%m-%d'),
+    }
+    return data
+
+
+def _decimal_sum(condition=None):
+    return Coalesce(Sum('transaction_amount', filter=condition), ZERO_DECIMAL)
+
+
+def financial_summary(organization):
+    """Financial report payload for ``organization``."""
+    from ledger.models import LedgerEntry
+    from organization.models import Agency, Organization
+    from booking.models import Booking
+
+    credit = Q(transaction_type='credit')
+    debit = Q(transaction_type='debit')
+    settled = Q(remarks__icontains='settled')
+
+    entries = LedgerEntry.objects.filter(organization_id=organization.id)
+    totals = entries.aggregate(
+        receivable=_decimal_sum(credit),
+        receivable_settled=_decimal_sum(credit & settled),
+        payable=_decimal_sum(debit),
+        payable_settled=_decimal_sum(debit & settled),
+    )
+
+    # counterparties are the seller organizations that appear on receivables
+    counterparties = list(
+        entries.filter(seller_organization__isnull=False)
+        .values('seller_organization_id')
+        .annotate(receivable=_decimal_sum(credit), payable=_decimal_sum(debit), receivables=Count('id', filter=credit))
+        .filter(receivables__gt=0)
+        .order_by('seller_organization_id')
+    )
+    org_names = dict(
+        Organization.objects.filter(
+            id__in=[row['seller_organization_id'] for row in counterparties]
+        ).values_list('id', 'name')
+    )
+    by_counterparty = [
+        {
+            "organization_id": row['seller_organization_id'],
+            "organization_name": org_names[row['seller_organization_id']],
+            "receivable": float(row['receivable']),
+            "payable": float(row['payable']),
+        }
+        for row in counterparties
+        if row['seller_organization_id'] in org_names
+    ]
+
+    # agents of the organization's bookings, with the ledger entries of those bookings
+    agent_ids = Booking.objects.filter(organization_id=organization.id, agency_id__isnull=False).values('agency_id')
+    agents = Agency.objects.filter(id__in=agent_ids).order_by('id').values_list('id', 'name')
+    agent_totals = {
+        row['booking__agency_id']: row
+        for row in LedgerEntry.objects.filter(
+            booking__organization_id=organization.id, booking__agency_id__isnull=False
+        )
+        .values('booking__agency_id')
+        .annotate(receivable=_decimal_sum(credit), payable=_decimal_sum(debit))
+        .order_by()
+    }
+    by_agent = []
+    for agent_id, name in agents:
+        row = agent_totals.get(agent_id, {})
+        by_agent.append({
+            "agent_id": agent_id,
+            "agent_name": name or f"Agent {agent_id}",
+            "receivable": float(row.get('receivable', 0)),
+            "payable": float(row.get('payable', 0)),
+        })
+
+    total_receivable = totals['receivable']
+    total_payable = totals['payable']
+    return {
+        "organization_id": organization.id,
+        "organization_name": organization.name,
+        "total_receivable_amount": float(total_receivable),
+        "total_payable_amount": float(total_payable),
+        "receivable_settled_amount": float(totals['receivable_settled']),
+        "receivable_unsettled_amount": float(total_receivable - totals['receivable_settled']),
+        "payable_settled_amount": float(totals['payable_settled']),
+        "payable_unsettled_amount": float(total_payable - totals['payable_settled']),
+        "net_balance": float(total_receivable - total_payable),
+        "by_counterparty": by_counterparty,
+        "by_agent": by_agent,
+    }
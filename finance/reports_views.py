@@ -9,17 +9,17 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Sum, Count, Q, F, DecimalField, FloatField
 from django.db.models.functions import Coalesce
-from decimal import Decimal
 from datetime import datetime, timedelta
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
-from booking.models import Booking, BookingHotelDetails
-from ledger.models import LedgerEntry
+from booking.models import Booking
 from organization.models import Organization, Branch, Agency
 from django.contrib.auth.models import User
 
+from .report_queries import cached_report, financial_summary, sales_summary
+
 
 def get_date_range(date_from=None, date_to=None):
     """
@@ -89,9 +89,11 @@ def filter_bookings_by_permissions(queryset, request_user, organization_id=None,
     
     **Calculation Rules:**
     - From Booking table: COUNT(all bookings), SUM(total_amount)
-    - total_paid_amount = SUM(total_amount WHERE payment_status = "Paid")
-    - total_hotel_nights = SUM of BookingHotelDetails.total_nights
+    - total_paid_amount = SUM(total_amount WHERE paid_payment > 0 AND pending_payment <= 0)
+    - total_unpaid_amount = SUM(total_amount WHERE pending_payment > 0)
+    - total_hotel_nights = SUM of BookingHotelDetails.number_of_nights
     - Filters applied on booking_date/created_at
+    - Results are cached briefly per filter set; pass refresh=1 to recompute
     """,
     parameters=[
         OpenApiParameter(
@@ -129,6 +131,13 @@ def filter_bookings_by_permissions(queryset, request_user, organization_id=None,
             description="Filter by specific branch (optional)",
             required=False,
         ),
+        OpenApiParameter(
+            name="refresh",
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description="Bypass the cached report (optional)",
+            required=False,
+        ),
     ],
     responses={
         200: {
@@ -196,203 +205,13 @@ def sales_summary_report(request):
         bookings, request.user, organization_id, branch_id, agent_id
     )
     
-    # Total bookings
-    total_bookings = bookings.count()
-    
-    # Category counts
-    total_ticket_bookings = bookings.filter(
-        Q(category__iexact='ticket') | 
-        Q(category__icontains='ticket')
-    ).count()
-    
-    total_umrah_bookings = bookings.filter(
-        Q(category__iexact='umrah') | 
-        Q(umrah_package__isnull=False)
-    ).count()
-    
-    total_visa_bookings = bookings.filter(
-        Q(category__iexact='visa') |
-        Q(category__icontains='visa')
-    ).count()
-    
-    # Transport, Food, Ziyarat counts (based on related models or category)
-    total_transport_bookings = bookings.filter(
-        Q(category__icontains='transport') |
-        Q(total_transport_amount__gt=0)
-    ).count()
-    
-    total_food_bookings = bookings.filter(
-        Q(total_food_amount_pkr__gt=0) |
-        Q(total_food_amount_sar__gt=0)
-    ).count()
-    
-    total_ziyarat_bookings = bookings.filter(
-        Q(total_ziyarat_amount_pkr__gt=0) |
-        Q(total_ziyarat_amount_sar__gt=0)
-    ).count()
-    
-    # Group bookings (bookings with multiple passengers)
-    total_group_bookings = bookings.filter(total_pax__gt=1).count()
-    
-    # Hotel nights calculation
-    hotel_bookings = BookingHotelDetails.objects.filter(
-        booking__in=bookings
+    # Every bucket in one aggregate, agents in one grouped query
+    response_data = cached_report(
+        "sales_summary",
+        (organization_id, branch_id, agent_id, date_from.isoformat(), date_to.isoformat()),
+        lambda: sales_summary(bookings, date_from, date_to),
+        use_cache=(request.GET.get('refresh') or '').lower() not in ('1', 'true', 'yes'),
     )
-    total_hotel_nights = hotel_bookings.aggregate(
-        total=Coalesce(Sum('total_nights'), 0)
-    )['total'] or 0
-    
-    # Payment status breakdown
-    total_paid_orders = bookings.filter(
-        Q(payment_status__iexact='paid') |
-        Q(is_paid=True)
-    ).count()
-    
-    total_unpaid_orders = bookings.filter(
-        Q(payment_status__iexact='pending') |
-        Q(payment_status__iexact='partial')
-    ).exclude(is_paid=True).count()
-    
-    # Expired orders (where expiry_time < now and not paid)
-    now = timezone.now()
-    total_expired_orders = bookings.filter(
-        expiry_time__lt=now,
-        is_paid=False
-    ).count()
-    
-    # Amount calculations
-    amounts = bookings.aggregate(
-        total=Coalesce(Sum('total_amount'), 0.0),
-        paid=Coalesce(
-            Sum('total_amount', filter=Q(payment_status__iexact='paid') | Q(is_paid=True)),
-            0.0
-        ),
-        unpaid=Coalesce(
-            Sum('total_amount', filter=Q(payment_status__in=['Pending', 'Partial'])),
-            0.0
-        ),
-        expired=Coalesce(
-            Sum('total_amount', filter=Q(expiry_time__lt=now, is_paid=False)),
-            0.0
-        )
-    )
-    
-    # Agent-wise summary
-    agent_wise_data = []
-    
-    # Get unique agents from filtered bookings
-    agent_ids = bookings.values_list('agency_id', flat=True).distinct()
-    
-    for agent_id_item in agent_ids:
-        if not agent_id_item:
-            continue
-        
-        try:
-            agent = Agency.objects.get(id=agent_id_item)
-        except Agency.DoesNotExist:
-            continue
-        
-        agent_bookings = bookings.filter(agency_id=agent_id_item)
-        
-        # Agent totals
-        agent_totals = agent_bookings.aggregate(
-            total_orders=Count('id'),
-            paid_orders=Count('id', filter=Q(payment_status__iexact='paid') | Q(is_paid=True)),
-            unpaid_orders=Count('id', filter=Q(payment_status__in=['Pending', 'Partial'])),
-            total_sales_amount=Coalesce(Sum('total_amount'), 0.0),
-            paid_sales_amount=Coalesce(
-                Sum('total_amount', filter=Q(payment_status__iexact='paid') | Q(is_paid=True)),
-                0.0
-            ),
-        )
-        
-        # Service breakdown
-        service_breakdown = {
-            "umrah": {
-                "count": agent_bookings.filter(Q(category__iexact='umrah') | Q(umrah_package__isnull=False)).count(),
-                "amount": float(agent_bookings.filter(
-                    Q(category__iexact='umrah') | Q(umrah_package__isnull=False)
-                ).aggregate(total=Coalesce(Sum('total_amount'), 0.0))['total'])
-            },
-            "visa": {
-                "count": agent_bookings.filter(category__icontains='visa').count(),
-                "amount": float(agent_bookings.filter(
-                    category__icontains='visa'
-                ).aggregate(total=Coalesce(Sum('total_visa_amount'), 0.0))['total'])
-            },
-            "tickets": {
-                "count": agent_bookings.filter(category__icontains='ticket').count(),
-                "amount": float(agent_bookings.filter(
-                    category__icontains='ticket'
-                ).aggregate(total=Coalesce(Sum('total_ticket_amount'), 0.0))['total'])
-            },
-            "hotel": {
-                "nights": BookingHotelDetails.objects.filter(
-                    booking__in=agent_bookings
-                ).aggregate(total=Coalesce(Sum('total_nights'), 0))['total'] or 0,
-                "amount": float(agent_bookings.aggregate(
-                    total=Coalesce(Sum('total_hotel_amount'), 0.0)
-                )['total'])
-            },
-            "transport": {
-                "count": agent_bookings.filter(total_transport_amount__gt=0).count(),
-                "amount": float(agent_bookings.aggregate(
-                    total=Coalesce(Sum('total_transport_amount'), 0.0)
-                )['total'])
-            },
-            "food": {
-                "count": agent_bookings.filter(
-                    Q(total_food_amount_pkr__gt=0) | Q(total_food_amount_sar__gt=0)
-                ).count(),
-                "amount": float(agent_bookings.aggregate(
-                    total=Coalesce(Sum('total_food_amount_pkr'), 0.0)
-                )['total'])
-            },
-            "ziyarat": {
-                "count": agent_bookings.filter(
-                    Q(total_ziyarat_amount_pkr__gt=0) | Q(total_ziyarat_amount_sar__gt=0)
-                ).count(),
-                "amount": float(agent_bookings.aggregate(
-                    total=Coalesce(Sum('total_ziyarat_amount_pkr'), 0.0)
-                )['total'])
-            }
-        }
-        
-        agent_wise_data.append({
-            "agent_id": agent.id,
-            "agent_name": agent.name if hasattr(agent, 'name') else f"Agent {agent.id}",
-            "total_orders": agent_totals['total_orders'],
-            "paid_orders": agent_totals['paid_orders'],
-            "unpaid_orders": agent_totals['unpaid_orders'],
-            "total_sales_amount": float(agent_totals['total_sales_amount']),
-            "paid_sales_amount": float(agent_totals['paid_sales_amount']),
-            "service_breakdown": service_breakdown
-        })
-    
-    # Prepare response
-    response_data = {
-        "total_bookings": total_bookings,
-        "total_group_bookings": total_group_bookings,
-        "total_ticket_bookings": total_ticket_bookings,
-        "total_umrah_bookings": total_umrah_bookings,
-        "total_visa_bookings": total_visa_bookings,
-        "total_hotel_nights": total_hotel_nights,
-        "total_transport_bookings": total_transport_bookings,
-        "total_food_bookings": total_food_bookings,
-        "total_ziyarat_bookings": total_ziyarat_bookings,
-        "total_paid_orders": total_paid_orders,
-        "total_unpaid_orders": total_unpaid_orders,
-        "total_expired_orders": total_expired_orders,
-        "total_amount": float(amounts['total']),
-        "total_paid_amount": float(amounts['paid']),
-        "total_unpaid_amount": float(amounts['unpaid']),
-        "total_expired_amount": float(amounts['expired']),
-        "agent_wise_summary": agent_wise_data,
-        "date_range": {
-            "from": date_from.strftime('%Y-%m-%d'),
-            "to": date_to.strftime('%Y-%m-%d')
-        }
-    }
     
     return Response({
         "message": "Sales summary report generated successfully",
@@ -426,6 +245,13 @@ def sales_summary_report(request):
             description="Organization ID (required)",
             required=True,
         ),
+        OpenApiParameter(
+            name="refresh",
+            type=OpenApiTypes.BOOL,
+            location=OpenApiParameter.QUERY,
+            description="Bypass the cached report (optional)",
+            required=False,
+        ),
     ],
     responses={
         200: {
@@ -476,136 +302,15 @@ def financial_summary_report(request):
             "data": None
         }, status=status.HTTP_404_NOT_FOUND)
     
-    # Receivable: where this org is receiving money (to_company = this org)
-    # For now, using organization field as main reference
-    receivable_entries = LedgerEntry.objects.filter(
-        organization_id=organization_id,
-        transaction_type='credit'
-    )
-    
-    receivable_totals = receivable_entries.aggregate(
-        total=Coalesce(Sum('transaction_amount'), Decimal('0.00')),
-        # Assuming 'settled' status exists; adjust based on your model
-        settled=Coalesce(
-            Sum('transaction_amount', filter=Q(remarks__icontains='settled')),
-            Decimal('0.00')
-        ),
+    # Receivable (credit) / payable (debit) totals, counterparties and agents
+    # in one grouped query each
+    response_data = cached_report(
+        "financial_summary",
+        (organization.id,),
+        lambda: financial_summary(organization),
+        use_cache=(request.GET.get('refresh') or '').lower() not in ('1', 'true', 'yes'),
     )
     
-    total_receivable = receivable_totals['total']
-    receivable_settled = receivable_totals['settled']
-    receivable_unsettled = total_receivable - receivable_settled
-    
-    # Payable: where this org owes money (from_company = this org)
-    payable_entries = LedgerEntry.objects.filter(
-        organization_id=organization_id,
-        transaction_type='debit'
-    )
-    
-    payable_totals = payable_entries.aggregate(
-        total=Coalesce(Sum('transaction_amount'), Decimal('0.00')),
-        settled=Coalesce(
-            Sum('transaction_amount', filter=Q(remarks__icontains='settled')),
-            Decimal('0.00')
-        ),
-    )
-    
-    total_payable = payable_totals['total']
-    payable_settled = payable_totals['settled']
-    payable_unsettled = total_payable - payable_settled
-    
-    # Net balance
-    net_balance = total_receivable - total_payable
-    
-    # By Counterparty (seller_organization or inventory_owner_organization)
-    by_counterparty = []
-    
-    # Get unique counterparty organizations from receivables
-    counterparty_ids = receivable_entries.exclude(
-        seller_organization__isnull=True
-    ).values_list('seller_organization_id', flat=True).distinct()
-    
-    for counterparty_id in counterparty_ids:
-        if not counterparty_id:
-            continue
-        
-        try:
-            counterparty_org = Organization.objects.get(id=counterparty_id)
-        except Organization.DoesNotExist:
-            continue
-        
-        # Receivable from this counterparty
-        recv = receivable_entries.filter(
-            seller_organization_id=counterparty_id
-        ).aggregate(total=Coalesce(Sum('transaction_amount'), Decimal('0.00')))['total']
-        
-        # Payable to this counterparty
-        pay = payable_entries.filter(
-            seller_organization_id=counterparty_id
-        ).aggregate(total=Coalesce(Sum('transaction_amount'), Decimal('0.00')))['total']
-        
-        by_counterparty.append({
-            "organization_id": counterparty_org.id,
-            "organization_name": counterparty_org.name,
-            "receivable": float(recv),
-            "payable": float(pay)
-        })
-    
-    # By Agent
-    by_agent = []
-    
-    # Get agent-related entries from bookings
-    agent_bookings = Booking.objects.filter(
-        organization_id=organization_id
-    ).values_list('agency_id', flat=True).distinct()
-    
-    for agent_id in agent_bookings:
-        if not agent_id:
-            continue
-        
-        try:
-            agent = Agency.objects.get(id=agent_id)
-        except Agency.DoesNotExist:
-            continue
-        
-        # Get ledger entries linked to this agent's bookings
-        agent_booking_ids = Booking.objects.filter(
-            agency_id=agent_id,
-            organization_id=organization_id
-        ).values_list('id', flat=True)
-        
-        agent_receivable = LedgerEntry.objects.filter(
-            booking_id__in=agent_booking_ids,
-            transaction_type='credit'
-        ).aggregate(total=Coalesce(Sum('transaction_amount'), Decimal('0.00')))['total']
-        
-        agent_payable = LedgerEntry.objects.filter(
-            booking_id__in=agent_booking_ids,
-            transaction_type='debit'
-        ).aggregate(total=Coalesce(Sum('transaction_amount'), Decimal('0.00')))['total']
-        
-        by_agent.append({
-            "agent_id": agent.id,
-            "agent_name": agent.name if hasattr(agent, 'name') else f"Agent {agent.id}",
-            "receivable": float(agent_receivable),
-            "payable": float(agent_payable)
-        })
-    
-    # Prepare response
-    response_data = {
-        "organization_id": int(organization_id),
-        "organization_name": organization.name,
-        "total_receivable_amount": float(total_receivable),
-        "total_payable_amount": float(total_payable),
-        "receivable_settled_amount": float(receivable_settled),
-        "receivable_unsettled_amount": float(receivable_unsettled),
-        "payable_settled_amount": float(payable_settled),
-        "payable_unsettled_amount": float(payable_unsettled),
-        "net_balance": float(net_balance),
-        "by_counterparty": by_counterparty,
-        "by_agent": by_agent
-    }
-    
     return Response({
         "message": "Financial summary report generated successfully",
         "data": response_data
@@ -1,28 +1,29 @@
 from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from booking.models import Payment, Booking
-from .utils import calculate_profit_loss
+from booking.models import Payment
+from booking.events import booking_events
+from .recompute import mark_booking_dirty
 from django.forms.models import model_to_dict
 from .models import Expense, FinancialRecord, AuditLog
 
 
 @receiver(post_save, sender=Payment)
 def payment_posted_update_profit(sender, instance: Payment, created, **kwargs):
-    """When a payment is saved (especially completed), recalculate profit/loss for the booking."""
+    """When a payment is saved (especially completed), recalculate profit/loss for the booking after commit."""
     try:
         # Only act if linked to booking
         if instance.booking_id:
-            calculate_profit_loss(instance.booking_id)
+            mark_booking_dirty(instance.booking_id)
     except Exception:
         # non-fatal
         pass
 
 
-@receiver(post_save, sender=Booking)
-def booking_saved_update_profit(sender, instance: Booking, created, **kwargs):
-    """Recalculate profit/loss whenever a booking is saved (idempotent)."""
+@booking_events.register("finance.profit_loss")
+def booking_saved_update_profit(event):
+    """Recalculate profit/loss whenever a booking is saved, once per transaction (idempotent)."""
     try:
-        calculate_profit_loss(instance.id)
+        mark_booking_dirty(event.booking_id)
     except Exception:
         pass
 
@@ -0,0 +1,77 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from booking.models import Booking
+from finance.models import FinancialRecord, Expense
+from finance.utils import calculate_profit_loss_batch
+from organization.models import Organization, Branch, Agency
+from packages.models import RiyalRate
+
+
+class ProfitLossRecomputeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='recompute', password='pass')
+        self.org = Organization.objects.create(name='Org R')
+        self.branch = Branch.objects.create(name='Branch R', organization=self.org)
+        self.agency = Agency.objects.create(name='Agency R', branch=self.branch)
+
+    def _booking(self, number, **extra):
+        return Booking.objects.create(
+            user=self.user, organization=self.org, branch=self.branch, agency=self.agency,
+            booking_number=number, status='new', **extra
+        )
+
+    def test_saves_in_one_transaction_recompute_once_after_commit(self):
+        with mock.patch('finance.utils.calculate_profit_loss_batch', wraps=calculate_profit_loss_batch) as batch:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    booking = self._booking('BKG-R1')
+                    booking.status = 'confirmed'
+                    booking.save()
+                    booking.save()
+                    self.assertFalse(FinancialRecord.objects.filter(booking_id=booking.id).exists())
+        batch.assert_called_once_with([booking.id])
+        self.assertEqual(FinancialRecord.objects.filter(booking_id=booking.id).count(), 1)
+
+    def test_rolled_back_savepoint_does_not_lose_later_marks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        self._booking('BKG-R2')
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                booking = self._booking('BKG-R3')
+        self.assertTrue(FinancialRecord.objects.filter(booking_id=booking.id).exists())
+
+    def test_batch_converts_sar_expenses_with_organization_rate(self):
+        RiyalRate.objects.create(organization=self.org, rate=75)
+        bookings = [self._booking(f'BKG-B{i}') for i in range(3)]
+        for booking in bookings:
+            Expense.objects.create(
+                organization=self.org, branch=self.branch, amount=Decimal('2.00'),
+                currency='SAR', date='2025-10-29', booking_id=booking.id,
+            )
+        FinancialRecord.objects.all().delete()
+
+        records = calculate_profit_loss_batch([b.id for b in bookings])
+        self.assertEqual(set(records), {b.id for b in bookings})
+        for record in records.values():
+            self.assertEqual(record.expenses_amount, Decimal('150'))
+            self.assertEqual(record.profit_loss, record.income_amount - Decimal('150'))
+
+    def test_backfill_command_covers_date_range_in_chunks(self):
+        bookings = [self._booking(f'BKG-F{i}') for i in range(5)]
+        FinancialRecord.objects.all().delete()
+        out = StringIO()
+        call_command('backfill_financial_records', '--from', '2000-01-01', '--to', '2100-01-01',
+                     '--chunk-size', '2', stdout=out)
+        self.assertEqual(FinancialRecord.objects.filter(booking_id__in=[b.id for b in bookings]).count(), 5)
+        self.assertIn('Backfilled 5 financial records', out.getvalue())
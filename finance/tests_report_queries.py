@@ -0,0 +1,111 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from booking.models import Booking, BookingHotelDetails
+from ledger.models import LedgerEntry
+from organization.models import Agency, Branch, Organization
+from packages.models import City
+from tickets.models import Hotels
+
+
+class SummaryReportQueryTests(TestCase):
+    def setUp(self):
+        # summaries are cached per organization and date range
+        cache.clear()
+        self.user = User.objects.create_user(username='reports')
+        self.org = Organization.objects.create(name='Org')
+        self.seller = Organization.objects.create(name='Seller')
+        self.branch = Branch.objects.create(name='Main', organization=self.org)
+        self.agency = Agency.objects.create(name='Agency', branch=self.branch)
+        self.other_agency = Agency.objects.create(name='Other', branch=self.branch)
+        city = City.objects.create(organization=self.org, name='Makkah', code='MAK')
+        self.hotel = Hotels.objects.create(
+            organization=self.org, name='Hotel', city=city, address='-',
+            available_start_date='2025-01-01', available_end_date='2026-12-31',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _booking(self, number, agency, **fields):
+        booking = Booking.objects.create(
+            user=self.user, organization=self.org, branch=self.branch, agency=agency,
+            booking_number=number, status='new',
+        )
+        Booking.objects.filter(pk=booking.pk).update(**fields)
+        return booking
+
+    def test_sales_summary_buckets(self):
+        past = timezone.now() - timedelta(days=1)
+        paid = self._booking('S1', self.agency, category='Ticket', total_amount=100, paid_payment=100,
+                             pending_payment=0, total_pax=3, total_ticket_amount=100)
+        self._booking('S2', self.agency, category='Visa', total_amount=50, paid_payment=10,
+                      pending_payment=40, total_visa_amount=50, expiry_time=past)
+        self._booking('S3', self.other_agency, category='Umrah', total_amount=200, pending_payment=200,
+                      total_food_amount_pkr=20)
+        BookingHotelDetails.objects.create(booking=paid, hotel=self.hotel, number_of_nights=4)
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/v1/reports/sales-summary/', {'organization_id': self.org.id})
+        data = response.json()['data']
+        self.assertEqual(data['total_bookings'], 3)
+        self.assertEqual(data['total_group_bookings'], 1)
+        self.assertEqual(data['total_ticket_bookings'], 1)
+        self.assertEqual(data['total_umrah_bookings'], 1)
+        self.assertEqual(data['total_visa_bookings'], 1)
+        self.assertEqual(data['total_food_bookings'], 1)
+        self.assertEqual(data['total_hotel_nights'], 4)
+        self.assertEqual(data['total_paid_orders'], 1)
+        self.assertEqual(data['total_unpaid_orders'], 2)
+        self.assertEqual(data['total_expired_orders'], 1)
+        self.assertEqual(data['total_amount'], 350.0)
+        self.assertEqual(data['total_paid_amount'], 100.0)
+        self.assertEqual(data['total_expired_amount'], 50.0)
+
+        agents = {row['agent_id']: row for row in data['agent_wise_summary']}
+        self.assertEqual(agents[self.agency.id]['total_orders'], 2)
+        self.assertEqual(agents[self.agency.id]['paid_orders'], 1)
+        self.assertEqual(agents[self.agency.id]['service_breakdown']['hotel']['nights'], 4)
+        self.assertEqual(agents[self.agency.id]['service_breakdown']['visa'], {'count': 1, 'amount': 50.0})
+        self.assertEqual(agents[self.other_agency.id]['service_breakdown']['umrah'], {'count': 1, 'amount': 200.0})
+
+    def test_financial_summary(self):
+        booking = self._booking('F1', self.agency)
+        LedgerEntry.objects.all().delete()
+        for kind, amount, remarks in (('credit', '100', 'settled'), ('credit', '50', ''), ('debit', '30', '')):
+            LedgerEntry.objects.create(
+                organization=self.org, seller_organization=self.seller, booking=booking,
+                transaction_type=kind, transaction_amount=Decimal(amount), remarks=remarks,
+            )
+
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/v1/reports/financial-summary/', {'organization_id': self.org.id})
+        data = response.json()['data']
+        self.assertEqual(data['total_receivable_amount'], 150.0)
+        self.assertEqual(data['receivable_settled_amount'], 100.0)
+        self.assertEqual(data['receivable_unsettled_amount'], 50.0)
+        self.assertEqual(data['total_payable_amount'], 30.0)
+        self.assertEqual(data['net_balance'], 120.0)
+        self.assertEqual(data['by_counterparty'], [
+            {'organization_id': self.seller.id, 'organization_name': 'Seller', 'receivable': 150.0, 'payable': 30.0},
+        ])
+        self.assertEqual(data['by_agent'], [
+            {'agent_id': self.agency.id, 'agent_name': 'Agency', 'receivable': 150.0, 'payable': 30.0},
+        ])
+
+    def test_refresh_flag_is_parsed_as_a_boolean(self):
+        url = '/api/v1/reports/sales-summary/'
+        self._booking('R1', self.agency)
+        self.client.get(url, {'organization_id': self.org.id})
+        self._booking('R2', self.agency)
+
+        for cached in ('0', 'false'):
+            response = self.client.get(url, {'organization_id': self.org.id, 'refresh': cached})
+            self.assertEqual(response.json()['data']['total_bookings'], 1)
+        response = self.client.get(url, {'organization_id': self.org.id, 'refresh': 'true'})
+        self.assertEqual(response.json()['data']['total_bookings'], 2)
@@ -91,8 +91,36 @@ def post_journal_to_ledger(journal: TransactionJournal, actor=None):
     return ledger_entry
 
 
-def calculate_profit_loss(booking_id: int):
-    """Calculate and persist FinancialRecord for a booking.
+def _riyal_rates(organization_ids):
+    """``{organization_id: rate}`` for the given organizations in one query."""
+    from packages.models import RiyalRate
+
+    organization_ids = {org_id for org_id in organization_ids if org_id}
+    if not organization_ids:
+        return {}
+    return dict(
+        RiyalRate.objects.filter(organization_id__in=organization_ids).values_list('organization_id', 'rate')
+    )
+
+
+def _to_pkr(amount, organization_id, rates):
+    """Convert a SAR amount with the cached organization rate; unknown rates leave it as is."""
+    rate = rates.get(organization_id)
+    if rate is None:
+        return Decimal(str(amount))
+    try:
+        return Decimal(str(convert_sar_to_pkr(amount, None, rate=rate)))
+    except Exception:
+        return Decimal(str(amount))
+
+
+def _item_owner_id(item):
+    owner = getattr(item, 'inventory_owner_organization', None)
+    return getattr(owner, 'id', owner)
+
+
+def _profit_loss_defaults(booking, hotels, transports, tickets, expenses, rates):
+    """FinancialRecord field values for one booking from already loaded rows.
 
     Simple logic:
     - income_amount: use booking.total_in_pkr if set, else booking.total_amount
@@ -100,11 +128,6 @@ def calculate_profit_loss(booking_id: int):
     - expenses_amount: sum of Expense entries linked to booking
     - profit_loss = income - purchase_cost - expenses
     """
-    try:
-        booking = Booking.objects.get(pk=booking_id)
-    except Booking.DoesNotExist:
-        return None
-
     # income
     income = Decimal(str(getattr(booking, 'total_in_pkr', None) or getattr(booking, 'total_amount', 0) or 0))
 
@@ -112,65 +135,45 @@ def calculate_profit_loss(booking_id: int):
     purchase = Decimal("0.00")
 
     # hotels
-    for h in getattr(booking, 'hotel_details', []).all():
+    for h in hotels:
         amt = getattr(h, 'total_in_pkr', None) if getattr(h, 'total_in_pkr', None) is not None else getattr(h, 'total_price', 0)
-        if not getattr(h, 'is_price_pkr', True) and getattr(h, 'inventory_owner_organization', None):
-            try:
-                amt = Decimal(str(convert_sar_to_pkr(amt, h.inventory_owner_organization)))
-            except Exception:
-                amt = Decimal(str(amt))
+        if not getattr(h, 'is_price_pkr', True) and _item_owner_id(h):
+            amt = _to_pkr(amt, _item_owner_id(h), rates)
         purchase += Decimal(str(amt or 0))
 
     # transport
-    for t in getattr(booking, 'transport_details', []).all():
+    for t in transports:
         amt = getattr(t, 'price_in_pkr', None) if getattr(t, 'price_in_pkr', None) is not None else getattr(t, 'price', 0)
-        if not getattr(t, 'is_price_pkr', True) and getattr(t, 'inventory_owner_organization', None):
-            try:
-                amt = Decimal(str(convert_sar_to_pkr(amt, t.inventory_owner_organization)))
-            except Exception:
-                amt = Decimal(str(amt))
+        if not getattr(t, 'is_price_pkr', True) and _item_owner_id(t):
+            amt = _to_pkr(amt, _item_owner_id(t), rates)
         purchase += Decimal(str(amt or 0))
 
     # tickets
-    for tk in getattr(booking, 'ticket_details', []).all():
+    for tk in tickets:
         seats = getattr(tk, 'seats', 0) or 0
-        price = getattr(tk, 'adult_price', None) if getattr(tk, 'adult_price', None) is not None else getattr(tk, 'adult_price', 0)
-        amt = Decimal(str((price or 0) * seats))
-        purchase += amt
-
-    # expenses linked to booking
-    exp_qs = Expense.objects.filter(booking_id=booking_id)
-    expenses_sum = exp_qs.aggregate(total=Sum('amount'))['total'] or 0
-    # convert any SAR expenses — assume Expense.currency set
+        price = getattr(tk, 'adult_price', None) or 0
+        purchase += Decimal(str(price * seats))
+
+    # expenses linked to booking, converting any SAR expenses
     expenses_total = Decimal('0.00')
-    for e in exp_qs:
+    for e in expenses:
         if e.currency and e.currency.upper() == 'SAR':
-            try:
-                amt = Decimal(str(convert_sar_to_pkr(e.amount, e.organization)))
-            except Exception:
-                amt = Decimal(str(e.amount))
+            expenses_total += _to_pkr(e.amount, e.organization_id, rates)
         else:
-            amt = Decimal(str(e.amount))
-        expenses_total += amt
+            expenses_total += Decimal(str(e.amount))
 
     profit = income - purchase - expenses_total
 
     # Determine service type intelligently - prioritize actual booking contents over booking_type field
-    service_type = 'other'
-    
-    # Check what items exist in the booking
-    has_hotel = getattr(booking, 'hotel_details', Booking.objects.none()).exists()
-    has_transport = getattr(booking, 'transport_details', Booking.objects.none()).exists()
-    has_ticket = getattr(booking, 'ticket_details', Booking.objects.none()).exists()
+    has_hotel = bool(hotels)
+    has_transport = bool(transports)
+    has_ticket = bool(tickets)
     has_umrah = getattr(booking, 'umrah_package_id', None) is not None
-    
-    # Auto-detect from actual booking contents (most accurate)
+
     if has_umrah:
         service_type = 'umrah'
     elif has_hotel and has_ticket:
         service_type = 'umrah'  # Hotel + ticket usually means Umrah/Hajj package
-    elif has_hotel and has_transport:
-        service_type = 'hotel'  # Hotel with transport
     elif has_hotel:
         service_type = 'hotel'
     elif has_ticket:
@@ -179,40 +182,81 @@ def calculate_profit_loss(booking_id: int):
         service_type = 'transport'
     else:
         # Fallback to booking_type field if no items found
-        booking_type = getattr(booking, 'booking_type', None)
-        if booking_type:
-            service_type = str(booking_type).lower()
-    
+        service_type = str(getattr(booking, 'booking_type', None) or 'other').lower()
+
     # Validate service_type is valid
-    valid_types = ['hotel', 'visa', 'transport', 'ticket', 'umrah', 'other']
-    if service_type not in valid_types:
+    if service_type not in ('hotel', 'visa', 'transport', 'ticket', 'umrah', 'other'):
         service_type = 'other'
 
-    fr, created = FinancialRecord.objects.update_or_create(
-        booking_id=booking_id,
-        defaults={
-            'organization': booking.organization,
-            'branch': booking.branch,
-            'agent': booking.agency,
-            'service_type': service_type,
-            'reference_no': booking.booking_number,
-            'income_amount': income,
-            'purchase_cost': purchase,
-            'expenses_amount': expenses_total,
-            'profit_loss': profit,
-            'currency': 'PKR',
-            'metadata': {
-                'booking_number': booking.booking_number,
-                'linked_booking_id': getattr(booking, 'linked_booking_id', None),
-                'has_hotel': getattr(booking, 'hotel_details', []).exists(),
-                'has_transport': getattr(booking, 'transport_details', []).exists(),
-                'has_ticket': getattr(booking, 'ticket_details', []).exists(),
-                'has_umrah_package': getattr(booking, 'umrah_package_id', None) is not None,
-            },
-        }
+    return {
+        'organization': booking.organization,
+        'branch': booking.branch,
+        'agent': booking.agency,
+        'service_type': service_type,
+        'reference_no': booking.booking_number,
+        'income_amount': income,
+        'purchase_cost': purchase,
+        'expenses_amount': expenses_total,
+        'profit_loss': profit,
+        'currency': 'PKR',
+        'metadata': {
+            'booking_number': booking.booking_number,
+            'linked_booking_id': getattr(booking, 'linked_booking_id', None),
+            'has_hotel': has_hotel,
+            'has_transport': has_transport,
+            'has_ticket': has_ticket,
+            'has_umrah_package': has_umrah,
+        },
+    }
+
+
+def calculate_profit_loss_batch(booking_ids):
+    """Recalculate and persist FinancialRecords for many bookings.
+
+    Bookings, their items and expenses are loaded with a fixed number of
+    queries and riyal rates are read once per organization, so the cost per
+    booking is the FinancialRecord write.  Returns ``{booking_id: record}``;
+    ids without a booking are skipped.
+    """
+    booking_ids = sorted({int(pk) for pk in booking_ids if pk})
+    if not booking_ids:
+        return {}
+
+    bookings = list(
+        Booking.objects.filter(pk__in=booking_ids)
+        .select_related('organization', 'branch', 'agency')
+        .prefetch_related('hotel_details', 'transport_details', 'ticket_details')
     )
+    expenses = {}
+    for e in Expense.objects.filter(booking_id__in=booking_ids).order_by('id'):
+        expenses.setdefault(e.booking_id, []).append(e)
+
+    owner_ids = set()
+    for booking in bookings:
+        for item in list(booking.hotel_details.all()) + list(booking.transport_details.all()):
+            if not getattr(item, 'is_price_pkr', True):
+                owner_ids.add(_item_owner_id(item))
+    for rows in expenses.values():
+        owner_ids.update(e.organization_id for e in rows if e.currency and e.currency.upper() == 'SAR')
+    rates = _riyal_rates(owner_ids)
+
+    records = {}
+    for booking in bookings:
+        defaults = _profit_loss_defaults(
+            booking,
+            list(booking.hotel_details.all()),
+            list(booking.transport_details.all()),
+            list(booking.ticket_details.all()),
+            expenses.get(booking.id, []),
+            rates,
+        )
+        records[booking.id], _ = FinancialRecord.objects.update_or_create(booking_id=booking.id, defaults=defaults)
+    return records
+
 
-    return fr
+def calculate_profit_loss(booking_id: int):
+    """Calculate and persist FinancialRecord for a booking (see ``calculate_profit_loss_batch``)."""
+    return calculate_profit_loss_batch([booking_id]).get(int(booking_id))
 
 
 def aggregate_financials_for_booking(booking_id: int):
@@ -222,7 +266,6 @@ def aggregate_financials_for_booking(booking_id: int):
     Returns a dict: { income_amount, purchase_cost, expenses_amount, profit_loss, count }
     This is a read-time aggregation only and does not modify persisted FinancialRecords.
     """
-    from django.db.models import Sum
     qs_main = FinancialRecord.objects.filter(booking_id=booking_id)
     # FRs for walk-ins may reference linked_booking_id in metadata
     qs_linked = FinancialRecord.objects.filter(metadata__linked_booking_id=booking_id)
@@ -0,0 +1,104 @@
+"""Monthly payroll batches.
+
+``generate_monthly_salaries`` used to run a Commission and a Fine aggregate
+per employee and then create each SalaryPayment on its own.  A batch now
+reads the commission and fine totals of every employee with one grouped
+query each and writes the missing payments with a single ``bulk_create``
+inside one transaction.
+
+Runs are idempotent: employees that already have a payment for the month
+are skipped and their payments left untouched, so a batch can be re-run
+after new employees join, or after a failure, without duplicating anything.
+The (employee, month, year) unique constraint settles concurrent runs.
+"""
+import calendar
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from . import models
+
+
+def month_bounds(year, month):
+    """``(first day, first day of the next month)``."""
+    first = date(year, month, 1)
+    following = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return first, following
+
+
+def expected_payment_date(employee, year, month):
+    """The employee's salary day in that month, clamped to its last day (None without a salary day)."""
+    if not employee.salary_payment_date:
+        return None
+    try:
+        last_day = calendar.monthrange(year, month)[1]
+        return date(year, month, min(employee.salary_payment_date, last_day))
+    except (ValueError, TypeError):
+        return None
+
+
+def _totals(model, employee_ids, year, month):
+    first, following = month_bounds(year, month)
+    rows = (
+        model.objects.filter(employee_id__in=employee_ids, date__gte=first, date__lt=following)
+        .order_by()
+        .values('employee_id')
+        .annotate(total=Sum('amount'))
+        .values_list('employee_id', 'total')
+    )
+    return {employee_id: total or Decimal('0') for employee_id, total in rows}
+
+
+def generate_payroll(year, month, employees=None):
+    """Create the missing pending SalaryPayments of ``employees`` (all active ones by default).
+
+    Returns ``(created, skipped)``: the payments written by this run and the
+    payments that already existed for the month.
+    """
+    if employees is None:
+        employees = models.Employee.objects.filter(is_active=True)
+    employees = list(employees)
+    employee_ids = [emp.pk for emp in employees]
+
+    with transaction.atomic():
+        skipped = list(
+            models.SalaryPayment.objects.select_related('employee')
+            .filter(month=month, year=year, employee_id__in=employee_ids)
+        )
+        paid_ids = {payment.employee_id for payment in skipped}
+        pending = [emp for emp in employees if emp.pk not in paid_ids]
+        if not pending:
+            return [], skipped
+
+        pending_ids = [emp.pk for emp in pending]
+        commissions = _totals(models.Commission, pending_ids, year, month)
+        fines = _totals(models.Fine, pending_ids, year, month)
+
+        payments = []
+        for emp in pending:
+            base_salary = emp.salary or Decimal('0')
+            commission_total = commissions.get(emp.pk, Decimal('0'))
+            fine_total = fines.get(emp.pk, Decimal('0'))
+            payments.append(models.SalaryPayment(
+                employee=emp,
+                month=month,
+                year=year,
+                base_salary=base_salary,
+                commission_total=commission_total,
+                fine_deductions=fine_total,
+                net_amount=base_salary + commission_total - fine_total,
+                expected_payment_date=expected_payment_date(emp, year, month),
+                status='pending',
+            ))
+        # a concurrent run may have written some of them meanwhile
+        models.SalaryPayment.objects.bulk_create(payments, ignore_conflicts=True)
+
+    # bulk_create returns no primary keys on MySQL (nor with ignore_conflicts)
+    created = list(
+        models.SalaryPayment.objects.select_related('employee')
+        .filter(month=month, year=year, employee_id__in=pending_ids)
+        .order_by('-employee_id')
+    )
+    return created, skipped
@@ -0,0 +1,88 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from hr import models
+
+
+class PayrollBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user(username='payroll', password='pass'))
+        self.ali = models.Employee.objects.create(first_name='Ali', salary=Decimal('1000'), salary_payment_date=31)
+        self.sara = models.Employee.objects.create(first_name='Sara', salary=Decimal('800'))
+        models.Employee.objects.create(first_name='Gone', salary=Decimal('500'), is_active=False)
+        models.Commission.objects.create(employee=self.ali, amount=Decimal('150'), date=date(2025, 2, 3))
+        models.Commission.objects.create(employee=self.ali, amount=Decimal('50'), date=date(2025, 2, 28))
+        models.Commission.objects.create(employee=self.ali, amount=Decimal('999'), date=date(2025, 3, 1))
+        models.Fine.objects.create(employee=self.sara, amount=Decimal('25.50'), date=date(2025, 2, 10), reason='late')
+
+    def _generate(self):
+        return self.client.post('/api/hr/salary-payments/generate_monthly_salaries/', {'month': 2, 'year': 2025}, format='json')
+
+    def test_batch_totals_and_idempotent_reruns(self):
+        response = self._generate()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 2)
+        payments = {p.employee_id: p for p in models.SalaryPayment.objects.all()}
+        self.assertEqual(payments[self.ali.pk].commission_total, Decimal('200'))
+        self.assertEqual(payments[self.ali.pk].net_amount, Decimal('1200'))
+        self.assertEqual(payments[self.ali.pk].expected_payment_date, date(2025, 2, 28))
+        self.assertEqual(payments[self.sara.pk].fine_deductions, Decimal('25.50'))
+        self.assertEqual(payments[self.sara.pk].net_amount, Decimal('774.50'))
+
+        response = self._generate()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created_count'], response.data['existing_count']), (0, 2))
+
+        newcomer = models.Employee.objects.create(first_name='New', salary=Decimal('600'))
+        response = self._generate()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([p['employee'] for p in response.data['payments']], [newcomer.pk])
+        self.assertEqual(models.SalaryPayment.objects.count(), 3)
+
+    def test_query_count_does_not_grow_with_employees(self):
+        from hr.payroll import generate_payroll
+
+        for i in range(20):
+            models.Employee.objects.create(first_name=f'E{i}', salary=Decimal('100'))
+        employees = list(models.Employee.objects.filter(is_active=True))
+        # savepoint, existing payments, commission totals, fine totals, bulk insert, release, re-read
+        with self.assertNumQueries(7):
+            created, skipped = generate_payroll(2025, 2, employees)
+        self.assertEqual((len(created), skipped), (22, []))
+
+
+class DashboardStatsTests(TestCase):
+    def test_dashboard_is_a_handful_of_aggregates(self):
+        client = APIClient()
+        client.force_authenticate(user=get_user_model().objects.create_user(username='hr', password='pass'))
+        pkt = pytz.timezone('Asia/Karachi')
+        today = date.today()
+        ali = models.Employee.objects.create(first_name='Ali')
+        sara = models.Employee.objects.create(first_name='Sara')
+        models.Employee.objects.create(first_name='Absent')
+        models.Attendance.objects.create(employee=ali, date=today, status='on_time',
+                                         check_in=pkt.localize(datetime.combine(today, time(9, 0))))
+        models.Attendance.objects.create(employee=sara, date=today, status='late',
+                                         check_in=pkt.localize(datetime.combine(today, time(9, 31))))
+        models.Commission.objects.create(employee=ali, amount=Decimal('40'), date=today)
+        models.Commission.objects.create(employee=ali, amount=Decimal('10'), date=date(2000, 1, 1), status='paid')
+        models.SalaryPayment.objects.create(employee=ali, month=today.month, year=today.year, base_salary=1,
+                                            net_amount=Decimal('300'), status='paid')
+        models.SalaryPayment.objects.create(employee=sara, month=today.month, year=today.year, base_salary=1,
+                                            net_amount=Decimal('200'))
+        models.LeaveRequest.objects.create(employee=sara, request_type='full_day', date=today, reason='x')
+
+        with self.assertNumQueries(6):
+            data = client.get('/api/hr/employees/dashboard_stats/').json()
+        self.assertEqual(data['total_employees'], 3)
+        self.assertEqual((data['present_today'], data['late_today'], data['absent_today']), (2, 1, 1))
+        self.assertEqual((data['total_commissions'], data['unpaid_commissions_amount']), (40.0, 40.0))
+        self.assertEqual((data['total_salaries_paid_this_month'], data['total_salary_pending']), (300.0, 200.0))
+        self.assertEqual(data['pending_approvals'], 1)
+        self.assertEqual(data['average_checkin_time'], '09:15')
@@ -4,9 +4,9 @@ from rest_framework.response import Response
 from django.utils import timezone
 from datetime import datetime, time, timedelta, date
 from drf_spectacular.utils import extend_schema, OpenApiExample
-from . import models, serializers
+from . import models, payroll, serializers
 from django.db import transaction
-from django.db.models import Count, Q, Sum, Avg
+from django.db.models import Count, Q, Sum, Avg, F, Value, ExpressionWrapper, DateTimeField, DurationField
 import pytz
 
 
@@ -28,62 +28,51 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         current_month = today.month
         current_year = today.year
         
-        # Basic counts
+        # one conditional aggregate per model
         total_employees = models.Employee.objects.filter(is_active=True).count()
-        present_today = models.Attendance.objects.filter(date=today, check_in__isnull=False).count()
-        
-        # Late and absent counts
-        late_today = models.Attendance.objects.filter(date=today, status__in=['late']).count()
+
+        # average check-in as the mean offset from today's PKT midnight, in the database
+        midnight = pkt.localize(datetime.combine(today, time.min))
+        checkin_offset = ExpressionWrapper(
+            F('check_in') - Value(midnight, output_field=DateTimeField()), output_field=DurationField()
+        )
+        today_checked_in = Q(date=today, check_in__isnull=False)
+        attendance = models.Attendance.objects.aggregate(
+            present_today=Count('id', filter=today_checked_in),
+            late_today=Count('id', filter=Q(date=today, status='late')),
+            pending_attendance=Count('id', filter=Q(is_approved=False, check_out__isnull=False)),
+            average_checkin=Avg(checkin_offset, filter=today_checked_in),
+        )
+        present_today = attendance['present_today']
+        late_today = attendance['late_today']
         absent_today = total_employees - present_today  # Simple calculation
-        
+
         # Movements
-        total_movements = models.MovementLog.objects.filter(start_time__date=today).count()
-        open_movements = models.MovementLog.objects.filter(end_time__isnull=True).count()
-        
+        movements = models.MovementLog.objects.aggregate(
+            total_movements=Count('id', filter=Q(start_time__date=today)),
+            open_movements=Count('id', filter=Q(end_time__isnull=True)),
+        )
+
         # Commissions
-        total_commissions = models.Commission.objects.filter(
-            date__month=current_month, 
-            date__year=current_year
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        unpaid_commissions = models.Commission.objects.filter(status='unpaid').aggregate(total=Sum('amount'))['total'] or 0
-        
+        commissions = models.Commission.objects.aggregate(
+            total_commissions=Sum('amount', filter=Q(date__month=current_month, date__year=current_year)),
+            unpaid_commissions=Sum('amount', filter=Q(status='unpaid')),
+        )
+
         # Salaries
-        total_salaries_paid_this_month = models.SalaryPayment.objects.filter(
-            month=current_month,
-            year=current_year,
-            status='paid'
-        ).aggregate(total=Sum('net_amount'))['total'] or 0
-        
-        total_salary_pending = models.SalaryPayment.objects.filter(
-            month=current_month,
-            year=current_year,
-            status='pending'
-        ).aggregate(total=Sum('net_amount'))['total'] or 0
-        
+        salaries = models.SalaryPayment.objects.filter(month=current_month, year=current_year).aggregate(
+            paid=Sum('net_amount', filter=Q(status='paid')),
+            pending=Sum('net_amount', filter=Q(status='pending')),
+        )
+
         # Pending approvals (leave requests + unapproved attendance)
         pending_leaves = models.LeaveRequest.objects.filter(status='pending').count()
-        pending_attendance = models.Attendance.objects.filter(is_approved=False, check_out__isnull=False).count()
-        pending_approvals = pending_leaves + pending_attendance
-        
-        # Average check-in time calculation
-        today_attendances = models.Attendance.objects.filter(date=today, check_in__isnull=False)
-        if today_attendances.exists():
-            # Calculate average manually by converting to seconds since midnight
-            total_seconds = 0
-            count = 0
-            for att in today_attendances:
-                check_in_time = att.check_in.astimezone(pkt).time()
-                seconds = check_in_time.hour * 3600 + check_in_time.minute * 60 + check_in_time.second
-                total_seconds += seconds
-                count += 1
-            
-            if count > 0:
-                avg_seconds = total_seconds // count
-                avg_hour = avg_seconds // 3600
-                avg_minute = (avg_seconds % 3600) // 60
-                average_checkin_time = f"{avg_hour:02d}:{avg_minute:02d}"
-            else:
-                average_checkin_time = '--:--'
+        pending_approvals = pending_leaves + attendance['pending_attendance']
+
+        average_checkin = attendance['average_checkin']
+        if average_checkin is not None:
+            avg_seconds = int(average_checkin.total_seconds())
+            average_checkin_time = f"{avg_seconds // 3600:02d}:{(avg_seconds % 3600) // 60:02d}"
         else:
             average_checkin_time = '--:--'
         
@@ -93,12 +82,12 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             'present_today': present_today,
             'late_today': late_today,
             'absent_today': absent_today,
-            'total_movements': total_movements,
-            'open_movements_today': open_movements,
-            'total_commissions': float(total_commissions),
-            'unpaid_commissions_amount': float(unpaid_commissions),
-            'total_salaries_paid_this_month': float(total_salaries_paid_this_month),
-            'total_salary_pending': float(total_salary_pending),
+            'total_movements': movements['total_movements'],
+            'open_movements_today': movements['open_movements'],
+            'total_commissions': float(commissions['total_commissions'] or 0),
+            'unpaid_commissions_amount': float(commissions['unpaid_commissions'] or 0),
+            'total_salaries_paid_this_month': float(salaries['paid'] or 0),
+            'total_salary_pending': float(salaries['pending'] or 0),
             'pending_approvals': pending_approvals,
             'average_checkin_time': average_checkin_time
         })
@@ -581,18 +570,6 @@ class SalaryPaymentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if salaries already exist for this month/year
-        existing = models.SalaryPayment.objects.filter(month=month, year=year)
-        if existing.exists():
-            return Response(
-                {
-                    'detail': f'Salary payments already exist for {month}/{year}',
-                    'existing_count': existing.count(),
-                    'can_regenerate': False
-                }, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         # Get all active employees
         employees = models.Employee.objects.filter(is_active=True)
         if not employees.exists():
@@ -600,67 +577,27 @@ class SalaryPaymentViewSet(viewsets.ModelViewSet):
                 {'detail': 'No active employees found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        created_payments = []
-        errors = []
-        
-        for emp in employees:
-            try:
-                # Calculate commission total for the month
-                comm_total = models.Commission.objects.filter(
-                    employee=emp,
-                    date__month=month,
-                    date__year=year
-                ).aggregate(total=Sum('amount'))['total'] or 0
-                
-                # Calculate fine deductions for the month
-                fine_total = models.Fine.objects.filter(
-                    employee=emp,
-                    date__month=month,
-                    date__year=year
-                ).aggregate(total=Sum('amount'))['total'] or 0
-                
-                base_salary = emp.salary or 0
-                net_amount = float(base_salary) + float(comm_total) - float(fine_total)
-                
-                # Calculate expected payment date based on employee's salary_payment_date
-                from datetime import date
-                expected_date = None
-                if emp.salary_payment_date:
-                    try:
-                        # Handle months with fewer days (e.g., Feb 30 -> Feb 28/29)
-                        import calendar
-                        last_day = calendar.monthrange(year, month)[1]
-                        payment_day = min(emp.salary_payment_date, last_day)
-                        expected_date = date(year, month, payment_day)
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Create salary payment
-                payment = models.SalaryPayment.objects.create(
-                    employee=emp,
-                    month=month,
-                    year=year,
-                    base_salary=base_salary,
-                    commission_total=comm_total,
-                    fine_deductions=fine_total,
-                    net_amount=net_amount,
-                    expected_payment_date=expected_date,
-                    status='pending'
-                )
-                created_payments.append(payment)
-                
-            except Exception as e:
-                errors.append({
-                    'employee': f"{emp.first_name} {emp.last_name}",
-                    'error': str(e)
-                })
-        
+
+        # one batch: grouped commission/fine totals, one bulk insert; employees
+        # already paid for the month are skipped, so re-runs only fill the gaps
+        created_payments, existing = payroll.generate_payroll(year, month, employees)
+        if not created_payments:
+            return Response(
+                {
+                    'detail': f'Salary payments already exist for {month}/{year}',
+                    'existing_count': len(existing),
+                    'created_count': 0,
+                    'can_regenerate': False
+                }, 
+                status=status.HTTP_200_OK
+            )
+
         return Response({
             'message': f'Successfully generated {len(created_payments)} salary payments',
             'month': month,
             'year': year,
             'created_count': len(created_payments),
-            'errors': errors,
+            'existing_count': len(existing),
+            'errors': [],
             'payments': serializers.SalaryPaymentSerializer(created_payments, many=True).data
         }, status=status.HTTP_201_CREATED)
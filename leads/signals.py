@@ -1,16 +1,15 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from booking.models import Booking
+from booking.events import booking_events
 from .services import LeadService
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@receiver(post_save, sender=Booking)
-def auto_create_lead_from_booking(sender, instance, created, **kwargs):
+@booking_events.register("leads.auto_create")
+def auto_create_lead_from_booking(event):
     # Only auto-create when booking created
-    if created:
+    if event.created:
+        instance = event.booking
         try:
             LeadService.auto_create_from_booking(instance)
         except Exception as e:
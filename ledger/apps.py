@@ -8,6 +8,7 @@ class LedgerConfig(AppConfig):
     def ready(self):
         # import signal handlers
         try:
+            import ledger.balances  # noqa: F401
             import ledger.signals  # noqa: F401
         except Exception:
             # don't crash on import errors during migrations
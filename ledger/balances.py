@@ -0,0 +1,303 @@
+"""Incremental ledger balance snapshot.
+
+The pending-balance endpoints used to aggregate LedgerEntry once per agency,
+branch or area agency of an organization.  ``LedgerBalance`` keeps those
+totals instead: every LedgerEntry save computes the entry's contribution
+before and after the write and applies the difference with F() updates in
+the same transaction, and deletes subtract the old contribution.  Reversing
+an entry (``reversed=True``) therefore removes it from the snapshot.
+
+Only ``debit`` and ``credit`` entries count, matching the aggregates the
+views ran before.  ``rebuild_ledger_balances`` recomputes the table from
+scratch and can verify it against the ledger.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+
+# LedgerEntry fields that decide where and how much an entry contributes
+BALANCE_FIELDS = (
+    "reversed",
+    "transaction_type",
+    "transaction_amount",
+    "agency_id",
+    "branch_id",
+    "area_agency_id",
+    "seller_organization_id",
+    "inventory_owner_organization_id",
+)
+
+ZERO = Decimal("0.00")
+
+
+def _scope_keys(row):
+    from .models import LedgerBalance
+
+    keys = []
+    if row.get("agency_id"):
+        keys.append((LedgerBalance.SCOPE_AGENCY, row["agency_id"], 0))
+    if row.get("branch_id"):
+        keys.append((LedgerBalance.SCOPE_BRANCH, row["branch_id"], 0))
+    if row.get("area_agency_id"):
+        keys.append((LedgerBalance.SCOPE_AREA_AGENCY, row["area_agency_id"], 0))
+    if row.get("seller_organization_id") and row.get("inventory_owner_organization_id"):
+        keys.append((
+            LedgerBalance.SCOPE_ORGANIZATION_PAIR,
+            row["seller_organization_id"],
+            row["inventory_owner_organization_id"],
+        ))
+    return keys
+
+
+def entry_contributions(row):
+    """``{(scope_type, scope_id, counterparty_id): (debit, credit, count)}`` for one entry.
+
+    ``row`` is a dict with the BALANCE_FIELDS (or None for a missing entry).
+    """
+    if not row or row.get("reversed"):
+        return {}
+    transaction_type = row.get("transaction_type")
+    if transaction_type not in ("debit", "credit"):
+        return {}
+    amount = Decimal(str(row.get("transaction_amount") or 0))
+    debit, credit = (amount, ZERO) if transaction_type == "debit" else (ZERO, amount)
+    return {key: (debit, credit, 1) for key in _scope_keys(row)}
+
+
+def contribution_delta(before, after):
+    """Difference between two ``entry_contributions`` results."""
+    delta = {}
+    for key, (debit, credit, count) in after.items():
+        delta[key] = (debit, credit, count)
+    for key, (debit, credit, count) in before.items():
+        d, c, n = delta.get(key, (ZERO, ZERO, 0))
+        delta[key] = (d - debit, c - credit, n - count)
+    return {key: value for key, value in delta.items() if any(value)}
+
+
+def entry_balance_row(entry):
+    """BALANCE_FIELDS of an in-memory LedgerEntry as a dict."""
+    return {field: getattr(entry, field) for field in BALANCE_FIELDS}
+
+
+def stored_balance_row(pk):
+    from .models import LedgerEntry
+
+    if not pk:
+        return None
+    return LedgerEntry.objects.filter(pk=pk).values(*BALANCE_FIELDS).first()
+
+
+def apply_balance_deltas(deltas):
+    """Add ``deltas`` to the snapshot rows, creating rows on first use.
+
+    Rows are touched in sorted key order so concurrent postings lock them
+    consistently.
+    """
+    from .models import LedgerBalance
+
+    if not deltas:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        for key in sorted(deltas):
+            debit, credit, count = deltas[key]
+            scope_type, scope_id, counterparty_id = key
+            rows = LedgerBalance.objects.filter(
+                scope_type=scope_type, scope_id=scope_id, counterparty_id=counterparty_id
+            )
+            changes = {
+                "total_debit": F("total_debit") + debit,
+                "total_credit": F("total_credit") + credit,
+                "entry_count": F("entry_count") + count,
+                "updated_at": now,
+            }
+            if rows.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    LedgerBalance.objects.create(
+                        scope_type=scope_type,
+                        scope_id=scope_id,
+                        counterparty_id=counterparty_id,
+                        total_debit=debit,
+                        total_credit=credit,
+                        entry_count=count,
+                    )
+            except IntegrityError:
+                # created concurrently
+                rows.update(**changes)
+
+
+def _grouped_totals(entry_model, scope_type, fields):
+    counted = Q(reversed=False, transaction_type__in=("debit", "credit"))
+    filters = {f"{field}__isnull": False for field in fields}
+    rows = (
+        entry_model.objects.filter(counted, **filters)
+        .values(*fields)
+        .annotate(
+            debit=Sum("transaction_amount", filter=Q(transaction_type="debit")),
+            credit=Sum("transaction_amount", filter=Q(transaction_type="credit")),
+            count=Count("id"),
+        )
+        .order_by()
+    )
+    totals = {}
+    for row in rows:
+        scope_id = row[fields[0]]
+        counterparty_id = row[fields[1]] if len(fields) > 1 else 0
+        if not scope_id or (len(fields) > 1 and not counterparty_id):
+            continue
+        totals[(scope_type, scope_id, counterparty_id)] = (
+            row["debit"] or ZERO,
+            row["credit"] or ZERO,
+            row["count"],
+        )
+    return totals
+
+
+def compute_ledger_balances(entry_model=None):
+    """Expected snapshot computed from LedgerEntry (one grouped query per scope)."""
+    from .models import LedgerBalance, LedgerEntry
+
+    entry_model = entry_model or LedgerEntry
+    totals = {}
+    totals.update(_grouped_totals(entry_model, LedgerBalance.SCOPE_AGENCY, ("agency_id",)))
+    totals.update(_grouped_totals(entry_model, LedgerBalance.SCOPE_BRANCH, ("branch_id",)))
+    totals.update(_grouped_totals(entry_model, LedgerBalance.SCOPE_AREA_AGENCY, ("area_agency_id",)))
+    totals.update(_grouped_totals(
+        entry_model,
+        LedgerBalance.SCOPE_ORGANIZATION_PAIR,
+        ("seller_organization_id", "inventory_owner_organization_id"),
+    ))
+    return totals
+
+
+def stored_ledger_balances():
+    from .models import LedgerBalance
+
+    return {
+        (row["scope_type"], row["scope_id"], row["counterparty_id"]): (
+            row["total_debit"], row["total_credit"], row["entry_count"]
+        )
+        for row in LedgerBalance.objects.values(
+            "scope_type", "scope_id", "counterparty_id", "total_debit", "total_credit", "entry_count"
+        )
+    }
+
+
+def verify_ledger_balances():
+    """Return ``[(key, stored, expected)]`` for every snapshot row that is off."""
+    expected = compute_ledger_balances()
+    stored = stored_ledger_balances()
+    empty = (ZERO, ZERO, 0)
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        have = stored.get(key, empty)
+        want = expected.get(key, empty)
+        if have != want:
+            mismatches.append((key, have, want))
+    return mismatches
+
+
+def rebuild_ledger_balances(entry_model=None, balance_model=None):
+    """Replace the snapshot with totals recomputed from the ledger.
+
+    The model arguments let data migrations pass their historical models.
+    """
+    from .models import LedgerBalance
+
+    balance_model = balance_model or LedgerBalance
+    totals = compute_ledger_balances(entry_model)
+    with transaction.atomic():
+        balance_model.objects.all().delete()
+        balance_model.objects.bulk_create(
+            [
+                balance_model(
+                    scope_type=scope_type,
+                    scope_id=scope_id,
+                    counterparty_id=counterparty_id,
+                    total_debit=debit,
+                    total_credit=credit,
+                    entry_count=count,
+                )
+                for (scope_type, scope_id, counterparty_id), (debit, credit, count) in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def pending_scope_balances(scope_type, scope_ids):
+    """``{scope_id: balance}`` for scopes in ``scope_ids`` whose balance is negative.
+
+    ``scope_ids`` may be a list or a ``values('id')`` queryset; either way
+    this is a single query.
+    """
+    from .models import LedgerBalance
+
+    rows = (
+        LedgerBalance.objects.filter(scope_type=scope_type, counterparty_id=0, scope_id__in=scope_ids)
+        .annotate(balance=F("total_debit") - F("total_credit"))
+        .filter(balance__lt=0)
+        .values_list("scope_id", "balance")
+    )
+    return {scope_id: balance for scope_id, balance in rows}
+
+
+def scope_totals(scope_type, scope_id):
+    """``(total_debit, total_credit)`` of one scope."""
+    from .models import LedgerBalance
+
+    row = LedgerBalance.objects.filter(
+        scope_type=scope_type, scope_id=scope_id, counterparty_id=0
+    ).values_list("total_debit", "total_credit").first()
+    return row or (ZERO, ZERO)
+
+
+def organization_pair_balances(organization_id, other_id=None):
+    """``{(seller_id, owner_id): balance}`` for pairs involving ``organization_id`` (one query)."""
+    from .models import LedgerBalance
+
+    rows = LedgerBalance.objects.filter(scope_type=LedgerBalance.SCOPE_ORGANIZATION_PAIR)
+    if other_id is None:
+        rows = rows.filter(Q(scope_id=organization_id) | Q(counterparty_id=organization_id))
+    else:
+        rows = rows.filter(
+            Q(scope_id=organization_id, counterparty_id=other_id)
+            | Q(scope_id=other_id, counterparty_id=organization_id)
+        )
+    return {
+        (seller_id, owner_id): debit - credit
+        for seller_id, owner_id, debit, credit in rows.values_list(
+            "scope_id", "counterparty_id", "total_debit", "total_credit"
+        )
+    }
+
+
+def internal_note_ids_by_scope(field, scope_ids):
+    """Ids of non-reversed entries with internal notes, grouped by ``field``."""
+    from .models import LedgerEntry
+
+    notes = {}
+    if not scope_ids:
+        return notes
+    rows = (
+        LedgerEntry.objects.filter(**{f"{field}__in": list(scope_ids)}, reversed=False)
+        .exclude(internal_notes=[])
+        .values_list(field, "id")
+        .order_by()
+    )
+    for scope_id, entry_id in rows:
+        notes.setdefault(scope_id, []).append(entry_id)
+    return notes
+
+
+@receiver(post_delete, sender="ledger.LedgerEntry")
+def ledger_entry_deleted(sender, instance, **kwargs):
+    apply_balance_deltas(contribution_delta(entry_contributions(entry_balance_row(instance)), {}))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ledger.balances import rebuild_ledger_balances, verify_ledger_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute the LedgerBalance snapshot from LedgerEntry, or verify it with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true", help="Only compare the snapshot with the ledger")
+        parser.add_argument("--limit", type=int, default=20, help="Mismatches to print with --verify")
+
+    def handle(self, *args, **options):
+        if not options["verify"]:
+            count = rebuild_ledger_balances()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} ledger balance rows"))
+            return
+
+        mismatches = verify_ledger_balances()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Ledger balances match the ledger"))
+            return
+
+        for (scope_type, scope_id, counterparty_id), stored, expected in mismatches[:options["limit"]]:
+            scope = f"{scope_type} {scope_id}" + (f"/{counterparty_id}" if counterparty_id else "")
+            self.stdout.write(
+                f"{scope}: stored debit={stored[0]} credit={stored[1]} entries={stored[2]}, "
+                f"expected debit={expected[0]} credit={expected[1]} entries={expected[2]}"
+            )
+        raise CommandError(f"{len(mismatches)} ledger balance rows differ; run without --verify to rebuild")
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-18 20:59
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def populate_ledger_balances(apps, schema_editor):
+    from ledger.balances import rebuild_ledger_balances
+
+    rebuild_ledger_balances(
+        apps.get_model('ledger', 'LedgerEntry'),
+        apps.get_model('ledger', 'LedgerBalance'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0005_ledgerentry_area_agency_ledgerentry_final_balance_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope_type', models.CharField(choices=[('agency', 'Agency'), ('branch', 'Branch'), ('area_agency', 'Area Agency'), ('organization_pair', 'Seller / Inventory Owner Organization')], max_length=20)),
+                ('scope_id', models.BigIntegerField()),
+                ('counterparty_id', models.BigIntegerField(default=0, help_text='Inventory owner organization for organization_pair rows, 0 otherwise')),
+                ('total_debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('total_credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ledger Balance',
+                'verbose_name_plural': 'Ledger Balances',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ledgerbalance',
+            constraint=models.UniqueConstraint(fields=('scope_type', 'scope_id', 'counterparty_id'), name='ledger_balance_unique_scope'),
+        ),
+        migrations.RunPython(populate_ledger_balances, migrations.RunPython.noop),
+    ]
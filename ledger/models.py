@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal
@@ -307,6 +307,22 @@ class LedgerEntry(models.Model):
 
     def __str__(self):
         return f"LE#{self.id} - {self.transaction_type} - {self.reference_no or self.booking_no or 'No Ref'}"
+
+    def save(self, *args, **kwargs):
+        """Save and move this entry's contribution in LedgerBalance atomically."""
+        from .balances import (
+            apply_balance_deltas, contribution_delta, entry_balance_row,
+            entry_contributions, stored_balance_row,
+        )
+
+        with transaction.atomic():
+            before = entry_contributions(stored_balance_row(self.pk))
+            super().save(*args, **kwargs)
+            if kwargs.get('update_fields') is not None:
+                after_row = stored_balance_row(self.pk)
+            else:
+                after_row = entry_balance_row(self)
+            apply_balance_deltas(contribution_delta(before, entry_contributions(after_row)))
     
     @property
     def total_debit(self):
@@ -414,3 +430,54 @@ class LedgerLine(models.Model):
 
     def __str__(self):
         return f"Line {self.id}: {self.account} - D:{self.debit} C:{self.credit} -> Bal:{self.balance_after}"
+
+
+class LedgerBalance(models.Model):
+    """
+    Running debit/credit totals of non-reversed ledger entries per scope.
+    Maintained by LedgerEntry.save() and the post_delete receiver in
+    ledger.balances; rebuild with `manage.py rebuild_ledger_balances`.
+
+    Scopes: agency, branch and area agency keyed by their id, and
+    organization pairs keyed by (seller organization, inventory owner).
+    """
+
+    SCOPE_AGENCY = "agency"
+    SCOPE_BRANCH = "branch"
+    SCOPE_AREA_AGENCY = "area_agency"
+    SCOPE_ORGANIZATION_PAIR = "organization_pair"
+
+    SCOPE_CHOICES = [
+        (SCOPE_AGENCY, "Agency"),
+        (SCOPE_BRANCH, "Branch"),
+        (SCOPE_AREA_AGENCY, "Area Agency"),
+        (SCOPE_ORGANIZATION_PAIR, "Seller / Inventory Owner Organization"),
+    ]
+
+    scope_type = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    scope_id = models.BigIntegerField()
+    counterparty_id = models.BigIntegerField(
+        default=0,
+        help_text="Inventory owner organization for organization_pair rows, 0 otherwise"
+    )
+    total_debit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal("0.00"))
+    total_credit = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal("0.00"))
+    entry_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ledger Balance"
+        verbose_name_plural = "Ledger Balances"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope_type", "scope_id", "counterparty_id"],
+                name="ledger_balance_unique_scope",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope_type} {self.scope_id}: {self.balance}"
+
+    @property
+    def balance(self):
+        return self.total_debit - self.total_credit
@@ -0,0 +1,188 @@
+"""Agency ledger statements computed in the database.
+
+An agency's running balance is the cumulative sum, oldest first, of the
+RECEIVABLE lines of its entries (credit - debit).  ``statement_queryset``
+annotates every entry with its own ``receivable_delta`` and the
+``running_balance`` up to and including it using a window function, so
+pages and exports never have to load the full history into Python.
+
+Entries are newest first.  Callers that pass a cursor or a page size get
+pages addressed by an opaque cursor built from ``(creation_datetime, id)``;
+without either the whole statement is returned, as it always was.  Because
+the cursor only removes newer rows, the window still sees the complete older
+history and the running balances on every page are exact.
+"""
+import base64
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, Window
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+EXPORT_FIELDS = (
+    "id",
+    "creation_datetime",
+    "reference_no",
+    "booking_no",
+    "transaction_type",
+    "service_type",
+    "narration",
+    "transaction_amount",
+    "receivable_delta",
+    "running_balance",
+)
+
+_AMOUNT = DecimalField(max_digits=18, decimal_places=2)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _line_sum(expression, **filters):
+    """Per-entry sum over its LedgerLines as a correlated subquery."""
+    from .models import LedgerLine
+
+    lines = (
+        LedgerLine.objects.filter(ledger_entry=OuterRef("pk"), **filters)
+        .order_by()
+        .values("ledger_entry")
+        .annotate(total=Sum(expression, output_field=_AMOUNT))
+        .values("total")
+    )
+    return Coalesce(Subquery(lines, output_field=_AMOUNT), Value(Decimal("0.00")), output_field=_AMOUNT)
+
+
+def receivable_delta():
+    return _line_sum(F("credit") - F("debit"), account__account_type="RECEIVABLE")
+
+
+def statement_queryset(agency_id):
+    """Entries of the agency annotated with receivable_delta and running_balance."""
+    from .models import LedgerEntry
+
+    delta = receivable_delta()
+    return (
+        LedgerEntry.objects.filter(agency_id=agency_id)
+        .annotate(receivable_delta=delta)
+        .annotate(
+            running_balance=Window(
+                Sum(delta, output_field=_AMOUNT),
+                order_by=[F("creation_datetime").asc(), F("id").asc()],
+            )
+        )
+    )
+
+
+def statement_summary(agency_id):
+    """Totals for the whole statement in one aggregate query."""
+    from .models import LedgerEntry
+
+    commission = Q(service_type="commission")
+    totals = LedgerEntry.objects.filter(agency_id=agency_id).aggregate(
+        total_entries=Count("id"),
+        total_debit=Sum(_line_sum("debit", account__agency_id=agency_id), output_field=_AMOUNT),
+        total_credit=Sum(_line_sum("credit", account__agency_id=agency_id), output_field=_AMOUNT),
+        net_balance=Sum(receivable_delta(), output_field=_AMOUNT),
+        total_commission=Sum("transaction_amount", filter=commission),
+        commission_entries=Count("id", filter=commission),
+    )
+    for key in ("total_debit", "total_credit", "net_balance", "total_commission"):
+        totals[key] = totals[key] or Decimal("0.00")
+    return totals
+
+
+def encode_cursor(entry):
+    raw = f"{entry.creation_datetime.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        stamp, entry_id = raw.rsplit("|", 1)
+        moment = parse_datetime(stamp)
+        if moment is None:
+            raise ValueError(stamp)
+        return moment, int(entry_id)
+    except (ValueError, TypeError, UnicodeDecodeError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+def statement_page(agency_id, cursor=None, page_size=None):
+    """One page of the statement, newest first; all of it without ``cursor`` and ``page_size``.
+
+    Returns ``(entries, opening_balance, closing_balance, next_cursor)``;
+    the opening balance is the balance before the oldest entry on the page.
+    """
+    paginate = bool(cursor or page_size)
+    if paginate:
+        page_size = max(1, min(int(page_size or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    rows = statement_queryset(agency_id)
+    if cursor:
+        moment, entry_id = decode_cursor(cursor)
+        rows = rows.filter(
+            Q(creation_datetime__lt=moment) | Q(creation_datetime=moment, id__lt=entry_id)
+        )
+    rows = (
+        rows.select_related(
+            "organization", "branch", "agency", "area_agency",
+            "seller_organization", "inventory_owner_organization",
+            "created_by", "reversed_by",
+        )
+        .prefetch_related("lines__account")
+        .order_by("-creation_datetime", "-id")
+    )
+    entries = list(rows[:page_size + 1] if paginate else rows)
+    next_cursor = None
+    if paginate and len(entries) > page_size:
+        entries = entries[:page_size]
+        next_cursor = encode_cursor(entries[-1])
+    if not entries:
+        return [], Decimal("0.00"), Decimal("0.00"), None
+    closing = entries[0].running_balance
+    opening = entries[-1].running_balance - entries[-1].receivable_delta
+    return entries, opening, closing, next_cursor
+
+
+def _export_rows(agency_id):
+    return (
+        statement_queryset(agency_id)
+        .order_by("creation_datetime", "id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=2000)
+    )
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object that hands back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def iter_statement_csv(agency_id):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _export_rows(agency_id):
+        yield writer.writerow(row)
+
+
+def iter_statement_ndjson(agency_id):
+    for row in _export_rows(agency_id):
+        yield json.dumps({k: _json_value(v) for k, v in zip(EXPORT_FIELDS, row)}) + "\n"
@@ -0,0 +1,80 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from organization.models import Organization, Branch, Agency
+from .balances import verify_ledger_balances
+from .models import LedgerBalance, LedgerEntry
+
+
+class LedgerBalanceSnapshotTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org")
+        self.owner = Organization.objects.create(name="Owner")
+        self.branch = Branch.objects.create(name="Main", organization=self.org)
+        self.agency = Agency.objects.create(name="Agency", branch=self.branch)
+        self.user = User.objects.create_user(username="bal", first_name="Ali", last_name="Raza")
+        self.agency.user.add(self.user)
+
+    def _entry(self, kind, amount, **extra):
+        return LedgerEntry.objects.create(
+            organization=self.org, branch=self.branch, agency=self.agency,
+            transaction_type=kind, transaction_amount=Decimal(amount), **extra
+        )
+
+    def _agency_balance(self):
+        row = LedgerBalance.objects.get(scope_type=LedgerBalance.SCOPE_AGENCY, scope_id=self.agency.id)
+        return row.balance
+
+    def test_postings_and_reversal_update_snapshot(self):
+        self._entry("debit", "100")
+        credit = self._entry("credit", "300", internal_notes=["paid"])
+        self.assertEqual(self._agency_balance(), Decimal("-200"))
+
+        credit.transaction_amount = Decimal("250")
+        credit.save()
+        self.assertEqual(self._agency_balance(), Decimal("-150"))
+
+        credit.reverse()
+        self.assertEqual(self._agency_balance(), Decimal("100"))
+        self.assertEqual(verify_ledger_balances(), [])
+
+        LedgerEntry.objects.all().delete()
+        self.assertEqual(self._agency_balance(), Decimal("0"))
+
+    def test_pending_endpoint_reads_snapshot(self):
+        self._entry("debit", "100")
+        noted = self._entry("credit", "300", internal_notes=["paid"])
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertNumQueries(5):
+            response = client.get("/api/agents/pending-balances", {"organization_id": self.org.id})
+        agents = response.json()["agents"]
+        self.assertEqual(len(agents), 1)
+        self.assertEqual(agents[0]["pending_balance"], -200.0)
+        self.assertEqual(agents[0]["agent_name"], "Ali Raza")
+        self.assertEqual(agents[0]["internal_note_ids"], [noted.id])
+
+        response = client.get("/api/final-balance", {"type": "branch", "id": self.branch.id})
+        self.assertEqual(response.json()["final_balance"], -200.0)
+
+    def test_organization_pairs(self):
+        self._entry("debit", "500", seller_organization=self.org, inventory_owner_organization=self.owner)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get("/api/organization/pending-balances", {"org1_id": self.owner.id}).json()
+        self.assertEqual(data["organizations"][0]["pending_balance"], 500.0)
+
+    def test_rebuild_and_verify_command(self):
+        self._entry("debit", "100")
+        LedgerBalance.objects.all().delete()
+        with self.assertRaises(Exception):
+            call_command("rebuild_ledger_balances", "--verify", stdout=StringIO())
+        call_command("rebuild_ledger_balances", stdout=StringIO())
+        call_command("rebuild_ledger_balances", "--verify", stdout=StringIO())
+        self.assertEqual(self._agency_balance(), Decimal("100"))
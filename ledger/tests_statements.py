@@ -0,0 +1,82 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from organization.models import Organization, Branch, Agency
+from .models import Account, LedgerEntry, LedgerLine
+from .statements import statement_page, statement_summary
+
+
+class AgencyStatementTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org")
+        self.branch = Branch.objects.create(name="Main", organization=self.org)
+        self.agency = Agency.objects.create(name="Agency", branch=self.branch)
+        self.receivable = Account.objects.create(name="Recv", account_type="RECEIVABLE", agency=self.agency)
+        self.sales = Account.objects.create(name="Sales", account_type="SALES", organization=self.org)
+        self.user = User.objects.create_user(username="stmt")
+
+        start = timezone.now() - timedelta(days=10)
+        # credits of 100, 200, ... 500 to the receivable, one per day
+        for i in range(5):
+            entry = LedgerEntry.objects.create(
+                organization=self.org, agency=self.agency, transaction_type="credit",
+                transaction_amount=Decimal(100 * (i + 1)), creation_datetime=start + timedelta(days=i),
+                service_type="commission" if i == 0 else "payment",
+            )
+            LedgerLine.objects.create(ledger_entry=entry, account=self.receivable, credit=Decimal(100 * (i + 1)))
+            LedgerLine.objects.create(ledger_entry=entry, account=self.sales, debit=Decimal(100 * (i + 1)))
+
+    def test_pages_carry_running_and_opening_balances(self):
+        entries, opening, closing, cursor = statement_page(self.agency.id, page_size=2)
+        self.assertEqual([float(e.running_balance) for e in entries], [1500.0, 1000.0])
+        self.assertEqual((opening, closing), (Decimal("600"), Decimal("1500")))
+
+        entries, opening, closing, cursor = statement_page(self.agency.id, cursor=cursor, page_size=2)
+        self.assertEqual([float(e.running_balance) for e in entries], [600.0, 300.0])
+        self.assertEqual(opening, Decimal("100"))
+
+        entries, opening, _, cursor = statement_page(self.agency.id, cursor=cursor, page_size=2)
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(opening, Decimal("0"))
+        self.assertIsNone(cursor)
+
+    def test_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            summary = statement_summary(self.agency.id)
+        self.assertEqual(summary["total_entries"], 5)
+        self.assertEqual(summary["total_credit"], Decimal("1500"))
+        self.assertEqual(summary["net_balance"], Decimal("1500"))
+        self.assertEqual(summary["commission_entries"], 1)
+
+    def test_view_page_and_streaming_export(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f"/api/ledger/agency/{self.agency.id}/"
+
+        # without cursor or page_size the whole statement comes back
+        data = client.get(url).json()
+        self.assertEqual([e["running_balance"] for e in data["entries"]], [1500.0, 1000.0, 600.0, 300.0, 100.0])
+        self.assertEqual((data["opening_balance"], data["closing_balance"]), (0.0, 1500.0))
+        self.assertIsNone(data["next_cursor"])
+
+        data = client.get(url, {"page_size": 3}).json()
+        self.assertEqual(len(data["entries"]), 3)
+        self.assertEqual(data["entries"][0]["running_balance"], 1500.0)
+        self.assertEqual(data["summary"]["net_balance"], 1500.0)
+        self.assertIsNotNone(data["next_cursor"])
+        self.assertEqual(client.get(url, {"cursor": "bogus"}).status_code, 400)
+
+        response = client.get(url, {"export": "ndjson"})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([r["running_balance"] for r in rows], [100.0, 300.0, 600.0, 1000.0, 1500.0])
+
+        response = client.get(url, {"export": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[0].startswith("id,creation_datetime"))
@@ -9,10 +9,18 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.db.models import Q, Sum, Count, F
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
 from decimal import Decimal
 
 from ledger.models import LedgerEntry, Account
 from ledger.serializers import LedgerEntrySerializer
+from ledger.statements import (
+    InvalidCursor,
+    iter_statement_csv,
+    iter_statement_ndjson,
+    statement_page,
+    statement_summary,
+)
 from organization.models import Organization, Branch, Agency
 from area_leads.models import AreaLead
 
@@ -145,96 +153,76 @@ class AgencyLedgerAPIView(APIView):
     3️⃣ Agency Ledger
     GET /api/ledger/agency/<agency_id>/
     → shows all transactions between agent ↔ branch / organization.
+
+    Entries are newest first, all of them by default. Pass ?page_size= (max
+    500) and the returned next_cursor as ?cursor= to page through them
+    instead. Each entry carries a running_balance computed in the database and
+    the response reports its opening/closing balance.
+    ?export=csv or ?export=ndjson streams the full statement oldest first.
     """
     permission_classes = [IsAuthenticated]
     
     def get(self, request, agency_id):
         agency = get_object_or_404(Agency, id=agency_id)
-        
-        # Get all ledger entries for this agency
-        entries = LedgerEntry.objects.filter(
-            agency=agency
-        ).select_related(
-            'organization', 'branch', 'agency', 'area_agency',
-            'seller_organization', 'inventory_owner_organization',
-            'created_by', 'reversed_by'
-        ).prefetch_related('lines').order_by('-creation_datetime')
-        
-        # Calculate summary statistics from LedgerLines
-        from ledger.models import LedgerLine, Account
-        
-        # Calculate total debit and credit from lines for this agency's account
-        total_debit = Decimal('0.00')
-        total_credit = Decimal('0.00')
-        
-        for entry in entries:
-            for line in entry.lines.all():
-                if line.account.agency_id == agency_id:
-                    total_debit += line.debit
-                    total_credit += line.credit
-        
-        # Calculate net balance: credit - debit (positive means agent has credit balance)
-        net_balance = total_credit - total_debit
 
-        
+        export = (request.query_params.get('export') or '').lower()
+        if export in ('csv', 'ndjson'):
+            return self._export(agency, export)
+
+        try:
+            entries, opening_balance, closing_balance, next_cursor = statement_page(
+                agency.id,
+                cursor=request.query_params.get('cursor'),
+                page_size=request.query_params.get('page_size'),
+            )
+        except InvalidCursor:
+            return Response({'detail': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'detail': 'page_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Totals for the whole statement in one aggregate query
+        summary = statement_summary(agency.id)
+
         # Breakdown by service type
-        service_breakdown = entries.values('service_type').annotate(
+        service_breakdown = LedgerEntry.objects.filter(agency=agency).values('service_type').annotate(
             count=Count('id'),
             total_amount=Sum('transaction_amount')
         ).order_by('-total_amount')
-        
-        # Commission summary
-        commission_entries = entries.filter(service_type='commission')
-        total_commission = commission_entries.aggregate(
-            total=Sum('transaction_amount')
-        )['total'] or Decimal('0.00')
-        
-        # Serialize entries and add running balance
+
         serializer = LedgerEntrySerializer(entries, many=True, context={'request': request})
-        entries_with_balance = self._add_running_balance(serializer.data, agency_id)
-        
-        # Get closing balance from the most recent entry's running balance
-        # The entries are in reverse chronological order, so the first entry has the latest balance
-        net_balance = Decimal(str(entries_with_balance[0]['running_balance'])) if entries_with_balance else Decimal('0.00')
-        
+        entries_data = serializer.data
+        for data, entry in zip(entries_data, entries):
+            data['running_balance'] = float(entry.running_balance)
+
         return Response({
             'agency_id': agency_id,
             'agency_name': agency.name,
             'branch_id': agency.branch_id if hasattr(agency, 'branch_id') else None,
             'summary': {
-                'total_entries': entries.count(),
-                'total_debit': float(total_debit),
-                'total_credit': float(total_credit),
-                'net_balance': float(net_balance),
-                'total_commission': float(total_commission),
-                'commission_entries': commission_entries.count(),
+                'total_entries': summary['total_entries'],
+                'total_debit': float(summary['total_debit']),
+                'total_credit': float(summary['total_credit']),
+                # latest running balance of the receivable account
+                'net_balance': float(summary['net_balance']),
+                'total_commission': float(summary['total_commission']),
+                'commission_entries': summary['commission_entries'],
             },
             'service_breakdown': list(service_breakdown),
-            'entries': entries_with_balance
+            'opening_balance': float(opening_balance),
+            'closing_balance': float(closing_balance),
+            'next_cursor': next_cursor,
+            'entries': entries_data
         })
-    
-    def _add_running_balance(self, entries_data, agency_id):
-        """Calculate running balance for ledger entries"""
-        # Reverse to chronological order for balance calculation
-        entries_data = list(reversed(entries_data))
-        
-        running_balance = Decimal('0.00')
-        
-        for entry in entries_data:
-            # Calculate net change from this entry's lines
-            # Since entries are already filtered by agency, we can use all lines
-            for line in entry.get('lines', []):
-                # Check if this line belongs to the agent's account (RECEIVABLE type)
-                account = line.get('account', {})
-                if account.get('account_type') == 'RECEIVABLE':
-                    running_balance += Decimal(str(line.get('credit', 0)))
-                    running_balance -= Decimal(str(line.get('debit', 0)))
-            
-            # Add running balance to entry
-            entry['running_balance'] = float(running_balance)
-        
-        # Reverse back to reverse chronological order
-        return list(reversed(entries_data))
+
+    def _export(self, agency, export):
+        if export == 'csv':
+            response = StreamingHttpResponse(iter_statement_csv(agency.id), content_type='text/csv')
+            extension = 'csv'
+        else:
+            response = StreamingHttpResponse(iter_statement_ndjson(agency.id), content_type='application/x-ndjson')
+            extension = 'ndjson'
+        response['Content-Disposition'] = f'attachment; filename="agency-{agency.id}-ledger.{extension}"'
+        return response
 
 
 
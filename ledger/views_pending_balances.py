@@ -11,7 +11,13 @@ from django.db.models import Sum, Q, Count
 from decimal import Decimal
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
-from ledger.models import LedgerEntry
+from ledger.models import LedgerEntry, LedgerBalance
+from ledger.balances import (
+    pending_scope_balances,
+    organization_pair_balances,
+    internal_note_ids_by_scope,
+    scope_totals,
+)
 from organization.models import Organization, Branch, Agency
 from area_leads.models import AreaLead
 
@@ -52,55 +58,29 @@ def agents_pending_balances(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Get all agencies for this organization (via branches)
-    agencies = Agency.objects.filter(
-        branch__organization=organization
-    ).distinct()
+    # Balances come from the LedgerBalance snapshot in one query
+    balances = pending_scope_balances(
+        LedgerBalance.SCOPE_AGENCY,
+        Agency.objects.filter(branch__organization=organization).values('id'),
+    )
+    agencies = Agency.objects.filter(id__in=list(balances)).prefetch_related('user')
+    note_ids = internal_note_ids_by_scope('agency_id', balances)
     
     pending_agents = []
     
     for agency in agencies:
-        # Calculate final balance from ledger entries
-        # Sum all debits and credits for this agency
-        ledger_summary = LedgerEntry.objects.filter(
-            agency=agency,
-            reversed=False  # Exclude reversed entries
-        ).aggregate(
-            total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-            total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-        )
-        
-        total_debit = ledger_summary['total_debit'] or Decimal('0.00')
-        total_credit = ledger_summary['total_credit'] or Decimal('0.00')
-        final_balance = total_debit - total_credit
+        final_balance = balances[agency.id]
+        agent_user = next(iter(agency.user.all()), None)
+        contact_no = getattr(agency, 'phone_number', '') or ''
         
-        # Only include agents with negative balance (they owe money)
-        if final_balance < 0:
-            # Get internal notes from ledger entries
-            internal_note_ids = list(
-                LedgerEntry.objects.filter(
-                    agency=agency,
-                    reversed=False
-                ).exclude(
-                    internal_notes=[]
-                ).values_list('id', flat=True)
-            )
-            
-            # Get agent details
-            agent_user = None
-            contact_no = ""
-            if hasattr(agency, 'user'):
-                agent_user = agency.user
-                contact_no = getattr(agent_user, 'phone', '') or getattr(agency, 'contact_number', '')
-            
-            pending_agents.append({
-                "agent_id": f"AGT{agency.id:03d}",
-                "agency_name": agency.name,
-                "agent_name": agent_user.get_full_name() if agent_user else agency.name,
-                "contact_no": contact_no or "N/A",
-                "pending_balance": float(final_balance),
-                "internal_note_ids": internal_note_ids
-            })
+        pending_agents.append({
+            "agent_id": f"AGT{agency.id:03d}",
+            "agency_name": agency.name,
+            "agent_name": (agent_user.get_full_name() or agency.name) if agent_user else agency.name,
+            "contact_no": contact_no or "N/A",
+            "pending_balance": float(final_balance),
+            "internal_note_ids": note_ids.get(agency.id, [])
+        })
     
     return Response({
         "organization_id": f"ORG{organization.id:05d}",
@@ -148,44 +128,26 @@ def area_agents_pending_balances(request):
     
     # Get all area leads (simplified - no organization filter since AreaLead doesn't have organization FK)
     # In a real scenario, you might filter area leads based on branches they manage
-    area_leads = AreaLead.objects.all()
+    balances = pending_scope_balances(
+        LedgerBalance.SCOPE_AREA_AGENCY,
+        AreaLead.objects.values('id'),
+    )
+    area_leads = AreaLead.objects.filter(id__in=list(balances))
+    note_ids = internal_note_ids_by_scope('area_agency_id', balances)
     
     pending_area_agents = []
     
     for area_lead in area_leads:
-        # Calculate final balance from ledger entries
-        ledger_summary = LedgerEntry.objects.filter(
-            area_agency=area_lead,
-            reversed=False
-        ).aggregate(
-            total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-            total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-        )
+        final_balance = balances[area_lead.id]
+        contact_no = getattr(area_lead, 'phone', '') or getattr(area_lead, 'contact_number', '')
         
-        total_debit = ledger_summary['total_debit'] or Decimal('0.00')
-        total_credit = ledger_summary['total_credit'] or Decimal('0.00')
-        final_balance = total_debit - total_credit
-        
-        # Only include area agents with negative balance
-        if final_balance < 0:
-            internal_note_ids = list(
-                LedgerEntry.objects.filter(
-                    area_agency=area_lead,
-                    reversed=False
-                ).exclude(
-                    internal_notes=[]
-                ).values_list('id', flat=True)
-            )
-            
-            contact_no = getattr(area_lead, 'phone', '') or getattr(area_lead, 'contact_number', '')
-            
-            pending_area_agents.append({
-                "area_agent_id": f"AREA{area_lead.id:03d}",
-                "area_agent_name": getattr(area_lead, 'name', f"Area Lead #{area_lead.id}"),
-                "contact_no": contact_no or "N/A",
-                "pending_balance": float(final_balance),
-                "internal_note_ids": internal_note_ids
-            })
+        pending_area_agents.append({
+            "area_agent_id": f"AREA{area_lead.id:03d}",
+            "area_agent_name": getattr(area_lead, 'name', f"Area Lead #{area_lead.id}"),
+            "contact_no": contact_no or "N/A",
+            "pending_balance": float(final_balance),
+            "internal_note_ids": note_ids.get(area_lead.id, [])
+        })
     
     return Response({
         "organization_id": f"ORG{organization.id:05d}",
@@ -232,44 +194,26 @@ def branch_pending_balances(request):
         )
     
     # Get all branches for this organization
-    branches = Branch.objects.filter(organization=organization)
+    balances = pending_scope_balances(
+        LedgerBalance.SCOPE_BRANCH,
+        Branch.objects.filter(organization=organization).values('id'),
+    )
+    branches = Branch.objects.filter(id__in=list(balances))
+    note_ids = internal_note_ids_by_scope('branch_id', balances)
     
     pending_branches = []
     
     for branch in branches:
-        # Calculate final balance from ledger entries
-        ledger_summary = LedgerEntry.objects.filter(
-            branch=branch,
-            reversed=False
-        ).aggregate(
-            total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-            total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-        )
+        final_balance = balances[branch.id]
+        contact_no = getattr(branch, 'phone', '') or getattr(branch, 'contact_number', '')
         
-        total_debit = ledger_summary['total_debit'] or Decimal('0.00')
-        total_credit = ledger_summary['total_credit'] or Decimal('0.00')
-        final_balance = total_debit - total_credit
-        
-        # Only include branches with negative balance
-        if final_balance < 0:
-            internal_note_ids = list(
-                LedgerEntry.objects.filter(
-                    branch=branch,
-                    reversed=False
-                ).exclude(
-                    internal_notes=[]
-                ).values_list('id', flat=True)
-            )
-            
-            contact_no = getattr(branch, 'phone', '') or getattr(branch, 'contact_number', '')
-            
-            pending_branches.append({
-                "branch_id": f"BRN{branch.id:04d}",
-                "branch_name": branch.name,
-                "contact_no": contact_no or "N/A",
-                "pending_balance": float(final_balance),
-                "internal_note_ids": internal_note_ids
-            })
+        pending_branches.append({
+            "branch_id": f"BRN{branch.id:04d}",
+            "branch_name": branch.name,
+            "contact_no": contact_no or "N/A",
+            "pending_balance": float(final_balance),
+            "internal_note_ids": note_ids.get(branch.id, [])
+        })
     
     return Response({
         "organization_id": f"ORG{organization.id:05d}",
@@ -341,29 +285,11 @@ def organization_pending_balances(request):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Calculate balance between org1 and org2
-        # org1 as seller, org2 as inventory owner (org1 bought from org2)
-        ledger_summary_1 = LedgerEntry.objects.filter(
-            seller_organization=org1,
-            inventory_owner_organization=org2,
-            reversed=False
-        ).aggregate(
-            total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-            total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-        )
-        
-        # org2 as seller, org1 as inventory owner (org2 bought from org1)
-        ledger_summary_2 = LedgerEntry.objects.filter(
-            seller_organization=org2,
-            inventory_owner_organization=org1,
-            reversed=False
-        ).aggregate(
-            total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-            total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-        )
-        
-        org1_owes = (ledger_summary_1['total_debit'] or Decimal('0.00')) - (ledger_summary_1['total_credit'] or Decimal('0.00'))
-        org2_owes = (ledger_summary_2['total_debit'] or Decimal('0.00')) - (ledger_summary_2['total_credit'] or Decimal('0.00'))
+        # Calculate balance between org1 and org2 from the snapshot:
+        # (org1, org2) = org1 bought from org2, (org2, org1) = org2 bought from org1
+        pairs = organization_pair_balances(org1.id, org2.id)
+        org1_owes = pairs.get((org1.id, org2.id), Decimal('0.00'))
+        org2_owes = pairs.get((org2.id, org1.id), Decimal('0.00'))
         
         net_balance = org2_owes - org1_owes  # Positive means org2 owes org1
         
@@ -384,60 +310,20 @@ def organization_pending_balances(request):
     
     # If org2_id not provided, return all organizations with pending balance against org1
     else:
-        # Get all organizations that have transactions with org1
-        related_org_ids = set()
-        
-        # As seller
-        related_org_ids.update(
-            LedgerEntry.objects.filter(
-                seller_organization=org1,
-                reversed=False
-            ).exclude(
-                inventory_owner_organization__isnull=True
-            ).values_list('inventory_owner_organization_id', flat=True)
-        )
-        
-        # As inventory owner
-        related_org_ids.update(
-            LedgerEntry.objects.filter(
-                inventory_owner_organization=org1,
-                reversed=False
-            ).exclude(
-                seller_organization__isnull=True
-            ).values_list('seller_organization_id', flat=True)
-        )
+        # Net balance per counterparty organization from the snapshot
+        org1_owes = {}
+        org2_owes = {}
+        for (seller_id, owner_id), balance in organization_pair_balances(org1.id).items():
+            if seller_id == org1.id:
+                org1_owes[owner_id] = balance
+            if owner_id == org1.id:
+                org2_owes[seller_id] = balance
+        related_org_ids = set(org1_owes) | set(org2_owes)
         
         pending_organizations = []
         
-        for org_id in related_org_ids:
-            try:
-                org2 = Organization.objects.get(id=org_id)
-            except Organization.DoesNotExist:
-                continue
-            
-            # Calculate net balance
-            ledger_summary_1 = LedgerEntry.objects.filter(
-                seller_organization=org1,
-                inventory_owner_organization=org2,
-                reversed=False
-            ).aggregate(
-                total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-                total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-            )
-            
-            ledger_summary_2 = LedgerEntry.objects.filter(
-                seller_organization=org2,
-                inventory_owner_organization=org1,
-                reversed=False
-            ).aggregate(
-                total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-                total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-            )
-            
-            org1_owes = (ledger_summary_1['total_debit'] or Decimal('0.00')) - (ledger_summary_1['total_credit'] or Decimal('0.00'))
-            org2_owes = (ledger_summary_2['total_debit'] or Decimal('0.00')) - (ledger_summary_2['total_credit'] or Decimal('0.00'))
-            
-            net_balance = org2_owes - org1_owes
+        for org2 in Organization.objects.filter(id__in=related_org_ids).order_by('id'):
+            net_balance = org2_owes.get(org2.id, Decimal('0.00')) - org1_owes.get(org2.id, Decimal('0.00'))
             
             # Only include if there's a pending balance
             if net_balance != 0:
@@ -479,21 +365,25 @@ def final_balance(request):
         )
     
     entity_type = entity_type.lower()
+    balance_scope = None
     
     try:
         if entity_type == 'agent':
             entity = Agency.objects.get(id=entity_id)
             ledger_filter = Q(agency=entity)
+            balance_scope = LedgerBalance.SCOPE_AGENCY
             entity_name = entity.name
             
         elif entity_type == 'area_agent':
             entity = AreaLead.objects.get(id=entity_id)
             ledger_filter = Q(area_agency=entity)
+            balance_scope = LedgerBalance.SCOPE_AREA_AGENCY
             entity_name = getattr(entity, 'name', f"Area Lead #{entity.id}")
             
         elif entity_type == 'branch':
             entity = Branch.objects.get(id=entity_id)
             ledger_filter = Q(branch=entity)
+            balance_scope = LedgerBalance.SCOPE_BRANCH
             entity_name = entity.name
             
         elif entity_type == 'organization':
@@ -513,17 +403,20 @@ def final_balance(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Calculate total debit and credit
-    ledger_summary = LedgerEntry.objects.filter(
-        ledger_filter,
-        reversed=False
-    ).aggregate(
-        total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
-        total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
-    )
-    
-    total_debit = ledger_summary['total_debit'] or Decimal('0.00')
-    total_credit = ledger_summary['total_credit'] or Decimal('0.00')
+    # Calculate total debit and credit (snapshot for single-scope entities;
+    # organizations match on any of three columns so they are aggregated)
+    if balance_scope:
+        total_debit, total_credit = scope_totals(balance_scope, entity.id)
+    else:
+        ledger_summary = LedgerEntry.objects.filter(
+            ledger_filter,
+            reversed=False
+        ).aggregate(
+            total_debit=Sum('transaction_amount', filter=Q(transaction_type='debit')),
+            total_credit=Sum('transaction_amount', filter=Q(transaction_type='credit'))
+        )
+        total_debit = ledger_summary['total_debit'] or Decimal('0.00')
+        total_credit = ledger_summary['total_credit'] or Decimal('0.00')
     final_balance = total_debit - total_credit
     
     # Get last updated timestamp
@@ -1,14 +1,15 @@
 from django.utils.deprecation import MiddlewareMixin
 from .utils import build_log_payload
 from .utils import _sanitize_payload
-from .models import SystemLog
+from .writer import write_system_log
 from django.conf import settings
 
 
 class SystemLogMiddleware(MiddlewareMixin):
     """
     Middleware to capture POST/PUT/PATCH/DELETE and create a SystemLog entry.
-    It keeps the logic minimal to avoid interfering with responses.
+    It keeps the logic minimal to avoid interfering with responses; rows are
+    handed to the buffered writer (logs.writer) instead of inserted inline.
     """
 
     WATCH_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
@@ -31,7 +32,7 @@ class SystemLogMiddleware(MiddlewareMixin):
                 # Basic action type: METHOD + PATH (shortened)
                 action_type = f"{method.upper()} {request.path}"
 
-                SystemLog.objects.create(
+                write_system_log(
                     action_type=action_type[:100],
                     model_name=getattr(request, 'resolver_match', None) and getattr(request.resolver_match, 'view_name', None) or request.path[:100],
                     record_id=None,
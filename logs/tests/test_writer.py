@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from logs.models import SystemLog
+from logs.writer import SystemLogWriter
+
+
+class _ManualWriter(SystemLogWriter):
+    """Async writer without the worker thread so the test drives flushing."""
+
+    def _ensure_worker(self):
+        pass
+
+
+class SystemLogWriterTest(TestCase):
+    def test_sync_mode_writes_immediately(self):
+        writer = SystemLogWriter(async_mode=False)
+        self.assertTrue(writer.write(action_type="A", model_name="M", description="d", status="success"))
+        self.assertEqual(SystemLog.objects.count(), 1)
+        self.assertEqual(writer.stats()["written"], 1)
+
+    def test_async_rows_are_flushed_in_bulk(self):
+        writer = _ManualWriter(async_mode=True, batch_size=50)
+        for i in range(5):
+            writer.write(action_type=f"A{i}", model_name="M", description="d", status="success")
+        self.assertEqual(SystemLog.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            writer.flush()
+        self.assertEqual(SystemLog.objects.count(), 5)
+        self.assertEqual(writer.stats()["written"], 5)
+
+    def test_full_queue_drops_and_counts(self):
+        writer = _ManualWriter(async_mode=True, max_queue=2, put_timeout=0)
+        results = [
+            writer.write(action_type="A", model_name="M", description="d", status="success")
+            for _ in range(3)
+        ]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(writer.stats()["dropped"], 1)
+        writer.shutdown()
+        self.assertEqual(SystemLog.objects.count(), 2)
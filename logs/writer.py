@@ -0,0 +1,190 @@
+"""Buffered SystemLog writer.
+
+Audit rows used to be written with ``SystemLog.objects.create()`` inside the
+request cycle of every mutating request.  ``system_log_writer`` collects them
+in a bounded in-process queue instead; a daemon thread drains the queue and
+inserts the rows with ``bulk_create`` whenever ``BATCH_SIZE`` rows are
+waiting or ``FLUSH_INTERVAL`` seconds have passed.
+
+Configuration (``settings.SYSTEM_LOG_WRITER``)::
+
+    SYSTEM_LOG_WRITER = {
+        "ASYNC": True,          # False -> write synchronously (tests, scripts)
+        "MAX_QUEUE": 10000,     # rows buffered before new rows are dropped
+        "BATCH_SIZE": 200,
+        "FLUSH_INTERVAL": 1.0,  # seconds
+        "PUT_TIMEOUT": 0.05,    # seconds a request may wait for queue space
+    }
+
+When the queue stays full for ``PUT_TIMEOUT`` the row is dropped and
+counted, so a slow database never blocks requests for long.  Pending rows
+are flushed on interpreter shutdown.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ASYNC": True,
+    "MAX_QUEUE": 10000,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 1.0,
+    "PUT_TIMEOUT": 0.05,
+}
+
+
+def _config():
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, "SYSTEM_LOG_WRITER", {}) or {})
+    return conf
+
+
+class SystemLogWriter:
+    """Bounded queue of pending SystemLog rows drained by a worker thread."""
+
+    def __init__(self, async_mode=None, max_queue=None, batch_size=None, flush_interval=None, put_timeout=None):
+        conf = _config()
+        self.async_mode = conf["ASYNC"] if async_mode is None else async_mode
+        self.batch_size = batch_size or conf["BATCH_SIZE"]
+        self.flush_interval = flush_interval or conf["FLUSH_INTERVAL"]
+        self.put_timeout = conf["PUT_TIMEOUT"] if put_timeout is None else put_timeout
+        self._queue = queue.Queue(maxsize=max_queue or conf["MAX_QUEUE"])
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    # --- producer side -----------------------------------------------------
+
+    def write(self, **fields):
+        """Record a SystemLog row built from ``fields``.
+
+        Returns False when the row had to be dropped because the queue was
+        full, True otherwise.
+        """
+        from .models import SystemLog
+
+        if not self.async_mode:
+            try:
+                SystemLog.objects.create(**fields)
+                self.written += 1
+                return True
+            except Exception:
+                self.failed += 1
+                logger.exception("SystemLog write failed")
+                return False
+
+        self._ensure_worker()
+        try:
+            self._queue.put(SystemLog(**fields), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    # --- consumer side -----------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="system-log-writer", daemon=True)
+            self._thread.start()
+
+    def _drain(self, first=None):
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch):
+        from .models import SystemLog
+
+        if not batch:
+            return
+        try:
+            SystemLog.objects.bulk_create(batch, batch_size=self.batch_size)
+            with self._lock:
+                self.written += len(batch)
+        except Exception:
+            with self._lock:
+                self.failed += len(batch)
+            logger.exception("SystemLog bulk write of %s rows failed", len(batch))
+
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        pending = []
+        try:
+            while not self._stop.is_set():
+                timeout = max(0.0, deadline - time.monotonic())
+                try:
+                    pending.extend(self._drain(self._queue.get(timeout=timeout)))
+                except queue.Empty:
+                    pass
+                if len(pending) >= self.batch_size or time.monotonic() >= deadline:
+                    with self._flush_lock:
+                        self._write_batch(pending)
+                    pending = []
+                    deadline = time.monotonic() + self.flush_interval
+                    close_old_connections()
+        finally:
+            with self._flush_lock:
+                self._write_batch(pending)
+                self._write_batch(self._drain())
+
+    def flush(self):
+        """Synchronously write everything currently queued."""
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                self._write_batch(batch)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the worker and flush pending rows (graceful shutdown)."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        return {
+            "async": self.async_mode,
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+system_log_writer = SystemLogWriter()
+atexit.register(system_log_writer.shutdown)
+
+
+def write_system_log(**fields):
+    """Queue a SystemLog row through the shared writer."""
+    return system_log_writer.write(**fields)
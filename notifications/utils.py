@@ -5,7 +5,7 @@ notification helper without introducing extra dependencies. It currently logs th
 notification into SystemLog and returns True. Replace implementation to integrate
 with your real push/SMS/email system.
 """
-from logs.models import SystemLog
+from logs.writer import write_system_log
 
 
 def send_agent_message(agent_id, message, booking_id=None):
@@ -19,9 +19,9 @@ def send_agent_message(agent_id, message, booking_id=None):
     if booking_id:
         desc += f" (booking_id={booking_id})"
 
-    # Log as an info system log (status success assumed)
+    # Log as an info system log (status success assumed), buffered by logs.writer
     try:
-        SystemLog.objects.create(
+        write_system_log(
             action_type="notification:agent",
             model_name="Notification",
             record_id=booking_id,
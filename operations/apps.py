@@ -10,6 +10,7 @@ class OperationsConfig(AppConfig):
         # Import signal handlers to ensure they are registered when app is ready
         try:
             from . import signals  # noqa: F401
+            from . import availability  # noqa: F401
         except Exception:
             # Avoid breaking startup if signals cannot be imported; errors will be visible in logs
             pass
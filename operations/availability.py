@@ -0,0 +1,198 @@
+"""Room availability engine for the room map.
+
+``RoomMapViewSet.availability`` used to walk every HotelRooms row and run a
+bed count, a BookingHotelDetails lookup and a BookingPersonDetail lookup per
+room, then re-filter the beds again for the totals.  ``hotel_availability``
+builds the same payload with a fixed number of queries regardless of the
+hotel size:
+
+1. the hotel itself,
+2. rooms annotated with their free bed counts,
+3. booking hotel details overlapping the date window,
+4. guest names for the bookings found in (3).
+
+Results are cached per hotel and date window.  Every RoomDetails,
+HotelRooms, HotelOperation or BookingHotelDetails write, and every batch of
+generated hotel operations, bumps the hotel's version number (see the
+receivers at the bottom of this module, and ``universal.cache_versions``),
+so stale entries are simply never read again.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from universal import cache_versions
+from .bulk import operations_generated
+
+
+CACHE_PREFIX = "room_availability"
+CACHE_TIMEOUT = 5 * 60
+
+
+def _version_key(hotel_id):
+    return f"{CACHE_PREFIX}:version:{int(hotel_id)}"
+
+
+def _cache_key(hotel_id, organization_id, date_from, date_to):
+    return (
+        f"{CACHE_PREFIX}:{int(hotel_id)}:{cache_versions.version(_version_key(hotel_id))}:"
+        f"{int(organization_id)}:{date_from}:{date_to}"
+    )
+
+
+def invalidate_hotel_availability(*hotel_ids):
+    """Drop every cached availability window of the given hotels (after commit)."""
+    cache_versions.bump(*(_version_key(hotel_id) for hotel_id in {h for h in hotel_ids if h}))
+
+
+def _room_status(available_beds, capacity):
+    if available_beds == 0:
+        return 'occupied'
+    if available_beds < capacity:
+        return 'partially_occupied'
+    return 'available'
+
+
+def build_hotel_availability(hotel, organization_id, date_from, date_to):
+    """Compute the availability payload for ``hotel`` (three queries)."""
+    from tickets.models import HotelRooms
+    from booking.models import BookingHotelDetails, BookingPersonDetail
+
+    rooms = list(
+        HotelRooms.objects.filter(hotel_id=hotel.id, hotel__organization_id=organization_id)
+        .annotate(
+            free_beds=Count('details', filter=Q(details__is_assigned=False)),
+        )
+        .values('id', 'floor', 'room_type', 'room_number', 'total_beds', 'free_beds')
+        .order_by('id')
+    )
+
+    # first overlapping booking per room type, same pick as the old per-room .first()
+    booking_by_type = {}
+    overlapping = (
+        BookingHotelDetails.objects.filter(
+            hotel_id=hotel.id,
+            room_type__in={r['room_type'] for r in rooms},
+            check_in_date__lte=date_to,
+            check_out_date__gte=date_from,
+        )
+        .values('room_type', 'booking_id', 'check_in_date', 'check_out_date')
+        .order_by('id')
+    ) if rooms else []
+    for row in overlapping:
+        booking_by_type.setdefault(row['room_type'], row)
+
+    guests = {}
+    booking_ids = {row['booking_id'] for row in booking_by_type.values()}
+    if booking_ids:
+        persons = (
+            BookingPersonDetail.objects.filter(booking_id__in=booking_ids)
+            .values_list('booking_id', 'first_name', 'last_name')
+            .order_by('id')
+        )
+        for booking_id, first_name, last_name in persons:
+            guests.setdefault(booking_id, []).append(f"{first_name} {last_name}")
+
+    floors = {}
+    type_totals = {}
+    available_rooms = 0
+    available_beds = 0
+    for room in rooms:
+        free = room['free_beds']
+        booking = booking_by_type.get(room['room_type'])
+        floor = floors.setdefault(room['floor'], {
+            'floor_no': room['floor'],
+            'floor_map_url': '',
+            'rooms': [],
+        })
+        floor['rooms'].append({
+            'room_id': room['id'],
+            'room_no': room['room_number'],
+            'room_type': room['room_type'],
+            'capacity': room['total_beds'],
+            'available_beds': free,
+            'status': _room_status(free, room['total_beds']),
+            'current_booking_id': booking['booking_id'] if booking else None,
+            'guest_names': list(guests.get(booking['booking_id'], [])) if booking else [],
+            'checkin_date': booking['check_in_date'] if booking else None,
+            'checkout_date': booking['check_out_date'] if booking else None,
+        })
+
+        counts = type_totals.setdefault(room['room_type'], [0, 0])
+        counts[0] += 1
+        available_beds += free
+        if free:
+            available_rooms += 1
+            counts[1] += 1
+
+    response = {
+        'hotel_id': hotel.id,
+        'hotel_name': hotel.name,
+        'total_rooms': len(rooms),
+        'available_rooms': available_rooms,
+        'occupied_rooms': len(rooms) - available_rooms,
+        'available_beds': available_beds,
+        'floors': list(floors.values()),
+    }
+    for room_type, (total, available) in type_totals.items():
+        response[f"total_{room_type.lower()}-rooms"] = total
+        response[f"available_{room_type.lower()}-rooms"] = available
+    return response
+
+
+def hotel_availability(hotel_id, organization_id, date_from, date_to, use_cache=True):
+    """Availability payload for the room map, or None if the hotel is not visible.
+
+    ``date_from`` / ``date_to`` are passed through to the overlap filter as
+    given (ISO date strings or dates).
+    """
+    from tickets.models import Hotels
+
+    key = _cache_key(hotel_id, organization_id, date_from, date_to)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    hotel = Hotels.objects.filter(id=hotel_id, organization_id=organization_id).only('id', 'name').first()
+    if not hotel:
+        return None
+
+    result = build_hotel_availability(hotel, organization_id, date_from, date_to)
+    if use_cache:
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+@receiver(post_save, sender="tickets.RoomDetails")
+@receiver(post_delete, sender="tickets.RoomDetails")
+def room_details_changed(sender, instance, **kwargs):
+    from tickets.models import HotelRooms
+
+    hotel_id = HotelRooms.objects.filter(pk=instance.room_id).values_list('hotel_id', flat=True).first()
+    invalidate_hotel_availability(hotel_id)
+
+
+@receiver(post_save, sender="tickets.HotelRooms")
+@receiver(post_delete, sender="tickets.HotelRooms")
+def hotel_room_changed(sender, instance, **kwargs):
+    invalidate_hotel_availability(instance.hotel_id)
+
+
+@receiver(post_save, sender="operations.HotelOperation")
+@receiver(post_delete, sender="operations.HotelOperation")
+def hotel_operation_changed(sender, instance, **kwargs):
+    invalidate_hotel_availability(instance.hotel_id)
+
+
+@receiver(operations_generated)
+def hotel_operations_generated(sender, operations, **kwargs):
+    if sender._meta.label == "operations.HotelOperation":
+        invalidate_hotel_availability(*{operation.hotel_id for operation in operations})
+
+
+@receiver(post_save, sender="booking.BookingHotelDetails")
+@receiver(post_delete, sender="booking.BookingHotelDetails")
+def booking_hotel_details_changed(sender, instance, **kwargs):
+    invalidate_hotel_availability(instance.hotel_id)
@@ -0,0 +1,229 @@
+"""Bulk generation of daily operations for the pax of a booking.
+
+The ``bulk-create`` endpoints of the hotel, transport, food, airport and
+ziyarat viewsets used to call ``objects.create()`` once per pax, so every row
+was its own INSERT plus a round of post_save work (the room signal's
+transaction, an availability cache bump per row).  ``generate`` builds the
+rows in memory and writes them with one ``bulk_create``:
+
+    operations = generate("hotel", booking, user=request.user, hotel=hotel,
+                          check_in_date=..., check_out_date=..., city="Makkah")
+
+``bulk_create`` sends no post_save, so the side effects run once per batch
+instead: ``operations_generated`` is sent once per model with every new row
+(the availability engine invalidates each hotel once from it).  Generated
+rows are always pending, which is the one status ``hotel_operation_post_save``
+has nothing to do for.
+
+``generate_itinerary`` creates a whole booking's hotel, transport, food,
+airport and ziyarat operations in one transaction from a single pax query.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from booking.models import BookingPersonDetail
+from .models import HotelOperation, TransportOperation, FoodOperation, AirportOperation, ZiyaratOperation
+
+
+# sent with sender=<operation model>, booking=<Booking>, operations=[...]
+operations_generated = Signal()
+
+BATCH_SIZE = 500
+
+
+def booking_pax(booking):
+    return list(BookingPersonDetail.objects.filter(booking=booking).order_by('id'))
+
+
+def _named(pax_list):
+    """Food and airport operations have always skipped pax without a full name."""
+    return [pax for pax in pax_list if pax.first_name and pax.last_name]
+
+
+def _pax_fields(booking, pax, user):
+    return {
+        'booking': booking,
+        'pax': pax,
+        'booking_id_str': booking.booking_number or str(booking.id),
+        'pax_id_str': str(pax.id),
+        'pax_first_name': pax.first_name or '',
+        'pax_last_name': pax.last_name or '',
+        'contact_no': pax.contact_number or '',
+        'created_by': user,
+    }
+
+
+def build_hotel_operations(booking, pax_list, hotel, check_in_date, check_out_date, city, user=None):
+    return [
+        HotelOperation(
+            hotel=hotel,
+            hotel_name=hotel.name,
+            city=city,
+            date=check_in_date,  # check-in date is the operation date
+            check_in_date=check_in_date,
+            check_out_date=check_out_date,
+            status='pending',
+            **_pax_fields(booking, pax, user)
+        )
+        for pax in pax_list
+    ]
+
+
+def build_transport_operations(booking, pax_list, date, pickup_location, drop_location, vehicle=None,
+                               driver_name='', driver_contact='', pickup_time=None, user=None):
+    return [
+        TransportOperation(
+            pickup_location=pickup_location,
+            drop_location=drop_location,
+            vehicle=vehicle,
+            vehicle_name=vehicle.vehicle_name if vehicle else '',
+            driver_name=driver_name,
+            driver_contact=driver_contact,
+            date=date,
+            pickup_time=pickup_time,
+            status='pending',
+            **_pax_fields(booking, pax, user)
+        )
+        for pax in pax_list
+    ]
+
+
+def build_food_operations(booking, pax_list, meal_type, location, date, city='', meal_time=None,
+                          special_requirements='', user=None):
+    return [
+        FoodOperation(
+            meal_type=meal_type,
+            location=location,
+            city=city,
+            date=date,
+            meal_time=meal_time,
+            special_requirements=special_requirements,
+            status='pending',
+            **_pax_fields(booking, pax, user)
+        )
+        for pax in _named(pax_list)
+    ]
+
+
+def build_airport_operations(booking, pax_list, transfer_type, flight_number, flight_time, date,
+                             pickup_point, drop_point, notes='', user=None):
+    return [
+        AirportOperation(
+            transfer_type=transfer_type,
+            flight_number=flight_number,
+            flight_time=flight_time,
+            date=date,
+            pickup_point=pickup_point,
+            drop_point=drop_point,
+            status='waiting',
+            notes=notes,
+            **_pax_fields(booking, pax, user)
+        )
+        for pax in _named(pax_list)
+    ]
+
+
+def build_ziyarat_operations(booking, pax_list, location, date, pickup_time, guide_name='', notes='', user=None):
+    operations = []
+    for pax in pax_list:
+        fields = _pax_fields(booking, pax, user)
+        # what ZiyaratOperation.save() would have filled in
+        fields['contact_no'] = pax.contact_number
+        fields['pax_full_name'] = f"{fields['pax_first_name']} {fields['pax_last_name']}".strip()
+        operations.append(ZiyaratOperation(
+            location=location,
+            date=date,
+            pickup_time=pickup_time,
+            guide_name=guide_name,
+            notes=notes,
+            **fields
+        ))
+    return operations
+
+
+BUILDERS = {
+    'hotel': build_hotel_operations,
+    'transport': build_transport_operations,
+    'food': build_food_operations,
+    'airport': build_airport_operations,
+    'ziyarat': build_ziyarat_operations,
+}
+
+
+def _load(model, ids):
+    rows = model.objects.in_bulk(ids)
+    missing = set(ids) - set(rows)
+    if missing:
+        raise model.DoesNotExist(f"{model.__name__} {', '.join(map(str, sorted(missing)))} not found")
+    return rows
+
+
+def builder_params(kind, items):
+    """Builder parameters for validated serializer data (``hotel_id``/``vehicle_id`` become rows).
+
+    Hotels and vehicles referenced by ``items`` are loaded with one query;
+    an unknown id raises the model's ``DoesNotExist``.
+    """
+    items = [dict(item) for item in items]
+    if kind == 'hotel':
+        from tickets.models import Hotels
+        hotels = _load(Hotels, {item['hotel_id'] for item in items})
+        for item in items:
+            item['hotel'] = hotels[item.pop('hotel_id')]
+    elif kind == 'transport':
+        from booking.models import VehicleType
+        vehicles = _load(VehicleType, {item['vehicle_id'] for item in items if item.get('vehicle_id')})
+        for item in items:
+            vehicle_id = item.pop('vehicle_id', None)
+            item['vehicle'] = vehicles[vehicle_id] if vehicle_id else None
+    return items
+
+
+def insert(booking, operations):
+    """``bulk_create`` unsaved operations of one model and send ``operations_generated`` once.
+
+    Backends that do not return primary keys from a bulk insert (MySQL) get
+    the new rows re-read by booking, pax and insert time.
+    """
+    if not operations:
+        return []
+    model = type(operations[0])
+    started = timezone.now()
+    with transaction.atomic():
+        created = model.objects.bulk_create(operations, batch_size=BATCH_SIZE)
+        if any(operation.pk is None for operation in created):
+            created = list(model.objects.filter(
+                booking=booking,
+                pax_id__in={operation.pax_id for operation in operations},
+                created_at__gte=started,
+            ).order_by('id'))
+    operations_generated.send(sender=model, booking=booking, operations=created)
+    return created
+
+
+def generate(kind, booking, user=None, pax_list=None, **params):
+    """Create ``kind`` operations for every pax of ``booking``; returns the saved rows."""
+    if pax_list is None:
+        pax_list = booking_pax(booking)
+    return insert(booking, BUILDERS[kind](booking, pax_list, user=user, **params))
+
+
+def generate_itinerary(booking, itinerary, user=None):
+    """Create a booking's operations for several services at once.
+
+    ``itinerary`` maps a kind from ``BUILDERS`` to a list of parameter dicts,
+    e.g. ``{"hotel": [{"hotel": h, ...}], "food": [{...}, {...}]}``.  All
+    rows are written in one transaction with one bulk insert per model.  Returns
+    ``{kind: [operations]}``.
+    """
+    pax_list = booking_pax(booking)
+    unknown = set(itinerary) - set(BUILDERS)
+    if unknown:
+        raise ValueError(f"Unknown operation types: {', '.join(sorted(unknown))}")
+    built = {
+        kind: [operation for params in itinerary[kind] for operation in BUILDERS[kind](booking, pax_list, user=user, **params)]
+        for kind in BUILDERS if itinerary.get(kind)
+    }
+    with transaction.atomic():
+        return {kind: insert(booking, operations) for kind, operations in built.items()}
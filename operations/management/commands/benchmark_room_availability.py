@@ -0,0 +1,119 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from booking.models import Booking, BookingHotelDetails, BookingPersonDetail
+from operations.availability import build_hotel_availability, hotel_availability
+from organization.models import Agency, Branch, Organization
+from packages.models import City
+from tickets.models import HotelRooms, Hotels, RoomDetails
+
+
+ROOM_TYPES = ('double', 'triple', 'quad', 'quint')
+FLOORS = ('ground', '1', '2', '3', '4', '5', '6', '7', '8', '9')
+
+
+def _legacy_availability(hotel, organization_id, date_from, date_to):
+    """Previous per-room strategy: bed count plus two lookups for every room."""
+    rooms = HotelRooms.objects.filter(hotel_id=hotel.id, hotel__organization_id=organization_id).prefetch_related('details')
+    result = []
+    for room in rooms:
+        beds = room.details.all()
+        free = beds.filter(is_assigned=False).count()
+        detail = BookingHotelDetails.objects.filter(
+            hotel_id=hotel.id,
+            room_type=room.room_type,
+            check_in_date__lte=date_to,
+            check_out_date__gte=date_from,
+        ).first()
+        if detail:
+            list(BookingPersonDetail.objects.filter(booking_id=detail.booking_id))
+        result.append(free)
+    sum(beds.filter(is_assigned=False).count() for beds in [r.details.all() for r in rooms])
+    return result
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Build a synthetic hotel inside a rolled back transaction and compare '
+        'the room map availability engine with the legacy per-room loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=300)
+        parser.add_argument('--beds', type=int, default=4, help='beds per room')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--skip-legacy', action='store_true')
+
+    def _time(self, label, func, repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        queries = len(ctx.captured_queries)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - started) / repeat
+        self.stdout.write(f'{label:<8} {elapsed * 1000:8.1f} ms/call  {queries:5d} queries')
+
+    def _build_hotel(self, rooms, beds):
+        org = Organization.objects.create(name='Availability benchmark')
+        city = City.objects.create(organization=org, name='Makkah', code='MAK')
+        hotel = Hotels.objects.create(
+            organization=org, name='Benchmark Hotel', city=city, address='-',
+            available_start_date='2025-01-01', available_end_date='2026-12-31',
+        )
+        HotelRooms.objects.bulk_create([
+            HotelRooms(
+                hotel=hotel,
+                floor=FLOORS[i % len(FLOORS)],
+                room_type=ROOM_TYPES[i % len(ROOM_TYPES)],
+                room_number=str(100 + i),
+                total_beds=beds,
+            )
+            for i in range(rooms)
+        ])
+        room_ids = list(HotelRooms.objects.filter(hotel=hotel).values_list('id', flat=True))
+        RoomDetails.objects.bulk_create([
+            RoomDetails(room_id=room_id, bed_number=str(b + 1), is_assigned=(i + b) % 3 == 0)
+            for i, room_id in enumerate(room_ids)
+            for b in range(beds)
+        ], batch_size=1000)
+
+        user = User.objects.create_user(username='availability-benchmark')
+        branch = Branch.objects.create(organization=org, name='Benchmark')
+        agency = Agency.objects.create(branch=branch, name='Benchmark')
+        for room_type in ROOM_TYPES:
+            booking = Booking.objects.create(user=user, organization=org, branch=branch, agency=agency)
+            BookingHotelDetails.objects.create(
+                booking=booking, hotel=hotel, room_type=room_type,
+                check_in_date='2025-10-01', check_out_date='2025-10-10',
+            )
+            BookingPersonDetail.objects.bulk_create([
+                BookingPersonDetail(booking=booking, first_name=f'Guest{p}', last_name=room_type)
+                for p in range(beds)
+            ])
+        return hotel, org
+
+    def handle(self, *args, **options):
+        date_from, date_to = '2025-10-01', '2025-10-05'
+        try:
+            with transaction.atomic():
+                hotel, org = self._build_hotel(options['rooms'], options['beds'])
+                self.stdout.write(f"Hotel with {options['rooms']} rooms x {options['beds']} beds")
+
+                if not options['skip_legacy']:
+                    self._time('legacy', lambda: _legacy_availability(hotel, org.id, date_from, date_to), options['repeat'])
+                self._time('engine', lambda: build_hotel_availability(hotel, org.id, date_from, date_to), options['repeat'])
+                hotel_availability(hotel.id, org.id, date_from, date_to)
+                self._time('cached', lambda: hotel_availability(hotel.id, org.id, date_from, date_to), options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Synthetic hotel rolled back'))
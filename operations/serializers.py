@@ -504,23 +504,16 @@ class HotelStatusUpdateSerializer(serializers.Serializer):
         return data
 
 
-class BulkHotelOperationCreateSerializer(serializers.Serializer):
+class HotelStaySerializer(serializers.Serializer):
     """
-    Serializer for bulk creating hotel operations from booking data.
+    One hotel stay of a booking's itinerary.
     """
     
-    booking_id = serializers.IntegerField(required=True)
     hotel_id = serializers.IntegerField(required=True)
     check_in_date = serializers.DateField(required=True)
     check_out_date = serializers.DateField(required=True)
     city = serializers.CharField(required=True)
     
-    def validate_booking_id(self, value):
-        """Validate booking exists"""
-        if not Booking.objects.filter(id=value).exists():
-            raise serializers.ValidationError(f"Booking with id {value} does not exist")
-        return value
-    
     def validate_hotel_id(self, value):
         """Validate hotel exists"""
         if not Hotels.objects.filter(id=value).exists():
@@ -534,6 +527,20 @@ class BulkHotelOperationCreateSerializer(serializers.Serializer):
         return data
 
 
+class BulkHotelOperationCreateSerializer(HotelStaySerializer):
+    """
+    Serializer for bulk creating hotel operations from booking data.
+    """
+    
+    booking_id = serializers.IntegerField(required=True)
+    
+    def validate_booking_id(self, value):
+        """Validate booking exists"""
+        if not Booking.objects.filter(id=value).exists():
+            raise serializers.ValidationError(f"Booking with id {value} does not exist")
+        return value
+
+
 # ===============================================
 # TRANSPORT OPERATION SERIALIZERS
 # ===============================================
@@ -797,12 +804,11 @@ class TransportStatusUpdateSerializer(serializers.Serializer):
         return value
 
 
-class BulkTransportOperationCreateSerializer(serializers.Serializer):
+class TransportLegSerializer(serializers.Serializer):
     """
-    Serializer for bulk creating transport operations from booking data.
+    One transport leg of a booking's itinerary.
     """
     
-    booking_id = serializers.IntegerField(required=True)
     date = serializers.DateField(required=True)
     pickup_location = serializers.CharField(required=True)
     drop_location = serializers.CharField(required=True)
@@ -811,12 +817,6 @@ class BulkTransportOperationCreateSerializer(serializers.Serializer):
     driver_contact = serializers.CharField(required=False, allow_blank=True)
     pickup_time = serializers.TimeField(required=False, allow_null=True)
     
-    def validate_booking_id(self, value):
-        """Validate booking exists"""
-        if not Booking.objects.filter(id=value).exists():
-            raise serializers.ValidationError(f"Booking with id {value} does not exist")
-        return value
-    
     def validate_vehicle_id(self, value):
         """Validate vehicle exists (if provided)"""
         if value and not VehicleType.objects.filter(id=value).exists():
@@ -824,6 +824,20 @@ class BulkTransportOperationCreateSerializer(serializers.Serializer):
         return value
 
 
+class BulkTransportOperationCreateSerializer(TransportLegSerializer):
+    """
+    Serializer for bulk creating transport operations from booking data.
+    """
+    
+    booking_id = serializers.IntegerField(required=True)
+    
+    def validate_booking_id(self, value):
+        """Validate booking exists"""
+        if not Booking.objects.filter(id=value).exists():
+            raise serializers.ValidationError(f"Booking with id {value} does not exist")
+        return value
+
+
 # ===============================================
 # PAX DETAILS SERIALIZER
 # ===============================================
@@ -1149,13 +1163,11 @@ class FoodStatusUpdateSerializer(serializers.Serializer):
         return data
 
 
-class BulkFoodOperationCreateSerializer(serializers.Serializer):
+class MealSerializer(serializers.Serializer):
     """
-    Serializer for bulk creating food operations from booking data.
-    Creates operations for all pax in a booking for a specific meal.
+    One meal of a booking's itinerary.
     """
     
-    booking_id = serializers.IntegerField(required=True)
     meal_type = serializers.ChoiceField(
         choices=['breakfast', 'lunch', 'dinner', 'snack'],
         required=True
@@ -1165,6 +1177,15 @@ class BulkFoodOperationCreateSerializer(serializers.Serializer):
     date = serializers.DateField(required=True)
     meal_time = serializers.TimeField(required=False, allow_null=True)
     special_requirements = serializers.CharField(required=False, allow_blank=True)
+
+
+class BulkFoodOperationCreateSerializer(MealSerializer):
+    """
+    Serializer for bulk creating food operations from booking data.
+    Creates operations for all pax in a booking for a specific meal.
+    """
+    
+    booking_id = serializers.IntegerField(required=True)
     
     def validate_booking_id(self, value):
         """Validate booking exists"""
@@ -1425,13 +1446,11 @@ class AirportStatusUpdateSerializer(serializers.Serializer):
         return data
 
 
-class BulkAirportOperationCreateSerializer(serializers.Serializer):
+class AirportTransferSerializer(serializers.Serializer):
     """
-    Serializer for bulk creating airport operations from booking data.
-    Creates operations for all pax in a booking.
+    One airport transfer of a booking's itinerary.
     """
     
-    booking_id = serializers.IntegerField(required=True)
     transfer_type = serializers.ChoiceField(
         choices=['pickup', 'drop'],
         required=True
@@ -1442,6 +1461,15 @@ class BulkAirportOperationCreateSerializer(serializers.Serializer):
     pickup_point = serializers.CharField(required=True)
     drop_point = serializers.CharField(required=True)
     notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class BulkAirportOperationCreateSerializer(AirportTransferSerializer):
+    """
+    Serializer for bulk creating airport operations from booking data.
+    Creates operations for all pax in a booking.
+    """
+    
+    booking_id = serializers.IntegerField(required=True)
     
     def validate_booking_id(self, value):
         """Validate booking exists"""
@@ -1567,16 +1595,22 @@ class ZiyaratStatusUpdateSerializer(serializers.Serializer):
         return attrs
 
 
-class BulkZiyaratOperationCreateSerializer(serializers.Serializer):
+class ZiyaratVisitSerializer(serializers.Serializer):
     """
-    Serializer for bulk creating ziyarat operations for all passengers in a booking.
+    One ziyarat of a booking's itinerary.
     """
-    booking_id = serializers.IntegerField(help_text="Booking ID")
     location = serializers.CharField(max_length=200, help_text="Ziyarat location")
     date = serializers.DateField(help_text="Date of ziyarat")
     pickup_time = serializers.TimeField(help_text="Pickup time")
     guide_name = serializers.CharField(max_length=100, required=False, allow_blank=True)
     notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class BulkZiyaratOperationCreateSerializer(ZiyaratVisitSerializer):
+    """
+    Serializer for bulk creating ziyarat operations for all passengers in a booking.
+    """
+    booking_id = serializers.IntegerField(help_text="Booking ID")
     created_by = serializers.IntegerField(required=False, help_text="User ID creating the operations")
     
     def validate_booking_id(self, value):
@@ -1585,3 +1619,28 @@ class BulkZiyaratOperationCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError(f"Booking with id {value} does not exist")
         return value
 
+
+
+class BookingItineraryCreateSerializer(serializers.Serializer):
+    """
+    Serializer for generating a booking's hotel, transport, food, airport and
+    ziyarat operations in one request.
+    """
+    booking_id = serializers.IntegerField(help_text="Booking ID")
+    hotels = HotelStaySerializer(many=True, required=False)
+    transport = TransportLegSerializer(many=True, required=False)
+    food = MealSerializer(many=True, required=False)
+    airport = AirportTransferSerializer(many=True, required=False)
+    ziyarats = ZiyaratVisitSerializer(many=True, required=False)
+    
+    def validate_booking_id(self, value):
+        """Validate booking exists"""
+        if not Booking.objects.filter(id=value).exists():
+            raise serializers.ValidationError(f"Booking with id {value} does not exist")
+        return value
+    
+    def validate(self, data):
+        """Require at least one service"""
+        if not any(data.get(name) for name in ('hotels', 'transport', 'food', 'airport', 'ziyarats')):
+            raise serializers.ValidationError("At least one of hotels, transport, food, airport or ziyarats is required")
+        return data
@@ -147,78 +147,255 @@ def mark_room_available(roommap: RoomMap, user=None):
     return roommap
 
 
-def assign_beds_for_booking(booking, user=None, group_pax=True):
-    """Attempt to auto-assign unassigned pax in a booking to available beds.
+_MALE_TITLES = frozenset(('mr', 'mstr', 'master'))
+_FEMALE_TITLES = frozenset(('mrs', 'ms', 'miss'))
 
-    Behavior (defaults):
-    - For each pax in booking.person_details, if there is no HotelOperation already, try to find a first-available bed
-      in the booking.hotel_details (matching room_type). Assign the pax to that bed and create HotelOperation + OperationLog.
-    - Persist results into BookingHotelDetails.room_assignments as a list of dicts.
 
-    Returns: list of assignment dicts: { 'pax_id': ..., 'booking_hotel_detail_id': ..., 'room_no': ..., 'bed_no': ... }
+class BedAllocationConflict(Exception):
+    """A planned bed was taken by a concurrent assignment."""
+
+
+def _pax_gender(pax):
+    title = (pax.person_title or '').strip().rstrip('.').lower()
+    if title in _MALE_TITLES:
+        return 'male'
+    if title in _FEMALE_TITLES:
+        return 'female'
+    return None
+
+
+def _group_pax(pax_list, group_pax=True):
+    """Split pax into allocation groups of ``(tag, members)``.
+
+    With ``group_pax`` members of the same family (``family_number``) are
+    kept together and never share a room with anyone else, larger families
+    first; the remaining pax are grouped by gender (from ``person_title``)
+    so rooms are not mixed.  Without it every pax is placed on its own.
+    """
+    if not group_pax:
+        return [(None, [pax]) for pax in pax_list]
+
+    families = {}
+    singles = {}
+    for pax in pax_list:
+        if pax.family_number:
+            families.setdefault(pax.family_number, []).append(pax)
+        else:
+            singles.setdefault(_pax_gender(pax), []).append(pax)
+
+    groups = [
+        (('family', number), members)
+        for number, members in sorted(families.items(), key=lambda item: -len(item[1]))
+    ]
+    groups += [(('gender', gender), members) for gender, members in singles.items()]
+    return groups
+
+
+def _place_group(tag, members, rooms):
+    """Place ``members`` into ``rooms`` in memory.
+
+    Picks the tightest room that fits the whole group, otherwise fills the
+    emptiest room and repeats. Rooms already holding another group are
+    skipped. Returns ``(placed, remaining)`` where placed holds
+    ``(pax, room, bed)`` tuples.
+    """
+    placed = []
+    remaining = list(members)
+    while remaining:
+        open_rooms = [r for r in rooms if r['beds'] and (tag is None or r['tag'] in (None, tag))]
+        if not open_rooms:
+            break
+        if tag is None:
+            room = open_rooms[0]
+        else:
+            fitting = [r for r in open_rooms if len(r['beds']) >= len(remaining)]
+            if fitting:
+                room = min(fitting, key=lambda r: len(r['beds']))
+            else:
+                room = max(open_rooms, key=lambda r: len(r['beds']))
+            room['tag'] = tag
+        while remaining and room['beds']:
+            placed.append((remaining.pop(0), room, room['beds'].pop(0)))
+    return placed, remaining
+
+
+def plan_bed_assignments(booking, group_pax=True):
+    """Work out bed assignments for the unassigned pax of ``booking``.
+
+    Free beds of every hotel in ``booking.hotel_details`` are loaded with a
+    single query and the allocation runs in memory, trying the hotel
+    details in order (matching room_type when set). Nothing is written.
+
+    Returns ``(plan, unassigned)``: plan entries are dicts with ``pax``,
+    ``detail``, ``room`` and ``bed``; unassigned is a list of pax.
     """
-    HotelRooms = _get_hotel_room_model()
     RoomDetails = _get_room_details_model()
-    assignments = []
 
-    # simple transactional loop to avoid races
+    hotel_details = list(booking.hotel_details.order_by('id'))
+    assigned_pax = set(
+        HotelOperation.objects.filter(booking=booking).exclude(status='canceled').values_list('pax_id', flat=True).order_by()
+    )
+    pax_list = [p for p in booking.person_details.order_by('id') if p.id not in assigned_pax]
+    if not pax_list or not hotel_details:
+        return [], pax_list
+
+    rooms = {}
+    beds = (
+        RoomDetails.objects.filter(is_assigned=False, room__hotel_id__in={bh.hotel_id for bh in hotel_details})
+        .values_list('id', 'bed_number', 'room_id', 'room__hotel_id', 'room__room_type', 'room__room_number')
+        .order_by('room__room_number', 'room_id', 'id')
+    )
+    for bed_id, bed_number, room_id, hotel_id, room_type, room_number in beds:
+        room = rooms.setdefault(room_id, {
+            'id': room_id,
+            'hotel_id': hotel_id,
+            'room_type': room_type,
+            'room_number': room_number,
+            'beds': [],
+            'tag': None,
+        })
+        room['beds'].append({'id': bed_id, 'bed_number': bed_number})
+    rooms = list(rooms.values())
+
+    plan = []
+    unassigned = []
+    for tag, members in _group_pax(pax_list, group_pax):
+        for bh in hotel_details:
+            candidates = [
+                r for r in rooms
+                if r['hotel_id'] == bh.hotel_id and (not bh.room_type or r['room_type'] == bh.room_type)
+            ]
+            placed, members = _place_group(tag, members, candidates)
+            plan.extend({'pax': pax, 'detail': bh, 'room': room, 'bed': bed} for pax, room, bed in placed)
+            if not members:
+                break
+        unassigned.extend(members)
+    return plan, unassigned
+
+
+def _commit_bed_plan(booking, plan, user=None):
+    """Persist ``plan`` with bulk writes inside one transaction.
+
+    Raises BedAllocationConflict (rolling everything back) when any planned
+    bed was assigned by someone else since it was read.
+    """
+    from tickets.models import Hotels
+    from .availability import invalidate_hotel_availability
+
+    RoomDetails = _get_room_details_model()
+
+    hotel_ids = {entry['room']['hotel_id'] for entry in plan}
+    hotels = Hotels.objects.select_related('city').in_bulk(hotel_ids)
+    roommap_filter = {(entry['room']['hotel_id'], entry['room']['room_number']) for entry in plan}
+    roommaps = {
+        (rm.hotel_id, rm.room_no): rm
+        for rm in RoomMap.objects.filter(hotel_id__in=hotel_ids, room_no__in={r for _, r in roommap_filter}).order_by()
+    }
+    check_date = getattr(booking, 'date', None)
+
     with transaction.atomic():
-        # Preload booking hotel details
-        hotel_details = list(booking.hotel_details.select_for_update())
+        details = {
+            bh.id: bh
+            for bh in BookingHotelDetails.objects.select_for_update().filter(booking=booking)
+        }
+        assigned_pax = set(
+            HotelOperation.objects.filter(booking=booking).exclude(status='canceled').values_list('pax_id', flat=True).order_by()
+        )
+        if assigned_pax.intersection(entry['pax'].id for entry in plan):
+            raise BedAllocationConflict("Pax assigned concurrently")
+
+        bed_ids = [entry['bed']['id'] for entry in plan]
+        taken = RoomDetails.objects.filter(id__in=bed_ids, is_assigned=False).update(is_assigned=True)
+        if taken != len(bed_ids):
+            raise BedAllocationConflict("Bed assigned concurrently")
+
+        operations = []
+        logs = []
+        for entry in plan:
+            pax, room, bed, bh = entry['pax'], entry['room'], entry['bed'], entry['detail']
+            hotel = hotels[room['hotel_id']]
+            roommap = roommaps.get((room['hotel_id'], room['room_number']))
+            check_in = bh.check_in_date or check_date
+            check_out = bh.check_out_date or check_date
+            operations.append(HotelOperation(
+                booking=booking,
+                pax=pax,
+                pax_id_str=str(pax.id),
+                pax_first_name=pax.first_name or '',
+                pax_last_name=pax.last_name or '',
+                booking_id_str=str(booking.id),
+                hotel=hotel,
+                hotel_name=hotel.name,
+                city=getattr(hotel.city, 'name', '') or '',
+                room=roommap,
+                room_no=room['room_number'],
+                bed_no=str(bed['bed_number']),
+                date=check_in,
+                check_in_date=check_in,
+                check_out_date=check_out,
+                status='checked_in',
+                created_by=user,
+                updated_by=user,
+            ))
+            logs.append(OperationLog(
+                action='assign',
+                room=roommap,
+                hotel=hotel,
+                performed_by=user,
+                performed_by_username=getattr(user, 'username', None) if user else None,
+                prev_status=None,
+                new_status='assigned',
+                reason=f'Assign via service for booking {booking.id}',
+            ))
+
+            locked = details.get(bh.id, bh)
+            if not isinstance(locked.room_assignments, list):
+                locked.room_assignments = list(locked.room_assignments) if locked.room_assignments else []
+            locked.room_assignments.append({'pax_id': pax.id, 'room_no': room['room_number'], 'bed_no': bed['bed_number']})
+
+        HotelOperation.objects.bulk_create(operations)
+        OperationLog.objects.bulk_create(logs)
+        touched = {entry['detail'].id for entry in plan}
+        BookingHotelDetails.objects.bulk_update([details[i] for i in touched if i in details], ['room_assignments'])
+        occupied = {rm.id for rm in (op.room for op in operations) if rm is not None}
+        if occupied:
+            RoomMap.objects.filter(id__in=occupied).update(availability_status='occupied')
+
+        invalidate_hotel_availability(*hotel_ids)
+
+
+def assign_beds_for_booking(booking, user=None, group_pax=True, dry_run=False, retries=3):
+    """Auto-assign the unassigned pax of a booking to available beds.
+
+    The allocation is planned in memory by ``plan_bed_assignments`` and then
+    written with bulk operations in one short transaction: beds are marked
+    assigned, HotelOperation and OperationLog rows are created, touched
+    RoomMaps are marked occupied and ``BookingHotelDetails.room_assignments``
+    is updated. If another request grabs one of the planned beds meanwhile
+    the plan is rebuilt (up to ``retries`` times).
+
+    With ``dry_run`` the plan is returned without writing anything.
 
-        # iterate through pax and try to assign each if not already assigned
-        for pax in booking.person_details.all():
-            # skip if already has HotelOperation
-            if HotelOperation.objects.filter(booking=booking, pax=pax).exists():
+    Returns: list of assignment dicts: { 'pax_id': ..., 'booking_hotel_detail_id': ..., 'room_no': ..., 'bed_no': ... }
+    """
+    for attempt in range(max(1, retries)):
+        plan, _unassigned = plan_bed_assignments(booking, group_pax=group_pax)
+        if plan and not dry_run:
+            try:
+                _commit_bed_plan(booking, plan, user=user)
+            except BedAllocationConflict:
+                if attempt + 1 >= retries:
+                    raise
                 continue
-
-            assigned = False
-            # try each hotel detail (in order). Default behaviour: match room_type if present
-            for bh in hotel_details:
-                # choose candidate rooms for this booking hotel detail
-                candidates = HotelRooms.objects.filter(hotel=bh.hotel)
-                if bh.room_type:
-                    candidates = candidates.filter(room_type=bh.room_type)
-
-                # order by id/room_number stable selection
-                candidates = candidates.order_by('room_number')
-
-                for hr in candidates:
-                    # find an unassigned bed
-                    rd = RoomDetails.objects.select_for_update().filter(room=hr, is_assigned=False).first()
-                    if not rd:
-                        continue
-
-                    # assign using existing helper (will create HotelOperation and OperationLog)
-                    try:
-                        assign_bed(hotel_room_id=hr.id, bed_no=rd.bed_number, booking=booking, pax=pax, user=user)
-                    except Exception:
-                        # skip failures and try next
-                        continue
-
-                    # append to booking hotel detail assignments
-                    try:
-                        # ensure bh instance is up-to-date
-                        if not isinstance(bh.room_assignments, list):
-                            bh.room_assignments = list(bh.room_assignments) if bh.room_assignments else []
-                        entry = {'pax_id': pax.id, 'room_no': hr.room_number, 'bed_no': rd.bed_number}
-                        bh.room_assignments.append(entry)
-                        bh.save()
-
-                        assignments.append({
-                            'pax_id': pax.id,
-                            'booking_hotel_detail_id': bh.id,
-                            'room_no': hr.room_number,
-                            'bed_no': rd.bed_number,
-                        })
-                        assigned = True
-                        break
-                    except Exception:
-                        # do not fail the whole transaction for a persistence issue
-                        assigned = True
-                        break
-
-                if assigned:
-                    break
-
-    return assignments
+        break
+
+    return [
+        {
+            'pax_id': entry['pax'].id,
+            'booking_hotel_detail_id': entry['detail'].id,
+            'hotel_room_id': entry['room']['id'],
+            'room_no': entry['room']['room_number'],
+            'bed_no': entry['bed']['bed_number'],
+        }
+        for entry in plan
+    ]
@@ -2,6 +2,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.db import transaction
 
+from booking.events import booking_events
 from .models import HotelOperation, RoomMap
 from . import services
 
@@ -60,12 +61,13 @@ def hotel_operation_post_save(sender, instance: HotelOperation, created, **kwarg
         pass
 
 
-@receiver(post_save, sender='booking.Booking')
-def booking_post_save(sender, instance, created, **kwargs):
+@booking_events.register("operations.booking_status")
+def booking_post_save(event):
     """Handle booking status transitions.
 
     - If booking.status indicates cancellation -> free all associated hotel operation beds and mark rooms available.
     """
+    instance = event.booking
     try:
         status = (getattr(instance, 'status', '') or '').lower()
         if 'cancel' in status:
@@ -90,30 +92,7 @@ def booking_post_save(sender, instance, created, **kwargs):
         # Auto-assign beds when booking is confirmed
         if 'confirm' in status:
             try:
-                from tickets.models import HotelRooms
-                # Use the first hotel detail as the allocation target (could be extended)
-                bh = getattr(instance, 'hotel_details', None)
-                bh_first = bh.first() if bh and bh.exists() else None
-                if bh_first:
-                    hotel_id = bh_first.hotel_id
-                    room_type = bh_first.room_type
-                    # iterate pax and try to allocate
-                    pax_list = getattr(instance, 'person_details', None)
-                    if pax_list:
-                        for pax in pax_list.all():
-                            # skip if operation already exists
-                            existing = HotelOperation.objects.filter(booking=instance, pax=pax).exclude(status='canceled').first()
-                            if existing:
-                                continue
-                            rooms = HotelRooms.objects.filter(hotel_id=hotel_id, room_type=room_type).prefetch_related('details')
-                            for room in rooms:
-                                bed = room.details.filter(is_assigned=False).first()
-                                if bed:
-                                    try:
-                                        services.assign_bed(hotel_room_id=room.id, bed_no=bed.bed_number, booking=instance, pax=pax, user=None)
-                                        break
-                                    except Exception:
-                                        continue
+                services.assign_beds_for_booking(instance)
             except Exception:
                 pass
     except Exception:
@@ -23,28 +23,31 @@ class AutoAssignTests(TestCase):
         self.agency = Agency.objects.create(branch=self.branch, name='Agency A')
 
     def test_booking_confirm_triggers_auto_assign(self):
-        booking = Booking.objects.create(
-            user=self.admin,
-            organization=self.org,
-            branch=self.branch,
-            agency=self.agency,
-            booking_number='B2',
-            status='pending'
-        )
+        # booking events are dispatched once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                user=self.admin,
+                organization=self.org,
+                branch=self.branch,
+                agency=self.agency,
+                booking_number='B2',
+                status='pending'
+            )
 
-        # add booking hotel detail linking to our hotel
-        bh = BookingHotelDetails.objects.create(
-            booking=booking,
-            hotel=self.hotel,
-            check_in_date='2025-10-20',
-            check_out_date='2025-10-22',
-            room_type='Single'
-        )
-        pax = BookingPersonDetail.objects.create(booking=booking, first_name='Auto', last_name='Assign')
+            # add booking hotel detail linking to our hotel
+            bh = BookingHotelDetails.objects.create(
+                booking=booking,
+                hotel=self.hotel,
+                check_in_date='2025-10-20',
+                check_out_date='2025-10-22',
+                room_type='Single'
+            )
+            pax = BookingPersonDetail.objects.create(booking=booking, first_name='Auto', last_name='Assign')
 
         # now confirm booking -> should trigger post_save and attempt assignment
         booking.status = 'confirmed'
-        booking.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
 
         # bed should now be assigned and a HotelOperation created
         bed = RoomDetails.objects.get(id=self.bed.id)
@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from booking.models import Booking, BookingHotelDetails, BookingPersonDetail
+from organization.models import Organization, Branch, Agency
+from packages.models import City
+from tickets.models import Hotels, HotelRooms, RoomDetails
+from .availability import hotel_availability
+
+
+class HotelAvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='OrgAV')
+        self.city = City.objects.create(organization=self.org, name='Makkah', code='MAK')
+        self.hotel = Hotels.objects.create(organization=self.org, name='Avail Hotel', city=self.city, address='Addr', available_start_date='2025-01-01', available_end_date='2026-01-01')
+        self.rooms = []
+        for i in range(6):
+            room = HotelRooms.objects.create(hotel=self.hotel, floor=str(i % 2 + 1), room_type='double' if i % 2 else 'quad', room_number=str(100 + i), total_beds=2)
+            RoomDetails.objects.create(room=room, bed_number='1', is_assigned=i < 2)
+            RoomDetails.objects.create(room=room, bed_number='2', is_assigned=i == 0)
+            self.rooms.append(room)
+
+        user = User.objects.create_user(username='avail')
+        branch = Branch.objects.create(organization=self.org, name='Main')
+        agency = Agency.objects.create(branch=branch, name='Agency')
+        self.booking = Booking.objects.create(user=user, organization=self.org, branch=branch, agency=agency)
+        BookingHotelDetails.objects.create(booking=self.booking, hotel=self.hotel, room_type='quad', check_in_date='2025-10-01', check_out_date='2025-10-05')
+        BookingPersonDetail.objects.create(booking=self.booking, first_name='Ali', last_name='Khan')
+
+    def _call(self):
+        return hotel_availability(self.hotel.id, self.org.id, '2025-10-02', '2025-10-03')
+
+    def test_payload_and_fixed_query_count(self):
+        # the hotel's cache version, then the four queries of the docstring
+        with self.assertNumQueries(5):
+            data = self._call()
+        self.assertEqual(data['total_rooms'], 6)
+        self.assertEqual(data['available_rooms'], 5)
+        self.assertEqual(data['occupied_rooms'], 1)
+        self.assertEqual(data['available_beds'], 9)
+        self.assertEqual(data['total_quad-rooms'], 3)
+        self.assertEqual(data['available_quad-rooms'], 2)
+
+        rooms = {r['room_id']: r for floor in data['floors'] for r in floor['rooms']}
+        self.assertEqual(rooms[self.rooms[0].id]['status'], 'occupied')
+        self.assertEqual(rooms[self.rooms[1].id]['status'], 'partially_occupied')
+        self.assertEqual(rooms[self.rooms[2].id]['guest_names'], ['Ali Khan'])
+        self.assertEqual(rooms[self.rooms[2].id]['current_booking_id'], self.booking.id)
+        self.assertIsNone(rooms[self.rooms[1].id]['current_booking_id'])
+
+    def test_cached_until_bed_changes(self):
+        self._call()
+        with self.assertNumQueries(0):
+            self._call()
+
+        RoomDetails.objects.filter(room=self.rooms[5]).update(is_assigned=True)
+        bed = RoomDetails.objects.filter(room=self.rooms[5]).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            bed.save()
+        self.assertEqual(self._call()['available_rooms'], 4)
+
+    def test_unknown_hotel(self):
+        self.assertIsNone(hotel_availability(self.hotel.id, self.org.id + 1, '2025-10-02', '2025-10-03'))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_room_availability', rooms=12, beds=2, repeat=1, stdout=out)
+        self.assertIn('engine', out.getvalue())
+        self.assertIn('rolled back', out.getvalue())
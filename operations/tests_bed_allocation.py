@@ -0,0 +1,88 @@
+from django.contrib.auth.models import Group, User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from booking.models import Booking, BookingHotelDetails, BookingPersonDetail
+from organization.models import Organization, Branch, Agency
+from packages.models import City
+from tickets.models import Hotels, HotelRooms, RoomDetails
+from users.models import GroupExtension
+from .models import HotelOperation, OperationLog
+from .services import assign_beds_for_booking
+
+
+class BulkBedAllocationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alloc')
+        self.org = Organization.objects.create(name='OrgAL')
+        city = City.objects.create(organization=self.org, name='Makkah', code='MAK')
+        self.hotel = Hotels.objects.create(organization=self.org, name='Alloc Hotel', city=city, address='Addr', available_start_date='2025-01-01', available_end_date='2026-01-01')
+        for i, beds in enumerate((2, 4, 4)):
+            room = HotelRooms.objects.create(hotel=self.hotel, floor='1', room_type='quad', room_number=str(101 + i), total_beds=beds)
+            for b in range(beds):
+                RoomDetails.objects.create(room=room, bed_number=str(b + 1))
+
+        branch = Branch.objects.create(organization=self.org, name='Main')
+        agency = Agency.objects.create(branch=branch, name='Agency')
+        self.booking = Booking.objects.create(user=self.user, organization=self.org, branch=branch, agency=agency)
+        self.detail = BookingHotelDetails.objects.create(booking=self.booking, hotel=self.hotel, room_type='quad', check_in_date='2025-10-01', check_out_date='2025-10-05')
+        self.family = [
+            BookingPersonDetail.objects.create(booking=self.booking, first_name=f'F{i}', last_name='Fam', family_number=1)
+            for i in range(3)
+        ]
+        self.men = [
+            BookingPersonDetail.objects.create(booking=self.booking, first_name=f'M{i}', last_name='Solo', person_title='Mr')
+            for i in range(2)
+        ]
+        self.women = [
+            BookingPersonDetail.objects.create(booking=self.booking, first_name='W', last_name='Solo', person_title='Mrs')
+        ]
+
+    def test_dry_run_returns_plan_without_writing(self):
+        plan = assign_beds_for_booking(self.booking, dry_run=True)
+        self.assertEqual(len(plan), 6)
+        self.assertFalse(RoomDetails.objects.filter(is_assigned=True).exists())
+        self.assertFalse(HotelOperation.objects.exists())
+
+    def test_family_and_gender_grouping(self):
+        plan = assign_beds_for_booking(self.booking, user=self.user)
+        rooms = {entry['pax_id']: entry['room_no'] for entry in plan}
+
+        family_rooms = {rooms[p.id] for p in self.family}
+        self.assertEqual(len(family_rooms), 1)
+        # the family has its room to itself and the genders are not mixed
+        others = {rooms[p.id] for p in self.men + self.women}
+        self.assertFalse(family_rooms & others)
+        self.assertNotEqual(rooms[self.men[0].id], rooms[self.women[0].id])
+        self.assertEqual(rooms[self.men[0].id], rooms[self.men[1].id])
+
+    def test_writes_are_bulk_and_persisted(self):
+        # constant: 6 reads, savepoint, 2 locked re-reads, 4 bulk writes, release
+        with self.assertNumQueries(14):
+            plan = assign_beds_for_booking(self.booking, user=self.user)
+        self.assertEqual(len(plan), 6)
+        self.assertEqual(RoomDetails.objects.filter(is_assigned=True).count(), 6)
+        self.assertEqual(HotelOperation.objects.filter(booking=self.booking).count(), 6)
+        self.assertEqual(OperationLog.objects.filter(action='assign').count(), 6)
+        self.detail.refresh_from_db()
+        self.assertEqual(len(self.detail.room_assignments), 6)
+
+        # already assigned pax are skipped on the next run
+        self.assertEqual(assign_beds_for_booking(self.booking), [])
+
+    def test_auto_assign_endpoint_is_limited_to_own_organization(self):
+        client = APIClient()
+        outsider = User.objects.create_user(username='outsider')
+        group = Group.objects.create(name='Other org staff')
+        GroupExtension.objects.create(group=group, organization=Organization.objects.create(name='Other'))
+        outsider.groups.add(group)
+        client.force_authenticate(outsider)
+        response = client.post('/api/operations/room-map/auto-assign/', {'booking_id': self.booking.pk}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(HotelOperation.objects.exists())
+
+        group.extended.organization = self.org
+        group.extended.save()
+        response = client.post('/api/operations/room-map/auto-assign/', {'booking_id': self.booking.pk, 'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['assignments']), 6)
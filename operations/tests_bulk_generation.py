@@ -0,0 +1,117 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from organization.models import Organization, Branch, Agency
+from packages.models import City
+from tickets.models import Hotels
+from booking.models import Booking, BookingPersonDetail
+
+from .models import HotelOperation, TransportOperation, FoodOperation, AirportOperation, ZiyaratOperation
+from universal import cache_versions
+from .availability import _version_key
+from . import bulk
+
+
+class BulkOperationGenerationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ops', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.org = Organization.objects.create(name='Org1')
+        self.branch = Branch.objects.create(name='Main', organization=self.org)
+        self.agency = Agency.objects.create(name='Agency1', branch=self.branch)
+        self.city = City.objects.create(organization=self.org, name='Makkah', code='MAK')
+        self.hotel = Hotels.objects.create(organization=self.org, name='Demo Hotel', city=self.city, address='Addr', available_start_date='2025-01-01', available_end_date='2026-01-01')
+
+        self.booking = Booking.objects.create(user=self.user, organization=self.org, branch=self.branch, agency=self.agency, booking_number='BKG-BULK', date='2025-11-01', status='confirmed')
+        self.pax = [
+            BookingPersonDetail.objects.create(booking=self.booking, first_name='Pax', last_name=str(i), contact_number=f'0300{i}')
+            for i in range(3)
+        ]
+        # unnamed pax get hotel, transport and ziyarat rows but no food or airport rows
+        self.unnamed = BookingPersonDetail.objects.create(booking=self.booking, first_name='Child')
+        cache.clear()
+
+    def test_generate_uses_one_insert_regardless_of_pax_count(self):
+        params = dict(hotel=self.hotel, check_in_date='2025-11-01', check_out_date='2025-11-05', city='Makkah')
+        pax_list = bulk.booking_pax(self.booking)
+        with self.assertNumQueries(3):  # savepoint, insert, release
+            small = bulk.generate('hotel', self.booking, user=self.user, pax_list=pax_list[:1], **params)
+        with self.assertNumQueries(3):
+            large = bulk.generate('hotel', self.booking, user=self.user, pax_list=pax_list, **params)
+
+        self.assertEqual(len(small), 1)
+        self.assertEqual(len(large), 4)
+        self.assertTrue(all(op.pk for op in large))
+        op = HotelOperation.objects.get(pk=large[0].pk)
+        self.assertEqual((op.booking_id_str, op.pax_id_str, op.hotel_name, op.status), ('BKG-BULK', str(self.pax[0].id), 'Demo Hotel', 'pending'))
+
+    def test_hotel_batch_invalidates_availability_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('daily-hotels-bulk-create'), {
+                'booking_id': self.booking.id, 'hotel_id': self.hotel.id,
+                'check_in_date': '2025-11-01', 'check_out_date': '2025-11-05', 'city': 'Makkah',
+            }, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(HotelOperation.objects.filter(booking=self.booking).count(), 4)
+        self.assertEqual(cache_versions.version(_version_key(self.hotel.id)), 2)
+
+    def test_sibling_endpoints(self):
+        response = self.client.post(reverse('daily-food-bulk-create'), {
+            'booking_id': self.booking.id, 'meal_type': 'lunch', 'location': 'Restaurant', 'date': '2025-11-02',
+            'special_requirements': 'no nuts',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(set(FoodOperation.objects.values_list('special_requirements', flat=True)), {'no nuts'})
+
+        response = self.client.post(reverse('daily-transport-bulk-create'), {
+            'booking_id': self.booking.id, 'date': '2025-11-05', 'pickup_location': 'A', 'drop_location': 'B',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(TransportOperation.objects.filter(booking=self.booking).count(), 4)
+
+        response = self.client.post(reverse('daily-ziyarats-bulk-create'), {
+            'booking_id': self.booking.id, 'location': 'Quba Mosque', 'date': '2025-11-06', 'pickup_time': '08:00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        ziyarat = ZiyaratOperation.objects.get(pax=self.pax[1])
+        self.assertEqual((ziyarat.booking_id_str, ziyarat.pax_full_name, ziyarat.contact_no), ('BKG-BULK', 'Pax 1', '03001'))
+
+    def test_generate_whole_itinerary(self):
+        response = self.client.post(reverse('daily-itinerary-generate'), {
+            'booking_id': self.booking.id,
+            'hotels': [
+                {'hotel_id': self.hotel.id, 'check_in_date': '2025-11-01', 'check_out_date': '2025-11-05', 'city': 'Makkah'},
+                {'hotel_id': self.hotel.id, 'check_in_date': '2025-11-05', 'check_out_date': '2025-11-08', 'city': 'Makkah'},
+            ],
+            'transport': [{'date': '2025-11-05', 'pickup_location': 'A', 'drop_location': 'B'}],
+            'food': [{'meal_type': 'breakfast', 'location': 'Hotel', 'date': '2025-11-02'}],
+            'airport': [{'transfer_type': 'pickup', 'flight_number': 'SV802', 'flight_time': '15:30', 'date': '2025-11-01',
+                         'pickup_point': 'Jeddah Airport', 'drop_point': 'Makkah Hotel'}],
+            'ziyarats': [{'location': 'Quba Mosque', 'date': '2025-11-06', 'pickup_time': '08:00'}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            {field: response.data[field]['count'] for field in ('hotels', 'transport', 'food', 'airport', 'ziyarats')},
+            {'hotels': 8, 'transport': 4, 'food': 3, 'airport': 3, 'ziyarats': 4},
+        )
+        self.assertEqual(HotelOperation.objects.filter(booking=self.booking).count(), 8)
+        self.assertEqual(AirportOperation.objects.get(pax=self.pax[2]).status, 'waiting')
+
+    def test_itinerary_rejects_unknown_hotel_without_writing(self):
+        response = self.client.post(reverse('daily-itinerary-generate'), {
+            'booking_id': self.booking.id,
+            'hotels': [{'hotel_id': 999999, 'check_in_date': '2025-11-01', 'check_out_date': '2025-11-05', 'city': 'Makkah'}],
+            'food': [{'meal_type': 'breakfast', 'location': 'Hotel', 'date': '2025-11-02'}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FoodOperation.objects.exists())
@@ -9,7 +9,7 @@ from .views import (
     ZiyaratOperationViewSet,
     PaxDetailViewSet
 )
-from .views import HotelRoomMapAPIView
+from .views import HotelRoomMapAPIView, BookingItineraryAPIView
 
 router = DefaultRouter()
 router.register(r'room-map', RoomMapViewSet, basename='room-map')
@@ -23,4 +23,5 @@ router.register(r'pax', PaxDetailViewSet, basename='pax')
 urlpatterns = [
     path('', include(router.urls)),
     path('hotels/room-map', HotelRoomMapAPIView.as_view(), name='hotel-room-map'),
+    path('daily/itinerary/generate', BookingItineraryAPIView.as_view(), name='daily-itinerary-generate'),
 ]
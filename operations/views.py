@@ -11,6 +11,7 @@ from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 from .models import RoomMap, HotelOperation, TransportOperation, FoodOperation, AirportOperation, ZiyaratOperation, OperationLog
+from . import bulk
 from .serializers import (
     RoomMapSerializer,
     RoomMapListSerializer,
@@ -36,6 +37,7 @@ from .serializers import (
     ZiyaratOperationListSerializer,
     ZiyaratStatusUpdateSerializer,
     BulkZiyaratOperationCreateSerializer,
+    BookingItineraryCreateSerializer,
     PaxDetailSerializer,
     PaxFullDetailSerializer
 )
@@ -80,6 +82,21 @@ from booking.models import Booking, BookingPersonDetail, VehicleType
     ),
 )
 class RoomMapViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for managing hotel room inventory (RoomMap).
+    
+    Endpoints:
+    - GET /api/room-map/ - List all rooms (with filters)
+    - POST /api/room-map/ - Create new room
+    - GET /api/room-map/{id}/ - Get specific room details
+    - PUT/PATCH /api/room-map/{id}/ - Update room details
+    - DELETE /api/room-map/{id}/ - Delete room
+    - GET /api/room-map/by-hotel/?hotel_id=X - List rooms by hotel
+    - GET /api/room-map/available/?hotel_id=X - List available rooms
+    - POST /api/room-map/{id}/mark-occupied/ - Mark room as occupied
+    - POST /api/room-map/{id}/mark-available/ - Mark room as available
+    """
+
     @action(detail=False, methods=['get'], url_path='availability')
     def availability(self, request):
         hotel_id = request.query_params.get('hotel_id')
@@ -89,76 +106,10 @@ class RoomMapViewSet(viewsets.ModelViewSet):
         if not hotel_id or not date_from or not date_to or not organization_id:
             return Response({'detail': "Missing 'organization', 'hotel_id', 'date_from', or 'date_to' query parameter."}, status=status_code.HTTP_400_BAD_REQUEST)
 
-        # Fetch hotel
-        from tickets.models import Hotels, HotelRooms, RoomDetails
-        from booking.models import BookingHotelDetails, BookingPersonDetail
-        hotel = Hotels.objects.filter(id=hotel_id, organization_id=organization_id).first()
-        if not hotel:
+        from .availability import hotel_availability
+        response = hotel_availability(hotel_id, organization_id, date_from, date_to)
+        if response is None:
             return Response({'error': 'Hotel not found or not accessible for this organization.'}, status=status_code.HTTP_404_NOT_FOUND)
-
-        # Fetch rooms and beds
-        rooms = HotelRooms.objects.filter(hotel_id=hotel_id, hotel__organization_id=organization_id).prefetch_related('details')
-        total_rooms = rooms.count()
-        room_type_counts = rooms.values('room_type').annotate(count=Count('id'))
-        floors = {}
-        for room in rooms:
-            floor_no = room.floor
-            if floor_no not in floors:
-                floors[floor_no] = {
-                    'floor_no': floor_no,
-                    'floor_map_url': '',  # Add logic for map URL if available
-                    'rooms': []
-                }
-            beds = room.details.all()
-            available_beds = beds.filter(is_assigned=False).count()
-            guest_names = []
-            current_booking_id = None
-            checkin_date = None
-            checkout_date = None
-            booking_detail = BookingHotelDetails.objects.filter(
-                hotel_id=hotel_id,
-                room_type=room.room_type,
-                check_in_date__lte=date_to,
-                check_out_date__gte=date_from
-            ).first()
-            if booking_detail:
-                current_booking_id = booking_detail.booking_id
-                checkin_date = booking_detail.check_in_date
-                checkout_date = booking_detail.check_out_date
-                pax_details = BookingPersonDetail.objects.filter(booking_id=booking_detail.booking_id)
-                guest_names = [f"{p.first_name} {p.last_name}" for p in pax_details]
-            status = 'available'
-            if available_beds == 0:
-                status = 'occupied'
-            elif available_beds < room.total_beds:
-                status = 'partially_occupied'
-            floors[floor_no]['rooms'].append({
-                'room_id': room.id,
-                'room_no': room.room_number,
-                'room_type': room.room_type,
-                'capacity': room.total_beds,
-                'available_beds': available_beds,
-                'status': status,
-                'current_booking_id': current_booking_id,
-                'guest_names': guest_names,
-                'checkin_date': checkin_date,
-                'checkout_date': checkout_date
-            })
-        available_rooms = sum(1 for r in rooms if any(b.is_assigned==False for b in r.details.all()))
-        occupied_rooms = total_rooms - available_rooms
-        available_beds = sum(beds.filter(is_assigned=False).count() for beds in [r.details.all() for r in rooms])
-        response = {
-            'hotel_id': hotel.id,
-            'hotel_name': hotel.name,
-            'total_rooms': total_rooms,
-            'available_rooms': available_rooms,
-            'occupied_rooms': occupied_rooms,
-            'available_beds': available_beds,
-            'floors': list(floors.values())
-        }
-        for rt in room_type_counts:
-            response[f"total_{rt['room_type'].lower()}-rooms"] = rt['count']
-            response[f"available_{rt['room_type'].lower()}-rooms"] = sum(1 for r in rooms if r.room_type==rt['room_type'] and any(b.is_assigned==False for b in r.details.all()))
         return Response(response)
 
     @extend_schema(request=AssignRoomSerializer, responses={200: HotelOperationSerializer})
@@ -270,20 +221,35 @@ class RoomMapViewSet(viewsets.ModelViewSet):
         }
 
         return Response({"success": True, "message": "Room assigned successfully", "assigned_details": assigned_details})
-    """
-    ViewSet for managing hotel room inventory (RoomMap).
-    
-    Endpoints:
-    - GET /api/room-map/ - List all rooms (with filters)
-    - POST /api/room-map/ - Create new room
-    - GET /api/room-map/{id}/ - Get specific room details
-    - PUT/PATCH /api/room-map/{id}/ - Update room details
-    - DELETE /api/room-map/{id}/ - Delete room
-    - GET /api/room-map/by-hotel/?hotel_id=X - List rooms by hotel
-    - GET /api/room-map/available/?hotel_id=X - List available rooms
-    - POST /api/room-map/{id}/mark-occupied/ - Mark room as occupied
-    - POST /api/room-map/{id}/mark-available/ - Mark room as available
-    """
+
+    @action(detail=False, methods=['post'], url_path='auto-assign')
+    def auto_assign(self, request):
+        """Auto-assign every unassigned pax of a booking to free beds.
+
+        Expected JSON body: {"booking_id": 5024, "group_pax": true, "dry_run": false}
+        With dry_run the planned assignments are returned without writing.
+        """
+        from .services import assign_beds_for_booking, BedAllocationConflict
+
+        data = request.data or {}
+        bookings = Booking.objects.all()
+        if not request.user.is_superuser:
+            # only bookings of the caller's own organizations
+            user_orgs = [
+                group.extended.organization_id
+                for group in request.user.groups.all()
+                if hasattr(group, 'extended')
+            ]
+            bookings = bookings.filter(organization_id__in=user_orgs)
+        booking = get_object_or_404(bookings, pk=data.get('booking_id'))
+        dry_run = str(data.get('dry_run', False)).lower() in ('1', 'true', 'yes')
+        group_pax = str(data.get('group_pax', True)).lower() not in ('0', 'false', 'no')
+        user = request.user if request.user and request.user.is_authenticated else None
+        try:
+            assignments = assign_beds_for_booking(booking, user=user, group_pax=group_pax, dry_run=dry_run)
+        except BedAllocationConflict as e:
+            return Response({"detail": str(e)}, status=status_code.HTTP_409_CONFLICT)
+        return Response({"success": True, "dry_run": dry_run, "assignments": assignments})
     
     queryset = RoomMap.objects.all()
     serializer_class = RoomMapSerializer
@@ -1097,49 +1063,27 @@ class HotelOperationViewSet(viewsets.ModelViewSet):
         
         booking_id = serializer.validated_data['booking_id']
         hotel_id = serializer.validated_data['hotel_id']
-        check_in_date = serializer.validated_data['check_in_date']
-        check_out_date = serializer.validated_data['check_out_date']
-        city = serializer.validated_data['city']
         
+        from tickets.models import Hotels
         try:
             booking = Booking.objects.get(id=booking_id)
-            from tickets.models import Hotels
-            hotel = Hotels.objects.get(id=hotel_id)
+            [params] = bulk.builder_params('hotel', [serializer.validated_data])
+            params.pop('booking_id')
             
             # Get all pax for this booking
-            pax_list = BookingPersonDetail.objects.filter(booking=booking)
+            pax_list = bulk.booking_pax(booking)
             
-            if not pax_list.exists():
+            if not pax_list:
                 return Response(
-                    {"error": f"No pax found for booking {booking.booking_reference}"},
+                    {"error": f"No pax found for booking {booking.booking_number}"},
                     status=status_code.HTTP_400_BAD_REQUEST
                 )
             
-            # Create operations for each pax
-            created_operations = []
-            for pax in pax_list:
-                operation = HotelOperation.objects.create(
-                    booking=booking,
-                    booking_id_str=booking.booking_reference,
-                    pax=pax,
-                    pax_id_str=pax.pax_id,
-                    pax_first_name=pax.first_name,
-                    pax_last_name=pax.last_name,
-                    contact_no=pax.contact_no if hasattr(pax, 'contact_no') else '',
-                    family_head_contact=pax.family_head_contact if hasattr(pax, 'family_head_contact') else '',
-                    hotel=hotel,
-                    hotel_name=hotel.name,
-                    city=city,
-                    date=check_in_date,  # Use check-in date as operation date
-                    check_in_date=check_in_date,
-                    check_out_date=check_out_date,
-                    status='pending',
-                    created_by=request.user
-                )
-                created_operations.append(operation)
+            # Create operations for each pax in one insert
+            created_operations = bulk.generate('hotel', booking, user=request.user, pax_list=pax_list, **params)
             
             return Response({
-                "message": f"Created {len(created_operations)} hotel operations for booking {booking.booking_reference}",
+                "message": f"Created {len(created_operations)} hotel operations for booking {booking.booking_number}",
                 "count": len(created_operations),
                 "operations": HotelOperationSerializer(created_operations, many=True).data
             }, status=status_code.HTTP_201_CREATED)
@@ -1539,62 +1483,32 @@ class TransportOperationViewSet(viewsets.ModelViewSet):
                 status=status_code.HTTP_400_BAD_REQUEST
             )
         
-        # Extract validated data
         booking_id = serializer.validated_data['booking_id']
-        date = serializer.validated_data['date']
-        pickup_location = serializer.validated_data['pickup_location']
-        drop_location = serializer.validated_data['drop_location']
         vehicle_id = serializer.validated_data.get('vehicle_id')
-        driver_name = serializer.validated_data.get('driver_name', '')
-        driver_contact = serializer.validated_data.get('driver_contact', '')
-        pickup_time = serializer.validated_data.get('pickup_time')
         
         # Get booking and all pax
         try:
             booking = Booking.objects.get(id=booking_id)
-            pax_list = BookingPersonDetail.objects.filter(booking=booking)
+            pax_list = bulk.booking_pax(booking)
             
-            if not pax_list.exists():
+            if not pax_list:
                 return Response(
                     {"error": f"No passengers found for booking {booking.booking_number}"},
                     status=status_code.HTTP_400_BAD_REQUEST
                 )
             
             # Get vehicle if provided
-            vehicle = None
-            if vehicle_id:
-                try:
-                    vehicle = VehicleType.objects.get(id=vehicle_id)
-                except VehicleType.DoesNotExist:
-                    return Response(
-                        {"error": f"Vehicle with id {vehicle_id} not found"},
-                        status=status_code.HTTP_400_BAD_REQUEST
-                    )
-            
-            # Create operations for all pax
-            created_operations = []
-            
-            for pax in pax_list:
-                operation = TransportOperation.objects.create(
-                    booking=booking,
-                    pax=pax,
-                    pax_id_str=str(pax.id),
-                    pax_first_name=pax.first_name,
-                    pax_last_name=pax.last_name,
-                    booking_id_str=booking.booking_number,
-                    contact_no=pax.contact_number if hasattr(pax, 'contact_number') else '',
-                    pickup_location=pickup_location,
-                    drop_location=drop_location,
-                    vehicle=vehicle,
-                    vehicle_name=vehicle.vehicle_name if vehicle else '',
-                    driver_name=driver_name,
-                    driver_contact=driver_contact,
-                    date=date,
-                    pickup_time=pickup_time,
-                    status='pending',
-                    created_by=request.user
+            try:
+                [params] = bulk.builder_params('transport', [serializer.validated_data])
+            except VehicleType.DoesNotExist:
+                return Response(
+                    {"error": f"Vehicle with id {vehicle_id} not found"},
+                    status=status_code.HTTP_400_BAD_REQUEST
                 )
-                created_operations.append(operation)
+            params.pop('booking_id')
+            
+            # Create operations for all pax in one insert
+            created_operations = bulk.generate('transport', booking, user=request.user, pax_list=pax_list, **params)
             
             return Response({
                 "message": f"Created {len(created_operations)} transport operations",
@@ -1984,50 +1898,22 @@ class FoodOperationViewSet(viewsets.ModelViewSet):
                 status=status_code.HTTP_400_BAD_REQUEST
             )
         
-        # Extract validated data
-        booking_id = serializer.validated_data['booking_id']
-        meal_type = serializer.validated_data['meal_type']
-        location = serializer.validated_data['location']
-        city = serializer.validated_data.get('city', '')
-        date = serializer.validated_data['date']
-        meal_time = serializer.validated_data.get('meal_time')
+        params = dict(serializer.validated_data)
+        booking_id = params.pop('booking_id')
         
         # Get booking and all pax
         try:
             booking = Booking.objects.get(id=booking_id)
-            pax_list = BookingPersonDetail.objects.filter(booking=booking)
+            pax_list = bulk.booking_pax(booking)
             
-            if not pax_list.exists():
+            if not pax_list:
                 return Response(
                     {"error": f"No passengers found for booking {booking.booking_number}"},
                     status=status_code.HTTP_400_BAD_REQUEST
                 )
             
-            # Create operations for all pax
-            created_operations = []
-            
-            for pax in pax_list:
-                # Skip pax without names
-                if not pax.first_name or not pax.last_name:
-                    continue
-                    
-                operation = FoodOperation.objects.create(
-                    booking=booking,
-                    pax=pax,
-                    pax_id_str=str(pax.id),
-                    pax_first_name=pax.first_name,
-                    pax_last_name=pax.last_name,
-                    booking_id_str=booking.booking_number,
-                    contact_no=pax.contact_number if hasattr(pax, 'contact_number') else '',
-                    meal_type=meal_type,
-                    location=location,
-                    city=city,
-                    date=date,
-                    meal_time=meal_time,
-                    status='pending',
-                    created_by=request.user
-                )
-                created_operations.append(operation)
+            # Create operations for all named pax in one insert
+            created_operations = bulk.generate('food', booking, user=request.user, pax_list=pax_list, **params)
             
             return Response({
                 "message": f"Created {len(created_operations)} food operations",
@@ -2471,54 +2357,22 @@ class AirportOperationViewSet(viewsets.ModelViewSet):
                 status=status_code.HTTP_400_BAD_REQUEST
             )
         
-        # Extract validated data
-        booking_id = serializer.validated_data['booking_id']
-        transfer_type = serializer.validated_data['transfer_type']
-        flight_number = serializer.validated_data['flight_number']
-        flight_time = serializer.validated_data['flight_time']
-        date = serializer.validated_data['date']
-        pickup_point = serializer.validated_data['pickup_point']
-        drop_point = serializer.validated_data['drop_point']
-        notes = serializer.validated_data.get('notes', '')
+        params = dict(serializer.validated_data)
+        booking_id = params.pop('booking_id')
         
         # Get booking and all pax
         try:
             booking = Booking.objects.get(id=booking_id)
-            pax_list = BookingPersonDetail.objects.filter(booking=booking)
+            pax_list = bulk.booking_pax(booking)
             
-            if not pax_list.exists():
+            if not pax_list:
                 return Response(
                     {"error": f"No passengers found for booking {booking.booking_number}"},
                     status=status_code.HTTP_400_BAD_REQUEST
                 )
             
-            # Create operations for all pax
-            created_operations = []
-            
-            for pax in pax_list:
-                # Skip pax without names
-                if not pax.first_name or not pax.last_name:
-                    continue
-                    
-                operation = AirportOperation.objects.create(
-                    booking=booking,
-                    pax=pax,
-                    pax_id_str=str(pax.id),
-                    pax_first_name=pax.first_name,
-                    pax_last_name=pax.last_name,
-                    booking_id_str=booking.booking_number,
-                    contact_no=pax.contact_number if hasattr(pax, 'contact_number') else '',
-                    transfer_type=transfer_type,
-                    flight_number=flight_number,
-                    flight_time=flight_time,
-                    date=date,
-                    pickup_point=pickup_point,
-                    drop_point=drop_point,
-                    status='waiting',
-                    notes=notes,
-                    created_by=request.user
-                )
-                created_operations.append(operation)
+            # Create operations for all named pax in one insert
+            created_operations = bulk.generate('airport', booking, user=request.user, pax_list=pax_list, **params)
             
             return Response({
                 "message": f"Created {len(created_operations)} airport operations",
@@ -2819,13 +2673,9 @@ class ZiyaratOperationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        booking_id = serializer.validated_data['booking_id']
-        location = serializer.validated_data['location']
-        date = serializer.validated_data['date']
-        pickup_time = serializer.validated_data['pickup_time']
-        guide_name = serializer.validated_data.get('guide_name', '')
-        notes = serializer.validated_data.get('notes', '')
-        created_by_id = serializer.validated_data.get('created_by')
+        params = dict(serializer.validated_data)
+        booking_id = params.pop('booking_id')
+        created_by_id = params.pop('created_by', None)
         
         # Get booking
         booking = Booking.objects.filter(id=booking_id).first()
@@ -2836,32 +2686,20 @@ class ZiyaratOperationViewSet(viewsets.ModelViewSet):
             )
         
         # Get all passengers in booking
-        passengers = BookingPersonDetail.objects.filter(booking_id=booking_id)
+        passengers = bulk.booking_pax(booking)
         
-        if not passengers.exists():
+        if not passengers:
             return Response(
                 {'error': f'No passengers found for booking {booking_id}'},
                 status=status_code.HTTP_400_BAD_REQUEST
             )
         
-        # Create operations
+        # Create operations in one insert
         created_by = None
         if created_by_id:
             created_by = User.objects.filter(id=created_by_id).first()
         
-        operations = []
-        for pax in passengers:
-            operation = ZiyaratOperation.objects.create(
-                booking=booking,
-                pax=pax,
-                location=location,
-                date=date,
-                pickup_time=pickup_time,
-                guide_name=guide_name,
-                notes=notes,
-                created_by=created_by
-            )
-            operations.append(operation)
+        operations = bulk.generate('ziyarat', booking, user=created_by, pax_list=passengers, **params)
         
         return Response({
             'message': f'Created {len(operations)} ziyarat operations for booking {booking.booking_number}',
@@ -2984,3 +2822,62 @@ class ZiyaratOperationViewSet(viewsets.ModelViewSet):
             "operation": ZiyaratOperationSerializer(operation).data
         })
 
+
+
+class BookingItineraryAPIView(APIView):
+    """POST /api/operations/daily/itinerary/generate
+
+    Creates a booking's hotel, transport, food, airport and ziyarat operations
+    for all pax in one request.
+
+    Request body:
+    {
+        "booking_id": 1,
+        "hotels": [{"hotel_id": 45, "check_in_date": "2025-11-01", "check_out_date": "2025-11-05", "city": "Makkah"}],
+        "transport": [{"date": "2025-11-05", "pickup_location": "Makkah Hotel", "drop_location": "Madinah Hotel"}],
+        "food": [{"meal_type": "breakfast", "location": "Hotel Restaurant", "date": "2025-11-02"}],
+        "airport": [{"transfer_type": "pickup", "flight_number": "SV802", "flight_time": "15:30", "date": "2025-11-01",
+                     "pickup_point": "Jeddah Airport", "drop_point": "Makkah Hotel"}],
+        "ziyarats": [{"location": "Quba Mosque", "date": "2025-11-06", "pickup_time": "08:00"}]
+    }
+    """
+    permission_classes = [IsAuthenticated]
+
+    SERVICES = (
+        ('hotels', 'hotel', HotelOperationSerializer),
+        ('transport', 'transport', TransportOperationSerializer),
+        ('food', 'food', FoodOperationSerializer),
+        ('airport', 'airport', AirportOperationSerializer),
+        ('ziyarats', 'ziyarat', ZiyaratOperationSerializer),
+    )
+
+    def post(self, request):
+        serializer = BookingItineraryCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        booking = Booking.objects.get(id=data['booking_id'])
+        if not BookingPersonDetail.objects.filter(booking=booking).exists():
+            return Response(
+                {"error": f"No passengers found for booking {booking.booking_number}"},
+                status=status_code.HTTP_400_BAD_REQUEST
+            )
+
+        from tickets.models import Hotels
+        try:
+            itinerary = {kind: bulk.builder_params(kind, data.get(field) or []) for field, kind, _ in self.SERVICES}
+        except (Hotels.DoesNotExist, VehicleType.DoesNotExist) as exc:
+            return Response({"error": str(exc)}, status=status_code.HTTP_400_BAD_REQUEST)
+
+        created = bulk.generate_itinerary(booking, itinerary, user=request.user)
+
+        response = {
+            "message": f"Created {sum(len(ops) for ops in created.values())} operations for booking {booking.booking_number}",
+        }
+        for field, kind, operation_serializer in self.SERVICES:
+            operations = created.get(kind, [])
+            response[field] = {
+                "count": len(operations),
+                "operations": operation_serializer(operations, many=True).data,
+            }
+        return Response(response, status=status_code.HTTP_201_CREATED)
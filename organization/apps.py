@@ -9,6 +9,7 @@ class OrganizationConfig(AppConfig):
         # Import signals to ensure post_save handlers for User are registered
         try:
             from . import signals  # noqa: F401
+            from . import visibility  # noqa: F401  (cache invalidation receivers)
         except Exception:
             # If signals fail to import, don't crash app startup; errors will show in logs
             pass
@@ -458,25 +458,11 @@ class OrganizationLink(models.Model):
         """
         Get all organizations that are linked to the given organization.
         Returns a set of organization IDs that have active links.
+        Served from the cached inventory visibility (see organization.visibility).
         """
-        linked_orgs = set()
-        
-        # Find links where the organization is main_organization and request_status is True
-        main_links = OrganizationLink.objects.filter(
-            main_organization_id=org_id,
-            request_status=True
-        ).values_list('link_organization_id', flat=True)
-        
-        # Find links where the organization is link_organization and request_status is True
-        link_links = OrganizationLink.objects.filter(
-            link_organization_id=org_id,
-            request_status=True
-        ).values_list('main_organization_id', flat=True)
-        
-        linked_orgs.update(main_links)
-        linked_orgs.update(link_links)
-        
-        return linked_orgs
+        from .visibility import get_inventory_visibility
+
+        return set(get_inventory_visibility(org_id).linked_org_ids)
 
     def __str__(self):
         return f"{self.main_organization} ↔ {self.link_organization} ({self.request_status})"
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from booking.models import AllowedReseller, OrganizationLink as OwnerLink
+from organization.models import Organization, OrganizationLink
+from organization.visibility import get_inventory_visibility
+
+
+class InventoryVisibilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org_a = Organization.objects.create(name="Org A")
+        self.org_b = Organization.objects.create(name="Org B")
+        self.org_c = Organization.objects.create(name="Org C")
+
+    def test_linked_organizations_are_cached_and_invalidated(self):
+        link = OrganizationLink.objects.create(
+            main_organization=self.org_a,
+            link_organization=self.org_b,
+            main_organization_request="ACCEPTED",
+            link_organization_request="ACCEPTED",
+        )
+        self.assertEqual(OrganizationLink.get_linked_organizations(self.org_a.id), {self.org_b.id})
+
+        with self.assertNumQueries(0):
+            get_inventory_visibility(self.org_a.id)
+
+        link.link_organization_request = "REJECTED"
+        with self.captureOnCommitCallbacks(execute=True):
+            link.save()
+        self.assertEqual(OrganizationLink.get_linked_organizations(self.org_a.id), set())
+
+    def test_allowed_reseller_grants_by_type_and_item(self):
+        owner_link = OwnerLink.objects.create(organization_id=self.org_b.id)
+        AllowedReseller.objects.create(
+            inventory_owner_company=owner_link,
+            reseller_company=self.org_a,
+            allowed_types=["GROUP_TICKETS", "HOTELS"],
+            requested_status_by_reseller="ACCEPTED",
+        )
+        grant = AllowedReseller.objects.create(
+            inventory_owner_company=OwnerLink.objects.create(organization_id=self.org_c.id),
+            reseller_company=self.org_a,
+            allowed_types=["UMRAH_PACKAGES"],
+            allowed_items=[{"type": "package", "id": 7}],
+            requested_status_by_reseller="ACCEPTED",
+        )
+
+        visibility = get_inventory_visibility(self.org_a.id)
+        self.assertEqual(visibility.owner_org_ids("GROUP_TICKETS"), {self.org_b.id})
+        self.assertEqual(visibility.owner_org_ids("GROUP_HOTELS", "HOTELS"), {self.org_b.id})
+        self.assertEqual(visibility.owner_org_ids("UMRAH_PACKAGES"), set())
+        self.assertEqual(visibility.owner_org_ids("UMRAH_PACKAGES", ignore_items=True), {self.org_c.id})
+        self.assertEqual(visibility.allowed_item_ids("package"), {7})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            grant.delete()
+        self.assertEqual(get_inventory_visibility(self.org_a.id).allowed_item_ids("package"), set())
+
+    def test_umrah_package_list_applies_reseller_grants(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIClient
+        from packages.models import UmrahPackage
+
+        OrganizationLink.objects.create(
+            main_organization=self.org_a,
+            link_organization=self.org_c,
+            main_organization_request="ACCEPTED",
+            link_organization_request="ACCEPTED",
+        )
+        AllowedReseller.objects.create(
+            inventory_owner_company=OwnerLink.objects.create(organization_id=self.org_b.id),
+            reseller_company=self.org_a,
+            allowed_types=["UMRAH_PACKAGES"],
+            requested_status_by_reseller="ACCEPTED",
+        )
+        own = UmrahPackage.objects.create(organization=self.org_a, title="Own")
+        shared = UmrahPackage.objects.create(organization=self.org_b, title="Shared", reselling_allowed=True)
+        UmrahPackage.objects.create(organization=self.org_b, title="Private", reselling_allowed=False)
+        UmrahPackage.objects.create(organization=self.org_c, title="Ungranted", reselling_allowed=True)
+
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user(username="agent", password="x"))
+        response = client.get(f"/api/umrah-packages/?organization={self.org_a.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(p["id"] for p in response.data), sorted([own.id, shared.id]))
@@ -0,0 +1,169 @@
+"""Inventory visibility resolver.
+
+Package, ticket and hotel listings all need the same answer for the calling
+organization: which organizations it is linked to, which inventory owners
+granted it resell access (``booking.AllowedReseller``) and which individual
+items were granted explicitly via ``allowed_items``.
+
+``get_inventory_visibility(org_id)`` materializes that answer once and keeps
+it in the Django cache, keyed by a per-organization version and a global
+generation (``universal.cache_versions``).  The signal receivers at the
+bottom of this module bump them whenever an OrganizationLink or
+AllowedReseller row changes, so listings never have to re-parse the JSON
+grants per request.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from universal import cache_versions
+
+
+CACHE_PREFIX = "inventory_visibility"
+CACHE_TIMEOUT = 60 * 60
+
+# allowed_items use these type names
+ITEM_TYPES = ("package", "ticket", "hotel")
+
+
+# global generation, bumped when grants of many organizations change at once
+GENERATION_KEY = f"{CACHE_PREFIX}:generation"
+
+
+def _version_key(org_id):
+    return f"{CACHE_PREFIX}:version:{int(org_id)}"
+
+
+def _cache_key(org_id):
+    version_key = _version_key(org_id)
+    found = cache_versions.versions([GENERATION_KEY, version_key])
+    return f"{CACHE_PREFIX}:{found[GENERATION_KEY]}:{int(org_id)}:{found[version_key]}"
+
+
+class InventoryVisibility:
+    """What one organization may see from other organizations' inventory.
+
+    - ``linked_org_ids``: organizations with an accepted OrganizationLink.
+    - ``owner_ids_by_type``: allowed_types token (e.g. ``GROUP_TICKETS``) ->
+      owner organization ids granted org-wide (grants without allowed_items).
+    - ``granted_owner_ids_by_type``: same, but counting every accepted grant
+      regardless of allowed_items.
+    - ``item_ids``: ``package``/``ticket``/``hotel`` -> explicitly granted ids.
+    """
+
+    __slots__ = ("organization_id", "linked_org_ids", "owner_ids_by_type", "granted_owner_ids_by_type", "item_ids")
+
+    def __init__(self, organization_id, linked_org_ids=(), owner_ids_by_type=None,
+                 granted_owner_ids_by_type=None, item_ids=None):
+        self.organization_id = int(organization_id)
+        self.linked_org_ids = frozenset(linked_org_ids)
+        self.owner_ids_by_type = {k: frozenset(v) for k, v in (owner_ids_by_type or {}).items()}
+        self.granted_owner_ids_by_type = {k: frozenset(v) for k, v in (granted_owner_ids_by_type or {}).items()}
+        self.item_ids = {t: frozenset((item_ids or {}).get(t, ())) for t in ITEM_TYPES}
+
+    def owner_org_ids(self, *tokens, ignore_items=False):
+        """Owner org ids granted for any of ``tokens`` (allowed_types values)."""
+        source = self.granted_owner_ids_by_type if ignore_items else self.owner_ids_by_type
+        ids = set()
+        for token in tokens:
+            ids.update(source.get(token, ()))
+        return ids
+
+    def allowed_item_ids(self, item_type):
+        return set(self.item_ids.get(item_type, ()))
+
+    def linked_org_ids_only(self):
+        """Linked organizations excluding the organization itself."""
+        return set(self.linked_org_ids) - {self.organization_id}
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+
+def build_inventory_visibility(org_id):
+    """Compute the visibility for ``org_id`` from the database (two queries)."""
+    from booking.models import AllowedReseller
+    from .models import OrganizationLink
+
+    org_id = int(org_id)
+
+    linked = set()
+    links = OrganizationLink.objects.filter(request_status=True).filter(
+        main_organization_id=org_id
+    ).values_list("link_organization_id", flat=True).union(
+        OrganizationLink.objects.filter(request_status=True, link_organization_id=org_id)
+        .values_list("main_organization_id", flat=True)
+    )
+    linked.update(links)
+
+    owner_ids_by_type = {}
+    granted_owner_ids_by_type = {}
+    item_ids = {t: set() for t in ITEM_TYPES}
+
+    grants = AllowedReseller.objects.filter(
+        reseller_company_id=org_id,
+        requested_status_by_reseller="ACCEPTED",
+    ).values_list("inventory_owner_company__organization_id", "allowed_types", "allowed_items")
+
+    for owner_id, types, items in grants:
+        if not owner_id:
+            continue
+        types = types or []
+        for token in types:
+            granted_owner_ids_by_type.setdefault(token, set()).add(owner_id)
+        if items:
+            for it in items:
+                try:
+                    item_type = it.get("type")
+                    if item_type in item_ids and it.get("id"):
+                        item_ids[item_type].add(int(it.get("id")))
+                except Exception:
+                    continue
+        else:
+            for token in types:
+                owner_ids_by_type.setdefault(token, set()).add(owner_id)
+
+    return InventoryVisibility(org_id, linked, owner_ids_by_type, granted_owner_ids_by_type, item_ids)
+
+
+def get_inventory_visibility(org_id):
+    """Cached InventoryVisibility for ``org_id``."""
+    key = _cache_key(org_id)
+    visibility = cache.get(key)
+    if visibility is None:
+        visibility = build_inventory_visibility(org_id)
+        cache.set(key, visibility, CACHE_TIMEOUT)
+    return visibility
+
+
+def invalidate_inventory_visibility(*org_ids):
+    """Drop cached visibility for the given organizations (after commit)."""
+    cache_versions.bump(*(_version_key(org_id) for org_id in org_ids if org_id))
+
+
+def invalidate_all_inventory_visibility():
+    """Invalidate every organization's cached visibility at once (after commit)."""
+    cache_versions.bump(GENERATION_KEY)
+
+
+@receiver(post_save, sender="organization.OrganizationLink")
+@receiver(post_delete, sender="organization.OrganizationLink")
+def organization_link_changed(sender, instance, **kwargs):
+    invalidate_inventory_visibility(instance.main_organization_id, instance.link_organization_id)
+
+
+@receiver(post_save, sender="booking.AllowedReseller")
+@receiver(post_delete, sender="booking.AllowedReseller")
+def allowed_reseller_changed(sender, instance, **kwargs):
+    invalidate_inventory_visibility(instance.reseller_company_id)
+
+
+@receiver(post_save, sender="booking.OrganizationLink")
+@receiver(post_delete, sender="booking.OrganizationLink")
+def inventory_owner_link_changed(sender, instance, **kwargs):
+    # the owner org of every grant pointing at this link may have changed
+    invalidate_all_inventory_visibility()
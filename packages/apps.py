@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class PackagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'packages'
+
+    def ready(self):
+        # register the price catalog cache invalidation receivers
+        from . import price_catalog  # noqa: F401
+        # register the package price vector refresh receivers
+        from . import quote_engine  # noqa: F401
+        # register the public read cache invalidation receivers (after the
+        # quote engine, so its vector refresh commits before the bump)
+        from . import signals  # noqa: F401
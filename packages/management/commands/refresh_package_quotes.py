@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from packages.quote_engine import refresh_vectors
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the stored price vectors and quoted prices of Umrah packages. "
+        "Run after writes that bypass model signals (update(), bulk_create, raw SQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--package', type=int, action='append', help='Only this package id (repeatable)')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_vectors(options['package'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} package price vectors'))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.1 on 2026-10-18 21:59
+
+from django.db import migrations, models
+
+
+def fill_price_vectors(apps, schema_editor):
+    # without a quoted_price existing packages would drop out of price-filtered lists
+    from packages.quote_engine import refresh_vectors
+
+    refresh_vectors(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0059_remove_umrahpackage_adault_visa_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='umrahpackage',
+            name='price_vector',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='umrahpackage',
+            name='quoted_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, help_text='Headline per-person price shown in package lists (from price_vector)', max_digits=12, null=True),
+        ),
+        migrations.RunPython(fill_price_vectors, migrations.RunPython.noop),
+    ]
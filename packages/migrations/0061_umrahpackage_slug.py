@@ -0,0 +1,39 @@
+# Generated by Django 4.2.1 on 2026-10-18 22:04
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def fill_slugs(apps, schema_editor):
+    UmrahPackage = apps.get_model('packages', 'UmrahPackage')
+    # the public detail view used to match slugify(title) against active public
+    # packages, newest first; hand out base slugs in that order so existing
+    # links keep resolving to the same package
+    taken = set()
+    packages = UmrahPackage.objects.order_by('-is_public', '-is_active', '-created_at', '-pk')
+    for pkg in packages.only('pk', 'title').iterator():
+        base = slugify(pkg.title or '')[:200] or 'package'
+        if base.isdigit():
+            base = f'package-{base}'
+        slug, ix = base, 1
+        while slug in taken:
+            ix += 1
+            slug = f'{base}-{ix}'
+        taken.add(slug)
+        UmrahPackage.objects.filter(pk=pkg.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0060_umrahpackage_price_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='umrahpackage',
+            name='slug',
+            field=models.SlugField(blank=True, help_text='Public URL key, generated from the title on first save and kept stable afterwards', max_length=220, null=True, unique=True),
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+    ]
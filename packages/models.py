@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from organization.models import Organization,Agency
 from django.contrib.auth.models import User
+from django.utils.text import slugify
 import secrets
 from datetime import datetime
 
@@ -430,6 +431,10 @@ class UmrahPackage(models.Model):
         db_constraint=False  # Disable FK constraint for MySQL compatibility
     )
     title = models.CharField(max_length=200, help_text="Package name (e.g., 'Ramzan Umrah Gold 2025')")
+    slug = models.SlugField(
+        max_length=220, unique=True, null=True, blank=True,
+        help_text="Public URL key, generated from the title on first save and kept stable afterwards"
+    )
     description = models.TextField(blank=True, null=True, help_text="Detailed package description")
     
     # Package Type and Status
@@ -532,6 +537,12 @@ class UmrahPackage(models.Model):
         max_digits=5, decimal_places=2, default=0,
         help_text="Profit percentage on base price"
     )
+    # Precomputed price components, maintained by packages.quote_engine
+    price_vector = models.JSONField(default=dict, blank=True, editable=False)
+    quoted_price = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True, db_index=True, editable=False,
+        help_text="Headline per-person price shown in package lists (from price_vector)"
+    )
     # discount_link removed temporarily - add when promotion_center.Promotion model is created
     # discount_link = models.ForeignKey(
     #     'promotion_center.Promotion',
@@ -546,6 +557,9 @@ class UmrahPackage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # inserts tried before a slug collision is raised
+    SLUG_ATTEMPTS = 5
+
     class Meta:
         verbose_name = "Umrah Package"
         verbose_name_plural = "Umrah Packages"
@@ -557,37 +571,55 @@ class UmrahPackage(models.Model):
             date_str = datetime.now().strftime('%Y%m%d')
             random_str = secrets.token_hex(2).upper()
             self.package_code = f"PKG-{date_str}-{random_str}"
-        
+
         # Auto-calculate available slots
         if self.max_capacity:
             self.left_seats = self.max_capacity - (self.booked_seats or 0)
-        
-        super().save(*args, **kwargs)
-    
+
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+
+        self.slug = self._unique_slug()
+        collided = set()
+        for attempt in range(self.SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # a concurrent save took the slug between the lookup and the insert
+                if attempt + 1 == self.SLUG_ATTEMPTS:
+                    raise
+                collided.add(self.slug)
+                self.slug = self._unique_slug(collided)
+
+    def _unique_slug(self, collided=()):
+        """Slugified title, suffixed -2, -3, ... past the slugs already taken (one query).
+
+        ``collided`` adds slugs a failed insert found taken but the lookup may
+        not see yet.
+        """
+        base = slugify(self.title or "")[:200] or "package"
+        if base.isdigit():
+            # numeric identifiers are package ids in the public URLs
+            base = f"package-{base}"
+        taken = set(
+            UmrahPackage.objects.filter(slug__startswith=base).exclude(pk=self.pk).values_list("slug", flat=True)
+        )
+        taken.update(collided)
+        slug, ix = base, 1
+        while slug in taken:
+            ix += 1
+            slug = f"{base}-{ix}"
+        return slug
+
     def calculate_total_price(self, adults=1, children=0, infants=0):
         """Calculate total package price for given number of persons"""
-        total = 0
-        total += adults * float(self.price_per_person)
-        
-        # Add visa prices
-        # use explicit selling price fields (removed legacy single-price fields)
-        total += adults * float(getattr(self, 'adault_visa_selling_price', 0) or 0)
-        total += children * float(getattr(self, 'child_visa_selling_price', 0) or 0)
-        total += infants * float(getattr(self, 'infant_visa_selling_price', 0) or 0)
-        
-        # Add service charges if active
-        if self.is_service_charge_active:
-            total += adults * float(self.adault_service_charge or 0)
-            total += children * float(self.child_service_charge or 0)
-            total += infants * float(self.infant_service_charge or 0)
-        
-        # Add profit (previously called markup_percent)
-        if getattr(self, 'profit_percent', None):
-            total += total * (float(self.profit_percent) / 100)
-        
-        return round(total, 2)
-
-    # --- New helper pricing methods matching requested formulas ---
+        from .quote_engine import scalar_components, total_price
+        return total_price(scalar_components(self), adults, children, infants)
+
+    # --- Pricing formulas, evaluated on the package's price vector (see packages.quote_engine) ---
     def _first_ticket_obj(self):
         """Return the first Ticket object included in this package, if any."""
         first = self.ticket_details.first()
@@ -597,63 +629,26 @@ class UmrahPackage(models.Model):
 
     def infant_price(self):
         """INFANT PRICE = INFANT TICKET SELLING PRICE + INFANT VISA SELLING PRICE"""
-        ticket = self._first_ticket_obj()
-        ticket_infant = 0
-        if ticket:
-            ticket_infant = getattr(ticket, 'infant_price', 0) or 0
-        visa_infant = float(getattr(self, 'infant_visa_selling_price', 0) or 0)
-        return float(ticket_infant) + visa_infant
+        from . import quote_engine
+        return quote_engine.infant_price(quote_engine.vector(self))
 
     def child_discount(self):
         """CHILD DISCOUNT = ADULT TICKET SELLING PRICE - CHILD TICKET SELLING PRICE"""
-        ticket = self._first_ticket_obj()
-        if not ticket:
-            return 0
-        adult_ticket = getattr(ticket, 'adult_price', 0) or 0
-        child_ticket = getattr(ticket, 'child_price', 0) or 0
-        return float(adult_ticket) - float(child_ticket)
+        from . import quote_engine
+        return quote_engine.child_discount(quote_engine.vector(self))
 
     def adult_cost(self):
         """Adult cost = food + makkah + madinah + transport + adult visa + adult ticket"""
-        food = float(getattr(self, 'food_selling_price', 0) or 0)
-        makkah = float(getattr(self, 'makkah_ziyarat_selling_price', 0) or 0)
-        madinah = float(getattr(self, 'madinah_ziyarat_selling_price', 0) or 0)
-        transport = float(getattr(self, 'transport_selling_price', 0) or 0)
-        visa = float(getattr(self, 'adault_visa_selling_price', 0) or 0)
-        ticket = self._first_ticket_obj()
-        ticket_adult = float(getattr(ticket, 'adult_price', 0) or 0) if ticket else 0
-        return food + makkah + madinah + transport + visa + ticket_adult
-
-    def _sum_hotel_room_component(self, room_field_name):
-        """Sum across all hotel_details: hotel.<room_field_name>_selling_price * number_of_nights"""
-        total = 0
-        for hd in self.hotel_details.all():
-            price = getattr(hd, room_field_name, None)
-            nights = getattr(hd, 'number_of_nights', 0) or 0
-            if price is None:
-                continue
-            total += float(price or 0) * int(nights)
-        return total
+        from . import quote_engine
+        return quote_engine.adult_cost(quote_engine.vector(self))
 
     def room_cost(self, room_type):
         """Compute total cost for a room type per your formulas.
 
         room_type: one of 'sharing','quad','quint','double','triple'
         """
-        base = float(self.adult_cost() or 0)
-        # Map requested room types to model field names
-        mapping = {
-            'sharing': 'sharing_bed_selling_price',
-            'quad': 'quad_bed_selling_price',
-            'quint': 'quaint_bed_selling_price',  # model uses 'quaint' (typo) for quint
-            'double': 'double_bed_selling_price',
-            'triple': 'triple_bed_selling_price',
-        }
-        field = mapping.get(room_type)
-        if not field:
-            return base
-        hotel_component = self._sum_hotel_room_component(field)
-        return base + hotel_component
+        from . import quote_engine
+        return quote_engine.room_cost(quote_engine.vector(self), room_type)
 
     def sharing_cost(self):
         return self.room_cost('sharing')
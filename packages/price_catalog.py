@@ -0,0 +1,223 @@
+"""Cached price catalog snapshots for the all-prices endpoints.
+
+``AllPricesAPIView`` used to run a dozen queries plus the full ticket and
+hotel serializers for one organization, and repeat all of it once per
+organization when no ``organization_id`` was given.  The catalog of an
+organization is now built once and cached together with an ETag (a hash of
+its JSON rendering).
+
+Cache keys carry a per-organization version and a global generation, kept
+in ``universal.cache_versions`` so every process sees them.  The
+receivers at the bottom of this module bump the version of the owning
+organization whenever a price model, or a ticket / hotel child row, is saved
+or deleted; City changes bump the generation because trip details of any
+organization show city names.  Writes that bypass signals (``update()``,
+``bulk_create``) become visible when the entry expires.
+
+The all-organization variant reuses the cached per-organization snapshots
+and builds the missing ones together, with one query per model grouped by
+organization.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from universal import cache_versions, public_cache
+
+
+CACHE_PREFIX = "price_catalog"
+CACHE_TIMEOUT = 15 * 60
+
+# (response key, model label, extra filters) for the plain ``.values()`` lists
+VALUE_SOURCES = (
+    ("riyal_rates", "packages.RiyalRate", {}),
+    ("shirkas", "packages.Shirka", {}),
+    ("umrah_visa_prices", "packages.UmrahVisaPrice", {}),
+    ("umrah_visa_type_two", "packages.UmrahVisaPriceTwo", {}),
+    ("only_visa_prices", "packages.OnlyVisaPrice", {}),
+    ("airlines", "packages.Airlines", {}),
+    ("cities", "packages.City", {}),
+    ("set_visa_type", "packages.SetVisaType", {}),
+    ("food_prices", "packages.FoodPrice", {"active": True}),
+    ("ziarat_prices", "packages.ZiaratPrice", {}),
+)
+
+_GENERATION_KEY = f"{CACHE_PREFIX}:generation"
+
+
+def _version_key(organization_id):
+    return f"{CACHE_PREFIX}:version:{int(organization_id)}"
+
+
+def _versions(organization_ids):
+    """``(generation, {organization_id: version})`` in at most one query."""
+    keys = {_version_key(org_id): org_id for org_id in organization_ids}
+    found = cache_versions.versions([_GENERATION_KEY, *keys])
+    return found[_GENERATION_KEY], {org_id: found[key] for key, org_id in keys.items()}
+
+
+def _cache_key(generation, organization_id, version):
+    return f"{CACHE_PREFIX}:{generation}:{int(organization_id)}:{version}"
+
+
+def invalidate_price_catalog(*organization_ids):
+    """Drop the cached catalogs of the given organizations (after commit)."""
+    cache_versions.bump(*(_version_key(org_id) for org_id in {o for o in organization_ids if o}))
+
+
+def invalidate_all_price_catalogs():
+    cache_versions.bump(_GENERATION_KEY)
+
+
+def _empty_catalog():
+    catalog = {key: [] for key, _, _ in VALUE_SOURCES}
+    catalog["tickets"] = []
+    catalog["hotels"] = []
+    return catalog
+
+
+def build_price_catalogs(organization_ids=None):
+    """``{organization_id: catalog}`` built with one query per model.
+
+    ``organization_ids=None`` builds every organization that has rows; pass
+    the ids explicitly to also get empty catalogs for organizations without
+    any prices.
+    """
+    from django.apps import apps
+    from tickets.models import Ticket, Hotels
+    from tickets.serializers import TicketSerializer, HotelsSerializer
+
+    def scoped(qs):
+        return qs if organization_ids is None else qs.filter(organization_id__in=organization_ids)
+
+    catalogs = {}
+
+    def catalog_for(org_id):
+        if org_id not in catalogs:
+            catalogs[org_id] = _empty_catalog()
+        return catalogs[org_id]
+
+    for org_id in organization_ids or ():
+        catalog_for(org_id)
+
+    for key, label, filters in VALUE_SOURCES:
+        for row in scoped(apps.get_model(label).objects.filter(**filters)).values():
+            catalog_for(row["organization_id"])[key].append(row)
+
+    tickets = scoped(Ticket.objects.all()).prefetch_related(
+        "trip_details__departure_city",
+        "trip_details__arrival_city",
+        "stopover_details",
+    )
+    for ticket, data in zip(tickets, TicketSerializer(tickets, many=True).data):
+        catalog_for(ticket.organization_id)["tickets"].append(data)
+
+    hotels = scoped(Hotels.objects.all()).prefetch_related("prices", "contact_details", "photos")
+    for hotel, data in zip(hotels, HotelsSerializer(hotels, many=True).data):
+        catalog_for(hotel.organization_id)["hotels"].append(data)
+
+    catalogs.pop(None, None)
+    return catalogs
+
+
+def _store(generation, versions, catalogs):
+    entries = {}
+    for org_id, catalog in catalogs.items():
+        if org_id not in versions:
+            continue
+        entry = {"etag": public_cache.etag(catalog), "data": catalog}
+        entries[_cache_key(generation, org_id, versions[org_id])] = entry
+    cache.set_many(entries, CACHE_TIMEOUT)
+    return entries
+
+
+def price_catalog(organization_id):
+    """``(etag, catalog)`` for one organization."""
+    organization_id = int(organization_id)
+    generation, versions = _versions([organization_id])
+    key = _cache_key(generation, organization_id, versions[organization_id])
+    entry = cache.get(key)
+    if entry is None:
+        catalogs = build_price_catalogs([organization_id])
+        entry = _store(generation, versions, catalogs)[key]
+    return entry["etag"], entry["data"]
+
+
+def all_price_catalogs():
+    """``(etag, {str(organization_id): catalog})`` for every organization."""
+    from organization.models import Organization
+
+    org_ids = list(Organization.objects.values_list("id", flat=True))
+    generation, versions = _versions(org_ids)
+    keys = {org_id: _cache_key(generation, org_id, versions[org_id]) for org_id in org_ids}
+    entries = cache.get_many(list(keys.values()))
+
+    missing = [org_id for org_id in org_ids if keys[org_id] not in entries]
+    if missing:
+        try:
+            catalogs = build_price_catalogs(None if len(missing) == len(org_ids) else missing)
+            for org_id in missing:
+                catalogs.setdefault(org_id, _empty_catalog())
+            entries.update(_store(generation, versions, catalogs))
+        except Exception:
+            # fall back to one organization at a time so one bad row only hides its own org
+            for org_id in missing:
+                try:
+                    entries.update(_store(generation, versions, build_price_catalogs([org_id])))
+                except Exception:
+                    pass
+
+    result = {}
+    etags = []
+    for org_id in org_ids:
+        entry = entries.get(keys[org_id])
+        if entry is None:
+            result[str(org_id)] = {"error": "failed to gather for org"}
+            etags.append(f"{org_id}:error")
+        else:
+            result[str(org_id)] = entry["data"]
+            etags.append(f"{org_id}:{entry['etag']}")
+    return f'"{hashlib.md5("|".join(etags).encode()).hexdigest()}"', result
+
+
+def _organization_changed(sender, instance, **kwargs):
+    invalidate_price_catalog(getattr(instance, "organization_id", None))
+
+
+for _label in [label for _, label, _ in VALUE_SOURCES if label != "packages.City"] + ["tickets.Ticket", "tickets.Hotels"]:
+    post_save.connect(_organization_changed, sender=_label, dispatch_uid=f"price_catalog:{_label}:save")
+    post_delete.connect(_organization_changed, sender=_label, dispatch_uid=f"price_catalog:{_label}:delete")
+
+
+@receiver(post_save, sender="packages.City")
+@receiver(post_delete, sender="packages.City")
+def city_changed(sender, instance, **kwargs):
+    invalidate_all_price_catalogs()
+
+
+@receiver(post_save, sender="tickets.TicketTripDetails")
+@receiver(post_delete, sender="tickets.TicketTripDetails")
+@receiver(post_save, sender="tickets.TickerStopoverDetails")
+@receiver(post_delete, sender="tickets.TickerStopoverDetails")
+def ticket_child_changed(sender, instance, **kwargs):
+    from tickets.models import Ticket
+
+    invalidate_price_catalog(
+        Ticket.objects.filter(pk=instance.ticket_id).values_list("organization_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender="tickets.HotelPrices")
+@receiver(post_delete, sender="tickets.HotelPrices")
+@receiver(post_save, sender="tickets.HotelContactDetails")
+@receiver(post_delete, sender="tickets.HotelContactDetails")
+@receiver(post_save, sender="tickets.HotelPhoto")
+@receiver(post_delete, sender="tickets.HotelPhoto")
+def hotel_child_changed(sender, instance, **kwargs):
+    from tickets.models import Hotels
+
+    invalidate_price_catalog(
+        Hotels.objects.filter(pk=instance.hotel_id).values_list("organization_id", flat=True).first()
+    )
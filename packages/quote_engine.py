@@ -0,0 +1,287 @@
+"""Precomputed price vectors for Umrah packages.
+
+The package pricing formulas (``adult_cost``, ``room_cost``,
+``infant_price``, ``child_discount``, ``calculate_total_price``) walked the
+package's ticket and hotel details on every call, and the package
+serializers called them several times per package in every list response.
+Each package now stores its price components in ``price_vector``:
+
+    {"v": 1, "base": 0.0, "visa": [a, c, i], "service_charge": [a, c, i],
+     "service_active": False, "profit": 0.0, "food": 0.0,
+     "ziyarat": [makkah, madinah], "transport": 0.0,
+     "ticket": [adult, child, infant], "rooms": {"sharing": ..., ...},
+     "list_price": 0.0}
+
+``rooms`` holds each room type's hotel component (selling price times
+nights, summed over the hotel details) and ``ticket`` the fares of the first
+included ticket.  ``quoted_price`` mirrors ``list_price``, the headline price
+of the public list, so price filters run in the database.
+
+Vectors are rebuilt once per transaction, after commit, for every package
+whose fields, hotel or ticket details, or included tickets changed (see the
+receivers at the bottom); ``manage.py refresh_package_quotes`` rebuilds them
+all.  Writes that bypass signals (``update()``, ``bulk_create``) need a
+refresh.
+
+``vector(package)`` reads the cheap scalar components from the instance
+itself and only takes ``ticket`` and ``rooms`` from storage, so unsaved
+edits are priced correctly; a package without a stored vector has it
+computed in memory.  ``quote_packages`` prices many packages for one pax mix
+from their stored vectors in a single pass.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from universal import commit_batches
+
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+
+# room type -> UmrahPackageHotelDetails selling price field
+ROOM_FIELDS = {
+    'sharing': 'sharing_bed_selling_price',
+    'quad': 'quad_bed_selling_price',
+    'quint': 'quaint_bed_selling_price',  # model uses 'quaint' (typo) for quint
+    'double': 'double_bed_selling_price',
+    'triple': 'triple_bed_selling_price',
+}
+
+BATCH_SIZE = 200
+
+
+def _f(value):
+    return float(value or 0)
+
+
+def scalar_components(package):
+    """Components read straight from the package's own fields."""
+    list_price = _f(package.price_per_person)
+    if not list_price:
+        # the public list falls back to the adult visa price plus service charge
+        list_price = _f(package.adault_visa_selling_price) + _f(package.adault_service_charge)
+    return {
+        'base': _f(package.price_per_person),
+        'visa': [
+            _f(package.adault_visa_selling_price),
+            _f(package.child_visa_selling_price),
+            _f(package.infant_visa_selling_price),
+        ],
+        'service_charge': [
+            _f(package.adault_service_charge),
+            _f(package.child_service_charge),
+            _f(package.infant_service_charge),
+        ],
+        'service_active': bool(package.is_service_charge_active),
+        'profit': _f(package.profit_percent),
+        'food': _f(package.food_selling_price),
+        'ziyarat': [_f(package.makkah_ziyarat_selling_price), _f(package.madinah_ziyarat_selling_price)],
+        'transport': _f(package.transport_selling_price),
+        'list_price': list_price,
+    }
+
+
+def _detail_components(package):
+    """Components that walk the ticket and hotel details (prefetch-friendly)."""
+    ticket_details = sorted(package.ticket_details.all(), key=lambda detail: detail.pk)
+    ticket = ticket_details[0].ticket if ticket_details else None
+    rooms = dict.fromkeys(ROOM_FIELDS, 0.0)
+    for detail in package.hotel_details.all():
+        nights = int(detail.number_of_nights or 0)
+        for room_type, field in ROOM_FIELDS.items():
+            price = getattr(detail, field, None)
+            if price is not None:
+                rooms[room_type] += _f(price) * nights
+    return {
+        'ticket': [
+            _f(getattr(ticket, 'adult_price', 0)),
+            _f(getattr(ticket, 'child_price', 0)),
+            _f(getattr(ticket, 'infant_price', 0)),
+        ],
+        'rooms': rooms,
+    }
+
+
+def build_vector(package):
+    return {'v': VERSION, **scalar_components(package), **_detail_components(package)}
+
+
+def vector(package):
+    """The price vector of ``package``, current for its in-memory field values.
+
+    Only the ticket and room components come from storage (or, without a
+    stored vector, from the details).
+    """
+    stored = package.price_vector or {}
+    if stored.get('v') == VERSION:
+        details = {'ticket': stored['ticket'], 'rooms': stored['rooms']}
+    else:
+        details = _detail_components(package)
+    return {'v': VERSION, **scalar_components(package), **details}
+
+
+# --- pricing from a vector -------------------------------------------------
+
+def adult_cost(vec):
+    """food + makkah + madinah ziyarat + transport + adult visa + adult ticket"""
+    makkah, madinah = vec['ziyarat']
+    return vec['food'] + makkah + madinah + vec['transport'] + vec['visa'][0] + vec['ticket'][0]
+
+
+def infant_price(vec):
+    """infant ticket + infant visa"""
+    return vec['ticket'][2] + vec['visa'][2]
+
+
+def child_discount(vec):
+    """adult ticket - child ticket"""
+    return vec['ticket'][0] - vec['ticket'][1]
+
+
+def room_cost(vec, room_type):
+    """Adult cost plus the hotel component of ``room_type`` (unknown types: adult cost)."""
+    return adult_cost(vec) + vec['rooms'].get(room_type, 0)
+
+
+def total_price(vec, adults=1, children=0, infants=0):
+    """Base, visa and active service charges per pax plus profit; needs only the scalar components."""
+    mix = (adults, children, infants)
+    total = adults * vec['base']
+    for n, price in zip(mix, vec['visa']):
+        total += n * price
+    if vec['service_active']:
+        for n, price in zip(mix, vec['service_charge']):
+            total += n * price
+    if vec['profit']:
+        total += total * (vec['profit'] / 100)
+    return round(total, 2)
+
+
+def stay_price(vec, room_type, adults=1, children=0, infants=0):
+    """Pax mix priced per room: children get the child discount off the room cost."""
+    per_adult = room_cost(vec, room_type)
+    return round(adults * per_adult + children * (per_adult - child_discount(vec)) + infants * infant_price(vec), 2)
+
+
+def quote_packages(packages, adults=1, children=0, infants=0, room_type=None):
+    """``{package_id: price}`` for one pax mix, from stored vectors.
+
+    ``packages`` may be instances or ``{"id", "price_vector"}`` dicts (e.g.
+    ``queryset.values("id", "price_vector")``); packages without a current
+    vector are skipped.  With ``room_type`` the price is ``stay_price``,
+    otherwise ``total_price``.
+    """
+    quotes = {}
+    for package in packages:
+        if isinstance(package, dict):
+            pk, vec = package['id'], package.get('price_vector') or {}
+        else:
+            pk, vec = package.pk, package.price_vector or {}
+        if vec.get('v') != VERSION:
+            continue
+        if room_type:
+            quotes[pk] = stay_price(vec, room_type, adults, children, infants)
+        else:
+            quotes[pk] = total_price(vec, adults, children, infants)
+    return quotes
+
+
+# --- maintenance -------------------------------------------------------------
+
+def refresh_vectors(package_ids=None, apps=None):
+    """Rebuild and store the vectors of ``package_ids`` (all packages when None); returns the count.
+
+    Migrations pass ``apps`` to work on the historical model.
+    """
+    if apps is not None:
+        UmrahPackage = apps.get_model('packages', 'UmrahPackage')
+    else:
+        from .models import UmrahPackage
+
+    packages = UmrahPackage.objects.order_by('pk').prefetch_related('hotel_details', 'ticket_details__ticket')
+    if package_ids is not None:
+        package_ids = sorted({pk for pk in package_ids if pk})
+        if not package_ids:
+            return 0
+        packages = packages.filter(pk__in=package_ids)
+    refreshed = 0
+    batch = []
+    for package in packages.iterator(chunk_size=BATCH_SIZE):
+        package.price_vector = build_vector(package)
+        package.quoted_price = Decimal(str(round(package.price_vector['list_price'], 2)))
+        batch.append(package)
+        if len(batch) >= BATCH_SIZE:
+            UmrahPackage.objects.bulk_update(batch, ['price_vector', 'quoted_price'])
+            refreshed += len(batch)
+            batch = []
+    if batch:
+        UmrahPackage.objects.bulk_update(batch, ['price_vector', 'quoted_price'])
+        refreshed += len(batch)
+    return refreshed
+
+
+def _refresh(package_ids):
+    try:
+        refresh_vectors(package_ids)
+    except Exception:
+        # non-fatal: readers fall back to computing the vector, the command repairs it
+        logger.exception("package price vector refresh failed for %s", sorted(package_ids))
+
+
+class _StalePackages(commit_batches.CommitBatch):
+    def __init__(self):
+        super().__init__()
+        self.package_ids = set()
+
+    def run(self):
+        _refresh(self.package_ids)
+
+
+def mark_stale(package_ids, using=None):
+    """Schedule a vector rebuild of ``package_ids`` after commit (now, outside a transaction)."""
+    package_ids = {pk for pk in package_ids if pk}
+    if not package_ids:
+        return
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        _refresh(package_ids)
+        return
+    batch = commit_batches.pending("package_quotes", _StalePackages, using=using)
+    batch.package_ids.update(package_ids)
+
+
+@receiver(post_save, sender="packages.UmrahPackage", dispatch_uid="package_quote_package_saved")
+def package_saved(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and set(update_fields) <= {'price_vector', 'quoted_price', 'left_seats',
+                                                            'booked_seats', 'confirmed_seats'}:
+        return
+    mark_stale([instance.pk], using=using)
+
+
+@receiver(post_save, sender="packages.UmrahPackageHotelDetails", dispatch_uid="package_quote_hotel_saved")
+@receiver(post_delete, sender="packages.UmrahPackageHotelDetails", dispatch_uid="package_quote_hotel_deleted")
+@receiver(post_save, sender="packages.UmrahPackageTicketDetails", dispatch_uid="package_quote_ticket_saved")
+@receiver(post_delete, sender="packages.UmrahPackageTicketDetails", dispatch_uid="package_quote_ticket_deleted")
+def package_detail_changed(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    mark_stale([instance.package_id], using=using)
+
+
+@receiver(post_save, sender="tickets.Ticket", dispatch_uid="package_quote_ticket_fares_changed")
+def ticket_saved(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    from .models import UmrahPackageTicketDetails
+
+    mark_stale(
+        UmrahPackageTicketDetails.objects.filter(ticket_id=instance.pk).values_list('package_id', flat=True),
+        using=using,
+    )
@@ -34,6 +34,7 @@ from .models import (
 from rest_framework import serializers
 from tickets.serializers import HotelsSerializer, TicketSerializer
 from django.db import models
+from . import quote_engine
 
 
 class VisaSerializer(serializers.ModelSerializer):
@@ -463,13 +464,15 @@ class UmrahPackageSerializer(ModelSerializer):
             # age/restriction & organisation internals
             'filght_min_adault_age', 'filght_max_adault_age', 'max_chilld_allowed', 'max_infant_allowed',
             'inventory_owner_organization_id',
+            # precomputed pricing internals (see packages.quote_engine)
+            'price_vector',
             # nested inclusions/exclusions are disabled separately by setting
             # the declared fields to None (see above). Do NOT include them
             # in Meta.exclude because they are not direct model fields.
         ]
 
         # Keep a few fields read-only as before
-        read_only_fields = ('package_code', 'created_at', 'updated_at', 'left_seats')
+        read_only_fields = ('package_code', 'slug', 'created_at', 'updated_at', 'left_seats')
     
     def get_created_by_name(self, obj):
         if obj.created_by:
@@ -499,13 +502,21 @@ class UmrahPackageSerializer(ModelSerializer):
     
     def get_total_price_breakdown(self, obj):
         """Return complete pricing breakdown for different passenger counts"""
+        vec = self._price_vector(obj)
         return {
-            '1_adult': obj.calculate_total_price(adults=1, children=0, infants=0),
-            '2_adults': obj.calculate_total_price(adults=2, children=0, infants=0),
-            '1_adult_1_child': obj.calculate_total_price(adults=1, children=1, infants=0),
-            '1_adult_1_infant': obj.calculate_total_price(adults=1, children=0, infants=1),
+            '1_adult': quote_engine.total_price(vec, adults=1, children=0, infants=0),
+            '2_adults': quote_engine.total_price(vec, adults=2, children=0, infants=0),
+            '1_adult_1_child': quote_engine.total_price(vec, adults=1, children=1, infants=0),
+            '1_adult_1_infant': quote_engine.total_price(vec, adults=1, children=0, infants=1),
         }
 
+    def _price_vector(self, obj):
+        """The package's price vector, built once per serialized instance."""
+        vec = getattr(obj, '_quote_vector', None)
+        if vec is None:
+            vec = obj._quote_vector = quote_engine.vector(obj)
+        return vec
+
     def create(self, validated_data):
         hotel_data = validated_data.pop("hotel_details", [])
         transport_data = validated_data.pop("transport_details", [])
@@ -575,6 +586,8 @@ class UmrahPackageSerializer(ModelSerializer):
         for exclusion in exclusions_data:
             PackageExclusion.objects.create(package=instance, **exclusion)
 
+        # the stored vector predates the new details; price the response from them
+        instance.price_vector = {}
         return instance
 
     def get_excluded_tickets(self, obj):
@@ -600,14 +613,14 @@ class UmrahPackageSerializer(ModelSerializer):
     def get_adult_price(self, obj):
         """Adult price / cost computed from components (food, ziarat, transport, visa, ticket)."""
         try:
-            return obj.adult_cost()
+            return quote_engine.adult_cost(self._price_vector(obj))
         except Exception:
             return getattr(obj, 'adault_visa_selling_price', None)
 
     def get_infant_price(self, obj):
         """INFANT PRICE = INFANT TICKET SELLING PRICE + INFANT VISA SELLING PRICE"""
         try:
-            return obj.infant_price()
+            return quote_engine.infant_price(self._price_vector(obj))
         except Exception:
             # fallback similar to previous logic
             base = getattr(obj, "infant_visa_selling_price", 0) or 0
@@ -621,7 +634,7 @@ class UmrahPackageSerializer(ModelSerializer):
     def get_child_discount(self, obj):
         """CHILD DISCOUNT = ADULT TICKET SELLING PRICE - CHILD TICKET SELLING PRICE"""
         try:
-            return obj.child_discount()
+            return quote_engine.child_discount(self._price_vector(obj))
         except Exception:
             ticket = obj.ticket_details.first()
             if not ticket or not getattr(ticket, 'ticket', None):
@@ -716,6 +729,8 @@ class PublicUmrahPackageTicketSummarySerializer(serializers.ModelSerializer):
 
 class PublicUmrahPackageListSerializer(serializers.ModelSerializer):
     price = serializers.SerializerMethodField()
+    # total for the requested pax mix; the list view fills context["quotes"]
+    quote = serializers.SerializerMethodField()
     hotels = PublicUmrahPackageHotelSummarySerializer(source="hotel_details", many=True, read_only=True)
     transport = UmrahPackageTransportDetailsSerializer(source="transport_details", many=True, read_only=True)
     tickets = PublicUmrahPackageTicketSummarySerializer(source="ticket_details", many=True, read_only=True)
@@ -725,7 +740,9 @@ class PublicUmrahPackageListSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "title",
+            "slug",
             "price",
+            "quote",
             "total_seats",
             "left_seats",
             "booked_seats",
@@ -747,6 +764,9 @@ class PublicUmrahPackageListSerializer(serializers.ModelSerializer):
         ]
 
     def get_price(self, obj):
+        # stored headline price (packages.quote_engine), kept in sync after every change
+        if obj.quoted_price is not None:
+            return obj.quoted_price
         # prefer explicit price_per_person, fallback to adult visa price + service charge
         if getattr(obj, "price_per_person", None):
             return obj.price_per_person
@@ -756,6 +776,9 @@ class PublicUmrahPackageListSerializer(serializers.ModelSerializer):
         except Exception:
             return None
 
+    def get_quote(self, obj):
+        return self.context.get("quotes", {}).get(obj.pk)
+
 
 class PublicUmrahPackageDetailSerializer(ModelSerializer):
     hotels = PublicUmrahPackageHotelSummarySerializer(source="hotel_details", many=True, read_only=True)
@@ -767,6 +790,7 @@ class PublicUmrahPackageDetailSerializer(ModelSerializer):
         fields = [
             "id",
             "title",
+            "slug",
             "rules",
             "price",
             "price_per_person",
@@ -0,0 +1,21 @@
+"""Public read cache invalidation for packages (see universal.public_cache)."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from universal.public_cache import invalidate
+
+
+@receiver(post_save, sender="packages.UmrahPackage", dispatch_uid="public_cache_package_saved")
+@receiver(post_delete, sender="packages.UmrahPackage", dispatch_uid="public_cache_package_deleted")
+def package_changed(sender, instance, using=None, **kwargs):
+    invalidate("packages", instance.pk, using=using)
+
+
+@receiver(post_save, sender="packages.UmrahPackageHotelDetails", dispatch_uid="public_cache_hotel_saved")
+@receiver(post_delete, sender="packages.UmrahPackageHotelDetails", dispatch_uid="public_cache_hotel_deleted")
+@receiver(post_save, sender="packages.UmrahPackageTransportDetails", dispatch_uid="public_cache_transport_saved")
+@receiver(post_delete, sender="packages.UmrahPackageTransportDetails", dispatch_uid="public_cache_transport_deleted")
+@receiver(post_save, sender="packages.UmrahPackageTicketDetails", dispatch_uid="public_cache_ticket_saved")
+@receiver(post_delete, sender="packages.UmrahPackageTicketDetails", dispatch_uid="public_cache_ticket_deleted")
+def package_detail_changed(sender, instance, using=None, **kwargs):
+    invalidate("packages", instance.package_id, using=using)
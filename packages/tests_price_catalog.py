@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from organization.models import Organization
+from .models import Airlines, City, FoodPrice
+
+
+class PriceCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org")
+        self.other = Organization.objects.create(name="Other")
+        City.objects.create(organization=self.org, name="Makkah", code="MKK")
+        Airlines.objects.create(organization=self.org, name="PIA", code="PK")
+        FoodPrice.objects.create(organization=self.org, title="Inactive", active=False)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="prices"))
+
+    def test_snapshot_is_cached_and_revalidated_with_etag(self):
+        url = f"/api/all-prices/{self.org.id}/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["name"] for c in response.json()["cities"]], ["Makkah"])
+        self.assertEqual(response.json()["food_prices"], [])
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Airlines.objects.create(organization=self.org, name="Saudia", code="SV")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()["airlines"]), 2)
+
+    def test_all_organizations_variant(self):
+        response = self.client.get("/api/all-prices/")
+        data = response.json()
+        self.assertEqual(set(data), {str(pk) for pk in Organization.objects.values_list("id", flat=True)})
+        self.assertEqual(len(data[str(self.org.id)]["airlines"]), 1)
+        self.assertEqual(data[str(self.other.id)]["cities"], [])
+
+        # cached snapshots: only the organization list is queried
+        with self.assertNumQueries(1):
+            again = self.client.get("/api/all-prices/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(organization=self.other, name="Madinah", code="MED")
+        data = self.client.get("/api/all-prices/").json()
+        self.assertEqual([c["name"] for c in data[str(self.other.id)]["cities"]], ["Madinah"])
+
+    def test_seat_ledger_updates_refresh_ticket_seats(self):
+        from booking.inventory import SeatLedger
+        from tickets.models import Ticket
+
+        ticket = Ticket.objects.create(organization=self.org, airline=Airlines.objects.get(code="PK"),
+                                       total_seats=10, left_seats=10)
+        url = f"/api/all-prices/{self.org.id}/"
+        self.assertEqual([t["left_seats"] for t in self.client.get(url).json()["tickets"]], [10])
+
+        # queryset updates send no post_save
+        with self.captureOnCommitCallbacks(execute=True):
+            SeatLedger().ticket(ticket.id, booked=4, left=-4).apply()
+        self.assertEqual([t["left_seats"] for t in self.client.get(url).json()["tickets"]], [6])
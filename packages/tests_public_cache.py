@@ -0,0 +1,100 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from organization.models import Organization
+from .models import UmrahPackage
+
+
+class PublicPackageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org")
+        self.client = APIClient()
+
+    def _package(self, title, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return UmrahPackage.objects.create(organization=self.org, title=title, is_public=True,
+                                               price_per_person=Decimal("1000"), **fields)
+
+    def test_slugs_are_unique_and_stable(self):
+        first = self._package("Ramzan Gold")
+        second = self._package("Ramzan Gold")
+        numeric = self._package("2025")
+        self.assertEqual((first.slug, second.slug, numeric.slug), ("ramzan-gold", "ramzan-gold-2", "package-2025"))
+
+        first.title = "Ramzan Platinum"
+        first.save()
+        first.refresh_from_db()
+        self.assertEqual(first.slug, "ramzan-gold")
+
+    def test_slug_taken_by_a_concurrent_save_is_retried(self):
+        self._package("Ramzan Gold")
+        real = UmrahPackage._unique_slug
+
+        def stale(package, collided=()):
+            # the first lookup ran before the other package was inserted
+            return "ramzan-gold" if not collided else real(package, collided)
+
+        with mock.patch.object(UmrahPackage, "_unique_slug", stale):
+            second = self._package("Ramzan Gold")
+        self.assertEqual(second.slug, "ramzan-gold-2")
+        self.assertEqual(UmrahPackage.objects.filter(slug__startswith="ramzan-gold").count(), 2)
+
+    def test_detail_by_slug_is_cached_until_the_package_changes(self):
+        package = self._package("Ramzan Gold")
+        url = "/api/public/packages/ramzan-gold/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], package.id)
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data["title"], "Ramzan Gold")
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.client.get(f"/api/public/packages/{package.id}/").data["slug"], "ramzan-gold")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            package.title = "Ramzan Gold Plus"
+            package.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["title"], "Ramzan Gold Plus")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            package.is_public = False
+            package.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get("/api/public/packages/no-such-package/").status_code, 404)
+
+    def test_list_is_cached_until_a_package_changes(self):
+        self._package("Ramzan Gold")
+        response = self.client.get("/api/public/packages/", {"price_min": "500"})
+        self.assertEqual([p["title"] for p in response.data], ["Ramzan Gold"])
+
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/public/packages/?price_min=500")
+        self.assertEqual(again["ETag"], response["ETag"])
+
+        self._package("Ramzan Silver")
+        response = self.client.get("/api/public/packages/", {"price_min": "500"})
+        self.assertEqual(sorted(p["title"] for p in response.data), ["Ramzan Gold", "Ramzan Silver"])
+
+    def test_seat_ledger_updates_refresh_seat_counts(self):
+        from booking.inventory import SeatLedger
+
+        package = self._package("Ramzan Gold", total_seats=10, left_seats=10)
+        url = f"/api/public/packages/{package.id}/"
+        self.assertEqual(self.client.get(url).data["left_seats"], 10)
+        self.assertEqual(self.client.get("/api/public/packages/").data[0]["left_seats"], 10)
+
+        # queryset updates send no post_save
+        with self.captureOnCommitCallbacks(execute=True):
+            SeatLedger().package(package.id, booked=4, left=-4).apply()
+        self.assertEqual(self.client.get(url).data["left_seats"], 6)
+        self.assertEqual(self.client.get("/api/public/packages/").data[0]["left_seats"], 6)
@@ -0,0 +1,102 @@
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from organization.models import Organization
+from tickets.models import Hotels, Ticket
+from . import quote_engine
+from .models import Airlines, City, UmrahPackage, UmrahPackageHotelDetails, UmrahPackageTicketDetails
+
+
+class QuoteEngineTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org")
+        city = City.objects.create(organization=self.org, name="Makkah", code="MKK")
+        self.hotel = Hotels.objects.create(organization=self.org, name="Quote Hotel", city=city, address="Addr",
+                                           available_start_date="2025-01-01", available_end_date="2026-01-01")
+        airline = Airlines.objects.create(organization=self.org, name="PIA", code="PK")
+        self.ticket = Ticket.objects.create(organization=self.org, airline=airline, pnr="Q1",
+                                            adult_fare=500, child_fare=300, infant_fare=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package = UmrahPackage.objects.create(
+                organization=self.org, title="Gold", price_per_person=Decimal("1000"), profit_percent=Decimal("10"),
+                adault_visa_selling_price=200, child_visa_selling_price=150, infant_visa_selling_price=50,
+                adault_service_charge=20, is_service_charge_active=True, food_selling_price=30,
+                makkah_ziyarat_selling_price=10, madinah_ziyarat_selling_price=5, transport_selling_price=40,
+            )
+            UmrahPackageHotelDetails.objects.create(package=self.package, hotel=self.hotel, number_of_nights=3,
+                                                    double_bed_selling_price=80, quad_bed_selling_price=40)
+            UmrahPackageHotelDetails.objects.create(package=self.package, hotel=self.hotel, number_of_nights=2,
+                                                    double_bed_selling_price=60)
+            UmrahPackageTicketDetails.objects.create(package=self.package, ticket=self.ticket)
+        self.package.refresh_from_db()
+
+    def test_stored_vector_prices_like_the_package_formulas(self):
+        vec = self.package.price_vector
+        self.assertEqual(vec["rooms"]["double"], 360)
+        self.assertEqual(vec["rooms"]["quad"], 120)
+        self.assertEqual(vec["ticket"], [500, 300, 100])
+        self.assertEqual(self.package.quoted_price, Decimal("1000.00"))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.package.adult_cost(), 30 + 10 + 5 + 40 + 200 + 500)
+            self.assertEqual(self.package.room_cost("double"), 785 + 360)
+            self.assertEqual(self.package.room_cost("unknown"), 785)
+            self.assertEqual(self.package.infant_price(), 150)
+            self.assertEqual(self.package.child_discount(), 200)
+            self.assertEqual(self.package.calculate_total_price(adults=2, children=1), round((2000 + 400 + 150 + 40) * 1.1, 2))
+
+        # without a stored vector the details are walked instead
+        self.package.price_vector = {}
+        self.assertEqual(self.package.room_cost("double"), 1145)
+
+    def test_vectors_follow_detail_and_ticket_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UmrahPackageHotelDetails.objects.filter(package=self.package, number_of_nights=2).get().delete()
+            self.ticket.adult_fare = 700
+            self.ticket.save()
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.price_vector["rooms"]["double"], 240)
+        self.assertEqual(self.package.price_vector["ticket"][0], 700)
+
+        UmrahPackage.objects.filter(pk=self.package.pk).update(price_vector={})
+        call_command("refresh_package_quotes", package=[self.package.pk], stdout=StringIO())
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.price_vector["rooms"]["double"], 240)
+
+    def test_migration_prices_existing_packages(self):
+        UmrahPackage.objects.filter(pk=self.package.pk).update(price_vector={}, quoted_price=None)
+
+        import_module("packages.migrations.0060_umrahpackage_price_vector").fill_price_vectors(apps, None)
+
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.quoted_price, Decimal("1000.00"))
+        self.assertEqual(self.package.price_vector["rooms"]["double"], 360)
+
+    def test_quote_packages_in_one_pass(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap = UmrahPackage.objects.create(organization=self.org, title="Silver", price_per_person=Decimal("500"))
+        rows = UmrahPackage.objects.values("id", "price_vector")
+        self.assertEqual(quote_engine.quote_packages(rows, adults=2), {self.package.pk: 2684.0, cheap.pk: 1000.0})
+        quotes = quote_engine.quote_packages(rows, adults=2, children=1, infants=1, room_type="double")
+        self.assertEqual(quotes[self.package.pk], 2 * 1145 + (1145 - 200) + 150)
+
+    def test_public_list_filters_on_quoted_price(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UmrahPackage.objects.create(organization=self.org, title="Silver", adault_visa_selling_price=300,
+                                        adault_service_charge=25, is_public=True)
+            UmrahPackage.objects.filter(pk=self.package.pk).update(is_public=True)
+        client = APIClient()
+
+        response = client.get("/api/public/packages/", {"price_min": "400"})
+        self.assertEqual([p["title"] for p in response.data], ["Gold"])
+        response = client.get("/api/public/packages/", {"price_max": "400"})
+        self.assertEqual([(p["title"], p["price"], p["quote"]) for p in response.data], [("Silver", Decimal("325.00"), None)])
+
+        response = client.get("/api/public/packages/", {"price_min": "400", "adults": "2", "room_type": "quad"})
+        self.assertEqual(response.data[0]["quote"], 2 * (785 + 120))
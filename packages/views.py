@@ -46,14 +46,14 @@ from .serializers import (
     FoodPriceSerializer,
     ZiaratPriceSerializer,
 )
-from tickets.models import Ticket, Hotels
-from tickets.serializers import TicketSerializer, HotelsSerializer
 from django.db.models import Q
-from booking.models import AllowedReseller
+from organization.visibility import get_inventory_visibility
 from django.utils import timezone
 from rest_framework import generics
 from .serializers import PublicUmrahPackageListSerializer, PublicUmrahPackageDetailSerializer
-from django.utils.text import slugify
+from .price_catalog import price_catalog, all_price_catalogs
+from .quote_engine import ROOM_FIELDS, quote_packages
+from universal.public_cache import cached_lookup, cached_response, not_modified
 from decimal import Decimal
 
 class VisaViewSet(ModelViewSet):
@@ -509,58 +509,15 @@ class PackageViewSet(ModelViewSet):
         Also includes packages where reselling_allowed=True and user's org is an allowed reseller.
         Includes packages from linked organizations.
         """
-        from organization.models import OrganizationLink
-        
         organization_id = self.request.query_params.get("organization")
         if not organization_id:
             raise PermissionDenied("Missing 'organization' query parameter.")
         
-        # Get linked organizations
-        linked_org_ids = OrganizationLink.get_linked_organizations(int(organization_id))
-        
-        # Include packages from the user's organization and linked organizations
-        allowed_org_ids = {int(organization_id)} | linked_org_ids
-
-        # Build allowed owner organization ids based on AllowedReseller entries
-        # Query AllowedReseller for the calling organization only (what this org is allowed to resell)
-        allowed_owner_org_ids = []
-        # collect specific allowed package ids from AllowedReseller.allowed_items
-        allowed_package_ids = set()
-        try:
-            allowed_qs = AllowedReseller.objects.filter(
-                reseller_company_id=int(organization_id),
-                requested_status_by_reseller="ACCEPTED",
-            )
-            # filter by allowed_types containing GROUP_PACKAGES
-            for ar in allowed_qs:
-                inv = getattr(ar, "inventory_owner_company", None)
-                if inv is None:
-                    continue
-                org_id = getattr(inv, "organization_id", None) or getattr(inv, "main_organization_id", None) or None
-                if org_id:
-                    # If AllowedReseller specifies allowed_items, treat those as specific allowed package ids
-                    try:
-                        items = getattr(ar, "allowed_items", None) or []
-                    except Exception:
-                        items = []
-
-                    if items:
-                        for it in items:
-                            try:
-                                if (it.get("type") == "package") and it.get("id"):
-                                    allowed_package_ids.add(int(it.get("id")))
-                            except Exception:
-                                continue
-                    else:
-                        types = ar.allowed_types or []
-                        if "GROUP_PACKAGES" in types:
-                            allowed_owner_org_ids.append(org_id)
-
-        except Exception:
-            allowed_owner_org_ids = []
-
-        # Include own organization and any explicitly allowed owner organizations
-        owner_ids = set(allowed_owner_org_ids) | {int(organization_id)}
+        # Linked organizations and AllowedReseller grants, resolved once per org and cached
+        visibility = get_inventory_visibility(int(organization_id))
+        linked_org_ids = set(visibility.linked_org_ids)
+        allowed_owner_org_ids = visibility.owner_org_ids("GROUP_PACKAGES")
+        allowed_package_ids = visibility.allowed_item_ids("package")
 
         # Base filters: always include packages that belong to the calling org (own org)
         own_org_id = int(organization_id)
@@ -1278,38 +1235,15 @@ class UmrahPackageViewSet(ModelViewSet):
         return self.update(request, *args, **kwargs)
 
     def get_queryset(self):
-        from organization.models import OrganizationLink
-        
         organization_id = self.request.query_params.get("organization")
         if not organization_id:
             raise PermissionDenied("Missing 'organization' query parameter.")
         is_active = self.request.query_params.get("is_active")
 
-        # Get linked organizations
-        linked_org_ids = OrganizationLink.get_linked_organizations(int(organization_id))
-        
-        # Include own organization and linked organizations
-        allowed_org_ids = {int(organization_id)} | linked_org_ids
-
-        # Build allowed owner organization ids based on AllowedReseller entries
-        allowed_owner_org_ids = []
-        try:
-            # Query AllowedReseller for the calling organization only
-            allowed_qs = AllowedReseller.objects.filter(
-                reseller_company_id=int(organization_id),
-                requested_status_by_reseller="ACCEPTED",
-            )
-            for ar in allowed_qs:
-                inv = getattr(ar, "inventory_owner_company", None)
-                if inv is None:
-                    continue
-                org_id = getattr(inv, "organization_id", None) or getattr(inv, "main_organization_id", None) or None
-                if org_id:
-                    types = ar.allowed_types or []
-                    if "UMRAH_PACKAGES" in types:
-                        allowed_owner_org_ids.append(org_id)
-        except Exception:
-            allowed_owner_org_ids = []
+        # AllowedReseller grants for UMRAH_PACKAGES (with or without explicit items)
+        visibility = get_inventory_visibility(int(organization_id))
+        linked_org_ids = set(visibility.linked_org_ids)
+        allowed_owner_org_ids = visibility.owner_org_ids("UMRAH_PACKAGES", ignore_items=True)
 
         owner_ids = set(allowed_owner_org_ids) | {int(organization_id)}
 
@@ -1414,28 +1348,22 @@ class SetVisaTypeViewSet(ModelViewSet):
 
 
 
+def _catalog_response(request, etag, data):
+    """Serve a price catalog snapshot, answering 304 when the client's copy is current."""
+    if not_modified(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(data)
+    response["ETag"] = etag
+    # let clients keep a copy but always revalidate it
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 class AllPricesAPIView(APIView):
     def _gather_for_org(self, organization_id):
         # return a dict of all price-like resources for a single organization id
-        return {
-            "riyal_rates": list(RiyalRate.objects.filter(organization_id=organization_id).values()),
-            "shirkas": list(Shirka.objects.filter(organization_id=organization_id).values()),
-            "umrah_visa_prices": list(UmrahVisaPrice.objects.filter(organization_id=organization_id).values()),
-            "umrah_visa_type_two": list(UmrahVisaPriceTwo.objects.filter(organization_id=organization_id).values()),
-            "only_visa_prices": list(OnlyVisaPrice.objects.filter(organization_id=organization_id).values()),
-            # "transport_sector_prices": list(TransportSectorPrice.objects.filter(organization_id=organization_id).values()),
-            "airlines": list(Airlines.objects.filter(organization_id=organization_id).values()),
-            "cities": list(City.objects.filter(organization_id=organization_id).values()),
-            "set_visa_type": list(SetVisaType.objects.filter(organization_id=organization_id).values()),
-            "food_prices": list(FoodPrice.objects.filter(organization_id=organization_id, active=True).values()),
-            "ziarat_prices": list(ZiaratPrice.objects.filter(organization_id=organization_id).values()),
-            "tickets": TicketSerializer(
-                Ticket.objects.filter(organization_id=organization_id), many=True
-            ).data,
-            "hotels": HotelsSerializer(
-                Hotels.objects.filter(organization_id=organization_id), many=True
-            ).data,
-        }
+        return price_catalog(organization_id)[1]
 
     @extend_schema(
         parameters=[
@@ -1457,22 +1385,12 @@ class AllPricesAPIView(APIView):
                 org_id = int(organization_id)
             except Exception:
                 return Response({"error": "invalid organization_id"}, status=400)
-            data = self._gather_for_org(org_id)
-            return Response(data)
+            etag, data = price_catalog(org_id)
+            return _catalog_response(request, etag, data)
 
         # No organization_id provided: return data for all organizations (keyed by org id)
-        from organization.models import Organization
-
-        all_orgs = Organization.objects.values_list('id', flat=True)
-        result = {}
-        for oid in all_orgs:
-            try:
-                result[str(oid)] = self._gather_for_org(oid)
-            except Exception:
-                # continue on errors for specific organizations
-                result[str(oid)] = {"error": "failed to gather for org"}
-
-        return Response(result)
+        etag, result = all_price_catalogs()
+        return _catalog_response(request, etag, result)
 
 
 @extend_schema(exclude=True)
@@ -1507,14 +1425,15 @@ class PublicUmrahPackageListAPIView(generics.ListAPIView):
 
         price_min = self.request.query_params.get("price_min")
         price_max = self.request.query_params.get("price_max")
+        # filter on the stored headline price (packages.quote_engine) in the database
         if price_min:
             try:
-                qs = qs.filter(Q(price_per_person_gte=price_min) | Q(adault_visa_selling_price_gte=price_min))
+                qs = qs.filter(quoted_price__gte=Decimal(price_min))
             except Exception:
                 pass
         if price_max:
             try:
-                qs = qs.filter(Q(price_per_person_lte=price_max) | Q(adault_visa_selling_price_lte=price_max))
+                qs = qs.filter(quoted_price__lte=Decimal(price_max))
             except Exception:
                 pass
 
@@ -1528,30 +1447,54 @@ class PublicUmrahPackageListAPIView(generics.ListAPIView):
 
         return qs.distinct()
 
+    def _pax_mix(self):
+        """Pax mix from ?adults=&children=&infants=&room_type=, or None when not requested."""
+        params = self.request.query_params
+        if not any(params.get(key) for key in ("adults", "children", "infants", "room_type")):
+            return None
+        try:
+            mix = {key: max(int(params.get(key) or default), 0)
+                   for key, default in (("adults", 1), ("children", 0), ("infants", 0))}
+        except (TypeError, ValueError):
+            return None
+        room_type = params.get("room_type")
+        mix["room_type"] = room_type if room_type in ROOM_FIELDS else None
+        return mix
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, "packages", lambda: super(PublicUmrahPackageListAPIView, self).list(request, *args, **kwargs))
+
+    def get_serializer(self, *args, **kwargs):
+        # price the whole page for the requested pax mix in one pass over the stored vectors
+        pax = self._pax_mix()
+        if pax and args:
+            kwargs["context"] = {**self.get_serializer_context(), "quotes": quote_packages(args[0], **pax)}
+        return super().get_serializer(*args, **kwargs)
+
 
 @extend_schema(exclude=True)
 class PublicUmrahPackageDetailAPIView(APIView):
-    """Public package detail view. Lookup by id or slug (slugified title)."""
+    """Public package detail view. Lookup by id or slug (the package's stored slug)."""
     permission_classes = [AllowAny]
 
     def get(self, request, identifier):
-        # try id
-        pkg = None
-        try:
-            if identifier.isdigit():
-                pkg = UmrahPackage.objects.get(id=int(identifier), is_active=True, is_public=True)
-        except UmrahPackage.DoesNotExist:
-            pkg = None
-
-        if pkg is None:
-            # try slug match on title
-            sl = identifier
-            qs = UmrahPackage.objects.filter(is_active=True, is_public=True)
-            for p in qs:
-                if slugify(p.title) == sl:
-                    pkg = p
-                    break
+        if identifier.isdigit():
+            pk = int(identifier)
+        else:
+            pk = cached_lookup(
+                "packages", "slug", identifier,
+                lambda slug: UmrahPackage.objects.filter(slug=slug).values_list("pk", flat=True).first(),
+            )
+        if pk is None:
+            return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+        return cached_response(request, "packages", lambda: self._detail(pk), obj_id=pk)
 
+    def _detail(self, pk):
+        pkg = (
+            UmrahPackage.objects.filter(pk=pk, is_active=True, is_public=True)
+            .prefetch_related("hotel_details__hotel", "transport_details", "ticket_details__ticket")
+            .first()
+        )
         if not pkg:
             return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -1579,5 +1522,5 @@ class AllPricesByOrgAPIView(APIView):
         except Exception:
             return Response({"error": "invalid organization_id"}, status=400)
 
-        data = AllPricesAPIView()._gather_for_org(org_id)
-        return Response(data)
\ No newline at end of file
+        etag, data = price_catalog(org_id)
+        return _catalog_response(request, etag, data)
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""Pax movement summary: one grouped query, or live counters.
+
+``movement_summary`` computes the whole summary (status totals, verified and
+unverified exits, per-city counts of pax in KSA) from one query grouped by
+status, exit verification and city, instead of a ``count()`` per figure.
+
+``PaxMovementCounter`` keeps the same groups as stored counts so a dashboard
+polled every few seconds reads a handful of rows.  Every PaxMovement save or
+delete (``update_status``, ``verify_exit``, admin edits, auto-creation for
+approved bookings) moves one unit from its old group to its new one inside
+the same transaction.  Queryset ``update()`` calls bypass this; run
+``manage.py reconcile_pax_counters`` after bulk changes.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import PaxMovement, PaxMovementCounter
+
+
+KEY_FIELDS = ("organization_id", "status", "current_city_id", "exit_verification")
+KSA_STATUSES = ("entered_ksa", "in_ksa")
+
+
+def counters_enabled():
+    return (getattr(settings, "PAX_MOVEMENT_COUNTERS", {}) or {}).get("MAINTAIN", True)
+
+
+def summarize(rows):
+    """Build the summary payload from ``(status, exit_verification, city_name, count)`` rows."""
+    summary = {
+        "total_pax": 0,
+        "in_pakistan": 0,
+        "entered_ksa": 0,
+        "in_ksa": 0,
+        "exited_ksa": 0,
+        "verified_exits": 0,
+        "not_verified_exits": 0,
+        "by_city": {},
+    }
+    for status, verification, city_name, count in rows:
+        if not count:
+            continue
+        summary["total_pax"] += count
+        if status in summary:
+            summary[status] += count
+        if status == "exited_ksa" and verification in ("verified", "not_verified"):
+            summary[f"{verification}_exits"] += count
+        if status in KSA_STATUSES and city_name is not None:
+            summary["by_city"][city_name] = summary["by_city"].get(city_name, 0) + count
+    return summary
+
+
+def movement_summary(queryset):
+    """Summary of a PaxMovement queryset in one grouped query."""
+    rows = (
+        queryset.values("status", "exit_verification", "current_city__name")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return summarize(
+        (row["status"], row["exit_verification"], row["current_city__name"], row["count"]) for row in rows
+    )
+
+
+def counter_summary(status=None, organization_id=None):
+    """The same summary read from ``PaxMovementCounter``."""
+    counters = PaxMovementCounter.objects.all()
+    if status:
+        counters = counters.filter(status=status)
+    if organization_id:
+        counters = counters.filter(organization_id=organization_id)
+    rows = (
+        counters.values("status", "exit_verification", "city__name")
+        .annotate(total=Sum("count"))
+        .order_by()
+    )
+    return summarize((row["status"], row["exit_verification"], row["city__name"], row["total"]) for row in rows)
+
+
+def movement_key(values):
+    """Counter key of a PaxMovement (instance or ``values()`` dict)."""
+    if isinstance(values, dict):
+        return tuple(values.get(field) for field in KEY_FIELDS)
+    return tuple(getattr(values, field) for field in KEY_FIELDS)
+
+
+def _lookup(key):
+    organization_id, status, city_id, verification = key
+    return {
+        "organization_id": organization_id,
+        "status": status,
+        "city_id": city_id,
+        "exit_verification": verification,
+    }
+
+
+def apply_delta(key, delta):
+    """Add ``delta`` to the counter of ``key``."""
+    if not delta:
+        return
+    lookup = _lookup(key)
+    pk = PaxMovementCounter.objects.filter(**lookup).order_by("pk").values_list("pk", flat=True).first()
+    if pk is None:
+        PaxMovementCounter.objects.create(count=delta, **lookup)
+    else:
+        PaxMovementCounter.objects.filter(pk=pk).update(count=F("count") + delta, updated_at=timezone.now())
+
+
+def move(old_key, new_key):
+    """Move one pax from ``old_key`` to ``new_key`` (either may be None)."""
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        apply_delta(old_key, -1)
+    if new_key is not None:
+        apply_delta(new_key, 1)
+
+
+def reconcile(fix=False, apps=None):
+    """Compare counters with PaxMovement rows; with ``fix`` rewrite them.
+
+    Returns ``{key: (counted, actual)}`` for every key that differs.
+    Migrations pass ``apps`` to work on the historical models.
+    """
+    movements, counter_model = PaxMovement, PaxMovementCounter
+    if apps is not None:
+        movements = apps.get_model("pax_movements", "PaxMovement")
+        counter_model = apps.get_model("pax_movements", "PaxMovementCounter")
+    with transaction.atomic():
+        counters = counter_model.objects.all()
+        if fix:
+            # block counter updates while the counts are rewritten
+            list(counters.select_for_update().values_list("pk", flat=True))
+        actual = {
+            movement_key(row): row["count"]
+            for row in movements.objects.values(*KEY_FIELDS).annotate(count=Count("id")).order_by()
+        }
+        counted = {}
+        for row in counters.values("organization_id", "status", "city_id", "exit_verification").annotate(
+            total=Sum("count")
+        ).order_by():
+            key = (row["organization_id"], row["status"], row["city_id"], row["exit_verification"])
+            counted[key] = row["total"]
+
+        differences = {
+            key: (counted.get(key, 0), actual.get(key, 0))
+            for key in set(actual) | set(counted)
+            if counted.get(key, 0) != actual.get(key, 0)
+        }
+        if fix and differences:
+            counters.delete()
+            counter_model.objects.bulk_create(
+                [counter_model(count=count, **_lookup(key)) for key, count in actual.items()],
+                batch_size=1000,
+            )
+    return differences
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from pax_movements.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the pax movement status counters with the PaxMovement rows '
+        'and report every differing (organization, status, city, verification) '
+        'group; --fix rewrites the counters from the rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite the counters when they differ')
+
+    def handle(self, *args, **options):
+        differences = reconcile(fix=options['fix'])
+        for (organization_id, status, city_id, verification), (counted, actual) in sorted(
+            differences.items(), key=str
+        ):
+            self.stdout.write(
+                f'organization={organization_id} status={status} city={city_id} '
+                f'verification={verification}: counted {counted}, actual {actual}'
+            )
+        if not differences:
+            self.stdout.write(self.style.SUCCESS('Counters are consistent'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Rewrote counters ({len(differences)} groups differed)'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(differences)} groups differ; run with --fix to repair'))
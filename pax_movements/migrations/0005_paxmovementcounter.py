@@ -0,0 +1,39 @@
+# Generated by Django 4.2.1 on 2026-10-18 21:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_counters(apps, schema_editor):
+    # count the existing movements, or the dashboard would start from zero
+    from pax_movements.counters import reconcile
+
+    reconcile(fix=True, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0020_add_resellrequest_items'),
+        ('packages', '0059_remove_umrahpackage_adault_visa_price_and_more'),
+        ('pax_movements', '0004_add_agent_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaxMovementCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('in_pakistan', 'In Pakistan'), ('entered_ksa', 'Entered KSA'), ('in_ksa', 'In KSA'), ('exited_ksa', 'Exited KSA')], max_length=20)),
+                ('exit_verification', models.CharField(choices=[('pending', 'Pending'), ('verified', 'Verified'), ('not_verified', 'Not Verified')], default='pending', max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('city', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='packages.city')),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organization.organization')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'status'], name='pax_movemen_organiz_66a18b_idx')],
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
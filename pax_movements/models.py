@@ -423,3 +423,27 @@ class FoodServicePax(models.Model):
     
     def __str__(self):
         return f"{self.person.first_name} {self.person.last_name} - {self.food_service}"
+
+
+class PaxMovementCounter(models.Model):
+    """Live PaxMovement counts per organization, status, city and exit verification.
+
+    Maintained from PaxMovement saves and deletes (see ``counters.py``); a key
+    may be spread over several rows, readers sum them.  Reconcile with
+    ``manage.py reconcile_pax_counters``.
+    """
+    
+    organization = models.ForeignKey('organization.Organization', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=PaxMovement.STATUS_CHOICES)
+    city = models.ForeignKey(City, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    exit_verification = models.CharField(max_length=20, choices=PaxMovement.VERIFICATION_CHOICES, default='pending')
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.status} / {self.city_id} / {self.exit_verification}: {self.count}"
@@ -1,23 +1,33 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from booking.models import Booking, BookingPersonDetail
+from booking.events import booking_events
+from booking.models import BookingPersonDetail
+from .counters import KEY_FIELDS, counters_enabled, move, movement_key
 from .models import PaxMovement
 
 
-@receiver(post_save, sender=Booking)
-def create_pax_movements_for_booking(sender, instance, created, **kwargs):
+logger = logging.getLogger(__name__)
+
+
+@booking_events.register("pax_movements.create")
+def create_pax_movements_for_booking(event):
     """
     Auto-generate PaxMovement records when a booking is created or when it becomes approved.
     This creates movement tracking for each passenger in the booking.
     """
+    instance = event.booking
     # Only create movements if booking is approved and movements don't already exist
     if instance.status == 'Approved':
         # Get all passengers in this booking
         persons = instance.person_details.all()
-        
+        tracked = set(PaxMovement.objects.filter(booking=instance).values_list('person_id', flat=True))
+
         for person in persons:
             # Check if movement already exists for this person
-            if not PaxMovement.objects.filter(booking=instance, person=person).exists():
+            if person.id not in tracked:
                 PaxMovement.objects.create(
                     booking=instance,
                     person=person,
@@ -37,3 +47,35 @@ def create_pax_movement_for_new_person(sender, instance, created, **kwargs):
                 person=instance,
                 status='in_pakistan'
             )
+
+
+def _move_counter(old_key, new_key):
+    try:
+        with transaction.atomic():
+            move(old_key, new_key)
+    except Exception:
+        # non-fatal: reconcile_pax_counters repairs the counters
+        logger.exception("pax movement counter update failed")
+
+
+@receiver(pre_save, sender=PaxMovement)
+def remember_counter_key(sender, instance, raw=False, **kwargs):
+    """Cache the stored status/city/verification so post_save can move the counter."""
+    if raw or not instance.pk or not counters_enabled():
+        instance._counter_key = None
+        return
+    old = PaxMovement.objects.filter(pk=instance.pk).values(*KEY_FIELDS).first()
+    instance._counter_key = movement_key(old) if old else None
+
+
+@receiver(post_save, sender=PaxMovement)
+def update_counter_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or not counters_enabled():
+        return
+    _move_counter(None if created else getattr(instance, '_counter_key', None), movement_key(instance))
+
+
+@receiver(post_delete, sender=PaxMovement)
+def update_counter_on_delete(sender, instance, **kwargs):
+    if counters_enabled():
+        _move_counter(movement_key(instance), None)
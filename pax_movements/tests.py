@@ -1,3 +1,78 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from booking.models import Booking, BookingPersonDetail
+from organization.models import Agency, Branch, Organization
+from packages.models import City
+
+from .models import PaxMovement, PaxMovementCounter
+
+
+class PaxMovementSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='movements')
+        self.org = Organization.objects.create(name='Org')
+        branch = Branch.objects.create(name='Main', organization=self.org)
+        agency = Agency.objects.create(name='Agency', branch=branch)
+        self.makkah = City.objects.create(organization=self.org, name='Makkah', code='MAK')
+        booking = Booking.objects.create(
+            user=self.user, organization=self.org, branch=branch, agency=agency,
+            booking_number='PM-1', status='new',
+        )
+        self.movements = [
+            PaxMovement.objects.create(
+                booking=booking, organization=self.org,
+                person=BookingPersonDetail.objects.create(booking=booking, first_name=f'P{i}', last_name='X'),
+            )
+            for i in range(4)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _summary(self, **params):
+        return self.client.get('/api/pax-movements/summary/', params).json()['data']
+
+    def test_summary_from_rows_and_counters_agree(self):
+        first, second, third = self.movements[:3]
+        self.client.put(f'/api/pax-movements/{first.pk}/update/', {'status': 'in_ksa', 'current_city': self.makkah.pk}, format='json')
+        self.client.put(f'/api/pax-movements/{second.pk}/update/', {'status': 'entered_ksa', 'current_city': self.makkah.pk}, format='json')
+        self.client.post(f'/api/pax-movements/{third.pk}/verify-exit/', {'exit_verification': 'verified'}, format='json')
+
+        with self.assertNumQueries(1):
+            scanned = self.client.get('/api/pax-movements/summary/').json()['data']
+        self.assertEqual(scanned, {
+            'total_pax': 4, 'in_pakistan': 1, 'entered_ksa': 1, 'in_ksa': 1, 'exited_ksa': 1,
+            'verified_exits': 1, 'not_verified_exits': 0, 'by_city': {'Makkah': 2},
+        })
+        self.assertEqual(self._summary(source='counters'), scanned)
+        self.assertEqual(self._summary(source='counters', status='in_ksa')['total_pax'], 1)
+
+        self.movements[3].delete()
+        self.assertEqual(self._summary(source='counters')['in_pakistan'], 0)
+
+    def test_reconcile_repairs_counters(self):
+        # bulk updates bypass the counters
+        PaxMovement.objects.filter(pk=self.movements[0].pk).update(status='exited_ksa')
+        self.assertEqual(self._summary(source='counters')['exited_ksa'], 0)
+
+        out = StringIO()
+        call_command('reconcile_pax_counters', stdout=out)
+        self.assertIn('2 groups differ', out.getvalue())
+
+        call_command('reconcile_pax_counters', '--fix', stdout=StringIO())
+        self.assertEqual(self._summary(source='counters'), self._summary())
+        self.assertEqual(PaxMovementCounter.objects.count(), 2)
+
+    def test_migration_seeds_counters_from_existing_movements(self):
+        PaxMovementCounter.objects.all().delete()
+
+        import_module('pax_movements.migrations.0005_paxmovementcounter').seed_counters(apps, None)
 
-# Create your tests here.
+        self.assertEqual(self._summary(source='counters')['in_pakistan'], 4)
+        self.assertEqual(self._summary(source='counters'), self._summary())
@@ -3,7 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db.models import Q
 from datetime import datetime, date
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
@@ -25,6 +25,7 @@ from .serializers import (
     PaxFullDetailsSerializer
 )
 from .mixins import EmptyDataMixin
+from .counters import counter_summary, counters_enabled, movement_summary
 
 
 @extend_schema_view(
@@ -158,6 +159,15 @@ class PaxMovementViewSet(EmptyDataMixin, viewsets.ModelViewSet):
     
     @extend_schema(
         description="Get summary statistics of all passenger movements: counts by status, city, and verification status",
+        parameters=[
+            OpenApiParameter(
+                name="source",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="'counters' reads the live status counters instead of scanning movements (ignored with pax_id/booking_id filters)",
+                required=False,
+            ),
+        ],
         responses={200: PaxMovementSummarySerializer}
     )
     @action(detail=False, methods=['get'], url_path='summary')
@@ -171,46 +181,18 @@ class PaxMovementViewSet(EmptyDataMixin, viewsets.ModelViewSet):
         - How many exited
         - How many in each city (Makkah, Madinah, Jeddah, etc.)
         """
-        queryset = self.get_queryset()
-        
-        # Count by status
-        total_pax = queryset.count()
-        in_pakistan = queryset.filter(status='in_pakistan').count()
-        entered_ksa = queryset.filter(status='entered_ksa').count()
-        in_ksa = queryset.filter(status='in_ksa').count()
-        exited_ksa = queryset.filter(status='exited_ksa').count()
-        
-        # Count verified vs not verified exits
-        verified_exits = queryset.filter(
-            status='exited_ksa', 
-            exit_verification='verified'
-        ).count()
-        not_verified_exits = queryset.filter(
-            status='exited_ksa', 
-            exit_verification='not_verified'
-        ).count()
-        
-        # Count by city (for those in KSA)
-        by_city = {}
-        city_counts = queryset.filter(
-            status__in=['entered_ksa', 'in_ksa'],
-            current_city__isnull=False
-        ).values('current_city__name').annotate(count=Count('id'))
-        
-        for item in city_counts:
-            city_name = item['current_city__name']
-            by_city[city_name] = item['count']
-        
-        summary_data = {
-            'total_pax': total_pax,
-            'in_pakistan': in_pakistan,
-            'entered_ksa': entered_ksa,
-            'in_ksa': in_ksa,
-            'exited_ksa': exited_ksa,
-            'verified_exits': verified_exits,
-            'not_verified_exits': not_verified_exits,
-            'by_city': by_city
-        }
+        params = request.query_params
+        use_counters = (
+            params.get('source') == 'counters'
+            and counters_enabled()
+            and not params.get('pax_id')
+            and not params.get('booking_id')
+        )
+        if use_counters:
+            summary_data = counter_summary(status=params.get('status'))
+        else:
+            # one query grouped by status, verification and city
+            summary_data = movement_summary(self.get_queryset())
         
         serializer = PaxMovementSummarySerializer(summary_data)
         return Response({
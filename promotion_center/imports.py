@@ -0,0 +1,259 @@
+"""Chunked, resumable CSV import and streaming export of promotion contacts.
+
+The import used to ``update_or_create`` every row inside one transaction, a
+SELECT plus an INSERT or UPDATE per phone number.  ``run_import`` reads the
+uploaded file in chunks of ``PROMOTION_IMPORT["CHUNK_SIZE"]`` rows; per chunk
+it normalizes the phones, resolves the existing contacts through their
+identity keys (``customers.identity``) and writes them with one
+``bulk_create`` and one ``bulk_update``.  Each chunk commits together with
+the job's progress, so a failed or interrupted job continues from
+``processed_rows`` (``resume_import`` or ``manage.py run_promotion_import``).
+
+Jobs run on a background thread when ``PROMOTION_IMPORT["BACKGROUND"]`` is on;
+the import endpoint then answers 202 with the job for polling.
+"""
+import csv
+import logging
+import threading
+from io import TextIOWrapper
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from customers.identity import index_contacts, phone_key, resolve_contacts
+from .models import PromotionContact, PromotionImportJob, normalize_phone
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BACKGROUND": True,
+    "CHUNK_SIZE": 1000,
+    "MAX_ERRORS": 1000,
+}
+
+UPDATE_FIELDS = [
+    "name", "email", "contact_type", "source", "source_reference", "city",
+    "organization_id", "branch_id", "updated_at",
+]
+
+EXPORT_HEADER = [
+    "id", "full_name", "contact_number", "email", "contact_type", "source",
+    "organization_id", "branch_id", "city", "status", "created_at",
+]
+EXPORT_FIELDS = [
+    "id", "name", "phone", "email", "contact_type", "source",
+    "organization_id", "branch_id", "city", "status", "created_at",
+]
+
+PHONE_MAX_LENGTH = PromotionContact._meta.get_field("phone").max_length
+
+
+def _config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "PROMOTION_IMPORT", {}) or {})
+    return config
+
+
+def _optional_int(value, column):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"invalid {column} {value!r}")
+
+
+def parse_row(row):
+    """``(phone, defaults)`` for a CSV row; raises ValueError for unusable rows."""
+    raw_phone = row.get("contact_number") or row.get("phone") or row.get("contact_no")
+    if not raw_phone:
+        raise ValueError("missing phone")
+    phone = normalize_phone(raw_phone)
+    if not phone or phone == "+" or len(phone) > PHONE_MAX_LENGTH:
+        raise ValueError(f"invalid phone {raw_phone!r}")
+    return phone, {
+        "name": row.get("full_name") or row.get("name") or "",
+        "email": row.get("email") or None,
+        "contact_type": row.get("type") or row.get("contact_type") or "other",
+        "source": row.get("source") or "import",
+        "source_reference": row.get("source_reference") or None,
+        "city": row.get("city") or None,
+        "organization_id": _optional_int(row.get("organization_id"), "organization_id"),
+        "branch_id": _optional_int(row.get("branch_id"), "branch_id"),
+    }
+
+
+def _upsert_one_by_one(rows):
+    created = updated = 0
+    for phone, defaults in rows:
+        _, was_created = PromotionContact.objects.update_or_create(phone=phone, defaults=defaults)
+        created += was_created
+        updated += not was_created
+    return created, updated
+
+
+def import_chunk(rows, first_row=1):
+    """Upsert a list of CSV rows by phone; returns ``(created, updated, errors)``.
+
+    Rows are numbered from ``first_row`` in error messages.  A phone repeated
+    within the chunk is applied in order, the last row winning, and counted as
+    created once and updated for every repeat, like the row-by-row import.
+    """
+    errors = []
+    parsed = []
+    for number, row in enumerate(rows, start=first_row):
+        try:
+            parsed.append(parse_row(row))
+        except ValueError as exc:
+            errors.append(f"Row {number}: {exc}")
+    if not parsed:
+        return 0, 0, errors
+
+    # "0300 1234567" and "+92 300 1234567" are the same contact
+    latest = {}
+    repeats = 0
+    for phone, defaults in parsed:
+        key = phone_key(phone) or phone
+        repeats += key in latest
+        latest[key] = (phone, defaults)
+
+    now = timezone.now()
+    rows = list(latest.values())
+    existing = {
+        phone: contact
+        for (phone, _), contact in zip(rows, resolve_contacts([{"phone": phone} for phone, _ in rows]))
+        if contact is not None
+    }
+    missing = [phone for phone, _ in rows if phone not in existing]
+    if missing:
+        # contacts written before they had identity keys
+        existing.update(PromotionContact.objects.in_bulk(missing, field_name="phone"))
+    to_create = []
+    to_update = []
+    for phone, defaults in rows:
+        contact = existing.get(phone)
+        if contact is None:
+            to_create.append(PromotionContact(phone=phone, last_seen=now, **defaults))
+        else:
+            for field, value in defaults.items():
+                setattr(contact, field, value)
+            contact.updated_at = now
+            to_update.append(contact)
+
+    try:
+        with transaction.atomic():
+            PromotionContact.objects.bulk_create(to_create)
+            PromotionContact.objects.bulk_update(to_update, UPDATE_FIELDS)
+            # bulk writes skip the post_save receiver that claims identity keys
+            index_contacts(PromotionContact.objects.filter(phone__in=[phone for phone, _ in rows]))
+    except IntegrityError:
+        # a concurrent writer inserted one of the phones; fall back for this chunk
+        created, updated = _upsert_one_by_one(parsed)
+        return created, updated, errors
+    return len(to_create), len(to_update) + repeats, errors
+
+
+def _chunks(reader, size, offset):
+    chunk = []
+    first_row = offset + 1
+    for number, row in enumerate(reader, start=1):
+        if number <= offset:
+            continue
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield first_row, chunk
+            first_row += len(chunk)
+            chunk = []
+    if chunk:
+        yield first_row, chunk
+
+
+def run_import(job, chunk_size=None):
+    """Process ``job`` from its current offset to the end of the file."""
+    config = _config()
+    chunk_size = max(1, int(chunk_size or config["CHUNK_SIZE"]))
+    max_errors = config["MAX_ERRORS"]
+
+    PromotionImportJob.objects.filter(pk=job.pk).update(
+        status=PromotionImportJob.STATUS_RUNNING, started_at=job.started_at or timezone.now(), failure=None,
+    )
+    job.refresh_from_db()
+    try:
+        with job.file.open("rb") as raw:
+            reader = csv.DictReader(TextIOWrapper(raw, encoding=job.encoding or "utf-8"))
+            for first_row, rows in _chunks(reader, chunk_size, job.processed_rows):
+                with transaction.atomic():
+                    created, updated, errors = import_chunk(rows, first_row)
+                    job.processed_rows += len(rows)
+                    job.created_count += created
+                    job.updated_count += updated
+                    job.error_count += len(errors)
+                    job.errors = (job.errors + errors)[:max_errors]
+                    job.save(update_fields=[
+                        "processed_rows", "created_count", "updated_count", "error_count", "errors", "updated_at",
+                    ])
+    except Exception as exc:
+        logger.exception("promotion import %s failed at row %s", job.pk, job.processed_rows + 1)
+        job.status = PromotionImportJob.STATUS_FAILED
+        job.failure = str(exc)
+    else:
+        job.status = PromotionImportJob.STATUS_COMPLETED
+        job.file.delete(save=False)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "failure", "file", "finished_at", "updated_at"])
+    return job
+
+
+def _run_in_background(job_id):
+    close_old_connections()
+    try:
+        run_import(PromotionImportJob.objects.get(pk=job_id))
+    except Exception:
+        logger.exception("promotion import %s could not run", job_id)
+    finally:
+        close_old_connections()
+
+
+def start_import(job):
+    """Run ``job`` now, or on a background thread once the current transaction commits."""
+    if not _config()["BACKGROUND"]:
+        return run_import(job)
+    transaction.on_commit(
+        lambda: threading.Thread(
+            target=_run_in_background, args=(job.pk,), name=f"promotion-import-{job.pk}", daemon=True
+        ).start()
+    )
+    return job
+
+
+def can_resume(job, force=False):
+    """Failed and pending jobs resume; a "running" one only with ``force`` (its worker died)."""
+    if job.status in (PromotionImportJob.STATUS_FAILED, PromotionImportJob.STATUS_PENDING):
+        return True
+    return force and job.status == PromotionImportJob.STATUS_RUNNING
+
+
+def resume_import(job, force=False):
+    """Restart a job from its last committed chunk; returns None if it cannot resume."""
+    if not can_resume(job, force):
+        return None
+    return start_import(job)
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line for streaming."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Yield the contacts of ``queryset`` as properly quoted CSV lines."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[-1] = row[-1].isoformat() if row[-1] else ""
+        yield writer.writerow(["" if value is None else value for value in row])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from promotion_center.imports import can_resume, run_import
+from promotion_center.models import PromotionImportJob
+
+
+class Command(BaseCommand):
+    help = "Run or resume a promotion contact import job from its last committed row"
+
+    def add_arguments(self, parser):
+        parser.add_argument("job_id", type=int, help="PromotionImportJob id")
+        parser.add_argument("--force", action="store_true", help="Resume a job left 'running' by a dead worker")
+        parser.add_argument("--chunk-size", type=int, help="Rows per transaction (default PROMOTION_IMPORT['CHUNK_SIZE'])")
+
+    def handle(self, *args, **options):
+        try:
+            job = PromotionImportJob.objects.get(pk=options["job_id"])
+        except PromotionImportJob.DoesNotExist:
+            raise CommandError(f"Import job {options['job_id']} does not exist")
+        if not can_resume(job, options["force"]):
+            raise CommandError(f"Import job {job.pk} is {job.status}; use --force to resume a running job")
+
+        self.stdout.write(f"Resuming import {job.pk} after row {job.processed_rows}")
+        job = run_import(job, chunk_size=options["chunk_size"])
+        if job.status == PromotionImportJob.STATUS_FAILED:
+            raise CommandError(f"Import {job.pk} failed after row {job.processed_rows}: {job.failure}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Import {job.pk} completed: {job.processed_rows} rows, {job.created_count} created, "
+            f"{job.updated_count} updated, {job.error_count} errors"
+        ))
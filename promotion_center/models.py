@@ -86,3 +86,43 @@ class PromotionContact(models.Model):
 
     def __str__(self):
         return f"{self.name or '—'} ({self.phone})"
+
+
+class PromotionImportJob(models.Model):
+    """A CSV contact import processed in chunks by ``promotion_center.imports``.
+
+    ``processed_rows`` is the number of data rows already applied; a failed or
+    interrupted job resumes from there.  The uploaded file is kept until the
+    job completes.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    # removed once the job completes
+    file = models.FileField(upload_to="promotion_imports/", blank=True)
+    encoding = models.CharField(max_length=32, default="utf-8")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # first PROMOTION_IMPORT["MAX_ERRORS"] row errors, "Row N: message"
+    errors = models.JSONField(default=list, blank=True)
+    failure = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name="+")
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.status}, {self.processed_rows} rows)"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import PromotionContact
+from .models import PromotionContact, PromotionImportJob
 
 
 class PromotionContactSerializer(serializers.ModelSerializer):
@@ -38,3 +38,23 @@ class PromotionContactImportResultSerializer(serializers.Serializer):
     created = serializers.IntegerField()
     updated = serializers.IntegerField()
     errors = serializers.ListField(child=serializers.CharField(), default=list)
+    job_id = serializers.IntegerField(required=False)
+
+
+class PromotionImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PromotionImportJob
+        fields = [
+            "id",
+            "status",
+            "processed_rows",
+            "created_count",
+            "updated_count",
+            "error_count",
+            "errors",
+            "failure",
+            "started_at",
+            "finished_at",
+            "created_at",
+        ]
+        read_only_fields = fields
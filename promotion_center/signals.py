@@ -2,9 +2,11 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
+from booking.events import booking_events
 from booking.models import Booking, Payment
+from customers.identity import upsert_contact
 from leads.models import Lead
-from .models import PromotionContact, normalize_phone
+from .models import normalize_phone
 from universal.models import UniversalRegistration
 
 
@@ -92,19 +94,14 @@ def upsert_contact_from_booking(booking: Booking):
         "branch_id": booking.branch_id,
         "last_seen": timezone.now(),
     }
-    obj, created = PromotionContact.objects.update_or_create(phone=phone, defaults=defaults)
-    # mark duplicate flag if there are others
-    duplicates = PromotionContact.objects.filter(phone=phone).count()
-    if duplicates > 1 and not obj.is_duplicate:
-        obj.is_duplicate = True
-        obj.save(update_fields=["is_duplicate"]) 
+    upsert_contact(phone=phone, defaults=defaults)
 
 
-@receiver(post_save, sender=Booking)
-def booking_post_save(sender, instance: Booking, created, **kwargs):
+@booking_events.register("promotion_center.contacts", background=True)
+def booking_post_save(event):
     # when booking is created or updated, attempt to upsert a promotion contact
     try:
-        upsert_contact_from_booking(instance)
+        upsert_contact_from_booking(event.booking)
     except Exception:
         # signals must not crash
         pass
@@ -128,11 +125,7 @@ def lead_post_save(sender, instance: Lead, created, **kwargs):
             "branch_id": instance.branch_id,
             "last_seen": timezone.now(),
         }
-        obj, created = PromotionContact.objects.update_or_create(phone=phone, defaults=defaults)
-        duplicates = PromotionContact.objects.filter(phone=phone).count()
-        if duplicates > 1 and not obj.is_duplicate:
-            obj.is_duplicate = True
-            obj.save(update_fields=["is_duplicate"]) 
+        upsert_contact(phone=phone, defaults=defaults)
     except Exception:
         pass
 
@@ -169,20 +162,8 @@ def universal_registration_post_save(sender, instance: UniversalRegistration, cr
             "branch_id": int(instance.branch_id) if instance.branch_id else None,
             "last_seen": timezone.now(),
         }
-        if phone_val:
-            obj, created = PromotionContact.objects.update_or_create(phone=phone_val, defaults=defaults)
-        elif email_val:
-            # fallback to email-based upsert
-            obj_qs = PromotionContact.objects.filter(email__iexact=email_val)
-            if obj_qs.exists():
-                obj = obj_qs.first()
-                for k, v in defaults.items():
-                    setattr(obj, k, v)
-                obj.save()
-            else:
-                # create with a generated phone placeholder to satisfy unique constraint (use email as phone)
-                defaults["phone"] = email_val
-                PromotionContact.objects.create(**defaults)
+        # phone first; fall back to email-based upsert (a new contact then uses the email as phone)
+        upsert_contact(phone=phone_val, email=None if phone_val else email_val, defaults=defaults)
     except Exception:
         pass
 
@@ -192,6 +173,6 @@ def payment_post_save(sender, instance: Payment, created, **kwargs):
     try:
         booking = instance.booking
         if booking:
-            booking_post_save(Booking, booking, False)
+            upsert_contact_from_booking(booking)
     except Exception:
         pass
@@ -0,0 +1,108 @@
+import csv
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .imports import run_import
+from .models import PromotionContact, PromotionImportJob
+
+
+HEADER = "contact_number,full_name,email,type,organization_id,branch_id,city\n"
+
+
+class PromotionImportTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.admin = User.objects.create_superuser(username="admin", email="a@b.com", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def _job(self, content):
+        job = PromotionImportJob(created_by=self.admin)
+        job.file.save("contacts.csv", ContentFile(content.encode()), save=False)
+        job.save()
+        return job
+
+    @override_settings(PROMOTION_IMPORT={"BACKGROUND": False, "CHUNK_SIZE": 2, "MAX_ERRORS": 10})
+    def test_chunked_import_reports_row_errors_and_repeats(self):
+        PromotionContact.objects.create(name="Old", phone="+923000000001")
+        content = HEADER + (
+            "+92 300 0000001,Alice,,customer,,,Lahore\n"
+            ",No phone,,,,,\n"
+            "+923000000002,Bob,,lead,x,,\n"
+            "+923000000003,Carol,,lead,,,Karachi\n"
+            "+923000000003,Carol B,,lead,,,Multan\n"
+        )
+        resp = self.client.post(
+            "/api/promotion-center/contacts/import/",
+            {"file": BytesIO(content.encode())},
+            format="multipart",
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual((data["total"], data["created"], data["updated"]), (5, 1, 2))
+        self.assertEqual(data["errors"], ["Row 2: missing phone", "Row 3: invalid organization_id 'x'"])
+
+        self.assertEqual(PromotionContact.objects.get(phone="+923000000001").name, "Alice")
+        self.assertEqual(PromotionContact.objects.get(phone="+923000000003").city, "Multan")
+        job = PromotionImportJob.objects.get(pk=data["job_id"])
+        self.assertEqual(job.status, PromotionImportJob.STATUS_COMPLETED)
+        self.assertFalse(job.file)
+
+    @override_settings(PROMOTION_IMPORT={"BACKGROUND": False, "CHUNK_SIZE": 2, "MAX_ERRORS": 10})
+    def test_resume_continues_from_processed_rows(self):
+        job = self._job(HEADER + "".join(f"+92300000001{n},Pax {n},,,,,\n" for n in range(5)))
+        # the first chunk was committed before the worker died
+        PromotionImportJob.objects.filter(pk=job.pk).update(
+            status=PromotionImportJob.STATUS_RUNNING, processed_rows=2, created_count=2,
+        )
+
+        resp = self.client.post(f"/api/promotion-center/contacts/imports/{job.pk}/resume/")
+        self.assertEqual(resp.status_code, 409)
+
+        out = StringIO()
+        call_command("run_promotion_import", str(job.pk), "--force", stdout=out)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows, job.created_count), ("completed", 5, 5))
+        # rows 1-2 were skipped, not re-imported
+        self.assertEqual(PromotionContact.objects.count(), 3)
+
+        resp = self.client.get(f"/api/promotion-center/contacts/imports/{job.pk}/")
+        self.assertEqual(resp.json()["processed_rows"], 5)
+
+    @override_settings(PROMOTION_IMPORT={"BACKGROUND": False, "CHUNK_SIZE": 10, "MAX_ERRORS": 10})
+    def test_failed_job_keeps_file_for_resume(self):
+        job = self._job(HEADER + "+923000000021,Dan,,,,,\n")
+        job.encoding = "no-such-codec"
+        job.save(update_fields=["encoding"])
+
+        job = run_import(job)
+        self.assertEqual(job.status, PromotionImportJob.STATUS_FAILED)
+        self.assertTrue(job.file)
+
+        job.encoding = "utf-8"
+        job.save(update_fields=["encoding"])
+        resp = self.client.post(f"/api/promotion-center/contacts/imports/{job.pk}/resume/")
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.json()["status"], PromotionImportJob.STATUS_COMPLETED)
+        self.assertTrue(PromotionContact.objects.filter(phone="+923000000021").exists())
+
+    def test_export_quotes_values(self):
+        PromotionContact.objects.create(name='Khan, "Ali"', phone="+923000000031", city="Lahore\nPunjab")
+        resp = self.client.get("/api/promotion-center/contacts/export/")
+        self.assertEqual(resp.status_code, 200)
+        rows = list(csv.reader(StringIO(b"".join(resp.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ["id", "full_name", "contact_number"])
+        self.assertEqual(rows[1][1:3], ['Khan, "Ali"', "+923000000031"])
+        self.assertEqual(rows[1][8], "Lahore\nPunjab")
@@ -2,13 +2,16 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db import transaction
-from django.utils import timezone
-import csv
-from io import TextIOWrapper
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 
-from .models import PromotionContact, normalize_phone
-from .serializers import PromotionContactSerializer, PromotionContactImportResultSerializer
+from .imports import export_rows, resume_import, start_import
+from .models import PromotionContact, PromotionImportJob, normalize_phone
+from .serializers import (
+    PromotionContactSerializer,
+    PromotionContactImportResultSerializer,
+    PromotionImportJobSerializer,
+)
 
 
 class PromotionContactViewSet(viewsets.ModelViewSet):
@@ -54,80 +57,50 @@ class PromotionContactViewSet(viewsets.ModelViewSet):
     def import_csv(self, request):
         """
         Upload a CSV file with columns: contact_number,full_name,email,type,source,organization_id,branch_id,city
-        Upserts by contact_number
+        Upserts by contact_number, in chunks (see promotion_center.imports).
+        Answers 202 with the import job when it runs in the background.
         """
         file = request.FILES.get("file")
         if not file:
             return Response({"detail": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        wrapper = TextIOWrapper(file.file, encoding=request.encoding or "utf-8")
-        reader = csv.DictReader(wrapper)
-        total = 0
-        created = 0
-        updated = 0
-        errors = []
-
-        with transaction.atomic():
-            for row in reader:
-                total += 1
-                phone = row.get("contact_number") or row.get("phone") or row.get("contact_no")
-                if not phone:
-                    errors.append(f"Row {total}: missing phone")
-                    continue
-                phone = normalize_phone(phone)
-                defaults = {
-                    "name": row.get("full_name") or row.get("name") or "",
-                    "email": row.get("email") or None,
-                    "contact_type": row.get("type") or row.get("contact_type") or "other",
-                    "source": row.get("source") or "import",
-                    "source_reference": row.get("source_reference") or None,
-                    "city": row.get("city") or None,
-                    "organization_id": int(row["organization_id"]) if row.get("organization_id") else None,
-                    "branch_id": int(row["branch_id"]) if row.get("branch_id") else None,
-                }
-
-                try:
-                    obj, was_created = PromotionContact.objects.update_or_create(phone=phone, defaults=defaults)
-                    if was_created:
-                        created += 1
-                    else:
-                        updated += 1
-                except Exception as e:
-                    errors.append(f"Row {total}: {str(e)}")
-
-        result = {"total": total, "created": created, "updated": updated, "errors": errors}
+        job = PromotionImportJob.objects.create(
+            file=file,
+            encoding=request.encoding or "utf-8",
+            created_by=request.user if request.user.is_authenticated else None,
+        )
+        job = start_import(job)
+        if job.status == PromotionImportJob.STATUS_PENDING:
+            return Response(PromotionImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        result = {
+            "total": job.processed_rows,
+            "created": job.created_count,
+            "updated": job.updated_count,
+            "errors": job.errors,
+            "job_id": job.id,
+        }
         serializer = PromotionContactImportResultSerializer(result)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"], url_path=r"imports/(?P<job_id>[0-9]+)", permission_classes=[permissions.IsAuthenticated, permissions.IsAdminUser])
+    def import_status(self, request, job_id=None):
+        job = get_object_or_404(PromotionImportJob, pk=job_id)
+        return Response(PromotionImportJobSerializer(job).data)
+
+    @action(detail=False, methods=["post"], url_path=r"imports/(?P<job_id>[0-9]+)/resume", permission_classes=[permissions.IsAuthenticated, permissions.IsAdminUser])
+    def import_resume(self, request, job_id=None):
+        job = get_object_or_404(PromotionImportJob, pk=job_id)
+        if resume_import(job) is None:
+            return Response({"detail": f"import is {job.status}"}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(PromotionImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=False, methods=["get"], url_path="export", permission_classes=[permissions.IsAuthenticated, permissions.IsAdminUser])
     def export_csv(self, request):
         qs = self.filter_queryset(self.get_queryset())
-        # stream CSV
-        import csv as _csv
-        from django.http import StreamingHttpResponse
-
-        def row_generator():
-            header = ["id", "full_name", "contact_number", "email", "contact_type", "source", "organization_id", "branch_id", "city", "status", "created_at"]
-            yield _csv.writer([None]).writerow(header) if False else None
-            # yield header as comma-joined
-            yield ",".join(header) + "\n"
-            for obj in qs.iterator():
-                row = [
-                    str(obj.id),
-                    (obj.name or ""),
-                    obj.phone or "",
-                    obj.email or "",
-                    obj.contact_type or "",
-                    obj.source or "",
-                    str(obj.organization_id) if obj.organization_id else "",
-                    str(obj.branch_id) if obj.branch_id else "",
-                    obj.city or "",
-                    obj.status or "",
-                    obj.created_at.isoformat(),
-                ]
-                yield ",".join([s.replace(",", "\,") if isinstance(s, str) else str(s) for s in row]) + "\n"
-
-        resp = StreamingHttpResponse(row_generator(), content_type="text/csv")
+        # stream CSV, quoted by the csv module
+        resp = StreamingHttpResponse(export_rows(qs), content_type="text/csv")
         resp["Content-Disposition"] = "attachment; filename=promotion_contacts.csv"
         return resp
 
@@ -0,0 +1,203 @@
+"""Hotel rate calendar: price a stay night by night from ``HotelPrices``.
+
+``HotelPrices`` rows are seasons: ``(hotel, room_type, start_date, end_date,
+price)``, both dates inclusive.  Nothing used to price a stay across season
+boundaries (callers took ``hotel.prices.first()`` or summed by hand).
+``RateCalendar`` indexes one hotel's rows per room type as sorted,
+non-overlapping segments, so pricing a stay is a bisect plus a walk over the
+seasons it touches:
+
+    quote = quote_stay(hotel_id, "double", date(2025, 11, 1), date(2025, 11, 5))
+    quote["total"], quote["breakdown"], quote["complete"]
+
+Night ``d`` (check-in <= d < check-out) costs the price of the row covering
+``d``.  Where rows overlap the most specific one wins: the shortest season,
+then the later start, then the newest row.  Nights no row covers are listed
+in ``missing_dates`` and make the quote incomplete.
+
+A hotel's rows are read with one query and cached under a per-hotel version
+(``universal.cache_versions``) that the receivers at the bottom bump on every
+HotelPrices write, so stale calendars are never read.  ``quote_stays`` prices
+the same stay for many hotels with one version lookup, one cache round trip
+and one query for the hotels not cached.
+Writes that bypass signals (``update()``, ``bulk_create``) become visible
+when the entry expires.
+"""
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from universal import cache_versions
+
+
+CACHE_PREFIX = "hotel_rates"
+CACHE_TIMEOUT = 10 * 60
+
+ONE_DAY = timedelta(days=1)
+
+
+def _version_key(hotel_id):
+    return f"{CACHE_PREFIX}:version:{int(hotel_id)}"
+
+
+def _cache_key(hotel_id, version):
+    return f"{CACHE_PREFIX}:{int(hotel_id)}:{version}"
+
+
+def invalidate_hotel_rates(*hotel_ids):
+    """Drop the cached rate calendars of the given hotels (after commit)."""
+    cache_versions.bump(*(_version_key(hotel_id) for hotel_id in {h for h in hotel_ids if h}))
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _flatten(rows):
+    """Non-overlapping ``(start, end, row)`` segments, the most specific row winning overlaps."""
+    boundaries = sorted({row[2] for row in rows} | {row[3] + ONE_DAY for row in rows})
+    # most specific first: shortest season, then later start, then newer row
+    ranked = sorted(rows, key=lambda row: (row[3] - row[2], -row[2].toordinal(), -row[0]))
+    segments = []
+    for start, next_start in zip(boundaries, boundaries[1:]):
+        row = next((r for r in ranked if r[2] <= start and r[3] >= start), None)
+        if row is None:
+            continue
+        end = next_start - ONE_DAY
+        if segments and segments[-1][2] is row and segments[-1][1] + ONE_DAY == start:
+            segments[-1] = (segments[-1][0], end, row)
+        else:
+            segments.append((start, end, row))
+    return segments
+
+
+class RateCalendar:
+    """Interval index over one hotel's HotelPrices rows.
+
+    ``rows`` are ``(id, room_type, start_date, end_date, price, purchase_price)``
+    tuples, the shape ``load_rows`` returns.
+    """
+
+    def __init__(self, hotel_id, rows):
+        self.hotel_id = hotel_id
+        by_type = {}
+        for row in rows:
+            if row[2] and row[3] and row[2] <= row[3]:
+                by_type.setdefault(row[1], []).append(row)
+        self._segments = {room_type: _flatten(type_rows) for room_type, type_rows in by_type.items()}
+        self._starts = {room_type: [s[0] for s in segments] for room_type, segments in self._segments.items()}
+
+    def room_types(self):
+        return sorted(self._segments)
+
+    def _covering(self, room_type, check_in, check_out):
+        """Segments of ``room_type`` overlapping nights check_in .. check_out - 1, in order."""
+        segments = self._segments.get(room_type, ())
+        if not segments:
+            return
+        i = max(bisect_right(self._starts[room_type], check_in) - 1, 0)
+        last_night = check_out - ONE_DAY
+        for segment in segments[i:]:
+            if segment[0] > last_night:
+                break
+            if segment[1] >= check_in:
+                yield segment
+
+    def nightly_rate(self, room_type, night):
+        """Price of ``night`` for ``room_type``, or None when no season covers it."""
+        night = _as_date(night)
+        for _, _, row in self._covering(room_type, night, night + ONE_DAY):
+            return row[4]
+        return None
+
+    def price_stay(self, room_type, check_in, check_out):
+        """Quote for the nights check_in .. check_out - 1 with a per-night breakdown."""
+        check_in, check_out = _as_date(check_in), _as_date(check_out)
+        breakdown = []
+        missing = []
+        night = check_in
+        for start, end, row in self._covering(room_type, check_in, check_out):
+            while night < start:
+                missing.append(night)
+                night += ONE_DAY
+            while night <= end and night < check_out:
+                breakdown.append({
+                    "date": night,
+                    "price": row[4] or 0,
+                    "purchase_price": row[5] or 0,
+                    "price_id": row[0],
+                })
+                night += ONE_DAY
+        while night < check_out:
+            missing.append(night)
+            night += ONE_DAY
+        return {
+            "hotel_id": self.hotel_id,
+            "room_type": room_type,
+            "check_in": check_in,
+            "check_out": check_out,
+            "nights": max((check_out - check_in).days, 0),
+            "total": round(sum(n["price"] for n in breakdown), 2),
+            "purchase_total": round(sum(n["purchase_price"] for n in breakdown), 2),
+            "breakdown": breakdown,
+            "missing_dates": missing,
+            "complete": check_out > check_in and not missing,
+        }
+
+
+def load_rows(hotel_ids):
+    """``{hotel_id: [row, ...]}`` for the given hotels, in one query."""
+    from tickets.models import HotelPrices
+
+    rows = {hotel_id: [] for hotel_id in hotel_ids}
+    for hotel_id, *row in HotelPrices.objects.filter(hotel_id__in=list(rows)).values_list(
+        "hotel_id", "id", "room_type", "start_date", "end_date", "price", "purchase_price"
+    ):
+        rows[hotel_id].append(tuple(row))
+    return rows
+
+
+def rate_calendars(hotel_ids):
+    """``{hotel_id: RateCalendar}``; hotels not cached are loaded with one query."""
+    hotel_ids = {int(h) for h in hotel_ids}
+    if not hotel_ids:
+        return {}
+    version_keys = {_version_key(h): h for h in hotel_ids}
+    found = cache_versions.versions(version_keys)
+    versions = {hotel_id: found[key] for key, hotel_id in version_keys.items()}
+
+    keys = {hotel_id: _cache_key(hotel_id, version) for hotel_id, version in versions.items()}
+    cached = cache.get_many(list(keys.values()))
+    rows = {hotel_id: cached[key] for hotel_id, key in keys.items() if key in cached}
+    missing = hotel_ids - set(rows)
+    if missing:
+        loaded = load_rows(missing)
+        cache.set_many({keys[hotel_id]: loaded[hotel_id] for hotel_id in missing}, CACHE_TIMEOUT)
+        rows.update(loaded)
+    return {hotel_id: RateCalendar(hotel_id, hotel_rows) for hotel_id, hotel_rows in rows.items()}
+
+
+def rate_calendar(hotel_id):
+    return rate_calendars([hotel_id])[int(hotel_id)]
+
+
+def quote_stay(hotel_id, room_type, check_in, check_out):
+    """Price one stay; see ``RateCalendar.price_stay``."""
+    return rate_calendar(hotel_id).price_stay(room_type, check_in, check_out)
+
+
+def quote_stays(hotel_ids, room_type, check_in, check_out):
+    """``{hotel_id: quote}`` for the same stay at many hotels, e.g. for search results."""
+    return {
+        hotel_id: calendar.price_stay(room_type, check_in, check_out)
+        for hotel_id, calendar in rate_calendars(hotel_ids).items()
+    }
+
+
+@receiver(post_save, sender="tickets.HotelPrices")
+@receiver(post_delete, sender="tickets.HotelPrices")
+def hotel_prices_changed(sender, instance, **kwargs):
+    invalidate_hotel_rates(instance.hotel_id)
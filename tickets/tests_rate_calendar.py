@@ -0,0 +1,93 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from organization.models import Organization
+from packages.models import City
+from tickets.models import Hotels, HotelPrices
+from tickets.rate_calendar import RateCalendar, quote_stay, quote_stays, rate_calendar
+
+
+class RateCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Org1')
+        self.city = City.objects.create(organization=self.org, name='Makkah', code='MAK')
+        self.hotel = self._hotel('Season Hotel')
+        self.other = self._hotel('Other Hotel')
+
+    def _hotel(self, name):
+        return Hotels.objects.create(organization=self.org, name=name, city=self.city, address='Addr',
+                                     available_start_date='2025-01-01', available_end_date='2026-01-01')
+
+    def _price(self, hotel, start, end, price, room_type='double', purchase_price=0):
+        return HotelPrices.objects.create(hotel=hotel, room_type=room_type, start_date=start, end_date=end,
+                                          price=price, purchase_price=purchase_price)
+
+    def test_stay_across_seasons_with_overlap_and_gap(self):
+        self._price(self.hotel, '2025-11-01', '2025-11-30', 100, purchase_price=80)
+        peak = self._price(self.hotel, '2025-11-03', '2025-11-04', 250)  # more specific, wins the overlap
+        self._price(self.hotel, '2025-12-03', '2025-12-31', 120)
+        self._price(self.hotel, '2025-11-01', '2025-12-31', 999, room_type='quad')
+
+        quote = quote_stay(self.hotel.id, 'double', date(2025, 11, 29), date(2025, 12, 4))
+        self.assertEqual([n['price'] for n in quote['breakdown']], [100, 100, 120])
+        self.assertEqual(quote['missing_dates'], [date(2025, 12, 1), date(2025, 12, 2)])
+        self.assertFalse(quote['complete'])
+
+        quote = quote_stay(self.hotel.id, 'double', '2025-11-02', '2025-11-06')
+        self.assertEqual([(n['date'].day, n['price']) for n in quote['breakdown']], [(2, 100), (3, 250), (4, 250), (5, 100)])
+        self.assertEqual(quote['breakdown'][1]['price_id'], peak.id)
+        self.assertEqual((quote['nights'], quote['total'], quote['purchase_total'], quote['complete']), (4, 700, 160, True))
+
+        self.assertEqual(rate_calendar(self.hotel.id).room_types(), ['double', 'quad'])
+        self.assertIsNone(rate_calendar(self.hotel.id).nightly_rate('double', '2025-12-01'))
+
+    def test_ties_go_to_the_later_start_then_newer_row(self):
+        rows = [
+            (1, 'double', date(2025, 1, 1), date(2025, 1, 10), 10, 0),
+            (2, 'double', date(2025, 1, 5), date(2025, 1, 14), 20, 0),
+            (3, 'double', date(2025, 1, 5), date(2025, 1, 14), 30, 0),
+        ]
+        calendar = RateCalendar(1, rows)
+        self.assertEqual([calendar.nightly_rate('double', date(2025, 1, d)) for d in (4, 5, 10, 14, 15)], [10, 30, 30, 30, None])
+
+    def test_calendars_are_cached_until_prices_change(self):
+        price = self._price(self.hotel, '2025-11-01', '2025-11-30', 100)
+        self._price(self.other, '2025-11-01', '2025-11-30', 90)
+
+        # cache versions, then the rows of both hotels
+        with self.assertNumQueries(2):
+            quotes = quote_stays([self.hotel.id, self.other.id], 'double', date(2025, 11, 1), date(2025, 11, 3))
+        self.assertEqual({h: q['total'] for h, q in quotes.items()}, {self.hotel.id: 200, self.other.id: 180})
+        with self.assertNumQueries(0):
+            quote_stays([self.hotel.id, self.other.id], 'double', date(2025, 11, 1), date(2025, 11, 3))
+
+        price.price = 150
+        with self.captureOnCommitCallbacks(execute=True):
+            price.save()
+        with self.assertNumQueries(2):
+            self.assertEqual(quote_stay(self.hotel.id, 'double', '2025-11-01', '2025-11-03')['total'], 300)
+        with self.captureOnCommitCallbacks(execute=True):
+            price.delete()
+        self.assertEqual(quote_stay(self.hotel.id, 'double', '2025-11-01', '2025-11-03')['total'], 0)
+
+    def test_stay_quotes_endpoint(self):
+        admin = User.objects.create_superuser(username='admin', password='pass')
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        self._price(self.hotel, '2025-11-01', '2025-11-30', 100)
+        self._price(self.other, '2025-11-01', '2025-11-02', 90)
+
+        response = client.get('/api/hotels/stay-quotes/', {
+            'room_type': 'double', 'check_in': '2025-11-01', 'check_out': '2025-11-04', 'complete_only': 'true',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(r['hotel_name'], r['total']) for r in response.data['results']], [('Season Hotel', 300)])
+        self.assertEqual(response.data['results'][0]['breakdown'][0]['date'], '2025-11-01')
+
+        response = client.get('/api/hotels/stay-quotes/', {'room_type': 'double', 'check_in': '2025-11-04', 'check_out': '2025-11-01'})
+        self.assertEqual(response.status_code, 400)
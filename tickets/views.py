@@ -1,7 +1,9 @@
 from rest_framework.viewsets import ModelViewSet
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 import json
+from datetime import date
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
@@ -10,7 +12,7 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, extend_schema
 from drf_spectacular.types import OpenApiTypes
 
 from .models import Ticket, Hotels, HotelRooms, HotelCategory, BedType
-from booking.models import AllowedReseller
+from organization.visibility import get_inventory_visibility
 from .serializers import (
     TicketSerializer,
     TicketListSerializer,
@@ -135,8 +137,6 @@ class TicketViewSet(ModelViewSet):
         return super().get_serializer_class()
 
     def get_queryset(self):
-        from organization.models import OrganizationLink
-        
         # Always require organization parameter
         organization_id = self.request.query_params.get("organization")
         # Optional: allow callers to opt-in to include past tickets
@@ -160,47 +160,11 @@ class TicketViewSet(ModelViewSet):
             if int(organization_id) not in user_organizations:
                 raise PermissionDenied("You don't have access to this organization.")
         
-        # Get linked organizations
-        linked_org_ids = OrganizationLink.get_linked_organizations(int(organization_id))
-        
-        # Include own organization and linked organizations
-        allowed_org_ids = {int(organization_id)} | linked_org_ids
-        
-        # Build allowed owner organization ids based on AllowedReseller entries
-        # Query AllowedReseller for the calling organization only (what this org is allowed to resell)
-        allowed_owner_org_ids = []
-        allowed_ticket_ids = set()
-        try:
-            allowed_qs = AllowedReseller.objects.filter(
-                reseller_company_id=int(organization_id),
-                requested_status_by_reseller="ACCEPTED",
-            )
-            # filter by allowed_types containing GROUP_TICKETS
-            for ar in allowed_qs:
-                inv = getattr(ar, "inventory_owner_company", None)
-                if inv is None:
-                    continue
-                org_id = getattr(inv, "organization_id", None) or getattr(inv, "main_organization_id", None) or None
-                if org_id:
-                    try:
-                        items = getattr(ar, "allowed_items", None) or []
-                    except Exception:
-                        items = []
-
-                    if items:
-                        for it in items:
-                            try:
-                                if (it.get("type") == "ticket") and it.get("id"):
-                                    allowed_ticket_ids.add(int(it.get("id")))
-                            except Exception:
-                                continue
-                    else:
-                        types = ar.allowed_types or []
-                        if "GROUP_TICKETS" in types:
-                            allowed_owner_org_ids.append(org_id)
-
-        except Exception:
-            allowed_owner_org_ids = []
+        # Linked organizations and AllowedReseller grants, resolved once per org and cached
+        visibility = get_inventory_visibility(int(organization_id))
+        linked_org_ids = set(visibility.linked_org_ids)
+        allowed_owner_org_ids = visibility.owner_org_ids("GROUP_TICKETS")
+        allowed_ticket_ids = visibility.allowed_item_ids("ticket")
 
         # Include own organization and any explicitly allowed owner organizations
         owner_ids = set(allowed_owner_org_ids) | {int(organization_id)}
@@ -367,8 +331,6 @@ class HotelsViewSet(ModelViewSet):
         return Response(serializer.data)
 
     def get_queryset(self):
-        from organization.models import OrganizationLink
-        
         # Debugging previously added here was removed.
         # If further investigation is needed, enable structured logging instead of prints.
 
@@ -389,50 +351,13 @@ class HotelsViewSet(ModelViewSet):
         if int(owner_org_id) not in user_organizations:
             raise PermissionDenied("You don't have access to this organization.")
 
-        # Get linked organizations
-        linked_org_ids = OrganizationLink.get_linked_organizations(int(owner_org_id))
-        
-        # Include hotels from the user's organization and linked organizations
-        allowed_org_ids = {int(owner_org_id)} | linked_org_ids
-        
-        # Build allowed owner organization ids based on AllowedReseller entries
-        allowed_owner_org_ids = []
-        allowed_hotel_ids = set()
-        try:
-            # Query AllowedReseller for the calling organization only
-            allowed_qs = AllowedReseller.objects.filter(
-                reseller_company_id=int(owner_org_id),
-                requested_status_by_reseller="ACCEPTED",
-            )
-            # filter by allowed_types containing GROUP_HOTELS
-            for ar in allowed_qs:
-                inv = getattr(ar, "inventory_owner_company", None)
-                if inv is None:
-                    continue
-                org_id = getattr(inv, "organization_id", None) or getattr(inv, "main_organization_id", None) or None
-                if org_id:
-                    try:
-                        items = getattr(ar, "allowed_items", None) or []
-                    except Exception:
-                        items = []
-
-                    if items:
-                        for it in items:
-                            try:
-                                if (it.get("type") == "hotel") and it.get("id"):
-                                    allowed_hotel_ids.add(int(it.get("id")))
-                            except Exception:
-                                continue
-                    else:
-                        types = ar.allowed_types or []
-                        # The approval flow uses tokens like 'HOTELS' for hotel approvals
-                        # (see organization.views.approve mapping). Accept either the
-                        # legacy 'GROUP_HOTELS' token or the 'HOTELS' token here.
-                        if "GROUP_HOTELS" in types or "HOTELS" in types:
-                            allowed_owner_org_ids.append(org_id)
-
-        except Exception:
-            allowed_owner_org_ids = []
+        # Linked organizations and AllowedReseller grants, resolved once per org and cached.
+        # The approval flow uses tokens like 'HOTELS' for hotel approvals
+        # (see organization.views.approve mapping); accept the legacy 'GROUP_HOTELS' too.
+        visibility = get_inventory_visibility(int(owner_org_id))
+        linked_org_ids = set(visibility.linked_org_ids)
+        allowed_owner_org_ids = visibility.owner_org_ids("GROUP_HOTELS", "HOTELS")
+        allowed_hotel_ids = visibility.allowed_item_ids("hotel")
 
         # Include own organization and any explicitly allowed owner organizations
         owner_ids = set(allowed_owner_org_ids) | {int(owner_org_id)}
@@ -496,6 +421,52 @@ class HotelsViewSet(ModelViewSet):
 
         return result_qs
 
+    @action(detail=False, methods=['get'], url_path='stay-quotes')
+    def stay_quotes(self, request):
+        """
+        Price one stay at every visible hotel (or the given ``hotel_ids``), e.g. for search.
+
+        GET /api/hotels/stay-quotes/?organization=1&room_type=double&check_in=2025-11-01&check_out=2025-11-05
+        Optional: hotel_ids=1,2,3 and complete_only=true to drop hotels with unpriced nights.
+        """
+        from .rate_calendar import quote_stays
+
+        room_type = request.query_params.get('room_type')
+        try:
+            check_in = date.fromisoformat(request.query_params.get('check_in') or '')
+            check_out = date.fromisoformat(request.query_params.get('check_out') or '')
+            hotel_ids = [int(h) for h in (request.query_params.get('hotel_ids') or '').split(',') if h.strip()]
+        except ValueError:
+            return Response({'error': 'check_in and check_out (YYYY-MM-DD) are required; hotel_ids must be integers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not room_type or check_out <= check_in:
+            return Response({'error': 'room_type is required and check_out must be after check_in'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        hotels = self.get_queryset()
+        if hotel_ids:
+            hotels = hotels.filter(id__in=hotel_ids)
+        names = dict(hotels.values_list('id', 'name'))
+        complete_only = request.query_params.get('complete_only', '').lower() in ('1', 'true', 'yes')
+
+        results = []
+        for hotel_id, quote in sorted(quote_stays(names, room_type, check_in, check_out).items()):
+            if complete_only and not quote['complete']:
+                continue
+            results.append({
+                **quote,
+                'hotel_name': names[hotel_id],
+                'breakdown': [{**night, 'date': night['date'].isoformat()} for night in quote['breakdown']],
+                'missing_dates': [night.isoformat() for night in quote['missing_dates']],
+            })
+        return Response({
+            'room_type': room_type,
+            'check_in': check_in,
+            'check_out': check_out,
+            'count': len(results),
+            'results': results,
+        })
+
 
 class HotelRoomsViewSet(ModelViewSet):
     serializer_class = HotelRoomsSerializer
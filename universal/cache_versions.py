@@ -0,0 +1,69 @@
+"""Cache version numbers shared by every process.
+
+The cached read paths (room availability, price catalogs, hotel rate
+calendars, inventory visibility, the commission rule index and the public
+response cache) embed a version number in their cache keys and bump it when
+the underlying rows change, so stale entries are simply never read again.
+Those versions used to live in the Django cache too.  With the default
+per-process ``LocMemCache`` a bump only reached the process that made it and
+every other worker kept serving the old entries until they expired.
+
+The versions now live in ``CacheVersion`` rows.  ``versions`` reads any
+number of them with one query and memoizes them in the local cache for
+``MEMO_TIMEOUT`` seconds, so a cached read within that window does not touch
+the database; another process's bump is seen once the memo expires, this
+process's own bumps right away.  ``bump`` increments them once the current
+transaction commits, so a reader never sees a version for data that was
+rolled back and no version row stays locked for the length of a
+transaction.  The cached values themselves may stay in a per-process cache:
+their keys change with the version.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+
+MEMO_TIMEOUT = 2
+MEMO_PREFIX = "cache_versions"
+
+
+def _memo_key(key):
+    return f"{MEMO_PREFIX}:{key}"
+
+
+def versions(keys):
+    """``{key: version}`` for ``keys``, in at most one query; keys never bumped are at 1."""
+    keys = set(keys)
+    if not keys:
+        return {}
+    memo = cache.get_many([_memo_key(key) for key in keys])
+    result = {key: memo[_memo_key(key)] for key in keys if _memo_key(key) in memo}
+    missing = keys - result.keys()
+    if missing:
+        found = dict(CacheVersion.objects.filter(key__in=missing).values_list("key", "version"))
+        loaded = {key: found.get(key, 1) for key in missing}
+        cache.set_many({_memo_key(key): value for key, value in loaded.items()}, MEMO_TIMEOUT)
+        result.update(loaded)
+    return result
+
+
+def version(key):
+    return versions([key])[key]
+
+
+def _write(keys):
+    keys = sorted(keys)
+    # create missing rows at the implicit version first, so concurrent bumps
+    # of a new key both land on the same row
+    CacheVersion.objects.bulk_create([CacheVersion(key=key) for key in keys], ignore_conflicts=True)
+    CacheVersion.objects.filter(key__in=keys).update(version=F("version") + 1)
+    cache.delete_many([_memo_key(key) for key in keys])
+
+
+def bump(*keys, using=None):
+    """Increment the given versions after commit (right away outside a transaction)."""
+    keys = {key for key in keys if key}
+    if keys:
+        transaction.on_commit(lambda: _write(keys), using=using)
@@ -0,0 +1,49 @@
+"""Work collected during a transaction and run once after it commits.
+
+Several write paths (booking events, profit/loss recomputes, booking fact
+rebuilds, package price vectors) are triggered by every save of a row but
+only need to run once per transaction.  ``pending`` returns the batch of the
+current transaction for a name, registering its ``flush`` with
+``transaction.on_commit`` the first time; callers add their ids to it.
+
+Django keeps the pending callbacks in the private ``connection.run_on_commit``
+list and drops those of a rolled back savepoint, which leaves a batch that
+will never run.  ``pending`` checks that list, in this one place, and opens a
+new batch when the old one's callback is gone or has already run
+(``TestCase.captureOnCommitCallbacks`` runs callbacks without removing them).
+"""
+from django.db import transaction
+
+
+class CommitBatch:
+    """A batch of work; subclasses collect ids and implement ``run``."""
+
+    def __init__(self):
+        self.flushed = False
+
+    def flush(self):
+        self.flushed = True
+        self.run()
+
+    def run(self):
+        raise NotImplementedError
+
+
+def _registered(connection, batch):
+    # entries are (savepoint ids, callback, robust) tuples
+    return any(entry[1] == batch.flush for entry in connection.run_on_commit)
+
+
+def pending(name, factory, using=None):
+    """The open batch ``name`` of the current transaction, created with ``factory()`` if needed.
+
+    Only call it inside an atomic block; outside one there is nothing to wait for.
+    """
+    connection = transaction.get_connection(using)
+    attr = f"_commit_batch_{name}"
+    batch = getattr(connection, attr, None)
+    if batch is None or batch.flushed or not _registered(connection, batch):
+        batch = factory()
+        setattr(connection, attr, batch)
+        transaction.on_commit(batch.flush, using=using)
+    return batch
@@ -151,6 +151,27 @@ class UniversalIDSequence(models.Model):
         return f"{self.type_key}:{self.last_value}"
 
 
+class CacheVersion(models.Model):
+    """Version number of a group of cached entries, shared by every process.
+
+    Cache keys embed the version (see ``universal.cache_versions``), so
+    bumping it makes every process stop reading the old entries.
+
+    Fields:
+        key: version key, e.g. ``room_availability:version:12``
+        version: current version; a key without a row is at version 1
+    """
+
+    key = models.CharField(max_length=191, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        db_table = "universal_cache_version"
+
+    def __str__(self):
+        return f"{self.key}:{self.version}"
+
+
 class AuditLog(models.Model):
     ACTION_CREATE = "create"
     ACTION_UPDATE = "update"
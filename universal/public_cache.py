@@ -0,0 +1,135 @@
+"""Shared response cache for the anonymous public read endpoints.
+
+The public package list/detail and the blog list/detail take the marketing
+traffic spikes.  Every request used to rebuild the response from the
+database: multi-join filters with ``distinct()`` for the package list, a
+Python scan of every public package to resolve a slug, and the nested blog
+serializers.  Their rendered data is now cached per URL and served as is.
+
+List entries are keyed by a per-namespace version (``"packages"``,
+``"blog"``), detail entries by a per-object version instead; the versions are
+``universal.cache_versions`` rows, shared by every process and memoized
+locally for a moment, so a hit is served without a query.  ``invalidate``
+bumps the namespace version and the versions of the given objects after
+commit, so list pages are rebuilt after any change and a detail page only
+after a change of its own object; the apps call it from their save/delete
+receivers.  Filters that depend on the clock (publication dates, package
+availability windows) and related rows without receivers become visible
+when the entry expires.
+
+Each entry carries an ETag (a hash of its JSON rendering) and the time it
+was built, sent as ``Last-Modified``; matching ``If-None-Match`` or
+``If-Modified-Since`` requests are answered 304.  ``Cache-Control`` lets
+browsers and shared caches reuse a response for ``MAX_AGE`` seconds.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import cache_versions
+
+
+CACHE_PREFIX = "public_cache"
+
+DEFAULTS = {
+    'TIMEOUT': 300,
+    'MAX_AGE': 60,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'PUBLIC_CACHE', {})}
+
+
+def _version_key(namespace, obj_id=None):
+    if obj_id is None:
+        return f"{CACHE_PREFIX}:{namespace}:version"
+    return f"{CACHE_PREFIX}:{namespace}:version:{obj_id}"
+
+
+def invalidate(namespace, *obj_ids, using=None):
+    """Drop the cached list pages of ``namespace`` and the detail pages of ``obj_ids`` after commit."""
+    keys = [_version_key(namespace)] + [_version_key(namespace, obj_id) for obj_id in {o for o in obj_ids if o}]
+    cache_versions.bump(*keys, using=using)
+
+
+def _request_key(request):
+    """Host (absolute media URLs embed it), path and the query parameters in a canonical order."""
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    raw = json.dumps([request.get_host(), request.path, params])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def etag(data):
+    """Quoted ETag of ``data``: the md5 of its JSON rendering."""
+    raw = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def not_modified(request, etag, last_modified=None):
+    """Whether the client's copy (``If-None-Match``, else ``If-Modified-Since``) is current."""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        # If-None-Match uses weak comparison and takes precedence over If-Modified-Since
+        client_etags = [e[2:] if e.startswith("W/") else e for e in parse_etags(if_none_match)]
+        return "*" in client_etags or etag in client_etags
+    if last_modified is None:
+        return False
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and int(last_modified) <= since
+
+
+def _respond(request, entry):
+    if not_modified(request, entry['etag'], entry['last_modified']):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(entry['data'])
+    response["ETag"] = entry['etag']
+    response["Last-Modified"] = http_date(entry['last_modified'])
+    response["Cache-Control"] = f"public, max-age={_config()['MAX_AGE']}"
+    return response
+
+
+def cached_response(request, namespace, build, obj_id=None):
+    """Serve ``build()``'s response for this URL from the cache.
+
+    ``build`` returns a DRF ``Response``; only 200 responses are cached,
+    anything else is returned unchanged.  Pass ``obj_id`` for detail pages
+    so they follow that object's version instead of the namespace's.
+    """
+    config = _config()
+    version = cache_versions.version(_version_key(namespace, obj_id))
+    key = f"{CACHE_PREFIX}:{namespace}:{version}:{_request_key(request)}"
+
+    entry = cache.get(key)
+    if entry is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        data = response.data
+        entry = {'data': data, 'etag': etag(data), 'last_modified': time.time()}
+        if config['TIMEOUT']:
+            cache.set(key, entry, config['TIMEOUT'])
+    return _respond(request, entry)
+
+
+def cached_lookup(namespace, name, value, lookup):
+    """``lookup(value)`` (e.g. a slug -> id resolution) remembered until ``namespace`` changes.
+
+    ``None`` results are not cached.
+    """
+    version = cache_versions.version(_version_key(namespace))
+    key = f"{CACHE_PREFIX}:{namespace}:{version}:{name}:{hashlib.md5(str(value).encode()).hexdigest()}"
+    result = cache.get(key)
+    if result is None:
+        result = lookup(value)
+        if result is not None and _config()['TIMEOUT']:
+            cache.set(key, result, _config()['TIMEOUT'])
+    return result
@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from . import cache_versions
+from .models import CacheVersion
+
+
+class CacheVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bumps_apply_after_commit_only(self):
+        self.assertEqual(cache_versions.versions(["a", "b"]), {"a": 1, "b": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_versions.bump("a", "b", None)
+            cache_versions.bump("a")
+            # not visible before the transaction commits
+            self.assertEqual(cache_versions.version("a"), 1)
+        self.assertEqual(cache_versions.versions(["a", "b"]), {"a": 3, "b": 2})
+
+        try:
+            with transaction.atomic():
+                with self.captureOnCommitCallbacks(execute=True):
+                    cache_versions.bump("b")
+                    raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(cache_versions.version("b"), 2)
+        self.assertEqual(CacheVersion.objects.count(), 2)
+
+    def test_versions_are_memoized_until_bumped_or_expired(self):
+        cache_versions.version("a")
+        with self.assertNumQueries(0):
+            self.assertEqual(cache_versions.version("a"), 1)
+
+        # a bump by another process is seen once the memo expires
+        CacheVersion.objects.create(key="a", version=5)
+        self.assertEqual(cache_versions.version("a"), 1)
+        cache.delete(cache_versions._memo_key("a"))
+        self.assertEqual(cache_versions.version("a"), 5)
+
+        # this process's own bumps are seen right away
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_versions.bump("a")
+        self.assertEqual(cache_versions.version("a"), 6)
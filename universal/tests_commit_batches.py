@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.test import TestCase
+
+from . import commit_batches
+
+
+class _Collect(commit_batches.CommitBatch):
+    def __init__(self, runs):
+        super().__init__()
+        self.ids = set()
+        self.runs = runs
+
+    def run(self):
+        self.runs.append(sorted(self.ids))
+
+
+class CommitBatchTests(TestCase):
+    def _add(self, runs, pk):
+        commit_batches.pending("tests", lambda: _Collect(runs)).ids.add(pk)
+
+    def test_one_run_per_transaction_after_commit(self):
+        runs = []
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add(runs, 1)
+            self._add(runs, 2)
+            self.assertEqual(runs, [])
+        self.assertEqual(runs, [[1, 2]])
+
+        # a flushed batch is not reused
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add(runs, 3)
+        self.assertEqual(runs, [[1, 2], [3]])
+
+    def test_batch_of_a_rolled_back_savepoint_is_replaced(self):
+        runs = []
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._add(runs, 1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self._add(runs, 2)
+        self.assertEqual(runs, [[2]])